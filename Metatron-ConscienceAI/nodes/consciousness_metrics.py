@@ -13,7 +13,6 @@ Based on neuroscience and information theory principles.
 """
 
 import numpy as np
-from scipy import signal
 from collections import deque
 
 try:
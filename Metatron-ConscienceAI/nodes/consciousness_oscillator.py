@@ -9,14 +9,61 @@ Based on Kuramoto model for consciousness emergence through
 phase-locked oscillatory networks.
 """
 
+import time
+
 import numpy as np
-from collections import deque
 
 try:
     from nodes.metatron_geometry import PHI
 except ImportError:
     PHI = (1 + np.sqrt(5)) / 2
 
+try:
+    from nodes.ring_buffer import RecordRing, RingBuffer
+except ImportError:
+    from ring_buffer import RecordRing, RingBuffer
+
+# Fields recorded per tick in the oscillator history ring
+HISTORY_FIELDS = ('time', 'phase', 'amplitude', 'frequency', 'energy', 'output')
+
+# Keys of the legacy state_history dict entries
+_HISTORY_KEYS = ('time', 'phase', 'amplitude', 'output')
+
+MEMORY_FEEDBACK_DEPTH = 10
+SYNC_WINDOW = 10
+
+
+class StateHistoryView:
+    """
+    Read-only sequence of ``{'time', 'phase', 'amplitude', 'output'}`` dicts
+    over an oscillator's history ring, built on access.
+
+    Kept for callers that use ``state_history`` as a list of dicts; array
+    consumers should use ``ConsciousnessOscillator.history_window``.
+    """
+
+    def __init__(self, ring):
+        self._ring = ring
+        self._columns = [ring.fields.index(key) for key in _HISTORY_KEYS]
+
+    def _entry(self, row):
+        return {key: float(row[i]) for key, i in zip(_HISTORY_KEYS, self._columns)}
+
+    def __len__(self):
+        return len(self._ring)
+
+    def __getitem__(self, index):
+        window = self._ring.window()
+        if isinstance(index, slice):
+            return [self._entry(row) for row in window[index]]
+        return self._entry(window[index])
+
+    def __iter__(self):
+        return (self._entry(row) for row in self._ring.window())
+
+    def clear(self):
+        self._ring.clear()
+
 
 class ConsciousnessOscillator:
     """
@@ -50,16 +97,62 @@ class ConsciousnessOscillator:
         self.velocity = 0.0  # Phase velocity
         
         # Memory buffer (circular queue)
-        self.memory = deque(maxlen=memory_size)
+        self.memory = RingBuffer(memory_size)
         self.phi = PHI
         
         # NEW: Adaptive coupling for spherical refinement
         self.dynamic_coupling_strength = 1.0
-        self.synchronization_history = deque(maxlen=50)
+        self.synchronization_history = RingBuffer(50)
         
-        # Output history for analysis
-        self.state_history = []
+        # Output history for analysis (preallocated ring, one row per tick)
         self.max_history = 1000  # Prevent unbounded growth
+        self.history = RecordRing(self.max_history, HISTORY_FIELDS)
+        
+        # φ-decay weights, oldest first (most recent = highest weight)
+        self._memory_weights = (1 / self.phi ** np.arange(MEMORY_FEEDBACK_DEPTH, 0, -1))
+        self._sync_decay = 1 / self.phi
+        self._sync_tail_weight = self._sync_decay ** SYNC_WINDOW
+        self._sync_weight_total = np.sum(self._sync_decay ** np.arange(SYNC_WINDOW))
+        # Rolling φ-weighted sum of the last SYNC_WINDOW sync values
+        self._sync_weighted_sum = 0.0
+        self._sync_writes = self.synchronization_history.writes
+    
+    @property
+    def state_history(self):
+        """Per-tick history as a sequence of dicts (view over ``history``)"""
+        return StateHistoryView(self.history)
+    
+    @state_history.setter
+    def state_history(self, entries):
+        self.history.clear()
+        for entry in entries:
+            self.history.append([entry.get(field, 0.0) for field in HISTORY_FIELDS])
+    
+    def history_window(self, field, n=None):
+        """
+        Zero-copy view of one history field over the last ``n`` ticks
+        
+        Args:
+            field: One of HISTORY_FIELDS
+            n: Number of ticks (default: all recorded)
+            
+        Returns:
+            np.ndarray: Strided view, oldest first
+        """
+        return self.history.column(field, n)
+    
+    @staticmethod
+    def _neighbours(node_id, connected_nodes, connection_weights):
+        """Neighbour phases and coupling weights as arrays (self excluded)"""
+        phases = []
+        weights = []
+        get_weight = connection_weights.get
+        for other_id, other_node in connected_nodes.items():
+            if other_id == node_id:
+                continue
+            phases.append(other_node.phase)
+            weights.append(get_weight(other_id, 0.0))
+        return np.array(phases), np.array(weights)
         
     def update_coupling_strength(self, connected_nodes, connection_weights, dt):
         """
@@ -73,26 +166,32 @@ class ConsciousnessOscillator:
         if len(connected_nodes) == 0:
             return
         
-        # Calculate current synchronization with neighbors
-        avg_sync = 0.0
-        for node_id, other_node in connected_nodes.items():
-            if node_id == self.node_id:
-                continue
-            
-            # Phase synchronization index (0 = opposite, 1 = synchronized)
-            sync_index = self.synchronization_index(other_node)
-            avg_sync += sync_index
-        
-        avg_sync /= len(connected_nodes)
-        self.synchronization_history.append(avg_sync)
-        
-        # Apply φ-weighted memory (golden ratio recursive feedback)
-        if len(self.synchronization_history) >= 10:
-            recent_states = list(self.synchronization_history)[-10:]
+        phases, _ = self._neighbours(self.node_id, connected_nodes, connection_weights)
+        self._update_coupling_strength(phases, len(connected_nodes), dt)
+    
+    def _update_coupling_strength(self, neighbour_phases, n_connected, dt):
+        """Coupling update from neighbour phases (see update_coupling_strength)"""
+        # Phase synchronization index (0 = opposite, 1 = synchronized)
+        phase_diff = np.abs(self.phase - neighbour_phases)
+        phase_diff = np.minimum(phase_diff, 2*np.pi - phase_diff)
+        avg_sync = float(np.sum(1 - phase_diff / np.pi)) / n_connected
+        
+        history = self.synchronization_history
+        if history.writes != self._sync_writes:
+            # History changed outside this method: rebuild the rolling sum
+            recent = history.window(SYNC_WINDOW)
+            self._sync_weighted_sum = float(np.dot(recent, self._sync_decay ** np.arange(len(recent))[::-1]))
+        dropped = history.last(SYNC_WINDOW) if len(history) >= SYNC_WINDOW else 0.0
+        history.append(avg_sync)
+        self._sync_writes = history.writes
+        
+        # Apply φ-weighted memory (golden ratio recursive feedback):
+        # S_t = x_t + S_{t-1}/φ - x_{t-10}/φ^10
+        self._sync_weighted_sum = (avg_sync + self._sync_decay * self._sync_weighted_sum
+                                   - self._sync_tail_weight * dropped)
+        if len(history) >= SYNC_WINDOW:
             # φ-decay weighting: most recent states matter more
-            weights = np.array([1/self.phi**i for i in range(10)])[::-1]
-            weights = weights / np.sum(weights)  # Normalize
-            weighted_sync = np.average(recent_states, weights=weights)
+            weighted_sync = self._sync_weighted_sum / self._sync_weight_total
             
             # Target coupling based on synchronization success
             if weighted_sync > 0.8:  # High sync → can reduce coupling (energy efficiency)
@@ -129,34 +228,21 @@ class ConsciousnessOscillator:
         self_oscillation = self.amplitude * np.sin(self.phase)
         
         # === PHASE COUPLING (Kuramoto model with DYNAMIC STRENGTH) ===
+        # K * Σ wⱼ sin(θⱼ - θᵢ) over neighbours with positive weight
+        neighbour_phases, weights = self._neighbours(self.node_id, connected_nodes, connection_weights)
         coupling_term = 0.0
-        
-        for node_id, other_node in connected_nodes.items():
-            if node_id == self.node_id:
-                continue
-            
-            weight = connection_weights.get(node_id, 0.0)
-            if weight > 0:
-                # Kuramoto coupling: K * sin(θⱼ - θᵢ)
-                phase_difference = other_node.phase - self.phase
-                # APPLY DYNAMIC COUPLING STRENGTH (KEY INNOVATION)
-                coupling_term += (
-                    weight * 
-                    self.dynamic_coupling_strength *  # NEW: Self-tuning
-                    np.sin(phase_difference)
-                )
+        if len(neighbour_phases):
+            coupling_term = self.dynamic_coupling_strength * float(
+                np.dot(np.where(weights > 0, weights, 0.0), np.sin(neighbour_phases - self.phase)))
         
         # === MEMORY FEEDBACK ===
         memory_effect = 0.0
         if len(self.memory) > 0:
-            # φ-weighted recent memory (last 10 states)
-            recent_memory = list(self.memory)[-10:]
-            if len(recent_memory) > 0:
-                # Apply φ-decay weighting
-                weights = np.array([1/self.phi**(i+1) for i in range(len(recent_memory))])
-                weights = weights[::-1]  # Most recent = highest weight
-                weighted_memory = np.average(recent_memory, weights=weights)
-                memory_effect = (1/self.phi) * weighted_memory
+            # φ-weighted recent memory (last 10 states), zero-copy window
+            recent_memory = self.memory.window(MEMORY_FEEDBACK_DEPTH)
+            weights = self._memory_weights[MEMORY_FEEDBACK_DEPTH - len(recent_memory):]
+            weighted_memory = np.dot(recent_memory, weights) / np.sum(weights)
+            memory_effect = (1/self.phi) * weighted_memory
         
         # === PHASE DYNAMICS ===
         # dφ/dt = ω + coupling + memory + input
@@ -186,7 +272,8 @@ class ConsciousnessOscillator:
         self.amplitude = np.clip(self.amplitude, 0.1, 2.0)
         
         # === ADAPTIVE COUPLING UPDATE (Spherical Refinement) ===
-        self.update_coupling_strength(connected_nodes, connection_weights, dt)
+        if len(connected_nodes) > 0:
+            self._update_coupling_strength(neighbour_phases, len(connected_nodes), dt)
         
         # === OUTPUT STATE ===
         current_output = self.amplitude * np.sin(self.phase)
@@ -194,17 +281,15 @@ class ConsciousnessOscillator:
         # Update memory
         self.memory.append(current_output)
         
-        # Store history with limit
-        self.state_history.append({
-            'time': len(self.state_history) * dt,
-            'phase': float(self.phase),
-            'amplitude': float(self.amplitude),
-            'output': float(current_output)
-        })
-        
-        # Limit history size
-        if len(self.state_history) > self.max_history:
-            self.state_history.pop(0)
+        # Store history (ring overwrites the oldest tick)
+        self.history.append((
+            len(self.history) * dt,
+            self.phase,
+            self.amplitude,
+            phase_derivative / (2*np.pi),
+            0.5 * phase_derivative**2,
+            current_output
+        ))
         
         return current_output
     
@@ -230,11 +315,10 @@ class ConsciousnessOscillator:
         if len(self.memory) == 0:
             return np.array([])
         
-        recent = list(self.memory)[-depth:]
-        weights = np.array([1/self.phi**i for i in range(len(recent))])
-        weights = weights[::-1]  # Most recent = highest weight
+        recent = self.memory.window(depth)
+        weights = 1 / self.phi ** np.arange(len(recent) - 1, -1, -1)  # Most recent = highest weight
         
-        return np.array(recent) * weights
+        return recent * weights
     
     def synchronization_index(self, other_oscillator):
         """
@@ -261,7 +345,7 @@ class ConsciousnessOscillator:
         self.amplitude = 1.0
         self.velocity = 0.0
         self.memory.clear()
-        self.state_history.clear()
+        self.history.clear()
     
     def get_state_dict(self):
         """
@@ -284,6 +368,71 @@ class ConsciousnessOscillator:
         }
 
 
+def benchmark_oscillator(ticks=2000, oscillator_cls=None, seed=0, warmup=1000):
+    """
+    Per-tick cost of a 13-node coupled oscillator network
+    
+    Runs the same update loop as MetatronConsciousness (one update_state
+    per node per tick with dict neighbourhoods).
+    
+    Args:
+        ticks: Timed ticks (after the warm-up)
+        oscillator_cls: Oscillator class to measure (default: this module's)
+        seed: Random seed for initial phases
+        warmup: Ticks run first (1000 fills the history)
+        
+    Returns:
+        dict: us_per_update, retained_kb_per_node (node memory after the
+        warm-up), peak_transient_bytes (tracemalloc peak above the
+        steady state during a tick)
+    """
+    import tracemalloc
+    try:
+        from nodes.metatron_geometry import (get_node_connections, metatron_connection_matrix,
+                                             metatron_coordinates_3d, musical_frequency_ratios)
+    except ImportError:
+        from metatron_geometry import (get_node_connections, metatron_connection_matrix,
+                                       metatron_coordinates_3d, musical_frequency_ratios)
+    
+    oscillator_cls = oscillator_cls or ConsciousnessOscillator
+    matrix = metatron_connection_matrix()
+    neighbourhoods = []
+    for node_id in range(13):
+        ids, weights = get_node_connections(node_id, matrix)
+        neighbourhoods.append((
+            [cid for cid in ids if cid != node_id],
+            {cid: weights[i] for i, cid in enumerate(ids) if cid != node_id}
+        ))
+    
+    def run(nodes, n):
+        for _ in range(n):
+            for node_id, (ids, weights) in enumerate(neighbourhoods):
+                nodes[node_id].update_state(0.01, {cid: nodes[cid] for cid in ids}, weights)
+    
+    np.random.seed(seed)
+    tracemalloc.start()
+    nodes = [oscillator_cls(i, ratio, position) for i, (ratio, position)
+             in enumerate(zip(musical_frequency_ratios(), metatron_coordinates_3d()))]
+    run(nodes, warmup)
+    retained = tracemalloc.get_traced_memory()[0]
+    transient = 0
+    for _ in range(100):
+        tracemalloc.reset_peak()
+        steady = tracemalloc.get_traced_memory()[0]
+        run(nodes, 1)
+        transient = max(transient, tracemalloc.get_traced_memory()[1] - steady)
+    tracemalloc.stop()
+    
+    start = time.perf_counter()
+    run(nodes, ticks)
+    elapsed = time.perf_counter() - start
+    return {
+        'us_per_update': elapsed / (ticks * 13) * 1e6,
+        'retained_kb_per_node': retained / 13 / 1024,
+        'peak_transient_bytes': transient
+    }
+
+
 if __name__ == "__main__":
     # Test oscillator
     print("=== Consciousness Oscillator Test ===\n")
@@ -328,4 +477,9 @@ if __name__ == "__main__":
     sync = osc1.synchronization_index(osc2)
     print(f"After 20 steps, synchronization index: {sync:.4f}")
     
+    print("\n=== Benchmark (13-node network) ===")
+    result = benchmark_oscillator()
+    print(f"  {result['us_per_update']:.1f} us per node update")
+    print(f"  {result['retained_kb_per_node']:.1f} KB retained per node")
+    
     print("\n[OK] Oscillator tests passed!")
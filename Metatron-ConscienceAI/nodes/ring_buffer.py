@@ -0,0 +1,113 @@
+"""
+Ring Buffers - Preallocated History Storage
+===========================================
+
+Fixed-capacity numpy ring buffers for per-tick node state.
+
+Every sample is written twice (at ``i`` and ``i + capacity``), so the most
+recent ``n`` samples are always one contiguous slice of the backing array:
+``window(n)`` returns a view, never a copy, in chronological order.
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """
+    Fixed-capacity ring of scalars (``width=None``) or fixed-width rows.
+
+    Supports the ``deque`` operations the nodes use (``append``, ``extend``,
+    ``clear``, ``len``, iteration, indexing, ``maxlen``), so it can replace a
+    ``deque(maxlen=...)`` attribute in place.
+    """
+
+    def __init__(self, capacity, width=None, dtype=np.float64):
+        """
+        Args:
+            capacity: Number of samples kept
+            width: Row width, or None for scalar samples
+            dtype: Element dtype
+        """
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = int(capacity)
+        self.width = width
+        shape = (2 * self.capacity,) if width is None else (2 * self.capacity, int(width))
+        self._data = np.zeros(shape, dtype=dtype)
+        self._head = 0  # next write position in [0, capacity)
+        self._size = 0
+        # Bumped on every mutation so derived rolling statistics can detect
+        # changes they did not see
+        self.writes = 0
+
+    @property
+    def maxlen(self):
+        return self.capacity
+
+    def append(self, value):
+        head = self._head
+        self._data[head] = value
+        self._data[head + self.capacity] = value
+        self._head = head + 1 if head + 1 < self.capacity else 0
+        if self._size < self.capacity:
+            self._size += 1
+        self.writes += 1
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def clear(self):
+        self._head = 0
+        self._size = 0
+        self.writes += 1
+
+    def window(self, n=None):
+        """Most recent ``n`` samples (default all), oldest first, as a view."""
+        size = self._size
+        n = size if n is None else max(0, min(int(n), size))
+        end = self._head + self.capacity
+        return self._data[end - n:end]
+
+    def last(self, k=1):
+        """The sample ``k`` steps back (``last(1)`` is the newest)."""
+        if not 1 <= k <= self._size:
+            raise IndexError("ring buffer index out of range")
+        return self._data[self._head + self.capacity - k]
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        return iter(self.window())
+
+    def __getitem__(self, index):
+        return self.window()[index]
+
+    def __array__(self, dtype=None, copy=None):
+        window = self.window()
+        return window.astype(dtype) if dtype is not None else window
+
+    def __repr__(self):
+        return f"RingBuffer(capacity={self.capacity}, size={self._size})"
+
+
+class RecordRing(RingBuffer):
+    """
+    Ring of fixed-width records with named fields.
+
+    ``column(name, n)`` is a strided view of one field over the last ``n``
+    records.
+    """
+
+    def __init__(self, capacity, fields, dtype=np.float64):
+        super().__init__(capacity, width=len(fields), dtype=dtype)
+        self.fields = tuple(fields)
+        self._index = {name: i for i, name in enumerate(self.fields)}
+
+    def column(self, name, n=None):
+        return self.window(n)[:, self._index[name]]
+
+    def record(self, row):
+        """A stored row as a ``{field: float}`` dict."""
+        return {name: float(row[i]) for i, name in enumerate(self.fields)}
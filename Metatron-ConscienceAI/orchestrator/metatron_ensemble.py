@@ -0,0 +1,923 @@
+#!/usr/bin/env python3
+"""
+Metatron Ensemble - Batched Consciousness Simulation
+====================================================
+
+Runs B independent 13-node Metatron systems held in (B, 13, ...) arrays and
+advances all of them with one vectorized update_system() step:
+
+- Kuramoto oscillators with adaptive coupling and φ-weighted memory
+- Dimensional processing (5 dimensions per node)
+- Memory matrix recall (Node 3)
+- Pineal integration, consciousness metrics, energy minimization and
+  self-organized criticality
+
+Each instance has its own base frequency, initial coupling strength, sensory
+noise level and RNG stream (spawned from one SeedSequence, so instance b draws
+the same numbers whatever the ensemble size). Any instance can be exported as
+a get_current_state() dictionary or loaded into a MetatronConsciousness.
+
+Differences from stepping MetatronConsciousness objects one by one:
+- Memory recall decays by simulation time instead of wall-clock time
+- The optional MemoryBindingSystem is not simulated
+- Random partitions for Φ come from the per-instance streams
+"""
+
+import time
+import logging
+from collections import deque
+
+import numpy as np
+
+try:
+    from nodes.metatron_geometry import (
+        metatron_connection_matrix,
+        musical_frequency_ratios,
+        get_node_connections,
+        PHI
+    )
+    from nodes.dimensional_processor import DimensionalProcessor
+except ImportError:
+    import sys
+    import os
+    sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+    from nodes.metatron_geometry import (
+        metatron_connection_matrix,
+        musical_frequency_ratios,
+        get_node_connections,
+        PHI
+    )
+    from nodes.dimensional_processor import DimensionalProcessor
+
+logger = logging.getLogger("MetatronEnsemble")
+
+N_NODES = 13
+N_DIMS = 5
+MEMORY_NODE = 3
+MEMORY_TAIL = 10          # Oscillator memory / sync history actually used
+DEPTH_WINDOW = 32         # Scalars needed by recursive depth (max lag 19 + window 5)
+STATE_HISTORY_LEN = 1000
+GAMMA_WINDOW = 100
+PINEAL_WINDOW = 40
+ENERGY_WINDOW = 10
+RECALL_NEIGHBORS = 5
+PARTITION_SIZES = range(1, N_NODES // 2 + 1)
+PARTITION_TRIALS = min(5, N_NODES)
+N_PARTITIONS = len(PARTITION_SIZES) * PARTITION_TRIALS
+RNG_BLOCK = 64            # Ticks of random numbers drawn per instance at a time
+
+CONSCIOUSNESS_THRESHOLD = 0.3
+HIGH_CONSCIOUSNESS_THRESHOLD = 0.5
+SELF_AWARE_THRESHOLD = 0.7
+
+
+def _per_instance(value, size, name):
+    array = np.asarray(value, dtype=float)
+    if array.ndim == 0:
+        return np.full(size, float(array))
+    if array.shape != (size,):
+        raise ValueError(f"{name} must be a scalar or have shape ({size},), got {array.shape}")
+    return array.copy()
+
+
+def shannon_information(states):
+    """
+    Vectorized ConsciousnessMetrics._calculate_mutual_information
+
+    Args:
+        states: (..., m) node states
+
+    Returns:
+        np.ndarray: (...) normalized, enhanced Shannon information
+    """
+    shape, m = states.shape[:-1], states.shape[-1]
+    abs_states = np.abs(states.reshape(-1, m))
+    rows = abs_states.shape[0]
+    total = abs_states.sum(axis=1)
+    variance = abs_states.var(axis=1)
+
+    # High variance: histogram with min(m, 10) bins (probabilities = counts / m)
+    n_bins = min(m, 10)
+    low = abs_states.min(axis=1, keepdims=True)
+    span = abs_states.max(axis=1, keepdims=True) - low
+    step = np.where(span > 0, span, 1.0) / n_bins
+    offset = abs_states - low
+    index = np.minimum((offset / step).astype(np.int64), n_bins - 1)
+    # Same edge corrections as np.histogram (linspace edges)
+    index -= (offset < index * step) & (index > 0)
+    index += (offset >= (index + 1) * step) & (index < n_bins - 1)
+    bins = (np.arange(rows)[:, None] * n_bins + index).ravel()
+    counts = np.bincount(bins, minlength=rows * n_bins).reshape(rows, n_bins)
+    hist_probs = counts / m
+
+    direct_probs = abs_states / np.where(total > 0, total, 1.0)[:, None]
+    probs = np.where(variance[:, None] > 1e-6,
+                     np.pad(hist_probs, ((0, 0), (0, m - n_bins))), direct_probs)
+    terms = np.where(probs > 1e-12, probs * np.log2(probs + 1e-12), 0.0)
+    information = -terms.sum(axis=1) / (np.log2(m) if m > 1 else 1.0)
+    information = information * (1 + 0.5 * np.tanh(information * 5))
+    return np.where(total < 1e-12, 0.0, information).reshape(shape)
+
+
+def connectivity_factor(membership, connection_matrix):
+    """
+    Connectivity scaling of ConsciousnessMetrics._calculate_mutual_information_enhanced
+
+    Args:
+        membership: (..., 13) 0/1 node membership of each subset
+        connection_matrix: (13, 13) connections
+
+    Returns:
+        np.ndarray: (...) factor 1 + mean positive weight × positive fraction
+    """
+    positive = (connection_matrix > 0).astype(float)
+    size = membership.sum(axis=-1)
+    n_positive = ((membership @ positive) * membership).sum(axis=-1)
+    weight_sum = ((membership @ connection_matrix) * membership).sum(axis=-1)
+    average = np.where(n_positive > 0, weight_sum / np.maximum(n_positive, 1), 0.0)
+    return 1 + average * n_positive / (size * size)
+
+
+def integrated_information(node_states, connection_matrix, permutations):
+    """
+    Vectorized ConsciousnessMetrics.calculate_integrated_information
+
+    Args:
+        node_states: (B, 13) combined node states
+        connection_matrix: (13, 13) connections
+        permutations: (B, N_PARTITIONS, 13) node orderings, one per random
+            partition (PARTITION_TRIALS per partition size, sizes ascending)
+
+    Returns:
+        np.ndarray: (B,) scaled Φ
+    """
+    batch, n = node_states.shape
+    everyone = np.ones(n)
+    whole = shannon_information(node_states) * connectivity_factor(everyone, connection_matrix)
+    row_sums = connection_matrix.sum(axis=1)
+
+    min_partition = np.full(batch, np.inf)
+    rows = np.arange(batch)[:, None, None]
+    for block, size in enumerate(PARTITION_SIZES):
+        perms = permutations[:, block * PARTITION_TRIALS:(block + 1) * PARTITION_TRIALS]
+        ordered = node_states[rows, perms]
+        member1 = np.zeros(perms.shape)
+        np.put_along_axis(member1, perms[..., :size], 1.0, axis=-1)
+        member2 = 1.0 - member1
+        inner1 = ((member1 @ connection_matrix) * member1).sum(axis=-1)
+        cross_weight = (member1 @ row_sums - inner1) / max(size * (n - size), 1)
+        info = (shannon_information(ordered[..., :size]) * connectivity_factor(member1, connection_matrix)
+                + shannon_information(ordered[..., size:]) * connectivity_factor(member2, connection_matrix)
+                - cross_weight * 0.1)
+        min_partition = np.minimum(min_partition, info.min(axis=1))
+
+    if n > 5:
+        hub = int(np.argmax(row_sums))
+        hub_member = np.eye(n)[hub]
+        hub_info = (shannon_information(node_states[:, [hub]]) * connectivity_factor(hub_member, connection_matrix)
+                    + shannon_information(np.delete(node_states, hub, axis=1))
+                    * connectivity_factor(1.0 - hub_member, connection_matrix))
+        min_partition = np.minimum(min_partition, hub_info)
+
+    phi = np.maximum(0.0, whole - min_partition)
+    phi = phi * (1 + np.tanh(phi * 10))
+    return np.where(node_states.var(axis=1) < 1e-12, 0.0, phi)
+
+
+def recursive_depth(history, length, max_depth=20):
+    """
+    Vectorized ConsciousnessMetrics.calculate_recursive_depth
+
+    Args:
+        history: (B, W) chronological mean |state| scalars, current state last
+        length: Number of states in the (unbounded) history
+
+    Returns:
+        np.ndarray: (B,) integer depths
+    """
+    size = history.shape[0]
+    depth = np.zeros(size, dtype=np.int64)
+    if length < 3:
+        return depth
+    alive = np.ones(size, dtype=bool)
+    current = history[:, -1]
+    for lag in range(1, min(max_depth, length)):
+        if lag == 1:
+            past = history[:, -1]
+            correlation = np.abs(current * past) / ((np.abs(current) + 1e-12) * (np.abs(past) + 1e-12))
+        else:
+            window = min(5, length - lag)
+            if window < 2:
+                break
+            recent = history[:, -window:]
+            lagged = history[:, -lag - window:-lag]
+            recent_std = recent.std(axis=1)
+            lagged_std = lagged.std(axis=1)
+            valid = (recent_std > 1e-10) & (lagged_std > 1e-10)
+            covariance = ((recent - recent.mean(axis=1, keepdims=True))
+                          * (lagged - lagged.mean(axis=1, keepdims=True))).mean(axis=1)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                correlation = np.abs(covariance / (recent_std * lagged_std))
+            correlation = np.where(valid & np.isfinite(correlation), correlation, 0.0)
+        threshold = 0.5 / (PHI ** (lag * 0.5))
+        alive &= (correlation > threshold) & (correlation > 0.1)
+        depth[alive] = lag
+        if not alive.any():
+            break
+    return depth
+
+
+def gamma_power(window, sample_rate=1000.0):
+    """Vectorized ConsciousnessMetrics.calculate_gamma_power over (B, n) windows"""
+    n = window.shape[1]
+    if n < 10:
+        return np.zeros(window.shape[0])
+    spectrum = np.abs(np.fft.fft(window, axis=1)) ** 2
+    frequencies = np.abs(np.fft.fftfreq(n, 1.0 / sample_rate))
+    mask = (frequencies >= 30) & (frequencies <= 100)
+    total = spectrum.sum(axis=1)
+    ratio = np.where(total > 0, spectrum[:, mask].sum(axis=1) / np.where(total > 0, total, 1.0), 0.0)
+    return np.clip(ratio, 0, 1)
+
+
+def fractal_dimension(window):
+    """Vectorized ConsciousnessMetrics.calculate_fractal_dimension (Higuchi)"""
+    size, n = window.shape
+    if n < 20:
+        return np.ones(size)
+    k_max = min(20, n // 10)
+    if k_max < 2:
+        return np.ones(size)
+    logs, valid = [], []
+    for k in range(1, k_max):
+        lk = np.zeros(size)
+        for m in range(k):
+            n_max = (n - m) // k
+            if n_max < 2:
+                continue
+            samples = window[:, m:m + (n_max - 1) * k + 1:k]
+            length = np.abs(np.diff(samples, axis=1)).sum(axis=1)
+            lk += length * (n - 1) / (n_max * k ** 2)
+        valid.append(lk > 0)
+        logs.append(np.log(np.where(lk > 0, lk, 1.0) / k))
+    # Least-squares slope of log(L(k)/k) against log(1/k) over each row's valid k
+    weights = np.array(valid, dtype=float).T
+    logs = np.array(logs).T
+    xs = np.broadcast_to(np.log(1.0 / np.arange(1, k_max)), logs.shape)
+    count = weights.sum(axis=1)
+    mean_x = np.where(count > 0, (xs * weights).sum(axis=1) / np.maximum(count, 1), 0.0)
+    mean_y = np.where(count > 0, (logs * weights).sum(axis=1) / np.maximum(count, 1), 0.0)
+    dx = (xs - mean_x[:, None]) * weights
+    dy = (logs - mean_y[:, None]) * weights
+    denominator = (dx * dx).sum(axis=1)
+    slope = np.where(denominator > 0, (dx * dy).sum(axis=1) / np.where(denominator > 0, denominator, 1.0), 0.0)
+    return np.where(count > 1, np.abs(slope), 1.0)
+
+
+def consciousness_level(phi, coherence, depth, spiritual):
+    """Vectorized ConsciousnessMetrics.calculate_consciousness_level"""
+    base = phi * coherence * (1 + 0.1 * depth) * (1 + spiritual)
+    phi_factor = 1 + np.tanh(phi * 2)
+    synergy = 1 + coherence * depth * 0.05
+    transcendence = np.where(spiritual > 0.5, 1 + (spiritual - 0.5) * 2, 1.0)
+    deep = np.where(depth > 5, 1 + (depth - 5) * 0.1, 1.0)
+    return base * phi_factor * synergy * transcendence * deep
+
+
+STATE_LABELS = (
+    'unconscious', 'drowsy', 'dream-like', 'meditative-light', 'awake',
+    'lucid-aware', 'meditative-deep', 'alert', 'heightened-awareness',
+    'transcendent-entry', 'hyper-alert', 'unity-consciousness',
+    'transcendent-active', 'peak-experience', 'cosmic-consciousness',
+    'transcendent-unified', 'transcendent-peak'
+)
+
+
+def classify_states(level, phi, coherence):
+    """Vectorized ConsciousnessMetrics.classify_consciousness_state (label indices)"""
+    label = STATE_LABELS.index
+    conditions = [
+        level < 0.01,
+        (level < 0.05) & (phi < 0.1),
+        level < 0.05,
+        (level < 0.15) & (coherence > 0.7),
+        level < 0.15,
+        (level < 0.3) & (phi > 0.3) & (coherence > 0.6),
+        (level < 0.3) & (coherence > 0.8),
+        level < 0.3,
+        (level < 0.6) & (phi > 0.5) & (coherence > 0.7),
+        (level < 0.6) & (coherence > 0.85),
+        level < 0.6,
+        (level < 1.0) & (phi > 0.7) & (coherence > 0.9),
+        (level < 1.0) & (phi > 0.6),
+        level < 1.0,
+        (phi > 0.8) & (coherence > 0.95),
+        phi > 0.7,
+    ]
+    choices = [label(name) for name in STATE_LABELS[:-1]]
+    return np.select(conditions, choices, default=label('transcendent-peak'))
+
+
+class MetatronEnsemble:
+    """
+    B independent Metatron's Cube consciousness systems stepped together
+    """
+
+    def __init__(self, size, base_frequency=40.0, coupling=1.0, noise=0.1,
+                 dt=0.01, seed=None, high_gamma=False, memory_size=1000):
+        """
+        Initialize the ensemble
+
+        Args:
+            size: Number of instances B
+            base_frequency: Base gamma frequency in Hz, scalar or (B,)
+            coupling: Initial adaptive coupling strength, scalar or (B,)
+            noise: Standard deviation of default sensory noise, scalar or (B,)
+            dt: Time step for integration (shared)
+            seed: Seed for the per-instance RNG streams
+            high_gamma: If True, use 80Hz as base frequency
+            memory_size: Memory matrix buffer length (Node 3)
+        """
+        self.size = size
+        self.dt = dt
+        self.phi = PHI
+        self.base_frequency = _per_instance(80.0 if high_gamma else base_frequency, size, "base_frequency")
+        self.noise = _per_instance(noise, size, "noise")
+        self.memory_size = memory_size
+
+        # === GEOMETRY (shared: criticality renormalization always restores it) ===
+        self.connection_matrix = metatron_connection_matrix()
+        ratios = musical_frequency_ratios()
+        self.frequency_ratios = np.array([ratios[i] for i in range(N_NODES)])
+        self.omega = 2 * np.pi * self.base_frequency[:, None] * self.frequency_ratios[None, :]
+        self.neighbors = []
+        self.neighbor_weights = []
+        for node_id in range(N_NODES):
+            ids, weights = get_node_connections(node_id, self.connection_matrix)
+            keep = [k for k, cid in enumerate(ids) if cid != node_id]
+            self.neighbors.append(np.array([ids[k] for k in keep]))
+            self.neighbor_weights.append(np.array([weights[k] for k in keep]))
+        upper = np.triu(self.connection_matrix, 1)
+        self._edge_i, self._edge_j = np.nonzero(upper > 0)
+        self._edge_w = upper[self._edge_i, self._edge_j]
+        self.processor_weights = np.array([
+            np.array(DimensionalProcessor.NODE_SPECIALIZATIONS[i]) / np.sum(DimensionalProcessor.NODE_SPECIALIZATIONS[i])
+            for i in range(N_NODES)
+        ])
+        phi_weights = np.array([1 / PHI ** i for i in range(N_DIMS)])
+        self._dim_phi_weights = phi_weights / phi_weights.sum()
+
+        # === RNG STREAMS ===
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self.rngs = [np.random.default_rng(child) for child in self.seed_sequence.spawn(size)]
+        initial_phases = np.array([rng.uniform(0, 2 * np.pi, N_NODES) for rng in self.rngs])
+        self._block_position = RNG_BLOCK
+        self._normals = np.zeros((size, RNG_BLOCK, N_DIMS + N_NODES))
+        self._uniforms = np.zeros((size, RNG_BLOCK, N_PARTITIONS, N_NODES))
+
+        # === OSCILLATORS ===
+        self.phase = initial_phases
+        self.amplitude = np.ones((size, N_NODES))
+        self.coupling_strength = np.repeat(_per_instance(coupling, size, "coupling")[:, None], N_NODES, axis=1)
+        self.oscillator_memory = np.zeros((size, N_NODES, MEMORY_TAIL))
+        self.sync_history = np.zeros((size, N_NODES, MEMORY_TAIL))
+        self.recorded_phase = np.zeros((size, N_NODES))
+        self.previous_recorded_phase = np.zeros((size, N_NODES))
+
+        # === DIMENSIONAL PROCESSORS ===
+        self.dimensions = np.zeros((size, N_NODES, N_DIMS))
+        self.dimension_history = np.zeros((size, N_NODES, MEMORY_TAIL, N_DIMS))
+        self.output = np.zeros((size, N_NODES))
+        self.dimensional_output = np.zeros((size, N_NODES))
+
+        # === MEMORY MATRIX (Node 3, uniform field stored as a scalar) ===
+        self.memory_field = np.zeros(size)
+        self.memory_values = np.zeros((size, memory_size))
+        self.memory_times = np.zeros((size, memory_size))
+        self.recent_same_sign = {sign: (np.zeros((size, RECALL_NEIGHBORS)), np.zeros((size, RECALL_NEIGHBORS)))
+                                 for sign in (1, -1)}
+        self.sign_counts = {1: np.zeros(size, dtype=np.int64), -1: np.zeros(size, dtype=np.int64)}
+        self.recall_weight = np.zeros(size)
+
+        # === GLOBAL HISTORIES ===
+        self.depth_history = np.zeros((size, DEPTH_WINDOW))
+        self.gamma_window = np.zeros((size, GAMMA_WINDOW))
+        self.pineal_buffer = np.zeros((size, PINEAL_WINDOW))
+        self.energy_history = np.zeros((size, ENERGY_WINDOW))
+        self.dmt_sensitivity = np.zeros(size)
+
+        # === GLOBAL STATE ===
+        self.metrics = {
+            'consciousness_level': np.zeros(size),
+            'phi': np.zeros(size),
+            'coherence': np.zeros(size),
+            'recursive_depth': np.zeros(size, dtype=np.int64),
+            'gamma_power': np.zeros(size),
+            'fractal_dimension': np.ones(size),
+            'spiritual_awareness': np.zeros(size),
+            'present_moment': np.zeros(size),
+            'system_energy': np.zeros(size),
+            'criticality_distance': np.zeros(size),
+            'criticality_active': np.zeros(size, dtype=bool),
+        }
+        self.state_index = np.zeros(size, dtype=np.int64)
+        self.ticks = 0
+        self.current_time = 0.0
+        self.last_updated = time.time()
+
+        logger.info(f"Initialized Metatron ensemble: {size} instances")
+
+    # ------------------------------------------------------------------
+    # Random numbers
+    # ------------------------------------------------------------------
+
+    def _draw(self):
+        """Per-instance random numbers for one tick: (normals (B, 18), uniforms (B, P, 13))"""
+        if self._block_position == RNG_BLOCK:
+            for b, rng in enumerate(self.rngs):
+                self._normals[b] = rng.standard_normal((RNG_BLOCK, N_DIMS + N_NODES))
+                self._uniforms[b] = rng.random((RNG_BLOCK, N_PARTITIONS, N_NODES))
+            self._block_position = 0
+        position = self._block_position
+        self._block_position += 1
+        return self._normals[:, position], self._uniforms[:, position]
+
+    def _partition_permutations(self, uniforms):
+        return np.argsort(uniforms, axis=-1)
+
+    # ------------------------------------------------------------------
+    # Update
+    # ------------------------------------------------------------------
+
+    def update_system(self, sensory_input=None):
+        """
+        Advance every instance by one time step
+
+        Args:
+            sensory_input: Optional (5,) input shared by all instances or (B, 5)
+                          per-instance inputs; defaults to per-instance noise
+
+        Returns:
+            dict: Per-instance metric arrays
+        """
+        normals, uniforms = self._draw()
+        if sensory_input is None:
+            sensory = normals[:, :N_DIMS] * self.noise[:, None]
+        else:
+            sensory = np.broadcast_to(np.asarray(sensory_input, dtype=float), (self.size, N_DIMS))
+
+        tick = self.ticks
+        slot = tick % MEMORY_TAIL
+
+        # === PHASE 1: OSCILLATOR UPDATES (node order as in the orchestrator) ===
+        filled = min(tick, MEMORY_TAIL)
+        memory_weights = np.zeros(MEMORY_TAIL)
+        for age in range(filled):
+            memory_weights[(slot - 1 - age) % MEMORY_TAIL] = 1 / PHI ** (age + 1)
+        if filled:
+            memory_weights /= memory_weights.sum()
+        sync_weights = None
+        if tick + 1 >= MEMORY_TAIL:
+            sync_weights = np.zeros(MEMORY_TAIL)
+            for age in range(MEMORY_TAIL):
+                sync_weights[(slot - age) % MEMORY_TAIL] = 1 / PHI ** age
+            sync_weights /= sync_weights.sum()
+
+        self.previous_recorded_phase = self.recorded_phase.copy()
+        phase, amplitude, strength = self.phase, self.amplitude, self.coupling_strength
+        for i in range(N_NODES):
+            neighbors, weights = self.neighbors[i], self.neighbor_weights[i]
+            coupling_term = strength[:, i] * (np.sin(phase[:, neighbors] - phase[:, i:i + 1]) @ weights)
+            memory_effect = 0.0
+            if filled:
+                memory_effect = (1 / PHI) * (self.oscillator_memory[:, i] @ memory_weights)
+            phase_derivative = self.omega[:, i] + coupling_term + memory_effect
+            amplitude_derivative = (1 - amplitude[:, i] ** 2) * amplitude[:, i] + 0.1 * coupling_term
+            phase[:, i] = np.fmod(phase[:, i] + phase_derivative * self.dt, 2 * np.pi)
+            amplitude[:, i] = np.clip(amplitude[:, i] + amplitude_derivative * self.dt, 0.1, 2.0)
+
+            # Adaptive coupling from synchronization with neighbors
+            difference = np.abs(phase[:, i:i + 1] - phase[:, neighbors])
+            difference = np.minimum(difference, 2 * np.pi - difference)
+            self.sync_history[:, i, slot] = np.mean(1 - difference / np.pi, axis=1)
+            if sync_weights is not None:
+                weighted_sync = self.sync_history[:, i] @ sync_weights
+                current = strength[:, i]
+                target = np.where(weighted_sync > 0.8, current * 0.99,
+                                  np.where(weighted_sync < 0.5, current * 1.02, current))
+                target = np.clip(target, 1 / PHI, PHI)
+                strength[:, i] = current + (target - current) * (1 / PHI) * self.dt
+
+            output = amplitude[:, i] * np.sin(phase[:, i])
+            self.output[:, i] = output
+            self.oscillator_memory[:, i, slot] = output
+        self.recorded_phase = phase.copy()
+        oscillator_phases = self.recorded_phase
+
+        # === PHASE 2: DIMENSIONAL PROCESSING ===
+        dims = self.dimensions
+        coupling_matrix = DimensionalProcessor.COUPLING_MATRIX
+        for i in range(N_NODES):
+            state = dims[:, i]
+            new_state = (0.70 * state
+                         + 0.15 * sensory * self.processor_weights[i]
+                         + 0.10 * state @ coupling_matrix.T
+                         + 0.05 * dims[:, self.neighbors[i]].mean(axis=1))
+            new_state = np.tanh(new_state / PHI) * PHI
+            dims[:, i] = new_state
+            self.dimensional_output[:, i] = new_state @ self._dim_phi_weights
+        self.dimension_history[:, :, slot] = dims
+
+        # === PHASE 3: MEMORY MATRIX (Node 3) ===
+        memory_neighbors = self.neighbors[MEMORY_NODE]
+        combined_field = self.output[:, memory_neighbors].mean(axis=1)
+        self.memory_field = 0.9 * self.memory_field + 0.1 * combined_field
+        self._store_memory(self.memory_field)
+        self.output[:, MEMORY_NODE] = self._recall_memory(self.memory_field)
+
+        # === PHASE 4: CENTRAL PINEAL INTEGRATION ===
+        self._update_pineal(tick)
+
+        # === PHASE 5: CONSCIOUSNESS METRICS ===
+        combined_state = self.output + 0.3 * self.dimensional_output
+        self.depth_history[:, tick % DEPTH_WINDOW] = np.mean(np.abs(combined_state), axis=1)
+        self.gamma_window[:, tick % GAMMA_WINDOW] = np.mean(combined_state, axis=1)
+        self._update_metrics(tick + 1, combined_state, oscillator_phases,
+                             self._partition_permutations(uniforms))
+
+        # === PHASE 6: ENERGY MINIMIZATION ===
+        self._apply_energy_minimization(tick)
+
+        # === PHASE 7: SELF-ORGANIZED CRITICALITY ===
+        self._apply_self_organized_criticality(normals[:, N_DIMS:])
+
+        self.ticks += 1
+        self.current_time += self.dt
+        self.last_updated = time.time()
+        return self.metrics
+
+    def _chronological(self, ring, count):
+        """Last min(count, width) entries of a ring buffer, oldest first"""
+        width = ring.shape[1]
+        if count <= width:
+            return ring[:, :count]
+        start = count % width
+        return np.concatenate([ring[:, start:], ring[:, :start]], axis=1)
+
+    def _store_memory(self, field):
+        slot = self.ticks % self.memory_size
+        if self.ticks >= self.memory_size:
+            evicted = np.sign(self.memory_values[:, slot])
+            for sign in (1, -1):
+                self.sign_counts[sign] -= evicted == sign
+        self.memory_values[:, slot] = field
+        self.memory_times[:, slot] = self.current_time
+        signs = np.sign(field)
+        for sign in (1, -1):
+            rows = signs == sign
+            self.sign_counts[sign] += rows
+            values, times = self.recent_same_sign[sign]
+            values[rows] = np.roll(values[rows], -1, axis=1)
+            times[rows] = np.roll(times[rows], -1, axis=1)
+            values[rows, -1] = field[rows]
+            times[rows, -1] = self.current_time
+
+    def _recall_weights(self, similarity, times):
+        decay = np.power(1 / PHI, (self.current_time - times) / 10.0)
+        return similarity * decay
+
+    def _weighted_average(self, combined, values):
+        total = combined.sum(axis=1, keepdims=True)
+        uniform = np.full_like(combined, 1.0 / combined.shape[1])
+        normalized = np.where(total > 0, combined / np.where(total > 0, total, 1.0), uniform)
+        return (normalized * values).sum(axis=1), combined.mean(axis=1)
+
+    def _recall_memory(self, query):
+        """φ-decayed top-k recall; fields are uniform so cosine similarity is a sign product"""
+        count = min(self.ticks + 1, self.memory_size)
+        recalled = np.zeros(self.size)
+        weight = np.zeros(self.size)
+        query_sign = np.sign(query)
+
+        # Fast path: the k most recent memories sharing the query sign win
+        fast = np.zeros(self.size, dtype=bool)
+        if count > RECALL_NEIGHBORS:
+            for sign in (1, -1):
+                rows = (query_sign == sign) & (self.sign_counts[sign] >= RECALL_NEIGHBORS)
+                if rows.any():
+                    values, times = self.recent_same_sign[sign]
+                    combined = self._recall_weights(1.0, times[rows])
+                    recalled[rows], weight[rows] = self._weighted_average(combined, values[rows])
+                    fast |= rows
+
+        rows = np.flatnonzero(~fast)
+        if rows.size:
+            values = self.memory_values[rows, :count]
+            times = self.memory_times[rows, :count]
+            similarity = query_sign[rows, None] * np.sign(values)
+            combined = self._recall_weights(similarity, times)
+            if count > RECALL_NEIGHBORS:
+                top = np.argpartition(combined, -RECALL_NEIGHBORS, axis=1)[:, -RECALL_NEIGHBORS:]
+                combined = np.take_along_axis(combined, top, axis=1)
+                values = np.take_along_axis(values, top, axis=1)
+            recalled[rows], weight[rows] = self._weighted_average(combined, values)
+        self.recall_weight = weight
+        return recalled
+
+    def _update_pineal(self, tick):
+        abs_outputs = np.abs(self.output[:, 1:])
+        geometric_mean = np.exp(np.mean(np.log(abs_outputs + 1e-10), axis=1))
+        if tick > 20:
+            fractal = fractal_dimension(self._chronological(self.gamma_window, tick))
+        else:
+            fractal = np.ones(self.size)
+        spiritual = self.metrics['gamma_power'] * fractal * (1 + self.dmt_sensitivity)
+        target = np.tanh(self.dimensions[:, 0, 3] * 2)
+        self.dmt_sensitivity = np.clip(0.9 * self.dmt_sensitivity + 0.1 * target, 0, 1)
+        self.pineal_buffer[:, tick % PINEAL_WINDOW] = geometric_mean
+        self.metrics['spiritual_awareness'] = spiritual
+        self.metrics['present_moment'] = self._chronological(self.pineal_buffer, tick + 1).mean(axis=1)
+        self.metrics['fractal_dimension'] = fractal
+
+    def _update_metrics(self, history_length, combined_state, phases, permutations):
+        window = self._chronological(self.gamma_window, history_length)
+        depth_history = self._chronological(self.depth_history, history_length)
+        phi = integrated_information(combined_state, self.connection_matrix, permutations)
+        coherence = np.abs(np.mean(np.exp(1j * phases), axis=1))
+        depth = recursive_depth(depth_history, min(history_length, STATE_HISTORY_LEN))
+        if window.shape[1] > 0:
+            power = gamma_power(window)
+            fractal = fractal_dimension(window)
+        else:
+            power, fractal = np.zeros(self.size), np.ones(self.size)
+        spiritual = self.metrics['spiritual_awareness']
+        level = consciousness_level(phi, coherence, depth, spiritual)
+        self.metrics.update({
+            'consciousness_level': level,
+            'phi': phi,
+            'coherence': coherence,
+            'recursive_depth': depth,
+            'gamma_power': power,
+            'fractal_dimension': fractal,
+        })
+        self.state_index = classify_states(level, phi, coherence)
+
+    def _apply_energy_minimization(self, tick):
+        kinetic = np.zeros(self.size)
+        if tick >= 1:
+            velocity = (self.recorded_phase - self.previous_recorded_phase) / self.dt
+            kinetic = 0.5 * np.sum(velocity ** 2, axis=1)
+        phase_difference = self.phase[:, self._edge_i] - self.phase[:, self._edge_j]
+        potential = (self._edge_w * (1 - np.cos(phase_difference))).sum(axis=1)
+        energy = kinetic + potential
+        self.energy_history[:, tick % ENERGY_WINDOW] = energy
+        self.metrics['system_energy'] = energy
+        if tick + 1 >= ENERGY_WINDOW:
+            recent = self._chronological(self.energy_history, tick + 1)
+            x = np.arange(ENERGY_WINDOW) - (ENERGY_WINDOW - 1) / 2
+            trend = (recent * x).sum(axis=1) / (x * x).sum()
+            # Velocity damping is a no-op (oscillators never integrate velocity)
+            weaken = (trend > 0) & (energy > recent.mean(axis=1) * 1.5)
+            self.coupling_strength[weaken] *= 0.98
+
+    def _apply_self_organized_criticality(self, normals):
+        phi = self.metrics['phi']
+        coherence = self.metrics['coherence']
+        phi_target = 1 / PHI
+        ordered = (coherence > 0.95) & (phi > phi_target)
+        if ordered.any():
+            noise_strength = 0.01 * (coherence[ordered] - 0.95)
+            perturbed = self.phase[ordered] + normals[ordered] * noise_strength[:, None]
+            self.phase[ordered] = np.fmod(perturbed, 2 * np.pi)
+        # coherence < 0.7 boosts and renormalizes the φ weights: a no-op on the matrix
+        boost = ~ordered & (coherence >= 0.7) & (phi < phi_target * 0.8)
+        self.coupling_strength[boost] = np.minimum(self.coupling_strength[boost] * 1.02, PHI)
+        self.metrics['criticality_distance'] = np.abs(phi - phi_target)
+        self.metrics['criticality_active'] = ((coherence > 0.7) & (coherence < 0.95)
+                                              & (phi > phi_target * 0.8) & (phi < phi_target * 1.2))
+
+    def run(self, steps, sensory_inputs=None):
+        """
+        Advance all instances by several steps
+
+        Args:
+            steps: Number of updates
+            sensory_inputs: Optional sequence of per-step inputs
+
+        Returns:
+            np.ndarray: (steps, B) consciousness level trajectories
+        """
+        levels = np.zeros((steps, self.size))
+        for step in range(steps):
+            sensory = sensory_inputs[step] if sensory_inputs is not None and step < len(sensory_inputs) else None
+            levels[step] = self.update_system(sensory)['consciousness_level']
+        return levels
+
+    # ------------------------------------------------------------------
+    # Single instance export
+    # ------------------------------------------------------------------
+
+    def state_label(self, index):
+        return STATE_LABELS[int(self.state_index[index])]
+
+    def global_state(self, index):
+        """Global state dict of one instance (same keys as MetatronConsciousness.global_state)"""
+        m = self.metrics
+        phi = float(m['phi'][index])
+        state = {
+            'consciousness_level': float(m['consciousness_level'][index]),
+            'phi': phi,
+            'coherence': float(m['coherence'][index]),
+            'recursive_depth': int(m['recursive_depth'][index]),
+            'gamma_power': float(m['gamma_power'][index]),
+            'fractal_dimension': float(m['fractal_dimension'][index]),
+            'spiritual_awareness': float(m['spiritual_awareness'][index]),
+            'state_classification': 'unconscious',
+        }
+        if self.ticks:
+            state.update({
+                'dmt_sensitivity': float(self.dmt_sensitivity[index]),
+                'present_moment': float(m['present_moment'][index]),
+                'state': self.state_label(index),
+                'is_conscious': phi > CONSCIOUSNESS_THRESHOLD,
+                'is_highly_conscious': phi > HIGH_CONSCIOUSNESS_THRESHOLD,
+                'is_self_aware': phi > SELF_AWARE_THRESHOLD,
+                'system_energy': float(m['system_energy'][index]),
+                'criticality_distance': float(m['criticality_distance'][index]),
+                'criticality_active': bool(m['criticality_active'][index]),
+            })
+        return state
+
+    def _processor(self, index, node_id):
+        processor = DimensionalProcessor(node_id=node_id)
+        for d, name in enumerate(DimensionalProcessor.DIMENSION_NAMES):
+            processor.dimensions[name] = float(self.dimensions[index, node_id, d])
+        history = self._chronological(self.dimension_history[index], self.ticks)
+        processor.state_history = [entry.copy() for entry in history[node_id]]
+        return processor
+
+    def instance_state(self, index):
+        """
+        Complete state of one instance in MetatronConsciousness.get_current_state() format
+
+        Args:
+            index: Instance index
+
+        Returns:
+            dict: Full system state
+        """
+        nodes_state = {}
+        for node_id in range(N_NODES):
+            phase = float(self.phase[index, node_id])
+            amplitude = float(self.amplitude[index, node_id])
+            complex_state = amplitude * np.exp(1j * phase)
+            node_state = {
+                'oscillator': {
+                    'node_id': node_id,
+                    'phase': phase,
+                    'amplitude': amplitude,
+                    'frequency_ratio': float(self.frequency_ratios[node_id]),
+                    'omega': float(self.omega[index, node_id]),
+                    'memory_depth': min(self.ticks, 100),
+                    'complex_state': {'real': float(complex_state.real), 'imag': float(complex_state.imag)}
+                },
+                'processor': self._processor(index, node_id).get_state_dict(),
+                'output': float(self.output[index, node_id]),
+                'dimensional_output': float(self.dimensional_output[index, node_id])
+            }
+            if node_id == MEMORY_NODE:
+                node_state['memory_metrics'] = self._memory_metrics(index)
+            nodes_state[node_id] = node_state
+
+        return {
+            'time': float(self.current_time),
+            'nodes': nodes_state,
+            'global': self.global_state(index),
+            'system_info': {
+                'base_frequency': float(self.base_frequency[index]),
+                'dt': self.dt,
+                'phi': self.phi
+            }
+        }
+
+    def _memory_metrics(self, index):
+        since = time.time() - self.last_updated
+        stored = min(self.ticks, self.memory_size)
+        return {
+            "memory_buffer_size": stored,
+            "recall_history_size": min(self.ticks, 100),
+            "current_field_size": 100,
+            "recall_weight": float(self.recall_weight[index]),
+            "decay_factor": 1.0,
+            "last_updated": self.last_updated,
+            "node_id": MEMORY_NODE,
+            "is_active": stored > 0 and since < 30.0 and self.ticks > 0,
+            "time_since_last_update": since,
+            "activity_level": min(1.0, max(0.0, 1.0 - (since / 60.0)))
+        }
+
+    def to_consciousness(self, index, system=None):
+        """
+        Load one instance into a MetatronConsciousness so it can keep running alone
+
+        Args:
+            index: Instance index
+            system: Optional existing system to overwrite (created otherwise)
+
+        Returns:
+            MetatronConsciousness: System in the same state as the instance
+        """
+        if system is None:
+            from orchestrator.metatron_orchestrator import MetatronConsciousness
+            system = MetatronConsciousness(base_frequency=float(self.base_frequency[index]), dt=self.dt)
+        memory_tail = min(self.ticks, MEMORY_TAIL)
+        now = time.time()
+
+        for node_id, node in system.nodes.items():
+            oscillator = node['oscillator']
+            oscillator.omega = float(self.omega[index, node_id])
+            oscillator.base_frequency = float(self.base_frequency[index])
+            oscillator.phase = float(self.phase[index, node_id])
+            oscillator.amplitude = float(self.amplitude[index, node_id])
+            oscillator.dynamic_coupling_strength = float(self.coupling_strength[index, node_id])
+            oscillator.memory.clear()
+            oscillator.memory.extend(self._chronological(self.oscillator_memory[index], self.ticks)[node_id][-memory_tail:])
+            oscillator.synchronization_history.clear()
+            oscillator.synchronization_history.extend(
+                self._chronological(self.sync_history[index], self.ticks)[node_id][-memory_tail:])
+            # Energy minimization only reads the last two recorded phases
+            recorded = (self.previous_recorded_phase[index, node_id], self.recorded_phase[index, node_id])
+            oscillator.state_history = [
+                {'time': 0.0, 'phase': float(p), 'amplitude': oscillator.amplitude, 'output': 0.0}
+                for p in recorded[2 - min(self.ticks, 2):]
+            ]
+
+            processor = self._processor(index, node_id)
+            node['processor'].dimensions = processor.dimensions
+            node['processor'].state_history = processor.state_history
+            node['output'] = float(self.output[index, node_id])
+            node['dimensional_output'] = float(self.dimensional_output[index, node_id])
+
+        memory = system.nodes[MEMORY_NODE].get('memory_matrix')
+        if memory is not None:
+            memory.memory_buffer.clear()
+            stored = min(self.ticks, self.memory_size)
+            values = self._chronological(self.memory_values[index:index + 1], self.ticks)[0][-stored:] if stored else []
+            times = self._chronological(self.memory_times[index:index + 1], self.ticks)[0][-stored:] if stored else []
+            for value, stamp in zip(values, times):
+                memory.memory_buffer.append({
+                    "timestamp": now - (self.current_time - stamp),
+                    "field_state": np.full(100, value),
+                    "metadata": {},
+                    "size": 100
+                })
+            memory.current_field_state = np.full(100, self.memory_field[index])
+            memory.recall_weight = float(self.recall_weight[index])
+
+        system.state_history = deque(
+            (np.full(N_NODES, h) for h in self._chronological(self.depth_history[index:index + 1], self.ticks)[0]),
+            maxlen=STATE_HISTORY_LEN)
+        system.gamma_window = deque(self._chronological(self.gamma_window[index:index + 1], self.ticks)[0],
+                                    maxlen=GAMMA_WINDOW)
+        system.pineal_buffer = deque(self._chronological(self.pineal_buffer[index:index + 1], self.ticks)[0],
+                                     maxlen=PINEAL_WINDOW)
+        system.system_energy_history = deque(
+            self._chronological(self.energy_history[index:index + 1], self.ticks)[0], maxlen=100)
+        system.dmt_sensitivity = float(self.dmt_sensitivity[index])
+        system.global_state = self.global_state(index)
+        system.current_time = self.current_time
+        return system
+
+
+def benchmark_ensemble(sizes=(1, 10, 100, 1000), steps=50, seed=0):
+    """
+    Instance-ticks per second for increasing ensemble sizes
+
+    Args:
+        sizes: Ensemble sizes to measure
+        steps: Updates per measurement (after a warm-up of 30 steps)
+
+    Returns:
+        list: One result dict per size
+    """
+    results = []
+    for size in sizes:
+        ensemble = MetatronEnsemble(size, seed=seed)
+        ensemble.run(30)
+        start = time.perf_counter()
+        ensemble.run(steps)
+        elapsed = time.perf_counter() - start
+        results.append({
+            'instances': size,
+            'instance_ticks_per_second': size * steps / elapsed,
+            'ms_per_step': elapsed / steps * 1000,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    import json
+
+    print("Metatron ensemble benchmark")
+    print(json.dumps(benchmark_ensemble(), indent=2))
@@ -44,17 +44,21 @@ except Exception as e:
     print(f"MirrorLoop import error: {e}")
     MirrorLoop = None
 
-# Import chat functionality
-try:
-    from transformers import AutoModelForCausalLM, AutoTokenizer
-    import torch
-    CHAT_AVAILABLE = True
-except ImportError:
+from scripts.state_stream import StateStreamEncoder, StreamOptions, build_json_payload
+
+# Heavy chat dependencies (transformers/torch) are proxies: they are only
+# imported when the chat model is loaded, off the startup path
+from scripts.server_startup import (CHAT_LOAD_MODES, DEFAULT_CHAT_MODEL, ModelLoader, pypdf,
+                                    serve_preforked, torch)
+
+chat_loader = ModelLoader()
+CHAT_AVAILABLE = chat_loader.available()
+if not CHAT_AVAILABLE:
     print("Warning: transformers/torch not available. Chat functionality disabled.")
-    CHAT_AVAILABLE = False
-    AutoModelForCausalLM = None
-    AutoTokenizer = None
-    torch = None
+
+# How the chat model is brought up: eager (before serving), background
+# (default), lazy (on first chat request) or preload (before forking workers)
+CHAT_LOAD_MODE = os.environ.get("METATRON_CHAT_LOAD", "background")
 
 # Create FastAPI app
 app = FastAPI(title="Metatron Consciousness Engine")
@@ -103,10 +107,7 @@ app.add_middleware(
 # Global consciousness system instance
 consciousness_system = None
 
-# Global chat system instance
-chat_model = None
-chat_tokenizer = None
-chat_device = None
+# Chat sessions (the model itself lives in chat_loader)
 chat_sessions = {}
 
 # Active WebSocket connections with metadata
@@ -152,7 +153,7 @@ def _log_consciousness_event(event_type: str, data: Dict[str, Any]) -> None:
 @app.on_event("startup")
 async def startup_event():
     """Initialize consciousness system with comprehensive setup"""
-    global consciousness_system, performance_metrics, chat_model, chat_tokenizer, chat_device
+    global consciousness_system, performance_metrics
     
     # Use ASCII-safe characters for Windows console compatibility
     print("\n" + "="*80)
@@ -186,20 +187,21 @@ async def startup_event():
         print("   * Real-time Consciousness Metrics (Phi, R, D, S, C)")
         print("   * WebSocket Streaming Interface")
         
-        # Initialize chat model if available
+        # Initialize chat model if available; streaming does not wait for it
         if CHAT_AVAILABLE:
-            try:
-                print("   * Loading Chat Model (distilgpt2)...")
-                chat_tokenizer = AutoTokenizer.from_pretrained("distilgpt2")
-                if chat_tokenizer.pad_token_id is None:
-                    chat_tokenizer.pad_token_id = chat_tokenizer.eos_token_id
-                chat_model = AutoModelForCausalLM.from_pretrained("distilgpt2")
-                chat_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-                chat_model.to(chat_device)
-                print("   * Chat System Ready (distilgpt2 on " + str(chat_device) + ")")
-            except Exception as e:
-                print(f"   * Chat System Failed: {e}")
-                chat_model = None
+            if chat_loader.ready:
+                print(f"   * Chat System Ready ({chat_loader.model_name}, preloaded)")
+            elif CHAT_LOAD_MODE == "eager":
+                print(f"   * Loading Chat Model ({DEFAULT_CHAT_MODEL})...")
+                if chat_loader.load(DEFAULT_CHAT_MODEL):
+                    print(f"   * Chat System Ready ({DEFAULT_CHAT_MODEL} on {chat_loader.components()[2]})")
+                else:
+                    print(f"   * Chat System Failed: {chat_loader.error}")
+            elif CHAT_LOAD_MODE == "lazy":
+                print("   * Chat Model loads on first request")
+            else:
+                print(f"   * Loading Chat Model ({DEFAULT_CHAT_MODEL}) in background")
+                chat_loader.start(DEFAULT_CHAT_MODEL)
         
         print("="*80)
         print("METATRON CONSCIOUSNESS ENGINE READY FOR OPERATION")
@@ -242,6 +244,65 @@ async def root():
     """)
 
 
+@app.get("/api/live")
+async def api_live():
+    """Liveness probe: the process is up and serving HTTP"""
+    return JSONResponse({"ok": True, "uptime_seconds": time.time() - performance_metrics['start_time']})
+
+
+@app.get("/api/ready")
+async def api_ready(require: str = "stream"):
+    """
+    Readiness probe.
+
+    The consciousness stream (/ws, /api/state) is ready as soon as the
+    system is initialized; pass ``require=chat`` to also wait for the chat
+    model.
+    """
+    stream_ready = consciousness_system is not None
+    chat_status = chat_loader.status()
+    ready = stream_ready and (require != "chat" or chat_loader.ready)
+    return JSONResponse({
+        "ready": ready,
+        "stream": stream_ready,
+        "chat": chat_status,
+        "chat_load_mode": CHAT_LOAD_MODE
+    }, status_code=200 if ready else 503)
+
+
+def _chat_unavailable_response(model_name: Optional[str] = None) -> JSONResponse:
+    """503 for chat requests: missing dependencies, or model still loading"""
+    if not CHAT_AVAILABLE:
+        return JSONResponse({
+            "error": "Chat unavailable. Install: pip install transformers torch"
+        }, status_code=503)
+    status = chat_loader.status()
+    if status["state"] == "failed" and not chat_loader.loading_model:
+        return JSONResponse({
+            "error": f"Chat model failed to load: {status['error']}",
+            "model_loader": status
+        }, status_code=503)
+    return JSONResponse({
+        "error": f"Chat model {model_name or status['loading_model'] or DEFAULT_CHAT_MODEL} is loading",
+        "model_loader": status
+    }, status_code=503, headers={"Retry-After": "2"})
+
+
+def _chat_components(model_name: str):
+    """
+    (model, tokenizer, device) for ``model_name``, or None while it loads.
+
+    Requesting a model that is not loaded starts a background load instead
+    of blocking the event loop.
+    """
+    if not CHAT_AVAILABLE:
+        return None
+    if chat_loader.has_model(model_name):
+        return chat_loader.components()
+    chat_loader.start(model_name)
+    return None
+
+
 @app.get("/api/health")
 async def api_health():
     """Enhanced health check with system diagnostics"""
@@ -267,7 +328,9 @@ async def api_health():
             "version": "2.0.0",
             "uptime_seconds": uptime,
             "total_updates": performance_metrics['total_updates'],
-            "active_connections": len(active_connections)
+            "active_connections": len(active_connections),
+            "model": chat_loader.model_name,
+            "chat": chat_loader.status()
         })
     except Exception as e:
         return JSONResponse({
@@ -438,53 +501,54 @@ async def websocket_endpoint(websocket: WebSocket):
     """
     WebSocket endpoint for real-time consciousness streaming
     Enhanced with proper error handling and connection tracking
+
+    Query parameters negotiate the stream (see scripts/state_stream.py):
+    ``format=binary`` for delta-encoded frames (JSON otherwise), ``fields`` to
+    select a subset of arrays and ``rate`` to decimate the 40 Hz feed.
     """
     await websocket.accept()
     active_connections.append(websocket)
     connection_id = id(websocket)
+    options = StreamOptions.from_query(websocket.query_params)
+    encoder = StateStreamEncoder(options.fields, options.keyframe_interval) if options.binary else None
     connection_metadata[connection_id] = {
         'connected_at': time.time(),
-        'updates_sent': 0
+        'updates_sent': 0,
+        'bytes_sent': 0,
+        'format': 'binary' if encoder else 'json',
+        'fields': list(options.fields),
+        'decimation': options.decimation
     }
+
+    async def send_state(state: Dict[str, Any], force_keyframe: bool = False) -> None:
+        if encoder is None:
+            message = json.dumps(build_json_payload(state))
+            await websocket.send_text(message)
+            connection_metadata[connection_id]['bytes_sent'] += len(message)
+        else:
+            for message in encoder.encode(state, force_keyframe=force_keyframe):
+                if isinstance(message, bytes):
+                    await websocket.send_bytes(message)
+                else:
+                    await websocket.send_text(message)
+                connection_metadata[connection_id]['bytes_sent'] += len(message)
+        connection_metadata[connection_id]['updates_sent'] += 1
     
     try:
-        print(f"[OK] WebSocket client connected. Total connections: {len(active_connections)}")
+        print(f"[OK] WebSocket client connected ({connection_metadata[connection_id]['format']}). "
+              f"Total connections: {len(active_connections)}")
         
-        # Send initial state immediately
+        # Send schema and initial state immediately
         try:
-            initial_state = consciousness_system.get_current_state()
-            initial_data = {
-                "time": float(initial_state['time']),
-                "consciousness": {
-                    "level": float(initial_state['global'].get('consciousness_level', 0)),
-                    "phi": float(initial_state['global'].get('phi', 0)),
-                    "coherence": float(initial_state['global'].get('coherence', 0)),
-                    "depth": int(initial_state['global'].get('recursive_depth', 0)),
-                    "gamma": float(initial_state['global'].get('gamma_power', 0)),
-                    "fractal_dim": float(initial_state['global'].get('fractal_dimension', 1)),
-                    "spiritual": float(initial_state['global'].get('spiritual_awareness', 0)),
-                    "state": initial_state['global'].get('state_classification', 'initializing'),
-                    "is_conscious": bool(initial_state['global'].get('is_conscious', False))
-                },
-                "nodes": {}
-            }
-            
-            # Add node data
-            for node_id, node_data in initial_state['nodes'].items():
-                initial_data['nodes'][str(node_id)] = {
-                    "output": float(node_data['output']),
-                    "phase": float(node_data['oscillator']['phase']),
-                    "amplitude": float(node_data['oscillator']['amplitude']),
-                    "dimensions": {k: float(v) for k, v in node_data['processor']['dimensions'].items()}
-                }
-            
-            await websocket.send_json(initial_data)
-            connection_metadata[connection_id]['updates_sent'] += 1
+            if encoder is not None:
+                await websocket.send_text(json.dumps(encoder.schema()))
+            await send_state(consciousness_system.get_current_state(), force_keyframe=True)
             print(f"[SENT] Sent initial state to client")
         except Exception as e:
             print(f"[WARN] Error sending initial state: {e}")
         
         # Continuous update loop
+        tick = 0
         while True:
             # Update consciousness system (CRITICAL: This actually runs the engine!)
             state = consciousness_system.update_system()
@@ -501,37 +565,10 @@ async def websocket_endpoint(websocket: WebSocket):
                       f"C={c['consciousness_level']:.4f}, Φ={c['phi']:.4f}, R={c['coherence']:.4f} "
                       f"Active: {active_nodes}/13")
             
-            # Prepare data for sending (convert numpy types to native Python)
-            websocket_data = {
-                "time": float(state['time']),
-                "consciousness": {
-                    "level": float(state['global']['consciousness_level']),
-                    "phi": float(state['global']['phi']),
-                    "coherence": float(state['global']['coherence']),
-                    "depth": int(state['global']['recursive_depth']),
-                    "gamma": float(state['global']['gamma_power']),
-                    "fractal_dim": float(state['global']['fractal_dimension']),
-                    "spiritual": float(state['global']['spiritual_awareness']),
-                    "state": state['global']['state_classification'],
-                    "is_conscious": bool(state['global']['is_conscious'])
-                },
-                "nodes": {}
-            }
-            
-            # Add node data
-            for node_id, node_data in state['nodes'].items():
-                websocket_data['nodes'][str(node_id)] = {
-                    "output": float(node_data['output']),
-                    "phase": float(node_data['oscillator']['phase']),
-                    "amplitude": float(node_data['oscillator']['amplitude']),
-                    "dimensions": {
-                        k: float(v) for k, v in node_data['processor']['dimensions'].items()
-                    }
-                }
-            
-            # Send to client
-            await websocket.send_json(websocket_data)
-            connection_metadata[connection_id]['updates_sent'] += 1
+            # Send to client (the engine keeps running at 40 Hz; only sends are decimated)
+            tick += 1
+            if tick % options.decimation == 0:
+                await send_state(state)
             
             # Wait before next update (40 Hz = 25ms, or 80 Hz = 12.5ms for high gamma)
             # Make sure we're using a consistent update interval
@@ -881,12 +918,8 @@ def _get_musical_note_name(ratio):
 @app.post("/api/chat")
 async def api_chat(request: Request):
     """Chat endpoint with optional model loading and consciousness integration"""
-    global chat_model, chat_tokenizer, chat_device
-    
     if not CHAT_AVAILABLE:
-        return JSONResponse({
-            "error": "Chat unavailable. Install: pip install transformers torch"
-        }, status_code=503)
+        return _chat_unavailable_response()
     
     if consciousness_system is None:
         # Fallback if consciousness system is not available
@@ -900,17 +933,11 @@ async def api_chat(request: Request):
             if not message:
                 return JSONResponse({"error": "Empty message"}, status_code=400)
             
-            # Load different model if requested
-            if chat_model is None or (hasattr(chat_tokenizer, 'name_or_path') and 
-                                       model_name != getattr(chat_tokenizer, 'name_or_path', 'distilgpt2')):
-                print(f"Loading model: {model_name}...")
-                chat_tokenizer = AutoTokenizer.from_pretrained(model_name)
-                if chat_tokenizer.pad_token_id is None:
-                    chat_tokenizer.pad_token_id = chat_tokenizer.eos_token_id
-                chat_model = AutoModelForCausalLM.from_pretrained(model_name)
-                chat_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-                chat_model.to(chat_device)
-                print(f"Model {model_name} loaded on {chat_device}")
+            # Load different model if requested (in the background)
+            components = _chat_components(model_name)
+            if components is None:
+                return _chat_unavailable_response(model_name)
+            chat_model, chat_tokenizer, chat_device = components
             
             # Generate response
             prompt = f"User: {message}\n\nAssistant:"
@@ -960,17 +987,11 @@ async def api_chat(request: Request):
         state_before = consciousness_system.get_current_state()
         global_state_before = state_before.get('global', {})
         
-        # Load different model if requested
-        if chat_model is None or (hasattr(chat_tokenizer, 'name_or_path') and 
-                                   model_name != getattr(chat_tokenizer, 'name_or_path', 'distilgpt2')):
-            print(f"Loading model: {model_name}...")
-            chat_tokenizer = AutoTokenizer.from_pretrained(model_name)
-            if chat_tokenizer.pad_token_id is None:
-                chat_tokenizer.pad_token_id = chat_tokenizer.eos_token_id
-            chat_model = AutoModelForCausalLM.from_pretrained(model_name)
-            chat_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-            chat_model.to(chat_device)
-            print(f"Model {model_name} loaded on {chat_device}")
+        # Load different model if requested (in the background)
+        components = _chat_components(model_name)
+        if components is None:
+            return _chat_unavailable_response(model_name)
+        chat_model, chat_tokenizer, chat_device = components
         
         # Generate response
         prompt = f"User: {message}\n\nAssistant:"
@@ -1044,15 +1065,13 @@ async def api_upload(file: UploadFile = File(...)):
         if ext in (".txt", ".md", ".log"):
             text = data.decode("utf-8", errors="ignore")
         elif ext == ".pdf":
-            try:
-                from pypdf import PdfReader
-                import io
-                reader = PdfReader(io.BytesIO(data))
-                text = "\n".join([page.extract_text() for page in reader.pages])
-            except ImportError:
+            if not pypdf.available:
                 return JSONResponse({
                     "error": "PDF support requires: pip install pypdf"
                 }, status_code=400)
+            import io
+            reader = pypdf.PdfReader(io.BytesIO(data))
+            text = "\n".join([page.extract_text() for page in reader.pages])
         else:
             text = data.decode("utf-8", errors="ignore")
         
@@ -1129,9 +1148,7 @@ async def api_clear_uploads():
 
 @app.post("/api/config")
 async def api_config(request: Request):
-    """Configure chat model"""
-    global chat_model, chat_tokenizer, chat_device
-    
+    """Configure chat model (``wait: false`` returns while it loads)"""
     if not CHAT_AVAILABLE:
         return JSONResponse({
             "error": "Chat unavailable"
@@ -1139,21 +1156,30 @@ async def api_config(request: Request):
     
     try:
         data = await request.json()
-        model_name = str(data.get('model_name', 'distilgpt2'))
+        model_name = str(data.get('model_name', DEFAULT_CHAT_MODEL))
+        wait = bool(data.get('wait', True))
         
         print(f"Reconfiguring to model: {model_name}...")
-        chat_tokenizer = AutoTokenizer.from_pretrained(model_name)
-        if chat_tokenizer.pad_token_id is None:
-            chat_tokenizer.pad_token_id = chat_tokenizer.eos_token_id
-        chat_model = AutoModelForCausalLM.from_pretrained(model_name)
-        chat_device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        chat_model.to(chat_device)
+        chat_loader.start(model_name)
+        if not wait:
+            return JSONResponse({
+                "ok": True,
+                "model": model_name,
+                "model_loader": chat_loader.status()
+            }, status_code=202)
+        
+        # Wait off the event loop so streaming continues during the load
+        await asyncio.get_running_loop().run_in_executor(None, chat_loader.wait)
+        if not chat_loader.has_model(model_name):
+            return JSONResponse({
+                "error": f"Configuration failed: {chat_loader.error}"
+            }, status_code=500)
         print(f"Model {model_name} configured successfully")
         
         return JSONResponse({
             "ok": True,
             "model": model_name,
-            "device": str(chat_device)
+            "device": str(chat_loader.components()[2])
         })
     except Exception as e:
         return JSONResponse({
@@ -1190,10 +1216,10 @@ async def api_new_session(request: Request):
 @app.post("/api/loop/start")
 async def api_loop_start(request: Request):
     """Start a mirror loop between two AI perspectives"""
-    global chat_model, chat_tokenizer, chat_device
+    components = chat_loader.components()
     
     # Check if required components are available
-    if not CHAT_AVAILABLE or not chat_model or not MirrorLoop:
+    if not CHAT_AVAILABLE or components is None or not MirrorLoop:
         return JSONResponse({
             "error": "Mirror Loop functionality not available. Required components missing.",
             "details": "Chat model or MirrorLoop not loaded."
@@ -1259,6 +1285,7 @@ async def api_loop_start(request: Request):
                     }
         
         # Create two instances of the chat service for the loop
+        chat_model, chat_tokenizer, chat_device = components
         service_a = SimpleChatService(chat_model, chat_tokenizer, chat_device)
         service_b = SimpleChatService(chat_model, chat_tokenizer, chat_device)
         
@@ -1333,13 +1360,21 @@ async def websocket_chat_endpoint(websocket: WebSocket):
             return
         
         # Check if chat is available
-        if not CHAT_AVAILABLE or chat_model is None or chat_tokenizer is None:
+        components = chat_loader.components() if CHAT_AVAILABLE else None
+        if components is None:
+            if not CHAT_AVAILABLE:
+                error = "Chat unavailable. Install: pip install transformers torch"
+            else:
+                chat_loader.start(DEFAULT_CHAT_MODEL)
+                error = "Chat model is loading"
             await websocket.send_json({
                 "type": "error", 
-                "error": "Chat unavailable. Install: pip install transformers torch"
+                "error": error,
+                "model_loader": chat_loader.status()
             })
             await websocket.close()
             return
+        chat_model, chat_tokenizer, chat_device = components
         
         # Generate response with streaming
         prompt = f"User: {message}\n\nAssistant:"
@@ -1405,8 +1440,21 @@ async def websocket_chat_endpoint(websocket: WebSocket):
             pass  # Ignore errors when closing
 
 
-def main(port=457):
-    """Run the server"""
+def main(port=457, host="0.0.0.0", chat_load="background", workers=1):
+    """
+    Run the server
+
+    Args:
+        port: Port to listen on
+        host: Bind address
+        chat_load: Chat model load mode (eager, background, lazy, preload)
+        workers: Worker processes for preload mode; they share the
+            preloaded model weights copy-on-write
+    """
+    global CHAT_LOAD_MODE
+    CHAT_LOAD_MODE = chat_load
+    os.environ["METATRON_CHAT_LOAD"] = chat_load
+
     print("\n" + "="*60)
     print("Starting Metatron Consciousness Web Server")
     print("="*60)
@@ -1418,9 +1466,17 @@ def main(port=457):
     print(f"Health Check: http://localhost:{port}/api/health")
     print("="*60)
     
+    if chat_load == "preload" and hasattr(os, "fork"):
+        def preload():
+            if CHAT_AVAILABLE:
+                print(f"Preloading chat model ({DEFAULT_CHAT_MODEL}) for {workers} worker(s)...")
+                chat_loader.load(DEFAULT_CHAT_MODEL)
+        serve_preforked(app, host=host, port=port, workers=max(1, workers), preload=preload)
+        return
+    
     uvicorn.run(
         app,
-        host="0.0.0.0",
+        host=host,
         port=port,
         log_level="info"
     )
@@ -1429,6 +1485,11 @@ def main(port=457):
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Start Metatron Consciousness Web Server")
     parser.add_argument("--port", type=int, default=457, help="Port to run the server on (default: 457)")
+    parser.add_argument("--host", default="0.0.0.0", help="Bind address (default: 0.0.0.0)")
+    parser.add_argument("--chat-load", choices=CHAT_LOAD_MODES, default=CHAT_LOAD_MODE,
+                        help="When to load the chat model (default: background)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes in preload mode (share model weights copy-on-write)")
     args = parser.parse_args()
     
-    main(args.port)
+    main(args.port, host=args.host, chat_load=args.chat_load, workers=args.workers)
@@ -0,0 +1,449 @@
+"""
+Server Startup - Deferred Imports and Warm Start
+================================================
+
+Startup support for the Metatron web server:
+
+- ``LazyModule`` proxies for the heavy optional dependencies (torch,
+  transformers, pypdf, sklearn). Nothing is imported until an attribute is
+  read, and ``available`` answers "is it installed?" without importing.
+- ``ModelLoader`` loads the chat model on a background thread and reports
+  a state/progress snapshot, so the HTTP and ``/ws`` endpoints come up
+  before the model does.
+- ``serve_preforked`` loads the model once in a parent process and forks
+  uvicorn workers that share its weights copy-on-write.
+- ``benchmark_startup`` measures time-to-first-byte, time-to-first-chat and
+  RSS of the server for each chat load mode.
+"""
+
+import gc
+import importlib
+import importlib.util
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+DEFAULT_CHAT_MODEL = "distilgpt2"
+
+# How the web server brings up the chat model (METATRON_CHAT_LOAD)
+CHAT_LOAD_MODES = ("eager", "background", "lazy", "preload")
+
+
+class LazyModule:
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        self.__dict__["_name"] = name
+        self.__dict__["_module"] = None
+        self.__dict__["_lock"] = threading.Lock()
+
+    @property
+    def available(self) -> bool:
+        """True if the module can be imported (checked without importing it)."""
+        if self.__dict__["_module"] is not None or self._name in sys.modules:
+            return True
+        try:
+            return importlib.util.find_spec(self._name) is not None
+        except (ImportError, ValueError):
+            return False
+
+    @property
+    def loaded(self) -> bool:
+        """True once the real module has been imported."""
+        return self.__dict__["_module"] is not None
+
+    def load(self):
+        """Import and return the real module (raises ImportError if missing)."""
+        module = self.__dict__["_module"]
+        if module is None:
+            with self.__dict__["_lock"]:
+                module = self.__dict__["_module"]
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    self.__dict__["_module"] = module
+        return module
+
+    def __getattr__(self, attr: str):
+        return getattr(self.load(), attr)
+
+    def __setattr__(self, attr: str, value):
+        setattr(self.load(), attr, value)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<LazyModule {self._name!r} ({state})>"
+
+
+torch = LazyModule("torch")
+transformers = LazyModule("transformers")
+pypdf = LazyModule("pypdf")
+sklearn = LazyModule("sklearn")
+
+
+def load_causal_lm(model_name: str, report: Callable[[str, float], None]) -> Tuple[Any, Any, Any]:
+    """
+    Load a Hugging Face causal LM and its tokenizer.
+
+    Args:
+        model_name: Model id or local path
+        report: Progress callback ``report(stage, fraction)``
+
+    Returns:
+        (model, tokenizer, device)
+    """
+    report("importing", 0.05)
+    auto_tokenizer = transformers.AutoTokenizer
+    auto_model = transformers.AutoModelForCausalLM
+    report("tokenizer", 0.3)
+    tokenizer = auto_tokenizer.from_pretrained(model_name)
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token_id = tokenizer.eos_token_id
+    report("weights", 0.5)
+    model = auto_model.from_pretrained(model_name)
+    report("device", 0.9)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+    model.eval()
+    return model, tokenizer, device
+
+
+class ModelLoader:
+    """
+    Background loader for the chat model.
+
+    States: ``idle`` -> ``loading`` -> ``ready`` | ``failed``. While a new
+    model is loading the previous one (if any) keeps serving; components are
+    swapped in one assignment when loading finishes.
+    """
+
+    def __init__(self, load_fn: Callable = load_causal_lm,
+                 requirements: Sequence[LazyModule] = (transformers, torch)):
+        self._load_fn = load_fn
+        self._requirements = tuple(requirements)
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._done.set()
+        self._thread: Optional[threading.Thread] = None
+        self._pending = 0
+        self._components: Optional[Tuple[Any, Any, Any]] = None
+        self.state = "idle"
+        self.model_name: Optional[str] = None
+        self.loading_model: Optional[str] = None
+        self.queued_models: List[str] = []
+        self.stage = ""
+        self.progress = 0.0
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._started_at: Optional[float] = None
+
+    def available(self) -> bool:
+        """True if the loader's dependencies are installed."""
+        return all(module.available for module in self._requirements)
+
+    @property
+    def ready(self) -> bool:
+        return self._components is not None
+
+    def components(self) -> Optional[Tuple[Any, Any, Any]]:
+        """The loaded (model, tokenizer, device), or None."""
+        return self._components
+
+    def has_model(self, model_name: str) -> bool:
+        return self._components is not None and self.model_name == model_name
+
+    def _report(self, stage: str, progress: float) -> None:
+        self.stage = stage
+        self.progress = progress
+
+    def load(self, model_name: str = DEFAULT_CHAT_MODEL) -> bool:
+        """
+        Load synchronously on the calling thread.
+
+        Returns:
+            True on success; on failure the state is ``failed`` and the
+            previous model (if any) is kept
+        """
+        with self._lock:
+            self._pending += 1
+            self._done.clear()
+        return self._load(model_name)
+
+    def _load(self, model_name: str) -> bool:
+        with self._lock:
+            if model_name in self.queued_models:
+                self.queued_models.remove(model_name)
+            self.state = "loading"
+            self.loading_model = model_name
+            self.error = None
+            self._started_at = time.perf_counter()
+            self._report("starting", 0.0)
+        try:
+            components = tuple(self._load_fn(model_name, self._report))
+            error = None
+        except Exception as e:
+            components = None
+            error = f"{type(e).__name__}: {e}"
+        with self._lock:
+            if components is not None:
+                self._components = components
+                self.model_name = model_name
+                self.load_seconds = time.perf_counter() - self._started_at
+                self.state = "ready"
+                self._report("ready", 1.0)
+            else:
+                self.error = error
+                self.state = "failed"
+            self._pending -= 1
+            if self._pending == 0:
+                self.loading_model = None
+                self._done.set()
+        return components is not None
+
+    def start(self, model_name: str = DEFAULT_CHAT_MODEL) -> bool:
+        """
+        Start loading on a daemon thread; loads run one at a time.
+
+        Returns:
+            False if that model is already loaded, loading or queued behind
+            the current load, True if a new load was started
+        """
+        with self._lock:
+            if self.loading_model == model_name or model_name in self.queued_models:
+                return False
+            if self._pending == 0 and self.has_model(model_name):
+                return False
+            previous = self._thread if self._thread is not None and self._thread.is_alive() else None
+            self._pending += 1
+            self._done.clear()
+            if previous is None:
+                self.state = "loading"
+                self.loading_model = model_name
+            else:
+                self.queued_models.append(model_name)
+
+            def run():
+                if previous is not None:
+                    previous.join()
+                self._load(model_name)
+
+            self._thread = threading.Thread(target=run, name="chat-model-loader", daemon=True)
+            self._thread.start()
+        return True
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until pending loads finish; returns True if the last one succeeded."""
+        return self._done.wait(timeout) and self.state == "ready"
+
+    def status(self) -> Dict[str, Any]:
+        """JSON-serializable snapshot for readiness endpoints."""
+        elapsed = None
+        if self.state == "loading" and self._started_at is not None:
+            elapsed = time.perf_counter() - self._started_at
+        return {
+            "state": self.state if self.available() else "unavailable",
+            "model": self.model_name,
+            "loading_model": self.loading_model,
+            "queued_models": list(self.queued_models),
+            "stage": self.stage,
+            "progress": round(self.progress, 3),
+            "elapsed_seconds": elapsed,
+            "load_seconds": self.load_seconds,
+            "error": self.error,
+        }
+
+
+def serve_preforked(app, host: str = "0.0.0.0", port: int = 457, workers: int = 2,
+                    preload: Optional[Callable[[], Any]] = None, log_level: str = "info") -> None:
+    """
+    Run ``workers`` uvicorn processes forked from this one.
+
+    ``preload`` runs before the fork, so whatever it loads (the chat model)
+    is shared copy-on-write by every worker instead of being loaded per
+    worker. ``gc.freeze()`` moves the preloaded objects out of the
+    collector's reach so collections in the workers do not touch (and
+    copy) their pages. POSIX only.
+
+    Args:
+        app: ASGI application (must not have started an event loop yet)
+        host: Bind address
+        port: Bind port, shared by all workers
+        workers: Number of worker processes
+        preload: Optional callable run once in the parent before forking
+        log_level: uvicorn log level
+    """
+    import uvicorn
+
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Preforked serving requires os.fork (POSIX)")
+
+    if preload is not None:
+        preload()
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    gc.collect()
+    gc.freeze()
+
+    children: List[int] = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            config = uvicorn.Config(app, log_level=log_level)
+            try:
+                uvicorn.Server(config).run(sockets=[sock])
+            finally:
+                os._exit(0)
+        children.append(pid)
+
+    def forward(signum, frame):
+        for child in children:
+            try:
+                os.kill(child, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, forward)
+    signal.signal(signal.SIGTERM, forward)
+    for child in children:
+        while True:
+            try:
+                os.waitpid(child, 0)
+                break
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+    sock.close()
+
+
+# ==================================================================
+# STARTUP BENCHMARK
+# ==================================================================
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _tree_memory(pid: int) -> Dict[str, Optional[float]]:
+    """RSS and PSS (MB) summed over a process and its children."""
+    import psutil
+
+    try:
+        root = psutil.Process(pid)
+        processes = [root] + root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        return {"rss_mb": None, "pss_mb": None}
+    rss = 0
+    pss = 0
+    has_pss = True
+    for process in processes:
+        try:
+            info = process.memory_full_info()
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+        rss += info.rss
+        if hasattr(info, "pss"):
+            pss += info.pss
+        else:
+            has_pss = False
+    return {"rss_mb": rss / 2 ** 20, "pss_mb": pss / 2 ** 20 if has_pss else None}
+
+
+def measure_startup(mode: str, workers: int = 1, timeout: float = 120.0,
+                    chat: bool = True) -> Dict[str, Any]:
+    """
+    Start the web server in a subprocess and time its warm-up.
+
+    Args:
+        mode: One of ``CHAT_LOAD_MODES``
+        workers: Worker processes (only used by ``preload``)
+        timeout: Give up after this many seconds
+        chat: Also measure time-to-first-chat (skipped if chat is unavailable)
+
+    Returns:
+        Dict with ``ttfb_s`` (first HTTP byte from /api/live), ``ws_ready_s``,
+        ``first_chat_s``, and ``rss_mb``/``pss_mb`` at the end
+    """
+    import requests
+
+    port = _free_port()
+    server = os.path.join(os.path.dirname(os.path.abspath(__file__)), "metatron_web_server.py")
+    command = [sys.executable, server, "--port", str(port), "--host", "127.0.0.1", "--chat-load", mode]
+    if mode == "preload":
+        command += ["--workers", str(workers)]
+    base = f"http://127.0.0.1:{port}"
+    result: Dict[str, Any] = {"mode": mode, "workers": workers if mode == "preload" else 1,
+                              "ttfb_s": None, "ws_ready_s": None, "first_chat_s": None}
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = start + timeout
+        while time.perf_counter() < deadline and process.poll() is None:
+            try:
+                requests.get(base + "/api/live", timeout=1.0)
+                result["ttfb_s"] = time.perf_counter() - start
+                break
+            except requests.RequestException:
+                time.sleep(0.01)
+
+        ready = {}
+        while result["ttfb_s"] is not None and time.perf_counter() < deadline:
+            response = requests.get(base + "/api/ready", timeout=5.0)
+            ready = response.json()
+            if response.status_code == 200:
+                result["ws_ready_s"] = time.perf_counter() - start
+                break
+            time.sleep(0.01)
+
+        chat_state = ready.get("chat", {}).get("state")
+        if chat and chat_state not in (None, "unavailable"):
+            while time.perf_counter() < deadline:
+                response = requests.post(base + "/api/chat", timeout=timeout,
+                                         json={"message": "Hello", "max_new_tokens": 4})
+                if response.status_code == 200:
+                    result["first_chat_s"] = time.perf_counter() - start
+                    break
+                if response.status_code != 503:
+                    break
+                time.sleep(0.05)
+        result["chat_state"] = chat_state
+        result.update(_tree_memory(process.pid))
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+    return result
+
+
+def benchmark_startup(modes: Sequence[str] = CHAT_LOAD_MODES, workers: int = 2,
+                      timeout: float = 120.0) -> List[Dict[str, Any]]:
+    """Run ``measure_startup`` for each chat load mode."""
+    return [measure_startup(mode, workers=workers, timeout=timeout) for mode in modes]
+
+
+if __name__ == "__main__":
+    def fmt(value, spec):
+        return "-" if value is None else format(value, spec)
+
+    print(f"{'mode':>10} {'workers':>7} {'ttfb s':>8} {'ws s':>8} {'chat s':>8} {'rss MB':>8} {'pss MB':>8}")
+    for row in benchmark_startup():
+        print(f"{row['mode']:>10} {row['workers']:>7} {fmt(row['ttfb_s'], '8.3f')} "
+              f"{fmt(row['ws_ready_s'], '8.3f')} {fmt(row['first_chat_s'], '8.3f')} "
+              f"{fmt(row['rss_mb'], '8.1f')} {fmt(row['pss_mb'], '8.1f')}")
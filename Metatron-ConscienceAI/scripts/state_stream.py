@@ -0,0 +1,380 @@
+"""
+Metatron State Streaming Protocol
+=================================
+
+Binary, delta-encoded frames for the ``/ws`` consciousness feed.
+
+A client opts in with ``/ws?format=binary`` (optionally ``fields=phase,amplitude``
+and ``rate=10``). The server first sends a JSON ``schema`` text message describing
+the field layout, then binary frames:
+
+* header ``<BBHId``: frame type (1 keyframe, 2 delta), field mask, reserved,
+  sequence number, simulation time
+* keyframe: the float32 arrays of every selected field, in schema order
+* delta: for every changed field, ``uint16`` count, ``uint16`` indices and
+  ``int16`` quantized deltas (value = previous + delta * quantum)
+
+The server tracks the values the client has reconstructed, so quantization error
+never accumulates. State labels travel as ``{"type": "state"}`` text messages and
+clients that do not ask for binary keep receiving the JSON payload.
+"""
+
+import json
+import math
+import struct
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+PROTOCOL_VERSION = 1
+NUM_NODES = 13
+UPDATE_RATE_HZ = 40.0
+
+KEYFRAME = 1
+DELTA = 2
+HEADER = struct.Struct("<BBHId")
+COUNT = struct.Struct("<H")
+INT16_LIMIT = 32767
+
+# (wire name, key in MetatronConsciousness.global_state)
+CONSCIOUSNESS_KEYS: Tuple[Tuple[str, str], ...] = (
+    ("level", "consciousness_level"),
+    ("phi", "phi"),
+    ("coherence", "coherence"),
+    ("depth", "recursive_depth"),
+    ("gamma", "gamma_power"),
+    ("fractal_dim", "fractal_dimension"),
+    ("spiritual", "spiritual_awareness"),
+    ("is_conscious", "is_conscious"),
+)
+DIMENSION_KEYS: Tuple[str, ...] = ("physical", "emotional", "mental", "spiritual", "temporal")
+
+
+@dataclass(frozen=True)
+class StreamField:
+    """One float array in the frame layout"""
+    name: str
+    length: int
+    quantum: float
+    wrap: Optional[float] = None
+
+
+FIELDS: Tuple[StreamField, ...] = (
+    StreamField("consciousness", len(CONSCIOUSNESS_KEYS), 1e-4),
+    StreamField("output", NUM_NODES, 1e-3),
+    StreamField("phase", NUM_NODES, 1e-4, wrap=2 * math.pi),
+    StreamField("amplitude", NUM_NODES, 1e-4),
+    StreamField("dimensions", NUM_NODES * len(DIMENSION_KEYS), 1e-4),
+)
+FIELD_NAMES = tuple(f.name for f in FIELDS)
+
+
+def flatten_state(state: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """Extract the streamed arrays from ``get_current_state()`` / ``update_system()`` output"""
+    global_state = state.get("global", {})
+    nodes = state.get("nodes", {})
+    consciousness = np.array([float(global_state.get(key, 0.0) or 0.0) for _, key in CONSCIOUSNESS_KEYS])
+    output = np.zeros(NUM_NODES)
+    phase = np.zeros(NUM_NODES)
+    amplitude = np.zeros(NUM_NODES)
+    dimensions = np.zeros((NUM_NODES, len(DIMENSION_KEYS)))
+    for node_id, node in nodes.items():
+        i = int(node_id)
+        if not 0 <= i < NUM_NODES:
+            continue
+        output[i] = node.get("output", 0.0)
+        oscillator = node.get("oscillator", {})
+        phase[i] = oscillator.get("phase", 0.0)
+        amplitude[i] = oscillator.get("amplitude", 0.0)
+        dims = node.get("processor", {}).get("dimensions", {})
+        dimensions[i] = [dims.get(key, 0.0) for key in DIMENSION_KEYS]
+    return {
+        "consciousness": consciousness,
+        "output": output,
+        "phase": phase,
+        "amplitude": amplitude,
+        "dimensions": dimensions.reshape(-1),
+    }
+
+
+@dataclass
+class StreamOptions:
+    """Per-connection streaming options negotiated from the query string"""
+    binary: bool = False
+    fields: Tuple[str, ...] = FIELD_NAMES
+    decimation: int = 1
+    keyframe_interval: int = 40
+
+    @classmethod
+    def from_query(cls, params: Any) -> "StreamOptions":
+        """Build options from ``websocket.query_params`` (or any mapping)"""
+        binary = str(params.get("format", "json")).lower() == "binary"
+        fields = FIELD_NAMES
+        requested = params.get("fields")
+        if requested:
+            wanted = {name.strip() for name in str(requested).split(",")}
+            fields = tuple(name for name in FIELD_NAMES if name in wanted) or FIELD_NAMES
+        decimation = 1
+        rate = params.get("rate")
+        if rate:
+            try:
+                decimation = max(1, int(round(UPDATE_RATE_HZ / max(float(rate), 0.1))))
+            except ValueError:
+                decimation = 1
+        keyframe_interval = 40
+        if params.get("keyframe"):
+            try:
+                keyframe_interval = max(1, int(params.get("keyframe")))
+            except ValueError:
+                pass
+        return cls(binary=binary, fields=fields, decimation=decimation, keyframe_interval=keyframe_interval)
+
+
+class StateStreamEncoder:
+    """Encodes successive states for one client as keyframes and quantized deltas"""
+
+    def __init__(self, fields: Iterable[str] = FIELD_NAMES, keyframe_interval: int = 40):
+        selected = set(fields)
+        self.fields = [f for f in FIELDS if f.name in selected]
+        self.mask = sum(1 << i for i, f in enumerate(FIELDS) if f.name in selected)
+        self.keyframe_interval = keyframe_interval
+        self.sequence = 0
+        self.frames_since_keyframe = 0
+        self.reconstructed: Optional[Dict[str, np.ndarray]] = None
+        self.state_label: Optional[str] = None
+        self.stats = {"keyframes": 0, "deltas": 0, "bytes": 0}
+
+    def schema(self) -> Dict[str, Any]:
+        """Text message sent once before the first binary frame"""
+        return {
+            "type": "schema",
+            "version": PROTOCOL_VERSION,
+            "num_nodes": NUM_NODES,
+            "consciousness_keys": [name for name, _ in CONSCIOUSNESS_KEYS],
+            "dimension_keys": list(DIMENSION_KEYS),
+            "keyframe_interval": self.keyframe_interval,
+            "fields": [
+                {"name": f.name, "bit": FIELDS.index(f), "length": f.length,
+                 "quantum": f.quantum, "wrap": f.wrap}
+                for f in self.fields
+            ],
+        }
+
+    def encode(self, state: Dict[str, Any], force_keyframe: bool = False) -> List[Union[str, bytes]]:
+        """Messages to send for this state: an optional label update and one frame"""
+        messages: List[Union[str, bytes]] = []
+        label = state.get("global", {}).get("state_classification")
+        if label is not None and label != self.state_label:
+            self.state_label = label
+            messages.append(json.dumps({"type": "state", "state": label}))
+
+        values = flatten_state(state)
+        frame = None
+        if not force_keyframe and self.reconstructed is not None \
+                and self.frames_since_keyframe < self.keyframe_interval:
+            frame = self._delta_frame(values, float(state.get("time", 0.0)))
+        if frame is None:
+            frame = self._keyframe(values, float(state.get("time", 0.0)))
+        self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+        messages.append(frame)
+        self.stats["bytes"] += sum(len(m) for m in messages)
+        return messages
+
+    def _keyframe(self, values: Dict[str, np.ndarray], sim_time: float) -> bytes:
+        parts = [HEADER.pack(KEYFRAME, self.mask, 0, self.sequence, sim_time)]
+        reconstructed = {}
+        for field in self.fields:
+            array = values[field.name].astype("<f4")
+            parts.append(array.tobytes())
+            reconstructed[field.name] = array.astype(np.float64)
+        self.reconstructed = reconstructed
+        self.frames_since_keyframe = 0
+        self.stats["keyframes"] += 1
+        return b"".join(parts)
+
+    def _delta_frame(self, values: Dict[str, np.ndarray], sim_time: float) -> Optional[bytes]:
+        """Delta against what the client holds; None when a keyframe is needed"""
+        changed_mask = 0
+        updates = []
+        for field in self.fields:
+            previous = self.reconstructed[field.name]
+            diff = values[field.name] - previous
+            if field.wrap:
+                diff = (diff + field.wrap / 2) % field.wrap - field.wrap / 2
+            steps = np.rint(diff / field.quantum)
+            indices = np.flatnonzero(steps)
+            if not indices.size:
+                continue
+            steps = steps[indices]
+            if np.abs(steps).max() > INT16_LIMIT:
+                return None
+            updates.append((field, indices, steps))
+            changed_mask |= 1 << FIELDS.index(field)
+
+        parts = [HEADER.pack(DELTA, changed_mask, 0, self.sequence, sim_time)]
+        for field, indices, steps in updates:
+            parts.append(COUNT.pack(indices.size))
+            parts.append(indices.astype("<u2").tobytes())
+            parts.append(steps.astype("<i2").tobytes())
+            previous = self.reconstructed[field.name]
+            previous[indices] += steps * field.quantum
+            if field.wrap:
+                previous[indices] %= field.wrap
+        self.frames_since_keyframe += 1
+        self.stats["deltas"] += 1
+        return b"".join(parts)
+
+
+class StateStreamDecoder:
+    """Reference decoder (mirrors ``webui/assets/state_stream.js``)"""
+
+    def __init__(self, schema: Dict[str, Any]):
+        self.schema = schema
+        self.fields = [next(f for f in FIELDS if f.name == spec["name"]) for spec in schema["fields"]]
+        self.values: Dict[str, np.ndarray] = {}
+        self.state_label = None
+
+    def handle_text(self, message: str):
+        data = json.loads(message)
+        if data.get("type") == "state":
+            self.state_label = data["state"]
+
+    def decode(self, frame: bytes) -> Tuple[float, Dict[str, np.ndarray]]:
+        frame_type, mask, _, _, sim_time = HEADER.unpack_from(frame, 0)
+        offset = HEADER.size
+        for field in self.fields:
+            bit = 1 << FIELDS.index(field)
+            if not mask & bit:
+                continue
+            if frame_type == KEYFRAME:
+                self.values[field.name] = np.frombuffer(frame, "<f4", field.length, offset).astype(np.float64)
+                offset += 4 * field.length
+            else:
+                (count,) = COUNT.unpack_from(frame, offset)
+                offset += COUNT.size
+                indices = np.frombuffer(frame, "<u2", count, offset)
+                offset += 2 * count
+                steps = np.frombuffer(frame, "<i2", count, offset)
+                offset += 2 * count
+                current = self.values[field.name]
+                current[indices] += steps * field.quantum
+                if field.wrap:
+                    current[indices] %= field.wrap
+        return sim_time, self.values
+
+
+def build_json_payload(state: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON fallback payload (the original ``/ws`` message format)"""
+    global_state = state['global']
+    payload = {
+        "time": float(state['time']),
+        "consciousness": {
+            "level": float(global_state.get('consciousness_level', 0)),
+            "phi": float(global_state.get('phi', 0)),
+            "coherence": float(global_state.get('coherence', 0)),
+            "depth": int(global_state.get('recursive_depth', 0)),
+            "gamma": float(global_state.get('gamma_power', 0)),
+            "fractal_dim": float(global_state.get('fractal_dimension', 1)),
+            "spiritual": float(global_state.get('spiritual_awareness', 0)),
+            "state": global_state.get('state_classification', 'initializing'),
+            "is_conscious": bool(global_state.get('is_conscious', False))
+        },
+        "nodes": {}
+    }
+    for node_id, node_data in state['nodes'].items():
+        payload['nodes'][str(node_id)] = {
+            "output": float(node_data['output']),
+            "phase": float(node_data['oscillator']['phase']),
+            "amplitude": float(node_data['oscillator']['amplitude']),
+            "dimensions": {k: float(v) for k, v in node_data['processor']['dimensions'].items()}
+        }
+    return payload
+
+
+class SyntheticStateSource:
+    """Stand-in for MetatronConsciousness.update_system() with the same state shape"""
+
+    def __init__(self, seed: int = 0, dt: float = 0.01):
+        self.rng = np.random.default_rng(seed)
+        self.dt = dt
+        self.time = 0.0
+        self.phase = self.rng.uniform(0, 2 * math.pi, NUM_NODES)
+        self.omega = 2 * math.pi * 40.0 * (1 + 0.05 * self.rng.normal(size=NUM_NODES))
+        self.amplitude = np.ones(NUM_NODES)
+        self.dims = np.zeros((NUM_NODES, len(DIMENSION_KEYS)))
+        self.level = 0.3
+
+    def update_system(self) -> Dict[str, Any]:
+        self.time += self.dt
+        self.phase = np.fmod(self.phase + self.omega * self.dt, 2 * math.pi)
+        self.amplitude += 0.002 * self.rng.normal(size=NUM_NODES)
+        # Dimensions drift slowly; most steps change only a few of them
+        moving = self.rng.random(self.dims.shape) < 0.2
+        self.dims += moving * 0.001 * self.rng.normal(size=self.dims.shape)
+        self.level = min(1.0, max(0.0, self.level + 0.0005 * self.rng.normal()))
+        return {
+            "time": self.time,
+            "nodes": {
+                i: {
+                    "oscillator": {"node_id": i, "phase": float(self.phase[i]),
+                                   "amplitude": float(self.amplitude[i]), "frequency_ratio": 1.0,
+                                   "omega": float(self.omega[i]), "memory_depth": 10,
+                                   "complex_state": {"real": 0.0, "imag": 0.0}},
+                    "processor": {"node_id": i,
+                                  "dimensions": {k: float(v) for k, v in zip(DIMENSION_KEYS, self.dims[i])},
+                                  "weights": [1.0] * 5, "dominant": "mental", "balance": 0.5,
+                                  "emotional_state": "neutral", "quality": 0.5},
+                    "output": float(self.amplitude[i] * math.sin(self.phase[i])),
+                    "dimensional_output": 0.0,
+                }
+                for i in range(NUM_NODES)
+            },
+            "global": {
+                "consciousness_level": self.level, "phi": self.level * 0.8, "coherence": 0.5,
+                "recursive_depth": 3, "gamma_power": 0.2, "fractal_dimension": 1.4,
+                "spiritual_awareness": 0.1, "state_classification": "aware" if self.level > 0.3 else "drowsy",
+                "is_conscious": self.level > 0.3,
+            },
+        }
+
+
+def benchmark_stream(frames: int = 4000, seed: int = 0) -> Dict[str, Dict[str, float]]:
+    """Bytes/s and server CPU per client for JSON and binary variants at 40 Hz"""
+    source = SyntheticStateSource(seed)
+    states = [source.update_system() for _ in range(frames)]
+    variants = {
+        "json": None,
+        "binary_all": StreamOptions(binary=True),
+        "binary_phase_amplitude": StreamOptions(binary=True, fields=("consciousness", "phase", "amplitude")),
+        "binary_all_10hz": StreamOptions(binary=True, decimation=4),
+    }
+    results = {}
+    for label, options in variants.items():
+        total_bytes = 0
+        sent = 0
+        decimation = options.decimation if options else 1
+        encoder = StateStreamEncoder(options.fields, options.keyframe_interval) if options else None
+        start = time.perf_counter()
+        for tick, state in enumerate(states):
+            if tick % decimation:
+                continue
+            if encoder is None:
+                total_bytes += len(json.dumps(build_json_payload(state)).encode("utf-8"))
+            else:
+                total_bytes += sum(len(m) for m in encoder.encode(state))
+            sent += 1
+        elapsed = time.perf_counter() - start
+        seconds = frames / UPDATE_RATE_HZ
+        results[label] = {
+            "bytes_per_second": total_bytes / seconds,
+            "bytes_per_frame": total_bytes / sent,
+            "cpu_us_per_frame": elapsed / sent * 1e6,
+            "cpu_percent_per_client": elapsed / seconds * 100,
+        }
+    return results
+
+
+if __name__ == "__main__":
+    print(json.dumps(benchmark_stream(), indent=2))
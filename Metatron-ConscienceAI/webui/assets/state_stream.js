@@ -0,0 +1,91 @@
+// Decoder for the binary /ws?format=binary consciousness stream (scripts/state_stream.py).
+// Rebuilds the same object shape as the JSON feed so dashboards can consume either.
+(() => {
+  const KEYFRAME = 1;
+  const DELTA = 2;
+  const HEADER_BYTES = 16;
+
+  class MetatronStateDecoder {
+    constructor(schema) {
+      this.schema = schema;
+      this.fields = schema.fields;
+      this.values = {};
+      this.ready = false;
+      this.state = 'initializing';
+      this.lastSequence = null;
+    }
+
+    // Text messages: returns true when consumed by the decoder
+    handleText(message) {
+      if (message.type === 'state') {
+        this.state = message.state;
+        return true;
+      }
+      return message.type === 'schema';
+    }
+
+    decode(buffer) {
+      const view = new DataView(buffer);
+      const frameType = view.getUint8(0);
+      const mask = view.getUint8(1);
+      const sequence = view.getUint32(4, true);
+      const time = view.getFloat64(8, true);
+      let offset = HEADER_BYTES;
+
+      if (frameType === DELTA && !this.ready) return null;
+
+      for (const field of this.fields) {
+        if (!(mask & (1 << field.bit))) continue;
+        if (frameType === KEYFRAME) {
+          const values = new Float64Array(field.length);
+          for (let i = 0; i < field.length; i++, offset += 4) {
+            values[i] = view.getFloat32(offset, true);
+          }
+          this.values[field.name] = values;
+        } else {
+          const count = view.getUint16(offset, true);
+          offset += 2;
+          const values = this.values[field.name];
+          const stepsOffset = offset + 2 * count;
+          for (let i = 0; i < count; i++) {
+            const index = view.getUint16(offset + 2 * i, true);
+            let value = values[index] + view.getInt16(stepsOffset + 2 * i, true) * field.quantum;
+            if (field.wrap) value = ((value % field.wrap) + field.wrap) % field.wrap;
+            values[index] = value;
+          }
+          offset = stepsOffset + 2 * count;
+        }
+      }
+      if (frameType === KEYFRAME) this.ready = true;
+      this.lastSequence = sequence;
+      return this.toPayload(time);
+    }
+
+    toPayload(time) {
+      const schema = this.schema;
+      const payload = { time, consciousness: { state: this.state }, nodes: {} };
+      const c = this.values.consciousness;
+      if (c) {
+        schema.consciousness_keys.forEach((key, i) => { payload.consciousness[key] = c[i]; });
+        payload.consciousness.depth = Math.round(payload.consciousness.depth);
+        payload.consciousness.is_conscious = payload.consciousness.is_conscious > 0.5;
+      }
+      const dims = this.values.dimensions;
+      const width = schema.dimension_keys.length;
+      for (let n = 0; n < schema.num_nodes; n++) {
+        const node = {};
+        if (this.values.output) node.output = this.values.output[n];
+        if (this.values.phase) node.phase = this.values.phase[n];
+        if (this.values.amplitude) node.amplitude = this.values.amplitude[n];
+        if (dims) {
+          node.dimensions = {};
+          schema.dimension_keys.forEach((key, d) => { node.dimensions[key] = dims[n * width + d]; });
+        }
+        payload.nodes[String(n)] = node;
+      }
+      return payload;
+    }
+  }
+
+  window.MetatronStateDecoder = MetatronStateDecoder;
+})();
@@ -6,6 +6,7 @@ enhances the basic alerting in monitoring_dashboard.py with:
 - Advanced alert rule definition and management
 - Multiple notification channels (email, SMS, webhook, etc.)
 - Alert deduplication and grouping
+- Incremental threshold evaluation on each metric sample (see alert_rules.py)
 - Alert escalation policies
 - Alert history and audit trail
 - Custom alert conditions and triggers
@@ -15,10 +16,11 @@ enhances the basic alerting in monitoring_dashboard.py with:
 """
 
 import asyncio
+import itertools
 import json
 import logging
 import time
-from typing import Dict, Any, List, Optional, Callable, Union
+from typing import Dict, Any, Iterable, List, Optional, Callable, Tuple, Union
 from dataclasses import dataclass, field
 from enum import Enum
 from collections import defaultdict, deque
@@ -28,6 +30,11 @@ import threading
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+from alert_rules import (
+    FIRING, AlertEvent, AlertNotification, CompiledRule, NotificationRouter, RuleEngine, alert_fingerprint
+)
+from rate_limiting import RateLimitPolicy
+
 # Try to import loguru, fallback to standard logging
 try:
     from loguru import logger
@@ -62,12 +69,13 @@ class AlertRule:
     id: str
     name: str
     description: str
-    condition: str  # Python expression or function name
+    condition: str  # threshold expression, e.g. 'cpu_usage{node_id="n1"} > 90'
     level: AlertLevel
     enabled: bool = True
     labels: Dict[str, str] = field(default_factory=dict)
     annotations: Dict[str, str] = field(default_factory=dict)
     for_duration: int = 0  # seconds before alert triggers
+    clear_threshold: Optional[float] = None  # hysteresis: resolve only past this value
     evaluation_interval: int = 30  # seconds
     notify_channels: List[NotificationChannel] = field(default_factory=list)
     escalation_policy: Optional[str] = None
@@ -108,6 +116,9 @@ class AlertSystemConfig:
     deduplication_window: int = 300  # seconds
     enable_grouping: bool = True
     grouping_interval: int = 60  # seconds
+    grouping_wait: float = 1.0  # seconds a new group waits for more alerts
+    notification_rate_limit: int = 60  # notifications per minute across all groups
+    series_timeout: int = 600  # seconds before a silent series' alerts resolve
     enable_silencing: bool = True
     silence_duration: int = 3600  # seconds
 
@@ -243,18 +254,52 @@ class AlertManager:
         self.notifier = AlertNotifier(self.config)
         self.evaluation_tasks: Dict[str, asyncio.Task] = {}
         self.running = False
+        # Threshold rules are evaluated on sample arrival, not by periodic rescans
+        self.engine = RuleEngine()
+        self.router = self._create_router()
+        self._alerts_by_fingerprint: Dict[str, str] = {}  # fingerprint -> active alert id
+        self._alert_ids = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._next_expiry = 0.0
+    
+    def _create_router(self) -> NotificationRouter:
+        """Create the grouped, rate-limited notification fan-out"""
+        return NotificationRouter(
+            self._dispatch_notification,
+            group_by=("rule_id",) if self.config.enable_grouping else ("fingerprint",),
+            group_wait=self.config.grouping_wait,
+            group_interval=self.config.grouping_interval,
+            repeat_interval=self.config.notification_interval,
+            rate_limit=RateLimitPolicy(self.config.notification_rate_limit, 60.0),
+        )
     
     def add_rule(self, rule: AlertRule):
         """Add an alert rule"""
         self.rules[rule.id] = rule
+        self._compile_rule(rule)
         logger.info(f"Added alert rule: {rule.name}")
     
     def remove_rule(self, rule_id: str):
         """Remove an alert rule"""
         if rule_id in self.rules:
             del self.rules[rule_id]
+            if self.engine.remove_rule(rule_id):
+                self._process_events()
             logger.info(f"Removed alert rule: {rule_id}")
     
+    def _compile_rule(self, rule: AlertRule):
+        """Register a rule's threshold condition with the rule engine"""
+        self.engine.remove_rule(rule.id)
+        if rule.enabled:
+            try:
+                compiled = CompiledRule.from_condition(rule.id, rule.condition, rule.for_duration,
+                                                       rule.clear_threshold, payload=rule)
+                self.engine.add_rule(compiled)
+            except ValueError:
+                logger.debug(f"Alert rule {rule.id} has no threshold condition, it fires through trigger_alert only")
+        if self.engine.events:
+            self._process_events()
+    
     def get_rule(self, rule_id: str) -> Optional[AlertRule]:
         """Get an alert rule by ID"""
         return self.rules.get(rule_id)
@@ -292,6 +337,9 @@ class AlertManager:
                 del self.silences[alert_id]
         return False
     
+    def _next_alert_id(self) -> str:
+        return f"alert_{int(time.time() * 1000000)}_{next(self._alert_ids)}"
+    
     def trigger_alert(self, rule_id: str, labels: Optional[Dict[str, str]] = None, annotations: Optional[Dict[str, str]] = None):
         """Trigger an alert based on a rule"""
         rule = self.get_rule(rule_id)
@@ -304,14 +352,10 @@ class AlertManager:
             return None
         
         # Create alert fingerprint for deduplication
-        fingerprint = f"{rule_id}:{hash(str(sorted((labels or {}).items())))}"
+        fingerprint = alert_fingerprint(rule_id, labels)
         
         # Check if alert is already active
-        existing_alert = None
-        for alert in self.active_alerts.values():
-            if alert.fingerprint == fingerprint:
-                existing_alert = alert
-                break
+        existing_alert = self.active_alerts.get(self._alerts_by_fingerprint.get(fingerprint, ""))
         
         if existing_alert:
             # Update existing alert
@@ -321,7 +365,7 @@ class AlertManager:
             return existing_alert
         
         # Create new alert
-        alert_id = f"alert_{int(time.time() * 1000000)}"
+        alert_id = self._next_alert_id()
         alert = Alert(
             id=alert_id,
             rule_id=rule_id,
@@ -336,6 +380,7 @@ class AlertManager:
         )
         
         self.active_alerts[alert_id] = alert
+        self._alerts_by_fingerprint[fingerprint] = alert_id
         self.alert_history.append(alert)
         logger.info(f"Triggered alert: {alert.name}")
         
@@ -344,6 +389,105 @@ class AlertManager:
         
         return alert
     
+    def ingest_sample(self, metric: str, value: float, labels: Optional[Dict[str, str]] = None,
+                      timestamp: Optional[float] = None) -> int:
+        """Evaluate one metric sample against the threshold rules on that metric"""
+        transitions = self.engine.ingest(metric, value, labels, timestamp)
+        if transitions:
+            self._process_events()
+        return transitions
+    
+    def ingest_samples(self, samples: Iterable[Tuple[str, float, Optional[Dict[str, str]], Optional[float]]]) -> int:
+        """Evaluate a batch of (metric, value, labels, timestamp) samples"""
+        ingest = self.engine.ingest
+        transitions = 0
+        for metric, value, labels, timestamp in samples:
+            transitions += ingest(metric, value, labels, timestamp)
+        if transitions:
+            self._process_events()
+        return transitions
+    
+    def _process_events(self):
+        """Turn rule engine transitions into alerts and queue them for notification"""
+        events = self.engine.drain()
+        for event in events:
+            if event.status == FIRING:
+                self._open_alert(event)
+            else:
+                alert_id = self._alerts_by_fingerprint.get(event.fingerprint)
+                if alert_id:
+                    self.resolve_alert(alert_id)
+        self.router.submit(events)
+        if self._wakeup is not None:
+            self._wakeup.set()
+    
+    def _open_alert(self, event: AlertEvent) -> Alert:
+        rule: AlertRule = event.rule.payload
+        alert = Alert(
+            id=self._next_alert_id(),
+            rule_id=rule.id,
+            name=rule.name,
+            description=rule.description,
+            level=rule.level,
+            status=AlertStatus.TRIGGERED,
+            labels={**rule.labels, **event.labels},
+            annotations={**rule.annotations, "value": f"{event.value:g}"},
+            starts_at=event.since,
+            fingerprint=event.fingerprint
+        )
+        self.active_alerts[alert.id] = alert
+        self._alerts_by_fingerprint[alert.fingerprint] = alert.id
+        self.alert_history.append(alert)
+        logger.info(f"Triggered alert: {alert.name} {event.labels}")
+        return alert
+    
+    def _dispatch_notification(self, notification: AlertNotification):
+        """Send one grouped notification to the channels of its rule"""
+        events = notification.firing or notification.resolved
+        rule: AlertRule = events[0].rule.payload
+        alerts = [self.active_alerts[alert_id]
+                  for alert_id in (self._alerts_by_fingerprint.get(event.fingerprint) for event in notification.firing)
+                  if alert_id in self.active_alerts]
+        unsilenced = [alert for alert in alerts if not self.is_silenced(alert.id)]
+        if alerts and not unsilenced and not notification.resolved:
+            logger.debug(f"All alerts of rule {rule.id} are silenced, skipping notifications")
+            return
+        
+        summary = Alert(
+            id=f"group_{rule.id}_{int(notification.timestamp * 1000000)}",
+            rule_id=rule.id,
+            name=rule.name,
+            description=(f"{rule.description} ({len(notification.firing)} firing, "
+                         f"{len(notification.started)} new, {len(notification.resolved)} resolved)"),
+            level=rule.level,
+            status=AlertStatus.TRIGGERED if notification.firing else AlertStatus.RESOLVED,
+            labels={**rule.labels, **{key: str(value) for key, value in notification.group.items()}},
+            annotations={**rule.annotations,
+                         "firing": "; ".join(str(event.labels) for event in notification.firing),
+                         "resolved": "; ".join(str(event.labels) for event in notification.resolved)},
+            starts_at=min(event.since for event in events),
+            ends_at=None if notification.firing else notification.timestamp,
+            last_notification=notification.timestamp,
+            fingerprint=alert_fingerprint(rule.id, notification.group)
+        )
+        for alert in unsilenced:
+            alert.last_notification = notification.timestamp
+            alert.notification_count += 1
+        
+        sending = self._send_to_channels(summary, rule.notify_channels)
+        try:
+            asyncio.get_running_loop().create_task(sending)
+        except RuntimeError:
+            asyncio.run(sending)
+    
+    async def _send_to_channels(self, alert: Alert, channels: List[NotificationChannel]):
+        for channel in channels:
+            await self.notifier.send_notification(alert, channel)
+    
+    def flush_notifications(self, now: Optional[float] = None) -> int:
+        """Send the notification groups that are due"""
+        return self.router.flush(now)
+    
     async def _send_alert_notifications(self, alert: Alert, rule: AlertRule):
         """Send notifications for an alert"""
         # Check if alert is silenced
@@ -375,6 +519,8 @@ class AlertManager:
             
             # Remove from active alerts
             del self.active_alerts[alert_id]
+            if self._alerts_by_fingerprint.get(alert.fingerprint) == alert_id:
+                del self._alerts_by_fingerprint[alert.fingerprint]
     
     def acknowledge_alert(self, alert_id: str):
         """Acknowledge an active alert"""
@@ -393,39 +539,34 @@ class AlertManager:
             return list(self.alert_history)[-limit:]
         return list(self.alert_history)
     
-    def evaluate_rule(self, rule: AlertRule):
-        """Evaluate an alert rule"""
-        # This is a simplified implementation
-        # In a real system, you would evaluate the condition against metrics
-        try:
-            # For demonstration, we'll trigger alerts randomly
-            import random
-            if random.random() < 0.1:  # 10% chance to trigger
-                self.trigger_alert(rule.id, {"test": "true"}, {"triggered_by": "test"})
-        except Exception as e:
-            logger.error(f"Failed to evaluate rule {rule.name}: {e}")
+    async def _notification_loop(self):
+        """Send grouped notifications as they fall due and expire silent series"""
+        while self.running:
+            try:
+                now = time.time()
+                if now >= self._next_expiry:
+                    self.engine.expire(now - self.config.series_timeout, now)
+                    if self.engine.events:
+                        self._process_events()
+                    self._next_expiry = now + self.config.series_timeout / 4
+                self.router.flush(now)
+                due = self.router.next_due()
+                timeout = min(self._next_expiry, due if due is not None else self._next_expiry) - time.time()
+                self._wakeup.clear()
+                if timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            except Exception as e:
+                logger.error(f"Error in alert notification loop: {e}")
+                await asyncio.sleep(1)
     
     async def start_evaluation(self):
-        """Start evaluating alert rules"""
+        """Start alerting; threshold rules are evaluated as samples are ingested"""
         self.running = True
-        
-        async def evaluation_loop():
-            while self.running:
-                try:
-                    for rule in self.rules.values():
-                        if rule.enabled:
-                            self.evaluate_rule(rule)
-                    await asyncio.sleep(30)  # Default evaluation interval
-                except Exception as e:
-                    logger.error(f"Error in alert evaluation loop: {e}")
-                    await asyncio.sleep(30)
-        
-        # Start evaluation task for each rule
-        for rule_id, rule in self.rules.items():
-            if rule.enabled:
-                task = asyncio.create_task(evaluation_loop())
-                self.evaluation_tasks[rule_id] = task
-        
+        self._wakeup = asyncio.Event()
+        self.evaluation_tasks["notifications"] = asyncio.create_task(self._notification_loop())
         logger.info("Alert evaluation started")
     
     async def stop_evaluation(self):
@@ -433,6 +574,8 @@ class AlertManager:
         self.running = False
         for task in self.evaluation_tasks.values():
             task.cancel()
+        self.evaluation_tasks.clear()
+        self._wakeup = None
         logger.info("Alert evaluation stopped")
     
     async def start_alert_system(self, config: Optional[Dict[str, Any]] = None):
@@ -447,6 +590,7 @@ class AlertManager:
             
             # Reinitialize notifier with updated config
             self.notifier = AlertNotifier(self.config)
+            self.router = self._create_router()
             
             # Start evaluation
             await self.start_evaluation()
@@ -485,6 +629,11 @@ def trigger_alert(rule_id: str, labels: Optional[Dict[str, str]] = None, annotat
     """Trigger an alert"""
     return get_alert_manager().trigger_alert(rule_id, labels, annotations)
 
+def ingest_sample(metric: str, value: float, labels: Optional[Dict[str, str]] = None,
+                  timestamp: Optional[float] = None):
+    """Evaluate a metric sample against the alert rules"""
+    return get_alert_manager().ingest_sample(metric, value, labels, timestamp)
+
 def resolve_alert(alert_id: str):
     """Resolve an alert"""
     get_alert_manager().resolve_alert(alert_id)
@@ -15,7 +15,8 @@ from the monitoring dashboard, offering:
 import asyncio
 import json
 import logging
-from typing import Dict, Any, Optional, Callable
+import math
+from typing import Dict, Any, Optional, Callable, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 import time
@@ -53,9 +54,10 @@ except ImportError:
         pass
         
     class JSONResponse:
-        def __init__(self, status_code=200, content=None):
+        def __init__(self, status_code=200, content=None, headers=None):
             self.status_code = status_code
             self.content = content
+            self.headers = headers or {}
             
     class CORSMiddleware:
         pass
@@ -81,6 +83,10 @@ except ImportError:
             async def serve(self):
                 pass
 
+from latency_histogram import (DEFAULT_LAYOUT, HistogramLayout, HistogramSnapshot, RollingLatencyHistogram,
+                               prometheus_histogram, prometheus_summary)
+from rate_limiting import GCRA, RateLimitDecision, RateLimiterSet, RateLimitPolicy
+
 # Try to import loguru, fallback to standard logging
 try:
     from loguru import logger
@@ -115,47 +121,46 @@ class APIServerConfig:
     auth_secret: Optional[str] = None
     rate_limit_requests: int = 100
     rate_limit_window: int = 60  # seconds
+    rate_limit_burst: Optional[int] = None  # defaults to rate_limit_requests
+    rate_limit_mode: str = GCRA  # "gcra" or "sliding_window"
+    # "METHOD /path" or "/prefix/*" -> RateLimitPolicy (or a kwargs dict for one)
+    rate_limit_routes: dict = field(default_factory=dict)
+    # AuthLevel -> RateLimitPolicy (or a kwargs dict for one)
+    rate_limit_auth_levels: dict = field(default_factory=dict)
     enable_docs: bool = True
     api_prefix: str = "/api/v1"
     enable_websockets: bool = True
 
 class RateLimiter:
-    """Simple rate limiter for API requests"""
+    """Rate limiter for API requests (GCRA by default, see rate_limiting)"""
     
-    def __init__(self, max_requests: int, window_seconds: int):
+    def __init__(self, max_requests: int, window_seconds: int, burst: Optional[int] = None,
+                 mode: str = GCRA, route_policies: Optional[Dict[str, Any]] = None,
+                 auth_policies: Optional[Dict[Any, Any]] = None):
         self.max_requests = max_requests
         self.window_seconds = window_seconds
-        self.requests: Dict[str, list] = {}
+        self.limiters = RateLimiterSet(
+            RateLimitPolicy(max_requests, window_seconds, burst, mode),
+            routes={route: self._policy(p) for route, p in (route_policies or {}).items()},
+            auth_levels={level: self._policy(p) for level, p in (auth_policies or {}).items()}
+        )
+    
+    @staticmethod
+    def _policy(policy) -> RateLimitPolicy:
+        return policy if isinstance(policy, RateLimitPolicy) else RateLimitPolicy(**policy)
+    
+    def check(self, client_id: str, route: Optional[str] = None,
+              auth_level: Optional[AuthLevel] = None) -> RateLimitDecision:
+        """Consume one request from the policy that applies and return the decision"""
+        return self.limiters.check(client_id, route, auth_level)
     
     def is_allowed(self, client_id: str) -> bool:
         """Check if a client is allowed to make a request"""
-        now = time.time()
-        
-        # Initialize client requests list if not exists
-        if client_id not in self.requests:
-            self.requests[client_id] = []
-        
-        # Remove old requests outside the window
-        self.requests[client_id] = [
-            req_time for req_time in self.requests[client_id]
-            if now - req_time < self.window_seconds
-        ]
-        
-        # Check if under limit
-        if len(self.requests[client_id]) < self.max_requests:
-            self.requests[client_id].append(now)
-            return True
-        
-        return False
+        return self.limiters.check(client_id).allowed
     
     def get_retry_after(self, client_id: str) -> int:
         """Get seconds until client can make another request"""
-        if client_id not in self.requests or not self.requests[client_id]:
-            return 0
-        
-        oldest_request = min(self.requests[client_id])
-        now = time.time()
-        return max(0, int(self.window_seconds - (now - oldest_request)))
+        return math.ceil(self.limiters.default.peek_retry_after(client_id))
 
 class AuthManager:
     """Authentication manager for API endpoints"""
@@ -179,6 +184,16 @@ class AuthManager:
         
         return True
     
+    def request_level(self, request: Request) -> AuthLevel:
+        """Auth level a request presents (used to pick its rate limit policy)"""
+        if not self.secret:
+            return AuthLevel.PUBLIC
+        authorization = request.headers.get("authorization", "")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() == "bearer" and token == self.secret:
+            return AuthLevel.AUTHENTICATED
+        return AuthLevel.PUBLIC
+    
     def require_auth(self, level: AuthLevel = AuthLevel.AUTHENTICATED):
         """Decorator to require authentication for endpoints"""
         def decorator(func):
@@ -189,56 +204,97 @@ class AuthManager:
             return wrapper
         return decorator
 
+_STATUS_CLASSES = [f"{i}xx" for i in range(10)]
+
 class MetricsCollector:
-    """Collect metrics for API performance"""
+    """Collect metrics for API performance
+    
+    Latencies go into fixed-size log-linear histograms per endpoint and
+    status class (see latency_histogram), so memory does not grow with
+    traffic and reading the metrics does not rescan past requests.
+    """
     
-    def __init__(self):
+    def __init__(self, window: float = 60.0, slots: int = 6,
+                 layout: HistogramLayout = DEFAULT_LAYOUT):
         self.request_count = 0
         self.error_count = 0
-        self.response_times = []
-        self.endpoint_metrics = {}
+        self.window = window
+        self.slots = slots
+        self.layout = layout
+        self.histograms: Dict[Tuple[str, str], RollingLatencyHistogram] = {}
+        self.endpoint_errors: Dict[str, int] = {}
     
-    def record_request(self, endpoint: str, response_time: float, success: bool = True):
+    def record_request(self, endpoint: str, response_time: float, success: bool = True,
+                       status_code: Optional[int] = None):
         """Record a request"""
         self.request_count += 1
         if not success:
             self.error_count += 1
-        
-        self.response_times.append(response_time)
-        
-        # Record endpoint-specific metrics
-        if endpoint not in self.endpoint_metrics:
-            self.endpoint_metrics[endpoint] = {
-                "count": 0,
-                "errors": 0,
-                "response_times": []
-            }
-        
-        self.endpoint_metrics[endpoint]["count"] += 1
-        if not success:
-            self.endpoint_metrics[endpoint]["errors"] += 1
-        self.endpoint_metrics[endpoint]["response_times"].append(response_time)
+            self.endpoint_errors[endpoint] = self.endpoint_errors.get(endpoint, 0) + 1
+        
+        status_class = _STATUS_CLASSES[status_code // 100] if status_code else ("2xx" if success else "5xx")
+        histogram = self.histograms.get((endpoint, status_class))
+        if histogram is None:
+            histogram = self.histograms[(endpoint, status_class)] = RollingLatencyHistogram(
+                self.window, self.slots, self.layout)
+        histogram.record(response_time)
     
-    def get_metrics(self) -> Dict[str, Any]:
-        """Get current metrics"""
-        if self.response_times:
-            avg_response_time = sum(self.response_times) / len(self.response_times)
-            max_response_time = max(self.response_times)
-            min_response_time = min(self.response_times)
-        else:
-            avg_response_time = 0
-            max_response_time = 0
-            min_response_time = 0
+    def snapshots(self, window: Optional[float] = None) -> Dict[Tuple[str, str], HistogramSnapshot]:
+        """Histogram snapshots per (endpoint, status class); cumulative unless a window is given"""
+        return {
+            key: histogram.snapshot() if window is None else histogram.window_snapshot(window)
+            for key, histogram in self.histograms.items()
+        }
+    
+    def get_metrics(self, window: Optional[float] = None) -> Dict[str, Any]:
+        """Get current metrics (latency quantiles over the last `window` seconds if given)"""
+        snapshots = self.snapshots(window)
+        overall = HistogramSnapshot.merge_all(snapshots.values(), self.layout)
+        
+        by_endpoint: Dict[str, Dict[str, HistogramSnapshot]] = {}
+        for (endpoint, status_class), snapshot in sorted(snapshots.items()):
+            by_endpoint.setdefault(endpoint, {})[status_class] = snapshot
+        endpoint_metrics = {}
+        for endpoint, classes in by_endpoint.items():
+            merged = HistogramSnapshot.merge_all(classes.values(), self.layout)
+            endpoint_metrics[endpoint] = {
+                "count": sum(self.histograms[(endpoint, status_class)].count for status_class in classes),
+                "errors": self.endpoint_errors.get(endpoint, 0),
+                "latency": merged.summary(),
+                "status_classes": {status_class: snapshot.summary() for status_class, snapshot in classes.items()}
+            }
         
         return {
             "request_count": self.request_count,
             "error_count": self.error_count,
             "error_rate": self.error_count / max(self.request_count, 1),
-            "avg_response_time": avg_response_time,
-            "max_response_time": max_response_time,
-            "min_response_time": min_response_time,
-            "endpoint_metrics": self.endpoint_metrics
+            "avg_response_time": overall.mean,
+            "max_response_time": overall.maximum,
+            "min_response_time": overall.minimum if overall.count else 0,
+            "latency": overall.summary(),
+            "window_seconds": window,
+            "endpoint_metrics": endpoint_metrics
         }
+    
+    def export_prometheus(self, prefix: str = "aegis_api") -> str:
+        """Latency histograms (cumulative) and rolling-window quantiles in Prometheus text format"""
+        def series(snapshots):
+            for (endpoint, status_class), snapshot in sorted(snapshots.items()):
+                method, _, path = endpoint.partition(" ")
+                yield {"method": method, "path": path, "status_class": status_class}, snapshot
+        
+        return (
+            prometheus_histogram(f"{prefix}_request_duration_seconds",
+                                 "API request latency in seconds", series(self.snapshots()))
+            + prometheus_summary(f"{prefix}_request_duration_window_seconds",
+                                 f"API request latency over the last {self.window:g} seconds",
+                                 series(self.snapshots(self.window)))
+            + f"# HELP {prefix}_requests_total API requests\n# TYPE {prefix}_requests_total counter\n"
+            + f"{prefix}_requests_total {self.request_count}\n"
+            + f"# HELP {prefix}_request_errors_total Failed API requests\n"
+            + f"# TYPE {prefix}_request_errors_total counter\n"
+            + f"{prefix}_request_errors_total {self.error_count}\n"
+        )
 
 class APIServer:
     """Main API server for AEGIS"""
@@ -248,7 +304,11 @@ class APIServer:
         self.app = None
         self.rate_limiter = RateLimiter(
             self.config.rate_limit_requests,
-            self.config.rate_limit_window
+            self.config.rate_limit_window,
+            burst=self.config.rate_limit_burst,
+            mode=self.config.rate_limit_mode,
+            route_policies=self.config.rate_limit_routes,
+            auth_policies=self.config.rate_limit_auth_levels
         )
         self.auth_manager = AuthManager(self.config.auth_secret)
         self.metrics_collector = MetricsCollector()
@@ -282,14 +342,16 @@ class APIServer:
         # Add middleware for metrics collection
         @self.app.middleware("http")
         async def metrics_middleware(request: Request, call_next):
-            start_time = time.time()
+            start_time = time.perf_counter()
             response = await call_next(request)
-            process_time = time.time() - start_time
+            process_time = time.perf_counter() - start_time
             
-            # Record metrics
-            endpoint = f"{request.method} {request.url.path}"
+            # Record metrics under the route template ("/items/{id}"), not the raw
+            # path, so the number of histograms stays bounded
+            route = request.scope.get("route")
+            endpoint = f"{request.method} {getattr(route, 'path', '<unmatched>')}"
             success = response.status_code < 400
-            self.metrics_collector.record_request(endpoint, process_time, success)
+            self.metrics_collector.record_request(endpoint, process_time, success, response.status_code)
             
             return response
         
@@ -297,15 +359,20 @@ class APIServer:
         @self.app.middleware("http")
         async def rate_limit_middleware(request: Request, call_next):
             client_id = request.client.host if request.client else "unknown"
+            route = f"{request.method} {request.url.path}"
+            decision = self.rate_limiter.check(client_id, route, self.auth_manager.request_level(request))
             
-            if not self.rate_limiter.is_allowed(client_id):
-                retry_after = self.rate_limiter.get_retry_after(client_id)
+            if not decision.allowed:
+                retry_after = math.ceil(decision.retry_after)
                 return JSONResponse(
                     status_code=429,
-                    content={"detail": f"Rate limit exceeded. Try again in {retry_after} seconds."}
+                    content={"detail": f"Rate limit exceeded. Try again in {retry_after} seconds."},
+                    headers=decision.headers()
                 )
             
-            return await call_next(request)
+            response = await call_next(request)
+            response.headers.update(decision.headers())
+            return response
         
         # Add default routes
         self._add_default_routes()
@@ -331,8 +398,13 @@ class APIServer:
             }
         
         @self.app.get("/metrics")
-        async def get_metrics():
-            return self.metrics_collector.get_metrics()
+        async def get_metrics(window: Optional[float] = None):
+            return self.metrics_collector.get_metrics(window)
+        
+        @self.app.get("/metrics/prometheus")
+        async def get_prometheus_metrics():
+            return Response(content=self.metrics_collector.export_prometheus(),
+                            media_type="text/plain; version=0.0.4")
         
         @self.app.get("/config")
         async def get_config():
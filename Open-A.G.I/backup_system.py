@@ -8,6 +8,7 @@ implements automated backup functionality with:
 - Encryption of backup files
 - Compression to save storage space
 - Backup verification and integrity checking
+- Incremental, content-defined deduplicating snapshots (see chunk_store)
 """
 
 import asyncio
@@ -15,13 +16,11 @@ import json
 import logging
 import os
 import time
-import shutil
-import hashlib
-import zipfile
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
 from pathlib import Path
 
+from chunk_store import ChunkStore
+
 # Try to import required libraries
 try:
     from cryptography.fernet import Fernet
@@ -47,7 +46,8 @@ class BackupConfig:
                  encryption_key: Optional[str] = None,
                  enable_compression: bool = True,
                  source_directories: Optional[List[str]] = None,
-                 backup_directory: str = "backups"):
+                 backup_directory: str = "backups",
+                 workers: Optional[int] = None):
         self.enabled = enabled
         self.interval_hours = interval_hours
         self.retention_days = retention_days
@@ -56,6 +56,7 @@ class BackupConfig:
         self.enable_compression = enable_compression
         self.source_directories = source_directories or ["config", "data", "logs"]
         self.backup_directory = backup_directory
+        self.workers = workers  # compression/encryption processes (None: up to 4 CPUs)
 
 class BackupManager:
     """Main backup manager for AEGIS"""
@@ -67,6 +68,8 @@ class BackupManager:
         self.encryption_key = None
         self.cipher_suite = None
         self.backup_history = []
+        self.store: Optional[ChunkStore] = None
+        self._store_lock = asyncio.Lock()
         
         # Setup encryption if enabled
         if self.config.enable_encryption and CRYPTO_AVAILABLE:
@@ -83,15 +86,37 @@ class BackupManager:
                 self.encryption_key = self.config.encryption_key.encode()
                 self.cipher_suite = Fernet(self.encryption_key) if Fernet else None
             elif CRYPTO_AVAILABLE and Fernet:
-                # Generate a new key
-                self.encryption_key = Fernet.generate_key()
+                # Generate a key once per backup directory: chunk ids depend on it, and
+                # snapshots are unreadable without it
+                key_file = Path(self.config.backup_directory) / "backup.key"
+                if key_file.exists():
+                    self.encryption_key = key_file.read_bytes().strip()
+                else:
+                    self.encryption_key = Fernet.generate_key()
+                    key_file.parent.mkdir(parents=True, exist_ok=True)
+                    key_file.write_bytes(self.encryption_key)
+                    os.chmod(key_file, 0o600)
+                    logger.warning(f"No encryption key provided, generated a new one in {key_file}; "
+                                   "keep a copy outside the backup directory")
                 self.cipher_suite = Fernet(self.encryption_key)
-                logger.warning("No encryption key provided, generated a new one")
         except Exception as e:
             logger.error(f"Failed to setup encryption: {e}")
     
+    def _get_store(self) -> ChunkStore:
+        """Chunk store under the configured backup directory"""
+        root = os.path.join(self.config.backup_directory, "store")
+        if self.store is None or self.store.root != root:
+            if self.store is not None:
+                self.store.close()
+            key = self.encryption_key if self.config.enable_encryption else None
+            if self.config.enable_encryption and key is None:
+                logger.warning("Encryption requested but not available, storing backups unencrypted")
+            level = 6 if self.config.enable_compression else 0
+            self.store = ChunkStore(root, key=key, workers=self.config.workers, compression_level=level)
+        return self.store
+    
     async def create_backup(self) -> Dict[str, Any]:
-        """Create a backup"""
+        """Create a backup (an incremental snapshot in the chunk store)"""
         backup_record = {
             "id": f"backup_{int(time.time() * 1000000)}",
             "timestamp": time.time(),
@@ -108,43 +133,32 @@ class BackupManager:
         try:
             logger.info("Starting backup")
             
-            # Create backup filename
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            backup_filename = f"aegis_backup_{timestamp}.zip"
-            backup_path = os.path.join(self.config.backup_directory, backup_filename)
-            backup_record["file_path"] = backup_path
-            
-            # Simple file copy backup (simplified implementation)
-            backup_record["backup_size"] = 0
-            files_copied = 0
-            
-            for source_dir in self.config.source_directories:
-                if os.path.exists(source_dir):
-                    dest_dir = os.path.join(self.config.backup_directory, "backup_" + timestamp, source_dir)
-                    Path(dest_dir).mkdir(parents=True, exist_ok=True)
-                    
-                    # Copy files
-                    for root, dirs, files in os.walk(source_dir):
-                        for file in files:
-                            src_file = os.path.join(root, file)
-                            rel_path = os.path.relpath(src_file, source_dir)
-                            dest_file = os.path.join(dest_dir, rel_path)
-                            
-                            # Create destination directory
-                            Path(os.path.dirname(dest_file)).mkdir(parents=True, exist_ok=True)
-                            
-                            # Copy file
-                            shutil.copy2(src_file, dest_file)
-                            files_copied += 1
-                            backup_record["backup_size"] += os.path.getsize(dest_file)
-            
-            backup_record["source_files"] = files_copied
+            async with self._store_lock:
+                store = self._get_store()
+                sources = [d for d in self.config.source_directories if os.path.exists(d)]
+                loop = asyncio.get_running_loop()
+                # Chunking, hashing and I/O run off the event loop
+                header = await loop.run_in_executor(None, store.create_snapshot, sources, backup_record["id"])
+                stats = header["stats"]
+                
+                backup_record["file_path"] = os.path.join(store.snapshot_dir, f"{header['id']}.json")
+                backup_record["source_files"] = stats["files"]
+                backup_record["backup_size"] = stats["bytes_written"]
+                backup_record["logical_size"] = stats["logical_bytes"]
+                backup_record["files_unchanged"] = stats["files_unchanged"]
+                backup_record["new_chunks"] = stats["new_chunks"]
+                backup_record["reused_chunks"] = stats["reused_chunks"]
+                
+                # Apply the retention policy (the newest snapshot is always kept)
+                cutoff = time.time() - self.config.retention_days * 86400
+                backup_record["pruned"] = await loop.run_in_executor(None, store.prune, cutoff)
             
             # Update backup record
             backup_record["status"] = "completed"
             backup_record["duration"] = time.time() - start_time
             
-            logger.info(f"Backup completed successfully: {backup_path}")
+            logger.info(f"Backup completed successfully: {backup_record['file_path']} "
+                        f"({backup_record['backup_size']} bytes written)")
             
         except Exception as e:
             backup_record["status"] = "failed"
@@ -157,6 +171,18 @@ class BackupManager:
         
         return backup_record
     
+    async def restore_backup(self, backup_id: str, target_directory: str,
+                             paths: Optional[List[str]] = None) -> Dict[str, int]:
+        """Restore a backup (or some of its files) under target_directory"""
+        async with self._store_lock:
+            store = self._get_store()
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, store.restore, backup_id, target_directory, paths)
+    
+    def list_backups(self) -> List[Dict[str, Any]]:
+        """Snapshots currently held in the chunk store, oldest first"""
+        return self._get_store().snapshots()
+    
     async def start_backup_scheduler(self):
         """Start the backup scheduler"""
         if not self.config.enabled:
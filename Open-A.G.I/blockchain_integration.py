@@ -7,6 +7,7 @@ contratos inteligentes y consenso descentralizado.
 Características principales:
 - Blockchain personalizado con PoS (Proof of Stake)
 - Contratos inteligentes para IA distribuida
+- Contratos compilados una vez por hash, con gas medido y estado transaccional
 - Inmutabilidad de modelos y datos de entrenamiento
 - Tokenización de recursos computacionales
 - Auditoría transparente de decisiones de IA
@@ -18,16 +19,19 @@ import json
 import hashlib
 import logging
 from typing import Dict, List, Optional, Any, Union
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
 from enum import Enum
 from collections import deque
 from cryptography.hazmat.primitives import hashes, serialization
 from cryptography.hazmat.primitives.asymmetric import rsa, padding
-import merkletools
 import sqlite3
 import pickle
 import base64
 
+from merkle_tree import IncrementalMerkleTree, hash_leaf, verify_inclusion, verify_multi_proof
+from stake_sampling import StakeSampler, derive_seed, seed_stream
+from contract_runtime import ContractCall, ContractError, ContractRuntime, ExecutionResult, validate_contract
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -103,6 +107,20 @@ class Block:
     block_hash: str
     status: BlockStatus
     confirmations: int
+    merkle_proofs: Dict[str, List[str]] = field(default_factory=dict)
+
+    def header(self) -> Dict[str, Any]:
+        """Cabecera del bloque (suficiente para clientes ligeros)"""
+        return {
+            'index': self.index,
+            'previous_hash': self.previous_hash,
+            'merkle_root': self.merkle_root,
+            'timestamp': self.timestamp,
+            'validator': self.validator,
+            'nonce': self.nonce,
+            'block_hash': self.block_hash,
+            'tx_count': len(self.transactions)
+        }
 
 
 @dataclass
@@ -264,27 +282,51 @@ class CryptographicManager:
             logger.error(f"❌ Error calculando hash: {e}")
             return ""
 
+    def transaction_leaf_hash(self, transaction: Transaction) -> bytes:
+        """Hash de hoja de Merkle de una transacción"""
+        tx_dict = asdict(transaction)
+        tx_dict['tx_type'] = transaction.tx_type.value
+        return hash_leaf(json.dumps(tx_dict, sort_keys=True, default=str))
+
+    def build_merkle_tree(self, transactions: List[Transaction]) -> IncrementalMerkleTree:
+        """Construye incrementalmente el árbol de Merkle de un bloque"""
+        tree = IncrementalMerkleTree()
+        for tx in transactions:
+            tree.append_hash(self.transaction_leaf_hash(tx))
+        return tree
+
     def create_merkle_tree(self, transactions: List[Transaction]) -> str:
         """Crea árbol de Merkle para transacciones"""
         try:
-            mt = merkletools.MerkleTools(hash_type="sha256")
+            return self.build_merkle_tree(transactions).root_hex()
 
-            # Agregar hashes de transacciones
-            for tx in transactions:
-                tx_data = json.dumps(asdict(tx), sort_keys=True)
-                mt.add_leaf(tx_data)
+        except Exception as e:
+            logger.error(f"❌ Error creando árbol de Merkle: {e}")
+            return ""
 
-            # Construir árbol
-            mt.make_tree()
+    def verify_transaction_inclusion(self, header: Dict[str, Any], transaction: Transaction,
+                                     proof: Dict[str, Any]) -> bool:
+        """Verifica que una transacción está en un bloque usando solo su cabecera"""
+        try:
+            return verify_inclusion(
+                self.transaction_leaf_hash(transaction), proof['index'], header['tx_count'],
+                proof['path'], header['merkle_root']
+            )
 
-            # Obtener raíz de Merkle
-            merkle_root = mt.get_merkle_root()
+        except Exception as e:
+            logger.error(f"❌ Error verificando prueba de inclusión: {e}")
+            return False
 
-            return merkle_root.hex() if merkle_root else ""
+    def verify_transactions_inclusion(self, header: Dict[str, Any], transactions: Dict[int, Transaction],
+                                      proof: List[str]) -> bool:
+        """Verifica una multi-prueba de varias transacciones contra la cabecera"""
+        try:
+            leaves = {index: self.transaction_leaf_hash(tx) for index, tx in transactions.items()}
+            return verify_multi_proof(leaves, header['tx_count'], proof, header['merkle_root'])
 
         except Exception as e:
-            logger.error(f"❌ Error creando árbol de Merkle: {e}")
-            return ""
+            logger.error(f"❌ Error verificando multi-prueba: {e}")
+            return False
 
 
 class TransactionPool:
@@ -402,6 +444,8 @@ class ProofOfStakeValidator:
         self.min_stake = 1000.0  # Stake mínimo para ser validador
         self.reward_rate = 0.05  # 5% anual
         self.slash_rate = 0.1    # 10% de penalización
+        # Árbol de Fenwick con el stake de los validadores activos
+        self.sampler = StakeSampler()
 
     def register_validator(self, validator_id: str, stake_amount: float) -> bool:
         """Registra un nuevo validador"""
@@ -421,8 +465,13 @@ class ProofOfStakeValidator:
                 performance_score=1.0
             )
 
+            previous = self.validators.get(validator_id)
+            if previous is not None:
+                self.total_stake -= previous.stake_amount
+
             self.validators[validator_id] = validator_stake
             self.total_stake += stake_amount
+            self._sync_sampler(validator_id)
 
             logger.info(f"✅ Validador registrado: {validator_id} con stake {stake_amount}")
             return True
@@ -431,46 +480,79 @@ class ProofOfStakeValidator:
             logger.error(f"❌ Error registrando validador: {e}")
             return False
 
-    def select_validator(self, block_height: int) -> Optional[str]:
-        """Selecciona validador usando algoritmo PoS"""
-        try:
-            if not self.validators:
-                return None
-
-            # Filtrar validadores activos
-            active_validators = {
-                v_id: stake for v_id, stake in self.validators.items()
-                if stake.status == StakeStatus.ACTIVE and stake.stake_amount > 0
-            }
-
-            if not active_validators:
-                return None
-
-            # Calcular probabilidades basadas en stake
-            total_active_stake = sum(stake.stake_amount for stake in active_validators.values())
-
-            # Usar hash del bloque anterior como semilla
-            seed = hashlib.sha256(f"{block_height}{time.time()}".encode()).hexdigest()
-            random_value = int(seed[:8], 16) / 0xFFFFFFFF
-
-            # Selección ponderada por stake
-            cumulative_probability = 0.0
+    def _sync_sampler(self, validator_id: str):
+        """Refleja en el muestreador el stake activo de un validador"""
+        validator = self.validators.get(validator_id)
+        if validator is not None and validator.status == StakeStatus.ACTIVE and validator.stake_amount > 0:
+            self.sampler.set_stake(validator_id, validator.stake_amount)
+        else:
+            self.sampler.remove(validator_id)
+
+    def _is_selectable(self, validator_id: str) -> bool:
+        """Comprueba que el muestreador coincide con el estado del validador"""
+        validator = self.validators.get(validator_id)
+        return (
+            validator is not None
+            and validator.status == StakeStatus.ACTIVE
+            and self.sampler.to_units(validator.stake_amount) == self.sampler.to_units(self.sampler.stake_of(validator_id))
+        )
 
-            for validator_id, stake in active_validators.items():
-                probability = stake.stake_amount / total_active_stake
-                cumulative_probability += probability
+    def select_validator(self, block_height: int, previous_hash: str = "") -> Optional[str]:
+        """Selecciona validador usando algoritmo PoS
 
-                if random_value <= cumulative_probability:
+        La semilla se deriva del hash del bloque anterior, así que cualquier
+        nodo con la misma cabecera y el mismo conjunto de stakes obtiene el
+        mismo validador (ver ``verify_validator_selection``).
+        """
+        try:
+            stream = seed_stream(derive_seed(previous_hash, block_height))
+            while len(self.sampler):
+                validator_id = self.sampler.pick(next(stream))
+                if validator_id is None:
+                    return None
+                if self._is_selectable(validator_id):
                     logger.debug(f"🎯 Validador seleccionado: {validator_id}")
                     return validator_id
-
-            # Fallback: seleccionar el último
-            return list(active_validators.keys())[-1]
+                # Estado modificado fuera de la API: resincronizar y repetir
+                self._sync_sampler(validator_id)
+            return None
 
         except Exception as e:
             logger.error(f"❌ Error seleccionando validador: {e}")
             return None
 
+    def select_committee(self, block_height: int, previous_hash: str, size: int) -> List[str]:
+        """Selecciona un comité de validadores distintos ponderado por stake"""
+        for validator_id in list(self.sampler.slots):
+            if not self._is_selectable(validator_id):
+                self._sync_sampler(validator_id)
+        return self.sampler.committee(derive_seed(previous_hash, block_height, "committee"), size)
+
+    def verify_validator_selection(self, validator_id: str, block_height: int, previous_hash: str) -> bool:
+        """Verifica que un validador fue el elegido para la altura dada"""
+        return self.select_validator(block_height, previous_hash) == validator_id
+
+    def add_stake(self, validator_id: str, amount: float) -> bool:
+        """Aumenta el stake de un validador registrado"""
+        validator = self.validators.get(validator_id)
+        if validator is None or amount <= 0:
+            return False
+        validator.stake_amount += amount
+        self.total_stake += amount
+        self._sync_sampler(validator_id)
+        return True
+
+    def unstake_validator(self, validator_id: str) -> bool:
+        """Retira el stake de un validador"""
+        validator = self.validators.get(validator_id)
+        if validator is None or validator.status == StakeStatus.WITHDRAWN:
+            return False
+        self.total_stake -= validator.stake_amount
+        validator.status = StakeStatus.WITHDRAWN
+        self._sync_sampler(validator_id)
+        logger.info(f"📤 Stake retirado: {validator_id}")
+        return True
+
     def validate_block(self, validator_id: str, block: Block) -> bool:
         """Valida un bloque propuesto"""
         try:
@@ -539,19 +621,8 @@ class ProofOfStakeValidator:
     def _validate_block_hash(self, block: Block) -> bool:
         """Valida hash del bloque"""
         try:
-            # Recalcular hash
-            block_data = {
-                'index': block.index,
-                'previous_hash': block.previous_hash,
-                'merkle_root': block.merkle_root,
-                'timestamp': block.timestamp,
-                'validator': block.validator,
-                'nonce': block.nonce
-            }
-
-            calculated_hash = hashlib.sha256(
-                json.dumps(block_data, sort_keys=True).encode()
-            ).hexdigest()
+            # Recalcular hash (mismos campos de cabecera que verifican los clientes ligeros)
+            calculated_hash = BlockchainCore.calculate_header_hash(block.header())
 
             return calculated_hash == block.block_hash
 
@@ -570,22 +641,28 @@ class ProofOfStakeValidator:
         if validator_id in self.validators:
             validator = self.validators[validator_id]
             validator.penalties += slash_amount
+            previous_stake = validator.stake_amount
             validator.stake_amount = max(0, validator.stake_amount - slash_amount)
+            self.total_stake -= previous_stake - validator.stake_amount
 
             if validator.stake_amount < self.min_stake:
                 validator.status = StakeStatus.SLASHED
 
+            self._sync_sampler(validator_id)
+
             logger.warning(f"⚡ Validador penalizado {validator_id}: -{slash_amount}")
 
 
 class SmartContractEngine:
     """Motor de contratos inteligentes"""
 
-    def __init__(self):
+    def __init__(self, parallel_workers: int = 0):
         self.contracts: Dict[str, SmartContract] = {}
         self.contract_storage: Dict[str, Dict[str, Any]] = {}
         self.gas_price = 0.001  # Precio del gas
         self.max_gas_per_contract = 1000000
+        # Código compilado una vez por hash; estado transaccional sobre contract_storage
+        self.runtime = ContractRuntime(self.contract_storage, workers=parallel_workers)
 
     def deploy_contract(
         self,
@@ -603,6 +680,9 @@ class SmartContractEngine:
                 logger.error("❌ Código de contrato inválido")
                 return None
 
+            # Compilar (o reutilizar de la caché) el código restringido
+            deployed = self.runtime.deploy(contract_id, code, initial_balance)
+
             # Crear contrato
             contract = SmartContract(
                 contract_id=contract_id,
@@ -610,7 +690,7 @@ class SmartContractEngine:
                 version="1.0.0",
                 creator=creator,
                 code=code,
-                abi=self._generate_abi(code),
+                abi=deployed.compiled.abi,
                 state={},
                 balance=initial_balance,
                 gas_used=0,
@@ -621,7 +701,6 @@ class SmartContractEngine:
 
             # Almacenar contrato
             self.contracts[contract_id] = contract
-            self.contract_storage[contract_id] = {}
 
             logger.info(f"📜 Contrato desplegado: {name} ({contract_id[:8]}...)")
             return contract_id
@@ -633,49 +712,43 @@ class SmartContractEngine:
     def _validate_contract_code(self, code: str) -> bool:
         """Valida código del contrato"""
         try:
-            # Verificaciones básicas de seguridad
-            forbidden_imports = ['os', 'sys', 'subprocess', 'eval', 'exec']
-
-            for forbidden in forbidden_imports:
-                if forbidden in code:
-                    logger.warning(f"[WARN] Importación prohibida detectada: {forbidden}")
-                    return False
-
-            # Verificar que sea código Python válido
-            compile(code, '<contract>', 'exec')
-
+            validate_contract(code)
             return True
 
-        except SyntaxError as e:
-            logger.error(f"❌ Error de sintaxis en contrato: {e}")
-            return False
-        except Exception as e:
-            logger.error(f"❌ Error validando contrato: {e}")
+        except ContractError as e:
+            logger.warning(f"[WARN] Contrato rechazado: {e}")
             return False
 
     def _generate_abi(self, code: str) -> Dict[str, Any]:
         """Genera ABI (Application Binary Interface) del contrato"""
-        # Implementación simplificada - en producción sería más compleja
-        abi = {
-            "functions": [],
-            "events": [],
-            "constructor": {}
-        }
+        return self.runtime.cache.get(code).abi
+
+    def _check_call(self, contract_id: str) -> Optional[str]:
+        """Motivo por el que no se puede invocar el contrato, o None"""
+        contract = self.contracts.get(contract_id)
+        if contract is None:
+            return "Contract not found"
+        if contract.status != ContractStatus.ACTIVE and contract.status != ContractStatus.DEPLOYED:
+            return "Contract not active"
+        return None
 
-        # Analizar código para extraer funciones públicas
-        lines = code.split('\n')
-        for line in lines:
-            line = line.strip()
-            if line.startswith('def ') and not line.startswith('def _'):
-                func_name = line.split('(')[0].replace('def ', '')
-                abi["functions"].append({
-                    "name": func_name,
-                    "type": "function",
-                    "inputs": [],
-                    "outputs": []
-                })
-
-        return abi
+    def _apply_result(self, result: ExecutionResult) -> Dict[str, Any]:
+        """Contabiliza el gas consumido y da formato al resultado"""
+        contract = self.contracts[result.contract_id]
+        contract.gas_used += result.gas_used
+        contract.updated_at = time.time()
+
+        if not result.success:
+            logger.debug(f"↩️ Contrato revertido: {result.function_name} ({result.error})")
+            return {"error": result.error, "gas_used": result.gas_used}
+
+        logger.debug(f"⚙️ Contrato ejecutado: {result.function_name} en {result.contract_id[:8]}...")
+        return {
+            "success": True,
+            "result": result.result,
+            "gas_used": result.gas_used,
+            "new_state": contract.state
+        }
 
     def execute_contract(
         self,
@@ -687,104 +760,41 @@ class SmartContractEngine:
     ) -> Dict[str, Any]:
         """Ejecuta función de contrato inteligente"""
         try:
-            if contract_id not in self.contracts:
-                return {"error": "Contract not found"}
-
-            contract = self.contracts[contract_id]
+            error = self._check_call(contract_id)
+            if error:
+                return {"error": error}
 
-            if contract.status != ContractStatus.ACTIVE and contract.status != ContractStatus.DEPLOYED:
-                return {"error": "Contract not active"}
-
-            # Verificar gas disponible
-            gas_cost = self._estimate_gas_cost(function_name, parameters)
-            if gas_cost > gas_limit:
-                return {"error": "Gas limit exceeded"}
-
-            # Crear contexto de ejecución
-            execution_context = {
-                'contract_id': contract_id,
-                'caller': caller,
-                'block_timestamp': time.time(),
-                'gas_remaining': gas_limit,
-                'storage': self.contract_storage[contract_id],
-                'balance': contract.balance
-            }
-
-            # Ejecutar función
-            result = self._execute_contract_function(
-                contract, function_name, parameters, execution_context
-            )
-
-            # Actualizar estado del contrato
-            contract.gas_used += gas_cost
-            contract.updated_at = time.time()
-
-            # Actualizar storage si cambió
-            self.contract_storage[contract_id] = execution_context['storage']
-
-            logger.debug(f"⚙️ Contrato ejecutado: {function_name} en {contract_id[:8]}...")
-
-            return {
-                "success": True,
-                "result": result,
-                "gas_used": gas_cost,
-                "new_state": contract.state
-            }
+            # El gas se mide durante la ejecución; una reversión deja el storage intacto
+            call = ContractCall(contract_id, function_name, parameters, caller,
+                                min(gas_limit, self.max_gas_per_contract))
+            return self._apply_result(self.runtime.execute(call))
 
         except Exception as e:
             logger.error(f"❌ Error ejecutando contrato: {e}")
             return {"error": str(e)}
 
-    def _estimate_gas_cost(self, function_name: str, parameters: Dict[str, Any]) -> int:
-        """Estima costo de gas para ejecución"""
-        base_cost = 1000
-        param_cost = len(str(parameters)) * 10
-        return base_cost + param_cost
-
-    def _execute_contract_function(
+    def execute_block(
         self,
-        contract: SmartContract,
-        function_name: str,
-        parameters: Dict[str, Any],
-        context: Dict[str, Any],
-    ) -> Any:
-        """Ejecuta función específica del contrato"""
-        try:
-            # Crear namespace seguro para ejecución
-            safe_globals = {
-                '__builtins__': {
-                    'len': len,
-                    'str': str,
-                    'int': int,
-                    'float': float,
-                    'bool': bool,
-                    'list': list,
-                    'dict': dict,
-                    'max': max,
-                    'min': min,
-                    'sum': sum,
-                    'abs': abs,
-                    'round': round
-                },
-                'context': context,
-                'storage': context['storage'],
-                'caller': context['caller'],
-                'timestamp': context['block_timestamp']
-            }
-
-            # Ejecutar código del contrato
-            exec(contract.code, safe_globals)
-
-            # Llamar función específica
-            if function_name in safe_globals:
-                function = safe_globals[function_name]
-                return function(**parameters)
-            else:
-                raise ValueError(f"Function {function_name} not found")
+        calls: List[ContractCall],
+        timestamp: Optional[float] = None,
+        parallel: bool = False,
+    ) -> List[Dict[str, Any]]:
+        """Ejecuta las llamadas a contratos de un bloque, en orden o con especulación paralela"""
+        results: List[Optional[Dict[str, Any]]] = []
+        runnable = []
+        for call in calls:
+            error = self._check_call(call.contract_id)
+            results.append({"error": error} if error else None)
+            if not error:
+                runnable.append(ContractCall(call.contract_id, call.function_name, call.parameters,
+                                             call.caller, min(call.gas_limit, self.max_gas_per_contract)))
+
+        executed = iter(self.runtime.execute_block(runnable, timestamp, parallel))
+        return [result or self._apply_result(next(executed)) for result in results]
 
-        except Exception as e:
-            logger.error(f"❌ Error en ejecución de contrato: {e}")
-            raise
+    def _estimate_gas_cost(self, function_name: str, parameters: Dict[str, Any]) -> int:
+        """Gas intrínseco de una llamada (el de ejecución se mide aparte)"""
+        return self.runtime.schedule.intrinsic_gas(parameters)
 
     def get_contract_state(self, contract_id: str) -> Optional[Dict[str, Any]]:
         """Obtiene estado actual del contrato"""
@@ -898,13 +908,13 @@ class BlockchainCore:
                 public_key="genesis_public_key"
             )
 
-            merkle_root = self.crypto_manager.create_merkle_tree([genesis_transaction])
+            merkle_tree = self.crypto_manager.build_merkle_tree([genesis_transaction])
 
             genesis_block = Block(
                 block_id="genesis_block",
                 index=0,
                 previous_hash="0" * 64,
-                merkle_root=merkle_root,
+                merkle_root=merkle_tree.root_hex(),
                 timestamp=time.time(),
                 transactions=[genesis_transaction],
                 validator=genesis_validator,
@@ -913,7 +923,8 @@ class BlockchainCore:
                 difficulty=0,
                 block_hash="",
                 status=BlockStatus.CONFIRMED,
-                confirmations=1
+                confirmations=1,
+                merkle_proofs=self._build_merkle_proofs([genesis_transaction], merkle_tree)
             )
 
             # Calcular hash del bloque
@@ -993,7 +1004,7 @@ class BlockchainCore:
                 return None
 
             # Seleccionar validador
-            validator_id = self.pos_validator.select_validator(len(self.chain))
+            validator_id = self.pos_validator.select_validator(len(self.chain), self.chain[-1].block_hash)
             if not validator_id:
                 logger.warning("[WARN] No hay validadores disponibles")
                 return None
@@ -1005,15 +1016,15 @@ class BlockchainCore:
                 logger.debug("📭 No hay transacciones para minar")
                 return None
 
-            # Crear nuevo bloque
+            # Crear nuevo bloque (árbol de Merkle incremental, O(log n) por transacción)
             previous_block = self.chain[-1]
-            merkle_root = self.crypto_manager.create_merkle_tree(transactions)
+            merkle_tree = self.crypto_manager.build_merkle_tree(transactions)
 
             new_block = Block(
                 block_id=hashlib.sha256(f"{len(self.chain)}{time.time()}".encode()).hexdigest(),
                 index=len(self.chain),
                 previous_hash=previous_block.block_hash,
-                merkle_root=merkle_root,
+                merkle_root=merkle_tree.root_hex(),
                 timestamp=time.time(),
                 transactions=transactions,
                 validator=validator_id,
@@ -1022,7 +1033,8 @@ class BlockchainCore:
                 difficulty=self.current_difficulty,
                 block_hash="",
                 status=BlockStatus.MINING,
-                confirmations=0
+                confirmations=0,
+                merkle_proofs=self._build_merkle_proofs(transactions, merkle_tree)
             )
 
             # Calcular hash del bloque
@@ -1054,17 +1066,77 @@ class BlockchainCore:
 
     def _calculate_block_hash(self, block: Block) -> str:
         """Calcula hash del bloque"""
+        return self.calculate_header_hash(block.header())
+
+    @staticmethod
+    def calculate_header_hash(header: Dict[str, Any]) -> str:
+        """Calcula hash de bloque a partir de su cabecera"""
         block_data = {
-            'index': block.index,
-            'previous_hash': block.previous_hash,
-            'merkle_root': block.merkle_root,
-            'timestamp': block.timestamp,
-            'validator': block.validator,
-            'nonce': block.nonce
+            'index': header['index'],
+            'previous_hash': header['previous_hash'],
+            'merkle_root': header['merkle_root'],
+            'timestamp': header['timestamp'],
+            'validator': header['validator'],
+            'nonce': header['nonce'],
+            # Las pruebas de inclusión se verifican contra tx_count: debe ir firmado
+            'tx_count': header['tx_count']
         }
 
         return hashlib.sha256(json.dumps(block_data, sort_keys=True).encode()).hexdigest()
 
+    def _build_merkle_proofs(self, transactions: List[Transaction],
+                             merkle_tree: IncrementalMerkleTree) -> Dict[str, List[str]]:
+        """Rutas de auditoría de todas las transacciones del bloque"""
+        return {
+            tx.tx_id: [node.hex() for node in merkle_tree.inclusion_proof(index)]
+            for index, tx in enumerate(transactions)
+        }
+
+    def get_block_headers(self, start: int = 0, end: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Cabeceras de bloques para sincronización ligera"""
+        return [block.header() for block in self.chain[start:end]]
+
+    def get_transaction_proof(self, tx_id: str) -> Optional[Dict[str, Any]]:
+        """Prueba de inclusión de una transacción junto con la cabecera de su bloque"""
+        for block in reversed(self.chain):
+            path = block.merkle_proofs.get(tx_id)
+            if path is None:
+                continue
+            index = next(i for i, tx in enumerate(block.transactions) if tx.tx_id == tx_id)
+            return {
+                'header': block.header(),
+                'index': index,
+                'path': path
+            }
+        return None
+
+    def get_transactions_multi_proof(self, block_index: int, tx_ids: List[str]) -> Optional[Dict[str, Any]]:
+        """Multi-prueba de varias transacciones de un mismo bloque"""
+        if not 0 <= block_index < len(self.chain):
+            return None
+        block = self.chain[block_index]
+        positions = {tx.tx_id: i for i, tx in enumerate(block.transactions)}
+        if any(tx_id not in positions for tx_id in tx_ids):
+            return None
+        merkle_tree = self.crypto_manager.build_merkle_tree(block.transactions)
+        indices = [positions[tx_id] for tx_id in tx_ids]
+        return {
+            'header': block.header(),
+            'indices': indices,
+            'proof': [node.hex() for node in merkle_tree.multi_proof(indices)]
+        }
+
+    def verify_header_chain(self, headers: List[Dict[str, Any]]) -> bool:
+        """Verifica hashes y enlaces de una secuencia de cabeceras"""
+        previous_hash = None
+        for header in headers:
+            if self.calculate_header_hash(header) != header['block_hash']:
+                return False
+            if previous_hash is not None and header['previous_hash'] != previous_hash:
+                return False
+            previous_hash = header['block_hash']
+        return True
+
     def _calculate_block_reward(self, block: Block) -> float:
         """Calcula recompensa por bloque"""
         base_reward = 10.0
@@ -0,0 +1,531 @@
+"""
+Chunk Store Module for AEGIS
+
+This module provides the deduplicating storage behind backup_system:
+- Content-defined chunking with a windowed gear hash (vectorized with numpy),
+  so an edit or insertion only changes the chunks around it
+- Content-addressed chunks (BLAKE2b, keyed when encryption is enabled)
+  stored once and reference counted in a SQLite index
+- Per-snapshot JSON manifests; files whose size and mtime match the previous
+  snapshot reuse its chunk list without being read
+- zlib compression and AES-GCM encryption of new chunks in worker processes
+- Streaming restore with per-chunk verification
+- Pruning by reference counting
+- A benchmark of a second backup after changing 1% of the data
+"""
+
+import bisect
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Try to import AES-GCM for chunk encryption
+try:
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+    AESGCM_AVAILABLE = True
+except ImportError:
+    AESGCM_AVAILABLE = False
+    AESGCM = None
+
+FLAG_COMPRESSED = 1
+FLAG_ENCRYPTED = 2
+NONCE_SIZE = 12
+_MIX = np.uint32(0x9E3779B1)
+
+
+def derive_key(secret: bytes, purpose: bytes) -> bytes:
+    """32-byte subkey of a configured secret (e.g. a Fernet key) for one purpose"""
+    return hashlib.blake2b(secret, digest_size=32, person=purpose[:16]).digest()
+
+
+class ContentChunker:
+    """Content-defined chunking with a windowed gear hash
+
+    The hash at byte i is the sum of random 32-bit gear values of the last
+    `window` bytes, mixed by an odd multiplier; a chunk ends where its top
+    bits are zero, once the chunk has reached `min_size`, or at `max_size`.
+    Because `window` < `min_size`, every cut only depends on bytes after the
+    previous cut, so chunk boundaries resynchronise right after an edit.
+    """
+
+    def __init__(self, min_size: int = 16 * 1024, avg_size: int = 64 * 1024,
+                 max_size: int = 256 * 1024, window: int = 48, seed: int = 0x5AE615):
+        if not window < min_size < avg_size < max_size:
+            raise ValueError("Chunk sizes need window < min_size < avg_size < max_size")
+        self.min_size = min_size
+        self.avg_size = avg_size
+        self.max_size = max_size
+        self.window = window
+        # Past min_size each byte ends a chunk with probability 2**-bits, with bits =
+        # floor(log2(avg_size - min_size)), so chunks average a little under avg_size
+        bits = max(1, (avg_size - min_size).bit_length() - 1)
+        self._shift = np.uint32(32 - bits)
+        self._gear = np.random.default_rng(seed).integers(0, 2 ** 32, size=256, dtype=np.uint32)
+
+    def cut_points(self, data: bytes, final: bool = True) -> List[int]:
+        """Chunk end offsets in `data` (which starts at a chunk boundary)
+
+        With final=False the trailing partial chunk is left out, to be
+        completed with the next block of the stream.
+        """
+        size = len(data)
+        if not size:
+            return []
+        gear = self._gear[np.frombuffer(data, dtype=np.uint8)]
+        # Wrapping 32-bit prefix sums; numpy buffers the overlapping in-place subtraction
+        rolling = np.cumsum(gear, dtype=np.uint32)
+        rolling[self.window:] -= rolling[:-self.window]
+        candidates = (np.flatnonzero((rolling * _MIX) >> self._shift == 0) + 1).tolist()
+
+        cuts, last = [], 0
+        while True:
+            low, high = last + self.min_size, last + self.max_size
+            k = bisect.bisect_left(candidates, low)
+            if k < len(candidates) and candidates[k] <= high:
+                end = candidates[k]
+            elif high <= size:
+                end = high
+            else:
+                break
+            cuts.append(end)
+            last = end
+        if final and last < size:
+            cuts.append(size)
+        return cuts
+
+    def split(self, stream: BinaryIO, block_size: int = 4 * 1024 * 1024) -> Iterator[bytes]:
+        """Chunks of a binary stream, read `block_size` bytes at a time"""
+        buffer = b""
+        while True:
+            block = stream.read(block_size)
+            final = not block
+            if block:
+                buffer = buffer + block if buffer else block
+            start = 0
+            for end in self.cut_points(buffer, final):
+                yield buffer[start:end]
+                start = end
+            buffer = buffer[start:]
+            if final:
+                return
+
+
+def pack_chunk(chunk_id: str, data: bytes, key: Optional[bytes], level: int = 6) -> bytes:
+    """Compress (when it helps) and encrypt a chunk; the id is bound as associated data"""
+    flags, payload = 0, data
+    if level:
+        compressed = zlib.compress(data, level)
+        if len(compressed) < len(data):
+            flags, payload = FLAG_COMPRESSED, compressed
+    if key is not None:
+        nonce = os.urandom(NONCE_SIZE)
+        payload = nonce + AESGCM(key).encrypt(nonce, payload, chunk_id.encode())
+        flags |= FLAG_ENCRYPTED
+    return bytes((flags,)) + payload
+
+
+def unpack_chunk(chunk_id: str, blob: bytes, key: Optional[bytes]) -> bytes:
+    flags, payload = blob[0], blob[1:]
+    if flags & FLAG_ENCRYPTED:
+        if key is None:
+            raise ValueError(f"Chunk {chunk_id} is encrypted and no key was given")
+        payload = AESGCM(key).decrypt(payload[:NONCE_SIZE], payload[NONCE_SIZE:], chunk_id.encode())
+    if flags & FLAG_COMPRESSED:
+        payload = zlib.decompress(payload)
+    return payload
+
+
+_WORKER: Dict[str, Any] = {}
+
+
+def _init_worker(key: Optional[bytes], level: int):
+    _WORKER["key"] = key
+    _WORKER["level"] = level
+
+
+def _pack_in_worker(chunk_id: str, data: bytes) -> Tuple[str, int, bytes]:
+    return chunk_id, len(data), pack_chunk(chunk_id, data, _WORKER["key"], _WORKER["level"])
+
+
+class ChunkStore:
+    """Content-addressed, reference-counted chunk repository with snapshot manifests
+
+    Layout under `root`:
+        index.sqlite          chunk id -> size, stored size, reference count
+        chunks/ab/abcd...     packed chunk blobs
+        snapshots/<id>.json   manifests (file metadata and chunk lists)
+    """
+
+    def __init__(self, root: str, key: Optional[bytes] = None, chunker: Optional[ContentChunker] = None,
+                 workers: Optional[int] = None, compression_level: int = 6):
+        if key is not None and not AESGCM_AVAILABLE:
+            raise RuntimeError("Chunk encryption requires the cryptography package")
+        self.root = root
+        self.key = derive_key(key, b"aegis-chunk-enc") if key is not None else None
+        self._id_key = derive_key(key, b"aegis-chunk-id") if key is not None else b""
+        self.chunker = chunker or ContentChunker()
+        self.workers = workers if workers is not None else min(4, os.cpu_count() or 1)
+        self.compression_level = compression_level
+        self.chunk_dir = os.path.join(root, "chunks")
+        self.snapshot_dir = os.path.join(root, "snapshots")
+        os.makedirs(self.chunk_dir, exist_ok=True)
+        os.makedirs(self.snapshot_dir, exist_ok=True)
+        # Callers may hand the store to a worker thread; it is used by one thread at a time
+        self.db = sqlite3.connect(os.path.join(root, "index.sqlite"), check_same_thread=False)
+        self.db.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, size INTEGER, "
+                        "stored INTEGER, refs INTEGER NOT NULL DEFAULT 0)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)")
+        self._check_key()
+        self.db.commit()
+
+    def _check_key(self):
+        # Chunk ids depend on the key, so a store must always be used with the same one
+        fingerprint = hashlib.blake2b(self._id_key + b"fingerprint", digest_size=8).hexdigest()
+        row = self.db.execute("SELECT value FROM meta WHERE name = 'key'").fetchone()
+        if row is None:
+            self.db.execute("INSERT INTO meta VALUES ('key', ?)", (fingerprint,))
+        elif row[0] != fingerprint:
+            raise ValueError(f"Encryption key does not match the chunk store at {self.root}")
+
+    def close(self):
+        self.db.close()
+
+    def chunk_id(self, data: bytes) -> str:
+        return hashlib.blake2b(data, digest_size=32, key=self._id_key).hexdigest()
+
+    def _chunk_path(self, chunk_id: str) -> str:
+        return os.path.join(self.chunk_dir, chunk_id[:2], chunk_id)
+
+    def _has_chunk(self, chunk_id: str) -> bool:
+        return self.db.execute("SELECT 1 FROM chunks WHERE id = ?", (chunk_id,)).fetchone() is not None
+
+    def _write_blob(self, chunk_id: str, size: int, blob: bytes) -> int:
+        path = self._chunk_path(chunk_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.tmp{os.getpid()}"
+        with open(temporary, "wb") as handle:
+            handle.write(blob)
+        os.replace(temporary, path)
+        self.db.execute("INSERT OR IGNORE INTO chunks (id, size, stored, refs) VALUES (?, ?, ?, 0)",
+                        (chunk_id, size, len(blob)))
+        return len(blob)
+
+    # Snapshots
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        """Manifest headers (without file lists), oldest first"""
+        headers = []
+        for name in os.listdir(self.snapshot_dir):
+            if name.endswith(".json"):
+                manifest = self.load_manifest(name[:-5])
+                manifest.pop("files", None)
+                headers.append(manifest)
+        return sorted(headers, key=lambda manifest: (manifest["created"], manifest["id"]))
+
+    def load_manifest(self, snapshot_id: str) -> Dict[str, Any]:
+        with open(os.path.join(self.snapshot_dir, f"{snapshot_id}.json"), encoding="utf-8") as handle:
+            return json.load(handle)
+
+    def latest_manifest(self) -> Optional[Dict[str, Any]]:
+        snapshots = self.snapshots()
+        return self.load_manifest(snapshots[-1]["id"]) if snapshots else None
+
+    def create_snapshot(self, sources: Sequence[str], snapshot_id: Optional[str] = None) -> Dict[str, Any]:
+        """Back up the source files and directories; returns the manifest header with statistics"""
+        started = time.perf_counter()
+        previous = self.latest_manifest()
+        previous_files = previous["files"] if previous else {}
+        snapshot_id = snapshot_id or f"snapshot_{time.time_ns()}"
+        stats = {"files": 0, "files_unchanged": 0, "logical_bytes": 0, "bytes_read": 0,
+                 "new_chunks": 0, "reused_chunks": 0, "bytes_written": 0}
+        files: Dict[str, Dict[str, Any]] = {}
+        pending: set = set()
+        in_flight: deque = deque()
+        pool = None
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(self.workers, initializer=_init_worker,
+                                       initargs=(self.key, self.compression_level))
+
+        def drain(limit: int):
+            while len(in_flight) > limit:
+                chunk_id, size, blob = in_flight.popleft().result()
+                stats["bytes_written"] += self._write_blob(chunk_id, size, blob)
+                pending.discard(chunk_id)
+
+        try:
+            for path, name in self._walk(sources):
+                info = os.stat(path)
+                entry = {"size": info.st_size, "mtime_ns": info.st_mtime_ns, "mode": info.st_mode & 0o7777}
+                stats["files"] += 1
+                stats["logical_bytes"] += info.st_size
+                old = previous_files.get(name)
+                if old and old["size"] == entry["size"] and old["mtime_ns"] == entry["mtime_ns"]:
+                    # Unchanged by size and mtime: reuse the chunk list without reading
+                    entry["chunks"] = old["chunks"]
+                    stats["files_unchanged"] += 1
+                    stats["reused_chunks"] += len(old["chunks"])
+                    files[name] = entry
+                    continue
+                chunks = []
+                with open(path, "rb") as handle:
+                    for data in self.chunker.split(handle):
+                        stats["bytes_read"] += len(data)
+                        chunk_id = self.chunk_id(data)
+                        chunks.append(chunk_id)
+                        if chunk_id in pending or self._has_chunk(chunk_id):
+                            stats["reused_chunks"] += 1
+                            continue
+                        stats["new_chunks"] += 1
+                        pending.add(chunk_id)
+                        if pool is None:
+                            blob = pack_chunk(chunk_id, data, self.key, self.compression_level)
+                            stats["bytes_written"] += self._write_blob(chunk_id, len(data), blob)
+                            pending.discard(chunk_id)
+                        else:
+                            in_flight.append(pool.submit(_pack_in_worker, chunk_id, data))
+                            drain(self.workers * 4)
+                entry["chunks"] = chunks
+                files[name] = entry
+            drain(0)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        manifest = {"id": snapshot_id, "created": time.time(), "sources": list(sources), "files": files}
+        encoded = json.dumps(manifest, separators=(",", ":")).encode("utf-8")
+        stats["bytes_written"] += len(encoded)
+        stats["duration"] = time.perf_counter() - started
+        manifest["stats"] = stats
+        encoded = json.dumps(manifest, separators=(",", ":")).encode("utf-8")
+        # Reference counts are taken before the manifest becomes visible
+        references = self._distinct_chunks(files)
+        self.db.executemany("UPDATE chunks SET refs = refs + 1 WHERE id = ?", ((c,) for c in references))
+        self.db.commit()
+        temporary = os.path.join(self.snapshot_dir, f".{snapshot_id}.tmp")
+        with open(temporary, "wb") as handle:
+            handle.write(encoded)
+        os.replace(temporary, os.path.join(self.snapshot_dir, f"{snapshot_id}.json"))
+        header = dict(manifest)
+        header.pop("files")
+        return header
+
+    @staticmethod
+    def _distinct_chunks(files: Dict[str, Dict[str, Any]]) -> set:
+        return {chunk_id for entry in files.values() for chunk_id in entry["chunks"]}
+
+    @staticmethod
+    def _walk(sources: Sequence[str]) -> Iterator[Tuple[str, str]]:
+        """(filesystem path, manifest name) for every regular file, in a stable order"""
+        for source in sources:
+            if os.path.isfile(source):
+                yield source, source.replace(os.sep, "/")
+                continue
+            for root, dirs, names in os.walk(source):
+                dirs.sort()
+                for name in sorted(names):
+                    path = os.path.join(root, name)
+                    if os.path.isfile(path) and not os.path.islink(path):
+                        relative = os.path.relpath(path, source)
+                        yield path, f"{source.rstrip(os.sep)}/{relative}".replace(os.sep, "/")
+
+    # Restore
+
+    def read_chunk(self, chunk_id: str) -> bytes:
+        with open(self._chunk_path(chunk_id), "rb") as handle:
+            data = unpack_chunk(chunk_id, handle.read(), self.key)
+        if self.chunk_id(data) != chunk_id:
+            raise ValueError(f"Chunk {chunk_id} failed verification")
+        return data
+
+    def iter_file(self, entry: Dict[str, Any]) -> Iterator[bytes]:
+        """Stream a file's contents chunk by chunk"""
+        for chunk_id in entry["chunks"]:
+            yield self.read_chunk(chunk_id)
+
+    def restore(self, snapshot_id: str, target: str, paths: Optional[Iterable[str]] = None) -> Dict[str, int]:
+        """Write a snapshot (or some of its files) under `target`, streaming one chunk at a time"""
+        manifest = self.load_manifest(snapshot_id)
+        names = list(paths) if paths is not None else list(manifest["files"])
+        restored = {"files": 0, "bytes": 0}
+        # Resolve every destination first: a manifest entry such as "../x" (or a
+        # symlink already under target) must not write outside it
+        root = os.path.realpath(target)
+        destinations = {}
+        for name in names:
+            relative = os.path.splitdrive(name)[1].lstrip("/\\")
+            destination = os.path.realpath(os.path.join(root, *relative.split("/")))
+            if destination == root or os.path.commonpath([root, destination]) != root:
+                raise ValueError(f"Snapshot path {name!r} escapes the restore target")
+            destinations[name] = destination
+        for name, destination in destinations.items():
+            entry = manifest["files"][name]
+            os.makedirs(os.path.dirname(destination) or ".", exist_ok=True)
+            with open(destination, "wb") as handle:
+                for data in self.iter_file(entry):
+                    handle.write(data)
+                    restored["bytes"] += len(data)
+            os.chmod(destination, entry["mode"])
+            os.utime(destination, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+            restored["files"] += 1
+        return restored
+
+    # Pruning
+
+    def delete_snapshot(self, snapshot_id: str, collect: bool = True) -> int:
+        """Drop a snapshot's references; returns the number of chunks freed"""
+        manifest = self.load_manifest(snapshot_id)
+        os.remove(os.path.join(self.snapshot_dir, f"{snapshot_id}.json"))
+        references = self._distinct_chunks(manifest["files"])
+        self.db.executemany("UPDATE chunks SET refs = refs - 1 WHERE id = ?", ((c,) for c in references))
+        self.db.commit()
+        return self.collect_garbage() if collect else 0
+
+    def collect_garbage(self) -> int:
+        """Delete chunks no snapshot references (including leftovers of interrupted backups)"""
+        unreferenced = [row[0] for row in self.db.execute("SELECT id FROM chunks WHERE refs <= 0")]
+        for chunk_id in unreferenced:
+            try:
+                os.remove(self._chunk_path(chunk_id))
+            except FileNotFoundError:
+                pass
+        self.db.executemany("DELETE FROM chunks WHERE id = ?", ((c,) for c in unreferenced))
+        self.db.commit()
+        return len(unreferenced)
+
+    def prune(self, older_than: float, keep_last: int = 1) -> List[str]:
+        """Delete snapshots created before `older_than` (epoch seconds), always keeping the newest"""
+        snapshots = self.snapshots()
+        candidates = snapshots[:-keep_last] if keep_last else snapshots
+        removed = [s["id"] for s in candidates if s["created"] < older_than]
+        for snapshot_id in removed:
+            self.delete_snapshot(snapshot_id, collect=False)
+        if removed:
+            self.collect_garbage()
+        return removed
+
+    def usage(self) -> Dict[str, int]:
+        chunks, logical, stored = self.db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(stored), 0) FROM chunks").fetchone()
+        return {"chunks": chunks, "unique_bytes": logical, "stored_bytes": stored,
+                "snapshots": len(os.listdir(self.snapshot_dir))}
+
+
+def _make_dataset(root: str, files: int, file_size: int, seed: int) -> List[str]:
+    """Semi-compressible files: random words from a small vocabulary plus random runs"""
+    rng = np.random.default_rng(seed)
+    vocabulary = [bytes(rng.integers(97, 123, size=rng.integers(3, 10), dtype=np.uint8)) for _ in range(2000)]
+    paths = []
+    for i in range(files):
+        path = os.path.join(root, f"dir{i % 8}", f"file{i:04d}.dat")
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        words = b" ".join(vocabulary[j] for j in rng.integers(0, len(vocabulary), size=file_size // 6))
+        noise = rng.integers(0, 256, size=file_size // 4, dtype=np.uint8).tobytes()
+        with open(path, "wb") as handle:
+            handle.write((words[:file_size * 3 // 4] + noise)[:file_size])
+        paths.append(path)
+    return paths
+
+
+def _change_one_percent(paths: List[str], seed: int) -> int:
+    """Edit ~1% of the dataset's bytes: overwrite or insert small regions in 1 of every 25 files"""
+    rng = np.random.default_rng(seed)
+    changed = 0
+    for n, path in enumerate(paths[::25]):
+        with open(path, "rb") as handle:
+            data = handle.read()
+        offset = int(rng.integers(0, len(data) - 8192))
+        patch = rng.integers(0, 256, size=len(data) // 4, dtype=np.uint8).tobytes()
+        if n % 2:
+            data = data[:offset] + patch + data[offset:]  # insertion shifts everything after it
+        else:
+            data = data[:offset] + patch + data[offset + len(patch):]
+        changed += len(patch)
+        with open(path, "wb") as handle:
+            handle.write(data)
+        # Make sure the mtime moves even on coarse filesystem clocks
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    return changed
+
+
+def _tree_bytes(root: str) -> int:
+    return sum(os.path.getsize(os.path.join(r, f)) for r, _, names in os.walk(root) for f in names)
+
+
+def benchmark_backups(files: int = 200, file_size: int = 256 * 1024, workers: int = 2,
+                      encrypt: bool = True, seed: int = 0) -> List[Dict[str, Any]]:
+    """
+    First and second backup of a synthetic dataset, the second after ~1% of
+    its bytes changed, with full-copy backups (the previous BackupManager
+    behaviour) and with the chunk store.
+    """
+    results = []
+    with tempfile.TemporaryDirectory() as workspace:
+        source = os.path.join(workspace, "data")
+        paths = _make_dataset(source, files, file_size, seed)
+        dataset_bytes = _tree_bytes(source)
+        key = os.urandom(32) if encrypt and AESGCM_AVAILABLE else None
+        store = ChunkStore(os.path.join(workspace, "store"), key=key, workers=workers)
+        copies = os.path.join(workspace, "copies")
+
+        runs = []
+        for run in ("first", "second"):
+            if run == "second":
+                changed = _change_one_percent(paths, seed + 1)
+            started = time.perf_counter()
+            shutil.copytree(source, os.path.join(copies, run))
+            copy_seconds = time.perf_counter() - started
+            header = store.create_snapshot([source])
+            runs.append((run, copy_seconds, header))
+
+        for run, copy_seconds, header in runs:
+            stats = header["stats"]
+            results.append({
+                "run": run,
+                "full_copy_seconds": copy_seconds,
+                "full_copy_bytes": dataset_bytes if run == "first" else _tree_bytes(os.path.join(copies, run)),
+                "chunk_store_seconds": stats["duration"],
+                "chunk_store_bytes": stats["bytes_written"],
+                "bytes_read": stats["bytes_read"],
+                "files_unchanged": stats["files_unchanged"],
+                "new_chunks": stats["new_chunks"],
+            })
+        results[-1]["changed_bytes"] = changed
+
+        # Restore the second snapshot and check it byte for byte
+        restored = os.path.join(workspace, "restored")
+        snapshot_id = runs[-1][2]["id"]
+        started = time.perf_counter()
+        store.restore(snapshot_id, restored)
+        restore_seconds = time.perf_counter() - started
+        identical = all(
+            open(path, "rb").read() == open(os.path.join(restored, *os.path.splitdrive(path)[1]
+                                                         .lstrip("/\\").split(os.sep)), "rb").read()
+            for path in paths)
+        results.append({"run": "restore", "seconds": restore_seconds, "identical": identical,
+                        **store.usage()})
+        store.close()
+    return results
+
+
+if __name__ == "__main__":
+    rows = benchmark_backups()
+    for row in rows[:2]:
+        print(f"{row['run']:>6} backup: full copy {row['full_copy_seconds']:6.2f} s "
+              f"{row['full_copy_bytes'] / 2 ** 20:7.1f} MB | chunk store {row['chunk_store_seconds']:6.2f} s "
+              f"{row['chunk_store_bytes'] / 2 ** 20:7.2f} MB written, {row['bytes_read'] / 2 ** 20:6.1f} MB read, "
+              f"{row['files_unchanged']} files skipped, {row['new_chunks']} new chunks")
+    print(f"Changed bytes in the second run: {rows[1]['changed_bytes'] / 2 ** 20:.2f} MB")
+    restore = rows[2]
+    print(f"Restore: {restore['seconds']:.2f} s, identical={restore['identical']}, "
+          f"{restore['chunks']} chunks, {restore['stored_bytes'] / 2 ** 20:.1f} MB stored")
@@ -6,7 +6,9 @@ enhances the basic configuration in main.py with advanced features including:
 - Dynamic configuration loading and reloading
 - Configuration validation and schema enforcement
 - Environment variable override support
-- Configuration file watching and auto-reload
+- Configuration file watching (inotify, polling fallback) and debounced auto-reload
+- Immutable versioned snapshots, compiled key-path accessors and subtree
+  change subscriptions (see config_runtime)
 - Secure configuration storage with encryption
 - Multi-environment configuration support
 - Configuration versioning and migration
@@ -16,7 +18,8 @@ import json
 import os
 import yaml
 import asyncio
-from typing import Dict, Any, Optional, Union
+from collections.abc import Mapping
+from typing import Dict, Any, Callable, Iterable, Optional, Union
 from pathlib import Path
 from dataclasses import dataclass, field
 from enum import Enum
@@ -27,6 +30,8 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import logging
 
+from config_runtime import ConfigAccessor, ConfigFileWatcher, ConfigRuntime, ConfigSnapshot, Subscription, thaw
+
 # Try to import loguru, fallback to standard logging
 try:
     from loguru import logger
@@ -58,7 +63,9 @@ class ConfigManagerConfig:
     enable_encryption: bool = False
     encryption_key: Optional[str] = None
     auto_reload: bool = True
-    reload_interval: int = 30  # seconds
+    reload_interval: int = 30  # seconds, polling fallback only
+    reload_debounce: float = 0.05  # seconds of quiet before a change is reloaded
+    use_inotify: bool = True
     environment_prefix: str = "AEGIS_"
     enable_validation: bool = True
     config_schema: Optional[ConfigSchema] = None
@@ -76,8 +83,10 @@ class ConfigManager:
     
     def __init__(self, config: Optional[ConfigManagerConfig] = None):
         self.config = config or ConfigManagerConfig()
-        self.current_config: Dict[str, Any] = {}
-        self.config_watchers: Dict[str, asyncio.Task] = {}
+        self.runtime = ConfigRuntime()
+        self.watcher: Optional[ConfigFileWatcher] = None
+        self.file_digests: Dict[str, str] = {}
+        self.overrides: Dict[str, Any] = {}  # set_value() layer, kept across reloads
         self.encryption_key: Optional[bytes] = None
         self.cipher_suite: Optional[Fernet] = None
         
@@ -111,34 +120,84 @@ class ConfigManager:
         except Exception as e:
             raise ConfigEncryptionError(f"Failed to setup encryption: {e}")
     
+    @property
+    def current_config(self) -> Mapping:
+        """Current merged configuration (read-only)"""
+        return self.runtime.snapshot.data
+    
     def load_configuration(self) -> Dict[str, Any]:
         """Load configuration from files and environment variables"""
-        # Start with default configuration
-        self.current_config = self._get_default_config()
-        
-        # Load from configuration files
+        # Layers in merge order: defaults, files, environment, runtime overrides
+        layers = {"defaults": self._get_default_config()}
+        order = ["defaults"]
+        self.file_digests = {}
         for config_path in self.config.config_paths:
+            order.append(self._file_layer(config_path))
             if os.path.exists(config_path):
                 try:
-                    file_config = self._load_config_file(config_path)
-                    self.current_config = self._merge_configs(self.current_config, file_config)
+                    layers[self._file_layer(config_path)] = self._load_file_layer(config_path, force=True)
                     logger.info(f"Loaded configuration from {config_path}")
                 except Exception as e:
                     logger.warning(f"Failed to load configuration from {config_path}: {e}")
+        layers["env"] = self._load_from_environment()
+        layers["overrides"] = self.overrides
+        order += ["env", "overrides"]
         
-        # Override with environment variables
-        env_config = self._load_from_environment()
-        self.current_config = self._merge_configs(self.current_config, env_config)
-        
-        # Validate configuration if schema is provided
-        if self.config.enable_validation and self.config.config_schema:
-            self._validate_configuration()
+        # Validated before it is published
+        self.runtime.replace_layers(layers, order, validate=self._validate_configuration)
         
         # Start file watchers if auto-reload is enabled
         if self.config.auto_reload:
             self._start_config_watchers()
         
-        return self.current_config
+        return self.get_config()
+    
+    @staticmethod
+    def _file_layer(config_path: str) -> str:
+        return f"file:{os.path.abspath(config_path)}"
+    
+    def _load_file_layer(self, config_path: str, force: bool = False) -> Optional[Dict[str, Any]]:
+        """Parse a config file, or None if its content is unchanged since the last load"""
+        with open(config_path, 'rb') as f:
+            content = f.read()
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        key = os.path.abspath(config_path)
+        if not force and self.file_digests.get(key) == digest:
+            return None
+        file_config = self._parse_config(content.decode('utf-8'), config_path)
+        self.file_digests[key] = digest
+        return file_config
+    
+    def reload_files(self, paths: Iterable[str]) -> Optional[ConfigSnapshot]:
+        """Re-read the given config files (and the environment) and patch the snapshot
+        
+        Only files whose content changed are parsed, and only the key paths they
+        changed are re-merged. A file that fails to parse keeps its last good
+        content; a deleted file no longer contributes.
+        """
+        changed = {os.path.abspath(path) for path in paths}
+        updates: Dict[str, Any] = {}
+        for config_path in self.config.config_paths:
+            key = os.path.abspath(config_path)
+            if key not in changed:
+                continue
+            if not os.path.exists(config_path):
+                self.file_digests.pop(key, None)
+                updates[self._file_layer(config_path)] = {}
+                continue
+            try:
+                file_config = self._load_file_layer(config_path)
+            except Exception as e:
+                logger.warning(f"Failed to reload configuration from {config_path}: {e}")
+                continue
+            if file_config is not None:
+                updates[self._file_layer(config_path)] = file_config
+        updates["env"] = self._load_from_environment()
+        
+        snapshot = self.runtime.update_layers(updates, validate=self._validate_configuration)
+        if snapshot is not None:
+            logger.info(f"Configuration reloaded (version {snapshot.version})")
+        return snapshot
     
     def _get_default_config(self) -> Dict[str, Any]:
         """Get default configuration values"""
@@ -217,12 +276,20 @@ class ConfigManager:
         """Load configuration from a file"""
         try:
             with open(file_path, 'r', encoding='utf-8') as f:
-                if self.config.config_format == ConfigFormat.JSON:
-                    config_data = json.load(f)
-                elif self.config.config_format == ConfigFormat.YAML:
-                    config_data = yaml.safe_load(f)
-                else:
-                    raise ValueError(f"Unsupported config format: {self.config.config_format}")
+                content = f.read()
+        except Exception as e:
+            raise ConfigValidationError(f"Failed to load config file {file_path}: {e}")
+        return self._parse_config(content, file_path)
+    
+    def _parse_config(self, content: str, file_path: str) -> Dict[str, Any]:
+        """Parse configuration file content"""
+        try:
+            if self.config.config_format == ConfigFormat.JSON:
+                config_data = json.loads(content)
+            elif self.config.config_format == ConfigFormat.YAML:
+                config_data = yaml.safe_load(content)
+            else:
+                raise ValueError(f"Unsupported config format: {self.config.config_format}")
             
             # Decrypt if encryption is enabled
             if self.config.enable_encryption and self.cipher_suite:
@@ -306,22 +373,24 @@ class ConfigManager:
         
         return merged
     
-    def _validate_configuration(self):
+    def _validate_configuration(self, config: Optional[Mapping] = None):
         """Validate configuration against schema"""
-        if not self.config.config_schema:
+        if not (self.config.enable_validation and self.config.config_schema):
             return
         
         schema = self.config.config_schema
+        if config is None:
+            config = self.current_config
         
         # Check required fields
         for field in schema.required_fields:
-            if not self._has_nested_key(self.current_config, field):
+            if not self._has_nested_key(config, field):
                 raise ConfigValidationError(f"Required field missing: {field}")
         
         # Check field types
         for field, expected_type in schema.field_types.items():
-            if self._has_nested_key(self.current_config, field):
-                value = self._get_nested_value(self.current_config, field)
+            if self._has_nested_key(config, field):
+                value = thaw(self._get_nested_value(config, field))
                 if not isinstance(value, expected_type):
                     raise ConfigValidationError(f"Field {field} has incorrect type. Expected {expected_type}, got {type(value)}")
     
@@ -331,7 +400,7 @@ class ConfigManager:
         current = config_dict
         
         for key in keys:
-            if not isinstance(current, dict) or key not in current:
+            if not isinstance(current, Mapping) or key not in current:
                 return False
             current = current[key]
         
@@ -349,57 +418,67 @@ class ConfigManager:
     
     def _start_config_watchers(self):
         """Start file watchers for auto-reload"""
-        for config_path in self.config.config_paths:
-            if os.path.exists(config_path):
-                # Cancel existing watcher if any
-                if config_path in self.config_watchers:
-                    self.config_watchers[config_path].cancel()
-                
-                # Start new watcher
-                watcher_task = asyncio.create_task(self._watch_config_file(config_path))
-                self.config_watchers[config_path] = watcher_task
-    
-    async def _watch_config_file(self, file_path: str):
-        """Watch a configuration file for changes"""
-        last_modified = os.path.getmtime(file_path)
-        
-        while True:
-            try:
-                await asyncio.sleep(self.config.reload_interval)
-                
-                # Check if file has been modified
-                current_modified = os.path.getmtime(file_path)
-                if current_modified > last_modified:
-                    logger.info(f"Configuration file {file_path} changed, reloading...")
-                    self.load_configuration()
-                    last_modified = current_modified
-            except Exception as e:
-                logger.error(f"Error watching config file {file_path}: {e}")
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Started again by start_config_system() once an event loop is running
+            logger.debug("No running event loop, configuration file watching deferred")
+            return
+        
+        # Replace the existing watcher if any
+        if self.watcher is not None:
+            self.watcher.stop()
+        
+        self.watcher = ConfigFileWatcher(self.config.config_paths, self._on_config_files_changed,
+                                         poll_interval=self.config.reload_interval,
+                                         debounce=self.config.reload_debounce,
+                                         use_inotify=self.config.use_inotify)
+        self.watcher.start()
+        logger.debug(f"Watching configuration files ({self.watcher.mode})")
+    
+    def _on_config_files_changed(self, paths):
+        """Reload the configuration files a watcher reported as changed"""
+        logger.info(f"Configuration files changed: {sorted(paths)}, reloading...")
+        self.reload_files(paths)
+    
+    def snapshot(self) -> ConfigSnapshot:
+        """Current immutable configuration snapshot (no copy)"""
+        return self.runtime.snapshot
+    
+    def accessor(self, key_path: str, default: Any = None) -> ConfigAccessor:
+        """Precompiled handle for a key path, for values read on hot paths"""
+        return self.runtime.accessor(key_path, default)
+    
+    def subscribe(self, key_path: str, callback: Callable[[str, Any, Any], Any]) -> Subscription:
+        """Call `callback(key_path, old, new)` when the subtree at key_path changes"""
+        return self.runtime.subscribe(key_path, callback)
+    
+    def unsubscribe(self, subscription: Subscription):
+        """Cancel a subscription"""
+        self.runtime.unsubscribe(subscription)
     
     def get_config(self) -> Dict[str, Any]:
-        """Get the current configuration"""
-        return self.current_config.copy()
+        """Get the current configuration (a mutable copy; see snapshot())"""
+        return thaw(self.runtime.snapshot.data)
     
     def get_value(self, key_path: str, default: Any = None) -> Any:
         """Get a specific configuration value by key path"""
-        try:
-            return self._get_nested_value(self.current_config, key_path)
-        except KeyError:
-            return default
+        return self.runtime.snapshot.get(key_path, default)
     
     def set_value(self, key_path: str, value: Any):
         """Set a specific configuration value by key path"""
         keys = key_path.split('.')
-        current = self.current_config
+        current = self.overrides
         
         # Navigate to the parent key
         for key in keys[:-1]:
-            if key not in current:
+            if not isinstance(current.get(key), dict):
                 current[key] = {}
             current = current[key]
         
         # Set the final value
         current[keys[-1]] = value
+        self.runtime.update_layers({"overrides": self.overrides})
     
     def save_config(self, file_path: Optional[str] = None, format: Optional[ConfigFormat] = None):
         """Save current configuration to a file"""
@@ -411,7 +490,7 @@ class ConfigManager:
         
         try:
             # Encrypt if encryption is enabled
-            config_to_save = self.current_config.copy()
+            config_to_save = self.get_config()
             if self.config.enable_encryption and self.cipher_suite:
                 config_to_save = self._encrypt_config(config_to_save)
             
@@ -458,12 +537,10 @@ class ConfigManager:
     
     async def shutdown(self):
         """Shutdown the configuration system"""
-        # Cancel all file watchers
-        for watcher_task in self.config_watchers.values():
-            watcher_task.cancel()
-        
-        # Wait for tasks to complete
-        await asyncio.gather(*self.config_watchers.values(), return_exceptions=True)
+        # Stop the file watcher
+        if self.watcher is not None:
+            await self.watcher.close()
+            self.watcher = None
         
         logger.info("Configuration system shutdown complete")
 
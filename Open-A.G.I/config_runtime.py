@@ -0,0 +1,689 @@
+"""
+Config Runtime Module for AEGIS
+
+This module provides the runtime behind config_manager:
+- Immutable, versioned configuration snapshots (read-only mappings and tuples)
+  published by a single atomic reference swap
+- Layered configuration (defaults, files, environment, runtime overrides)
+  re-merged incrementally: only the key paths a layer changed are recomputed,
+  every other subtree is shared with the previous snapshot
+- Precompiled accessor handles for hot key paths
+- Change subscriptions scoped to a subtree
+- File change notification through Linux inotify (via ctypes), with a
+  single polling task as the fallback, and debounced reloads
+- A benchmark of lookup cost and reload latency against the previous
+  polling manager
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import logging
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import weakref
+from collections.abc import Mapping
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+# Try to import loguru, fallback to standard logging
+try:
+    from loguru import logger
+except ImportError:
+    logging.basicConfig(level=logging.INFO)
+    logger = logging.getLogger(__name__)
+
+MISSING = object()
+EMPTY: Mapping = MappingProxyType({})
+KeyPath = Tuple[str, ...]
+
+# Above this many changed paths a full merge is cheaper than patching
+FULL_MERGE_THRESHOLD = 64
+
+
+# Immutable trees
+
+def freeze(value: Any) -> Any:
+    """Read-only copy of a configuration value (mappings -> mappingproxy, lists -> tuples)"""
+    if isinstance(value, Mapping):
+        if isinstance(value, MappingProxyType) and all(_is_frozen(v) for v in value.values()):
+            return value
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _is_frozen(value: Any) -> bool:
+    if isinstance(value, Mapping):
+        return isinstance(value, MappingProxyType) and all(_is_frozen(v) for v in value.values())
+    if isinstance(value, list):
+        return False
+    if isinstance(value, tuple):
+        return all(_is_frozen(item) for item in value)
+    return True
+
+
+def thaw(value: Any) -> Any:
+    """Mutable (dict/list) deep copy of a frozen value"""
+    if isinstance(value, Mapping):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+
+@lru_cache(maxsize=4096)
+def compile_path(key_path: str) -> KeyPath:
+    """Split a dotted key path once"""
+    return tuple(key_path.split('.')) if key_path else ()
+
+
+def lookup(tree: Any, keys: KeyPath, default: Any = None) -> Any:
+    """Walk a precompiled key path; `default` if any step is missing"""
+    for key in keys:
+        try:
+            tree = tree[key]
+        except (KeyError, TypeError, IndexError):
+            return default
+    return tree
+
+
+def merge_values(base: Any, override: Any) -> Any:
+    """Same semantics as ConfigManager._merge_configs, on frozen values"""
+    if not (isinstance(base, Mapping) and isinstance(override, Mapping)):
+        return override
+    merged = dict(base)
+    for key, value in override.items():
+        current = merged.get(key, MISSING)
+        merged[key] = merge_values(current, value) if current is not MISSING else value
+    return MappingProxyType(merged)
+
+
+def merge_layers(layers: Sequence[Mapping]) -> Mapping:
+    merged = EMPTY
+    for layer in layers:
+        merged = merge_values(merged, layer)
+    return merged
+
+
+def changed_paths(old: Any, new: Any, prefix: KeyPath = ()) -> List[KeyPath]:
+    """Shallowest key paths whose values differ between two frozen trees"""
+    if old is new:
+        return []
+    if isinstance(old, Mapping) and isinstance(new, Mapping):
+        paths: List[KeyPath] = []
+        for key in old.keys() | new.keys():
+            paths.extend(changed_paths(old.get(key, MISSING), new.get(key, MISSING), prefix + (key,)))
+        return paths
+    if old is MISSING or new is MISSING or type(old) is not type(new) or old != new:
+        return [prefix]
+    return []
+
+
+def value_at(layers: Sequence[Mapping], path: KeyPath) -> Any:
+    """Merged value at `path` without merging whole layers (MISSING if absent)"""
+    result = MISSING
+    for layer in layers:
+        node = layer
+        for key in path:
+            if not isinstance(node, Mapping):
+                # A scalar above the path replaces everything earlier layers put below it
+                result = MISSING
+                node = MISSING
+                break
+            node = node.get(key, MISSING)
+            if node is MISSING:
+                break
+        if node is MISSING:
+            continue
+        result = node if result is MISSING else merge_values(result, node)
+    return result
+
+
+def assign(tree: Mapping, path: KeyPath, value: Any) -> Mapping:
+    """Copy-on-write update of one path (MISSING deletes); untouched subtrees are shared"""
+    key = path[0]
+    current = tree.get(key, MISSING)
+    if len(path) == 1:
+        if value is current:
+            return tree
+        updated = dict(tree)
+        if value is MISSING:
+            del updated[key]
+        else:
+            updated[key] = value
+        return MappingProxyType(updated)
+    if not isinstance(current, Mapping):
+        if value is MISSING:
+            return tree
+        current = EMPTY
+    child = assign(current, path[1:], value)
+    if child is current:
+        return tree
+    updated = dict(tree)
+    updated[key] = child
+    return MappingProxyType(updated)
+
+
+# Snapshots, accessors and subscriptions
+
+# Distinct key paths memoised per snapshot
+SNAPSHOT_MEMO_SIZE = 4096
+
+
+class ConfigSnapshot:
+    """An immutable, versioned view of the merged configuration"""
+
+    __slots__ = ("version", "data", "created", "_memo")
+
+    def __init__(self, version: int, data: Mapping, created: Optional[float] = None):
+        self.version = version
+        self.data = data
+        self.created = created if created is not None else time.time()
+        self._memo: Dict[str, Any] = {}
+
+    def get(self, key_path: str, default: Any = None) -> Any:
+        # The tree never changes, so each key path is resolved at most once per snapshot
+        try:
+            value = self._memo[key_path]
+        except KeyError:
+            value = lookup(self.data, compile_path(key_path), MISSING)
+            if len(self._memo) < SNAPSHOT_MEMO_SIZE:
+                self._memo[key_path] = value
+        return default if value is MISSING else value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return thaw(self.data)
+
+
+class ConfigAccessor:
+    """Precompiled handle for one key path
+
+    The runtime resolves `value` when each snapshot is published, so reading
+    it on a hot path is a single attribute load.
+    """
+
+    __slots__ = ("key_path", "keys", "default", "value", "__weakref__")
+
+    def __init__(self, key_path: str, default: Any = None):
+        self.key_path = key_path
+        self.keys = compile_path(key_path)
+        self.default = default
+        self.value = default
+
+    def refresh(self, snapshot: ConfigSnapshot):
+        self.value = lookup(snapshot.data, self.keys, self.default)
+
+    def __call__(self) -> Any:
+        return self.value
+
+    get = __call__
+
+
+class Subscription:
+    """Callback for changes under one subtree"""
+
+    __slots__ = ("key_path", "keys", "callback", "active")
+
+    def __init__(self, key_path: str, callback: Callable[[str, Any, Any], Any]):
+        self.key_path = key_path
+        self.keys = compile_path(key_path)
+        self.callback = callback
+        self.active = True
+
+
+class ConfigRuntime:
+    """Layered configuration published as immutable snapshots"""
+
+    def __init__(self, layer_order: Iterable[str] = ()):
+        self.layer_order: List[str] = list(layer_order)
+        self.layers: Dict[str, Mapping] = {}
+        self.snapshot = ConfigSnapshot(0, EMPTY)
+        self.subscriptions: List[Subscription] = []
+        self.accessors: "weakref.WeakSet[ConfigAccessor]" = weakref.WeakSet()
+        self._lock = threading.RLock()
+        self.stats = {"reloads": 0, "incremental": 0, "full": 0, "unchanged": 0}
+
+    def _ordered(self, layers: Dict[str, Mapping]) -> List[Mapping]:
+        return [layers[name] for name in self.layer_order if name in layers]
+
+    def replace_layers(self, layers: Dict[str, Any], layer_order: Optional[Iterable[str]] = None,
+                       validate: Optional[Callable[[Mapping], None]] = None) -> ConfigSnapshot:
+        """Rebuild every layer and merge from scratch"""
+        with self._lock:
+            frozen = {name: freeze(data) for name, data in layers.items()}
+            order = list(layer_order) if layer_order is not None else self.layer_order
+            data = merge_layers([frozen[name] for name in order if name in frozen])
+            if validate:
+                validate(data)
+            self.layer_order = order
+            self.layers = frozen
+            self.stats["full"] += 1
+            return self._publish(data)
+
+    def update_layers(self, updates: Dict[str, Any],
+                      validate: Optional[Callable[[Mapping], None]] = None) -> Optional[ConfigSnapshot]:
+        """Replace some layers and patch only the paths they changed
+
+        Returns the new snapshot, or None if the merged configuration did not
+        change. `validate` may raise to reject the update (nothing is published).
+        """
+        with self._lock:
+            layers = dict(self.layers)
+            paths: List[KeyPath] = []
+            for name, data in updates.items():
+                if name not in self.layer_order:
+                    self.layer_order.append(name)
+                frozen = freeze(data)
+                paths.extend(changed_paths(layers.get(name, EMPTY), frozen))
+                layers[name] = frozen
+            if not paths:
+                self.layers = layers
+                self.stats["unchanged"] += 1
+                return None
+            ordered = self._ordered(layers)
+            if () in paths or len(paths) > FULL_MERGE_THRESHOLD:
+                data = merge_layers(ordered)
+                self.stats["full"] += 1
+            else:
+                data = self.snapshot.data
+                for path in paths:
+                    data = assign(data, path, value_at(ordered, path))
+                self.stats["incremental"] += 1
+            if data is self.snapshot.data:
+                self.layers = layers
+                self.stats["unchanged"] += 1
+                return None
+            if validate:
+                validate(data)
+            self.layers = layers
+            return self._publish(data)
+
+    def _publish(self, data: Mapping) -> ConfigSnapshot:
+        previous = self.snapshot
+        snapshot = ConfigSnapshot(previous.version + 1, data)
+        self.snapshot = snapshot  # readers pick up the new tree with one reference load
+        for accessor in list(self.accessors):
+            accessor.refresh(snapshot)
+        self.stats["reloads"] += 1
+        self._notify(previous, snapshot)
+        return snapshot
+
+    def accessor(self, key_path: str, default: Any = None) -> ConfigAccessor:
+        """Handle kept up to date for as long as the caller holds a reference to it"""
+        accessor = ConfigAccessor(key_path, default)
+        with self._lock:
+            accessor.refresh(self.snapshot)
+            self.accessors.add(accessor)
+        return accessor
+
+    def subscribe(self, key_path: str, callback: Callable[[str, Any, Any], Any]) -> Subscription:
+        """Call `callback(key_path, old, new)` whenever the subtree at key_path changes
+
+        Missing values are reported as None. Coroutine callbacks are scheduled
+        on the running event loop.
+        """
+        subscription = Subscription(key_path, callback)
+        with self._lock:
+            self.subscriptions = self.subscriptions + [subscription]
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscription.active = False
+            self.subscriptions = [s for s in self.subscriptions if s is not subscription]
+
+    def _notify(self, previous: ConfigSnapshot, snapshot: ConfigSnapshot):
+        for subscription in self.subscriptions:
+            old = lookup(previous.data, subscription.keys, MISSING)
+            new = lookup(snapshot.data, subscription.keys, MISSING)
+            # Untouched subtrees are shared between snapshots, so identity settles most checks
+            if old is new or (old is not MISSING and new is not MISSING and old == new):
+                continue
+            try:
+                result = subscription.callback(subscription.key_path,
+                                               None if old is MISSING else old,
+                                               None if new is MISSING else new)
+                if asyncio.iscoroutine(result):
+                    asyncio.ensure_future(result)
+            except Exception as e:
+                logger.error(f"Config subscriber for '{subscription.key_path}' failed: {e}")
+
+
+# File change notification
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+_EVENT = struct.Struct("iIII")
+
+_libc = None
+
+
+def _inotify_libc():
+    global _libc
+    if _libc is None:
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError("libc does not provide inotify")
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        _libc = libc
+    return _libc
+
+
+class InotifyWatch:
+    """Non-blocking inotify descriptor watching the directories of some files
+
+    Directories (not files) are watched so editors that save by renaming a
+    temporary file over the original are still seen.
+    """
+
+    def __init__(self, paths: Iterable[str]):
+        libc = _inotify_libc()
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.directories: Dict[int, str] = {}
+        self.files: Dict[str, Set[str]] = {}
+        for path in paths:
+            directory, name = os.path.split(os.path.abspath(path))
+            self.files.setdefault(directory, set()).add(name)
+        try:
+            for directory in self.files:
+                wd = libc.inotify_add_watch(self.fd, os.fsencode(directory), WATCH_MASK)
+                if wd < 0:
+                    raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+                self.directories[wd] = directory
+        except OSError:
+            self.close()
+            raise
+
+    def read_changes(self) -> Set[str]:
+        """Watched files touched since the last call"""
+        changed: Set[str] = set()
+        while True:
+            try:
+                buffer = os.read(self.fd, 65536)
+            except BlockingIOError:
+                return changed
+            if not buffer:
+                return changed
+            offset = 0
+            while offset < len(buffer):
+                wd, mask, _, length = _EVENT.unpack_from(buffer, offset)
+                offset += _EVENT.size
+                name = buffer[offset:offset + length].rstrip(b"\0").decode(errors="surrogateescape")
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(os.path.join(d, n) for d, names in self.files.items() for n in names)
+                    continue
+                directory = self.directories.get(wd)
+                if directory is not None and name in self.files[directory]:
+                    changed.add(os.path.join(directory, name))
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+
+def file_signature(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class ConfigFileWatcher:
+    """Debounced change notification for a set of configuration files
+
+    Files in existing directories are watched through inotify where it is
+    available; everything else (or everything, when inotify is unavailable or
+    disabled) is checked by one polling task every `poll_interval` seconds.
+    `on_change` receives the set of changed paths once events have been quiet
+    for `debounce` seconds.
+    """
+
+    def __init__(self, paths: Iterable[str], on_change: Callable[[Set[str]], Any],
+                 poll_interval: float = 30.0, debounce: float = 0.05, use_inotify: bool = True):
+        self.paths = [os.path.abspath(path) for path in paths]
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.use_inotify = use_inotify
+        self.inotify: Optional[InotifyWatch] = None
+        self.polled: List[str] = []
+        self.signatures: Dict[str, Optional[Tuple[int, int, int]]] = {}
+        self.pending: Set[str] = set()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def mode(self) -> str:
+        if self.inotify and self.polled:
+            return "inotify+polling"
+        return "inotify" if self.inotify else "polling"
+
+    def start(self):
+        """Start watching (must be called from the event loop)"""
+        self._loop = asyncio.get_running_loop()
+        watched = [path for path in self.paths if os.path.isdir(os.path.dirname(path))]
+        if self.use_inotify and watched:
+            try:
+                self.inotify = InotifyWatch(watched)
+                self._loop.add_reader(self.inotify.fd, self._on_inotify)
+            except (OSError, NotImplementedError) as e:
+                logger.info(f"inotify unavailable ({e}), polling configuration files")
+                if self.inotify:
+                    self.inotify.close()
+                self.inotify = None
+        self.polled = [path for path in self.paths if not self.inotify or path not in watched]
+        self.signatures = {path: file_signature(path) for path in self.polled}
+        if self.polled:
+            self._poll_task = asyncio.create_task(self._poll())
+
+    def _on_inotify(self):
+        changed = self.inotify.read_changes()
+        if changed:
+            self._schedule(changed)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                changed = set()
+                for path in self.polled:
+                    signature = file_signature(path)
+                    if signature != self.signatures.get(path):
+                        self.signatures[path] = signature
+                        changed.add(path)
+                if changed:
+                    self._schedule(changed)
+            except Exception as e:
+                logger.error(f"Error polling configuration files: {e}")
+
+    def _schedule(self, changed: Set[str]):
+        self.pending |= changed
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = self._loop.call_later(self.debounce, self._flush)
+
+    def _flush(self):
+        self._timer = None
+        changed, self.pending = self.pending, set()
+        try:
+            self.on_change(changed)
+        except Exception as e:
+            logger.error(f"Configuration reload failed: {e}")
+
+    def stop(self):
+        """Stop watching without waiting for the polling task to finish"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self.inotify is not None:
+            try:
+                self._loop.remove_reader(self.inotify.fd)
+            except Exception:
+                pass
+            self.inotify.close()
+            self.inotify = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+
+    async def close(self):
+        self.stop()
+        if self._poll_task is not None:
+            await asyncio.gather(self._poll_task, return_exceptions=True)
+            self._poll_task = None
+
+
+# Benchmark
+
+class _LegacyPollingReloader:
+    """The previous reload path: one mtime polling task per file and a full reload"""
+
+    def __init__(self, manager, interval: float):
+        self.manager = manager
+        self.interval = interval
+        self.tasks: List[asyncio.Task] = []
+
+    def start(self):
+        for path in self.manager.config.config_paths:
+            self.tasks.append(asyncio.create_task(self._watch(path)))
+
+    async def _watch(self, file_path: str):
+        last_modified = os.path.getmtime(file_path)
+        while True:
+            await asyncio.sleep(self.interval)
+            current_modified = os.path.getmtime(file_path)
+            if current_modified > last_modified:
+                self.manager.load_configuration()
+                last_modified = current_modified
+
+    async def close(self):
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+
+def _legacy_get_value(config: Dict[str, Any], key_path: str, default: Any = None) -> Any:
+    try:
+        current = config
+        for key in key_path.split('.'):
+            current = current[key]
+        return current
+    except KeyError:
+        return default
+
+
+def benchmark_config_runtime(lookups: int = 200_000, reloads: int = 5,
+                             poll_interval: float = 0.5) -> Dict[str, Any]:
+    """
+    Lookup cost (ns per call) for the previous split-and-walk lookup and
+    dict copy versus snapshot lookups and accessor handles; reload cost; and
+    the latency from a config file write to the new snapshot with inotify,
+    with the polling fallback and with the previous per-file polling.
+    """
+    from config_manager import ConfigManager, ConfigManagerConfig
+
+    results: Dict[str, Any] = {"lookup_ns": {}, "reload_ms": {}, "reload_latency_ms": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "app_config.json")
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write('{"api_server": {"port": 8000}, "custom": {"value": 0}}')
+        manager = ConfigManager(ConfigManagerConfig(config_paths=[path], auto_reload=False))
+        legacy_config = manager.get_config()
+        port = manager.accessor("api_server.port")
+        candidates = [
+            ("legacy get_value", lambda: _legacy_get_value(legacy_config, "api_server.port")),
+            ("legacy get_config copy", lambda: legacy_config.copy()),
+            ("get_value", lambda: manager.get_value("api_server.port")),
+            ("accessor()", port),
+            ("accessor.value", lambda: port.value),
+            ("snapshot", lambda: manager.snapshot()),
+        ]
+        for name, call in candidates:
+            started = time.perf_counter()
+            for _ in range(lookups):
+                call()
+            results["lookup_ns"][name] = (time.perf_counter() - started) / lookups * 1e9
+
+        def write(value: int):
+            with open(path, "w", encoding="utf-8") as handle:
+                handle.write('{"api_server": {"port": 8000}, "custom": {"value": %d}}' % value)
+
+        counter = [0]
+
+        def timed(call: Callable[[], Any], rounds: int = 50) -> float:
+            elapsed = 0.0
+            for _ in range(rounds):
+                counter[0] += 1
+                write(counter[0])
+                started = time.perf_counter()
+                call()
+                elapsed += time.perf_counter() - started
+            return elapsed / rounds * 1000
+
+        results["reload_ms"]["full load_configuration"] = timed(manager.load_configuration)
+        results["reload_ms"]["incremental"] = timed(lambda: manager.reload_files([path]))
+
+        async def latency(mode: str) -> float:
+            manager.config.reload_interval = poll_interval
+            manager.config.use_inotify = mode == "inotify"
+            legacy = None
+            if mode == "legacy polling":
+                legacy = _LegacyPollingReloader(manager, poll_interval)
+                legacy.start()
+            else:
+                manager.config.auto_reload = True
+                manager._start_config_watchers()
+            samples = []
+            try:
+                for i in range(reloads):
+                    # Let at least one mtime tick pass and desynchronise writes from the poll phase
+                    await asyncio.sleep(0.02 + poll_interval * i / reloads)
+                    version = manager.snapshot().version
+                    counter[0] += 1
+                    started = time.perf_counter()
+                    write(counter[0])
+                    while manager.snapshot().version == version:
+                        await asyncio.sleep(0.001)
+                    samples.append((time.perf_counter() - started) * 1000)
+            finally:
+                if legacy:
+                    await legacy.close()
+                await manager.shutdown()
+                manager.config.auto_reload = False
+            return sum(samples) / len(samples)
+
+        for mode in ("inotify", "polling", "legacy polling"):
+            results["reload_latency_ms"][mode] = asyncio.run(latency(mode))
+        results["poll_interval"] = poll_interval
+    return results
+
+
+if __name__ == "__main__":
+    report = benchmark_config_runtime()
+    for name, value in report["lookup_ns"].items():
+        print(f"{name:>24}: {value:8.1f} ns")
+    for name, value in report["reload_ms"].items():
+        print(f"{name:>24}: {value:8.3f} ms per reload")
+    for name, value in report["reload_latency_ms"].items():
+        print(f"{name:>24}: {value:8.1f} ms from write to snapshot (poll interval {report['poll_interval']} s)")
@@ -0,0 +1,987 @@
+#!/usr/bin/env python3
+"""
+Runtime de Contratos Inteligentes - AEGIS Framework
+Ejecución aislada de contratos compilados una sola vez por hash de código.
+
+Características principales:
+- Validación por lista blanca del AST (sin imports, clases, excepciones ni dunders)
+- Compilación única por hash de código con caché LRU de código restringido
+- Gas medido por bloque básico, almacenamiento y tamaño de datos (límites deterministas)
+- Límite de profundidad de llamadas independiente del intérprete
+- Estado copy-on-write por transacción con confirmación o reversión atómica
+- Ejecución optimista de bloques con especulación paralela y reejecución por conflicto
+- Benchmark de llamadas/s con un contrato de transferencia de tokens
+"""
+
+import ast
+import copy
+import gc
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from types import FunctionType, MappingProxyType
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Tamaño máximo del código fuente de un contrato
+MAX_CODE_SIZE = 64 * 1024
+
+# Nombres inyectados por el runtime en el espacio de nombres del contrato
+RESERVED_NAMES = frozenset({"storage", "caller", "context", "timestamp"})
+
+# Métodos accesibles desde el contrato (almacenamiento, listas y cadenas)
+ALLOWED_ATTRIBUTES = frozenset({
+    "get", "keys", "values", "items",
+    "append", "pop", "insert", "index", "count",
+    "join", "split", "strip", "lower", "upper", "startswith", "endswith",
+})
+
+# Tipos inmutables que pueden guardarse en el almacenamiento
+STORABLE_TYPES = (int, float, str, bool, bytes, type(None))
+
+_ALLOWED_NODES = (
+    ast.Module, ast.FunctionDef, ast.arguments, ast.arg, ast.Return, ast.Assign, ast.AugAssign,
+    ast.For, ast.While, ast.If, ast.Expr, ast.Pass, ast.Break, ast.Continue, ast.Assert, ast.Delete,
+    ast.BoolOp, ast.BinOp, ast.UnaryOp, ast.IfExp, ast.Compare, ast.Call, ast.keyword,
+    ast.Dict, ast.List, ast.Tuple, ast.Constant, ast.Attribute, ast.Subscript, ast.Slice, ast.Name,
+    ast.JoinedStr, ast.FormattedValue,
+    ast.Load, ast.Store, ast.Del,
+    ast.And, ast.Or, ast.Not, ast.Invert, ast.UAdd, ast.USub,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow,
+    ast.BitAnd, ast.BitOr, ast.BitXor, ast.LShift, ast.RShift,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.In, ast.NotIn, ast.Is, ast.IsNot,
+)
+
+# Operaciones cuyo coste depende del tamaño de los operandos
+_SIZED_OPERATORS = {ast.Add: "__add", ast.Mult: "__mul", ast.Pow: "__pow", ast.LShift: "__lshift", ast.Mod: "__mod"}
+_SIZED_AUGMENTED = {**_SIZED_OPERATORS, ast.Add: "__iadd", ast.Mult: "__imul"}
+
+# Métodos O(n) en el tamaño del objeto y de sus argumentos
+_SIZED_METHODS = frozenset({
+    "insert", "index", "count", "join", "split", "strip", "lower", "upper", "startswith", "endswith",
+})
+
+# Tipos cuyo tamaño cuentan los operadores y métodos medidos
+_SEQUENCE_TYPES = (str, bytes, list, tuple)
+
+
+class ContractError(Exception):
+    """Error de validación o ejecución de un contrato"""
+
+
+class OutOfGas(ContractError):
+    """El contrato agotó el gas de la transacción"""
+
+
+@dataclass(frozen=True)
+class GasSchedule:
+    """Tabla de costes de gas"""
+    step: int = 1               # por nodo del AST ejecutado
+    call: int = 20              # por llamada a función del contrato
+    storage_read: int = 20
+    storage_write: int = 100
+    item: int = 1               # por elemento procesado por builtins y operaciones de tamaño variable
+    intrinsic: int = 1000       # coste base de la transacción
+    parameter_byte: int = 10    # por byte de parámetros
+    max_depth: int = 64
+
+    def intrinsic_gas(self, parameters: Dict[str, Any]) -> int:
+        """Gas fijo de una transacción antes de ejecutar código"""
+        return self.intrinsic + len(str(parameters)) * self.parameter_byte
+
+
+class GasMeter:
+    """Contador de gas y profundidad de una transacción"""
+
+    __slots__ = ("limit", "remaining", "depth", "schedule")
+
+    def __init__(self, limit: int, schedule: GasSchedule):
+        self.limit = limit
+        self.remaining = limit
+        self.depth = 0
+        self.schedule = schedule
+
+    @property
+    def used(self) -> int:
+        return self.limit - self.remaining
+
+    def charge(self, amount: int):
+        self.remaining -= amount
+        if self.remaining < 0:
+            self.remaining = 0
+            raise OutOfGas(f"Out of gas (limit {self.limit})")
+
+    def charge_items(self, count: int):
+        self.charge(count * self.schedule.item)
+
+    def enter(self, amount: int):
+        self.depth += 1
+        if self.depth > self.schedule.max_depth:
+            raise ContractError(f"Call depth exceeds {self.schedule.max_depth}")
+        self.charge(amount)
+
+    def leave(self):
+        self.depth -= 1
+
+
+# Medidor de la transacción en curso en cada hilo (para builtins y operadores)
+_active = threading.local()
+
+
+def _meter() -> GasMeter:
+    return _active.meter
+
+
+def _sized(function: Callable) -> Callable:
+    """Envuelve un builtin cobrando por el tamaño de sus argumentos"""
+    def metered(*args, **kwargs):
+        count = 0
+        for arg in args:
+            try:
+                count += len(arg)
+            except TypeError:
+                pass
+        _meter().charge_items(count)
+        return function(*args, **kwargs)
+    metered.__name__ = function.__name__
+    return metered
+
+
+def _sequence_length(value) -> int:
+    return len(value) if isinstance(value, _SEQUENCE_TYPES) else 0
+
+
+def _add(left, right):
+    if isinstance(left, _SEQUENCE_TYPES):
+        _meter().charge_items(len(left) + _sequence_length(right))
+    return left + right
+
+
+def _iadd(left, right):
+    if isinstance(left, _SEQUENCE_TYPES):
+        _meter().charge_items(len(left) + _sequence_length(right))
+    left += right
+    return left
+
+
+def _mod(left, right):
+    # El formateo con % puede crear cadenas arbitrariamente largas ("%0200000000d")
+    if isinstance(left, (str, bytes)):
+        raise ContractError("%-formatting is not allowed in contracts")
+    return left % right
+
+
+def _mul(left, right):
+    if isinstance(left, int) and isinstance(right, int):
+        _meter().charge_items((left.bit_length() + right.bit_length()) // 64)
+    elif isinstance(right, int):
+        _meter().charge_items(_length(left) * max(right, 0))
+    elif isinstance(left, int):
+        _meter().charge_items(_length(right) * max(left, 0))
+    return left * right
+
+
+def _imul(left, right):
+    result = _mul(left, right)
+    if isinstance(left, list):
+        # Conserva la semántica in situ de list *= n
+        left[:] = result
+        return left
+    return result
+
+
+def _pow(base, exponent):
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+        _meter().charge_items(max(base.bit_length(), 1) * exponent // 64)
+    return base ** exponent
+
+
+def _lshift(value, shift):
+    if isinstance(shift, int) and shift > 0:
+        _meter().charge_items(shift // 64)
+    return value << shift
+
+
+def _length(value) -> int:
+    try:
+        return len(value)
+    except TypeError:
+        return 0
+
+
+def _contains(item, container) -> bool:
+    _meter().charge_items(_sequence_length(container))
+    return item in container
+
+
+def _method(target, name: str, *args, **kwargs):
+    """Llama a un método O(n) cobrando por el tamaño del objeto y de los argumentos"""
+    meter = _meter()
+    if name == "join" and isinstance(target, (str, bytes)) and len(args) == 1:
+        # El separador se repite entre cada par de elementos
+        items = list(args[0])
+        meter.charge_items(len(items) * (len(target) + 1) + sum(_sequence_length(item) for item in items))
+        return target.join(items)
+    meter.charge_items(_sequence_length(target) + sum(_sequence_length(arg) for arg in args))
+    return getattr(target, name)(*args, **kwargs)
+
+
+def _str(*args, **kwargs) -> str:
+    """str() cobrando por el objeto convertido y por el texto resultante"""
+    meter = _meter()
+    if args:
+        meter.charge_items(_sequence_length(args[0]))
+    text = str(*args, **kwargs)
+    meter.charge_items(len(text))
+    return text
+
+
+def _format(value, conversion: int) -> str:
+    """Un campo {valor!conversión} de un f-string, medido como str()"""
+    meter = _meter()
+    meter.charge_items(_sequence_length(value))
+    if conversion == ord("r"):
+        text = repr(value)
+    elif conversion == ord("a"):
+        text = ascii(value)
+    else:
+        text = format(value)
+    meter.charge_items(len(text))
+    return text
+
+
+def _fstring(*parts: str) -> str:
+    _meter().charge_items(sum(len(part) for part in parts))
+    return "".join(parts)
+
+
+def _augmented_item(container, key, operation, value):
+    container[key] = operation(container[key], value)
+
+
+def _slice(value, lower, upper, step):
+    result = value[lower:upper:step]
+    _meter().charge_items(_sequence_length(result))
+    return result
+
+
+SAFE_BUILTINS: Dict[str, Any] = {
+    "len": len, "str": _str, "int": int, "float": float, "bool": bool, "abs": abs, "round": round,
+    "range": range, "True": True, "False": False, "None": None,
+}
+SAFE_BUILTINS.update({function.__name__: _sized(function) for function in (
+    list, tuple, dict, sum, max, min, sorted, any, all, enumerate, zip,
+)})
+
+_HELPERS = {
+    "__add": _add, "__iadd": _iadd, "__mul": _mul, "__imul": _imul, "__pow": _pow, "__lshift": _lshift,
+    "__mod": _mod, "__contains": _contains, "__method": _method, "__augitem": _augmented_item,
+    "__slice": _slice, "__format": _format, "__fstring": _fstring,
+}
+
+
+def _check_storable(value: Any) -> Any:
+    if type(value) in STORABLE_TYPES:
+        return value
+    if type(value) is tuple:
+        for item in value:
+            _check_storable(item)
+        return value
+    raise ContractError(f"Cannot store value of type {type(value).__name__}")
+
+
+def _is_storable_literal(node: ast.AST) -> bool:
+    try:
+        _check_storable(ast.literal_eval(node))
+        return True
+    except (ValueError, TypeError, SyntaxError, ContractError):
+        return False
+
+
+def _reject(node: ast.AST, message: str):
+    raise ContractError(f"Line {getattr(node, 'lineno', '?')}: {message}")
+
+
+class _Validator(ast.NodeVisitor):
+    """Comprueba que el contrato sólo use el subconjunto permitido"""
+
+    def __init__(self):
+        self.depth = 0
+
+    def generic_visit(self, node: ast.AST):
+        if not isinstance(node, _ALLOWED_NODES):
+            _reject(node, f"{type(node).__name__} is not allowed in contracts")
+        super().generic_visit(node)
+
+    def visit_Module(self, node: ast.Module):
+        for statement in node.body:
+            if isinstance(statement, ast.FunctionDef):
+                continue
+            if isinstance(statement, ast.Expr) and isinstance(statement.value, ast.Constant):
+                continue
+            if (isinstance(statement, ast.Assign) and len(statement.targets) == 1
+                    and isinstance(statement.targets[0], ast.Name)
+                    and _is_storable_literal(statement.value)):
+                continue
+            _reject(statement, "module level only allows functions and immutable constants")
+        self.generic_visit(node)
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        if self.depth:
+            _reject(node, "nested functions are not allowed")
+        if node.decorator_list:
+            _reject(node, "decorators are not allowed")
+        if node.name in RESERVED_NAMES:
+            _reject(node, f"'{node.name}' is reserved")
+        if node.args.vararg or node.args.kwarg:
+            _reject(node, "*args and **kwargs are not allowed")
+        for default in node.args.defaults + [d for d in node.args.kw_defaults if d is not None]:
+            if not _is_storable_literal(default):
+                _reject(default, "defaults must be immutable literals")
+        self._check_name(node, node.name)
+        self.depth += 1
+        self.generic_visit(node)
+        self.depth -= 1
+
+    def visit_arg(self, node: ast.arg):
+        self._check_name(node, node.arg)
+        self.generic_visit(node)
+
+    def visit_Name(self, node: ast.Name):
+        self._check_name(node, node.id)
+        if not isinstance(node.ctx, ast.Load) and node.id in RESERVED_NAMES:
+            _reject(node, f"'{node.id}' is reserved")
+
+    def visit_Attribute(self, node: ast.Attribute):
+        if node.attr not in ALLOWED_ATTRIBUTES:
+            _reject(node, f"attribute '{node.attr}' is not allowed")
+        if not isinstance(node.ctx, ast.Load):
+            _reject(node, "attributes cannot be assigned")
+        self.generic_visit(node)
+
+    def visit_AugAssign(self, node: ast.AugAssign):
+        if (type(node.op) in _SIZED_AUGMENTED and isinstance(node.target, ast.Subscript)
+                and isinstance(node.target.slice, ast.Slice)):
+            _reject(node, "augmented assignment to a slice is not allowed")
+        self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare):
+        if len(node.ops) > 1 and any(isinstance(op, (ast.In, ast.NotIn)) for op in node.ops):
+            _reject(node, "'in' cannot be chained with other comparisons")
+        self.generic_visit(node)
+
+    def visit_FormattedValue(self, node: ast.FormattedValue):
+        if node.format_spec is not None:
+            _reject(node, "format specifications are not allowed")
+        self.generic_visit(node)
+
+    @staticmethod
+    def _check_name(node: ast.AST, name: str):
+        if name.startswith("__"):
+            _reject(node, f"name '{name}' is not allowed")
+
+
+def _straight_line_cost(body: List[ast.stmt], schedule: GasSchedule) -> int:
+    """Coste de las sentencias de un bloque sin contar los bloques anidados"""
+    nodes = 0
+    for statement in body:
+        if isinstance(statement, ast.If):
+            nodes += 1 + sum(1 for _ in ast.walk(statement.test))
+        elif isinstance(statement, ast.While):
+            nodes += 1 + sum(1 for _ in ast.walk(statement.test))
+        elif isinstance(statement, ast.For):
+            nodes += 1 + sum(1 for _ in ast.walk(statement.iter))
+        else:
+            nodes += sum(1 for _ in ast.walk(statement))
+    return nodes * schedule.step
+
+
+def _helper_call(name: str, *args: ast.expr) -> ast.Call:
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[])
+
+
+class _GasInjector(ast.NodeTransformer):
+    """Inserta cargos de gas al inicio de cada bloque básico"""
+
+    def __init__(self, schedule: GasSchedule):
+        self.schedule = schedule
+
+    def _charged(self, body: List[ast.stmt], extra: int = 0) -> List[ast.stmt]:
+        if not body:
+            return body
+        cost = _straight_line_cost(body, self.schedule) + extra
+        return [ast.Expr(_helper_call("__gas", ast.Constant(cost)))] + body
+
+    def visit_FunctionDef(self, node: ast.FunctionDef):
+        self.generic_visit(node)
+        cost = _straight_line_cost(node.body, self.schedule) + self.schedule.call
+        node.body = [
+            ast.Expr(_helper_call("__enter", ast.Constant(cost))),
+            ast.Try(body=node.body, handlers=[], orelse=[],
+                    finalbody=[ast.Expr(_helper_call("__leave"))]),
+        ]
+        return node
+
+    def visit_If(self, node: ast.If):
+        self.generic_visit(node)
+        node.body = self._charged(node.body)
+        node.orelse = self._charged(node.orelse)
+        return node
+
+    def visit_For(self, node: ast.For):
+        self.generic_visit(node)
+        # Cada iteración paga la asignación del objetivo
+        target = sum(1 for _ in ast.walk(node.target)) * self.schedule.step
+        node.body = self._charged(node.body, target)
+        node.orelse = self._charged(node.orelse)
+        return node
+
+    def visit_While(self, node: ast.While):
+        self.generic_visit(node)
+        # Cada iteración paga la reevaluación de la condición
+        test = sum(1 for _ in ast.walk(node.test)) * self.schedule.step
+        node.body = self._charged(node.body, test)
+        node.orelse = self._charged(node.orelse)
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp):
+        self.generic_visit(node)
+        helper = _SIZED_OPERATORS.get(type(node.op))
+        if helper:
+            return ast.copy_location(_helper_call(helper, node.left, node.right), node)
+        return node
+
+    def visit_AugAssign(self, node: ast.AugAssign):
+        self.generic_visit(node)
+        helper = _SIZED_AUGMENTED.get(type(node.op))
+        if not helper:
+            return node
+        target = node.target
+        if isinstance(target, ast.Subscript):
+            # storage[k] += v -> __augitem(storage, k, __iadd, v)
+            call = _helper_call("__augitem", target.value, target.slice,
+                                ast.Name(id=helper, ctx=ast.Load()), node.value)
+            return ast.copy_location(ast.Expr(call), node)
+        value = _helper_call(helper, ast.Name(id=target.id, ctx=ast.Load()), node.value)
+        return ast.copy_location(ast.Assign(targets=[target], value=value), node)
+
+    def visit_Compare(self, node: ast.Compare):
+        self.generic_visit(node)
+        if len(node.ops) == 1 and isinstance(node.ops[0], (ast.In, ast.NotIn)):
+            call = _helper_call("__contains", node.left, node.comparators[0])
+            if isinstance(node.ops[0], ast.NotIn):
+                call = ast.UnaryOp(op=ast.Not(), operand=call)
+            return ast.copy_location(call, node)
+        return node
+
+    def visit_Call(self, node: ast.Call):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Attribute) and node.func.attr in _SIZED_METHODS:
+            call = ast.Call(func=ast.Name(id="__method", ctx=ast.Load()),
+                            args=[node.func.value, ast.Constant(node.func.attr)] + node.args,
+                            keywords=node.keywords)
+            return ast.copy_location(call, node)
+        return node
+
+    def visit_JoinedStr(self, node: ast.JoinedStr):
+        # f"{a}{b}" -> __fstring(__format(a, -1), __format(b, -1)): paga por la longitud total
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.FormattedValue):
+                value = _helper_call("__format", self.visit(value.value), ast.Constant(value.conversion))
+            parts.append(value)
+        return ast.copy_location(_helper_call("__fstring", *parts), node)
+
+    def visit_Subscript(self, node: ast.Subscript):
+        self.generic_visit(node)
+        if isinstance(node.ctx, ast.Load) and isinstance(node.slice, ast.Slice):
+            bounds = [bound or ast.Constant(None) for bound in
+                      (node.slice.lower, node.slice.upper, node.slice.step)]
+            return ast.copy_location(_helper_call("__slice", node.value, *bounds), node)
+        return node
+
+
+def code_hash(code: str) -> str:
+    """Identificador del código de un contrato"""
+    return hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+
+def validate_contract(code: str) -> ast.Module:
+    """Analiza y valida el código; lanza ContractError si no es admisible"""
+    if len(code.encode("utf-8")) > MAX_CODE_SIZE:
+        raise ContractError(f"Contract code exceeds {MAX_CODE_SIZE} bytes")
+    try:
+        tree = ast.parse(code, "<contract>", "exec")
+    except SyntaxError as e:
+        raise ContractError(f"Syntax error: {e}") from e
+    _Validator().visit(tree)
+    return tree
+
+
+class CompiledContract:
+    """Código restringido y medido de un contrato, compartido entre ejecuciones"""
+
+    def __init__(self, code: str, schedule: GasSchedule):
+        self.code_hash = code_hash(code)
+        tree = _GasInjector(schedule).visit(validate_contract(code))
+        ast.fix_missing_locations(tree)
+        # optimize=0 conserva los assert aunque el nodo corra con -O
+        bytecode = compile(tree, f"<contract {self.code_hash[:8]}>", "exec", optimize=0)
+
+        namespace: Dict[str, Any] = {"__builtins__": SAFE_BUILTINS}
+        exec(bytecode, namespace)  # sólo define funciones y constantes literales
+        self.constants: Dict[str, Any] = {"__builtins__": SAFE_BUILTINS, **_HELPERS}
+        self.functions: Dict[str, Tuple[Any, Optional[tuple], Optional[dict]]] = {}
+        for name, value in namespace.items():
+            if name == "__builtins__":
+                continue
+            if isinstance(value, FunctionType):
+                self.functions[name] = (value.__code__, value.__defaults__, value.__kwdefaults__)
+            else:
+                self.constants[name] = value
+
+        self.abi = {
+            "functions": [
+                {
+                    "name": node.name,
+                    "type": "function",
+                    "inputs": [{"name": arg.arg} for arg in node.args.args + node.args.kwonlyargs],
+                    "outputs": [],
+                }
+                for node in tree.body
+                if isinstance(node, ast.FunctionDef) and not node.name.startswith("_")
+            ],
+            "events": [],
+            "constructor": {},
+        }
+
+    def is_public(self, function_name: str) -> bool:
+        return function_name in self.functions and not function_name.startswith("_")
+
+    def bind(self, env: Dict[str, Any]) -> Dict[str, Any]:
+        """Espacio de nombres nuevo por ejecución: sin estado compartido entre llamadas"""
+        namespace = dict(self.constants)
+        namespace.update(env)
+        for name, (code, defaults, kwdefaults) in self.functions.items():
+            function = FunctionType(code, namespace, name, defaults)
+            if kwdefaults:
+                function.__kwdefaults__ = dict(kwdefaults)
+            namespace[name] = function
+        return namespace
+
+
+class ContractCache:
+    """Caché LRU de contratos compilados por hash de código"""
+
+    def __init__(self, max_entries: int = 256, schedule: Optional[GasSchedule] = None):
+        self.max_entries = max_entries
+        self.schedule = schedule or GasSchedule()
+        self.entries: "OrderedDict[str, CompiledContract]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def get(self, code: str) -> CompiledContract:
+        key = code_hash(code)
+        with self._lock:
+            compiled = self.entries.get(key)
+            if compiled is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return compiled
+        compiled = CompiledContract(code, self.schedule)
+        with self._lock:
+            self.misses += 1
+            self.entries[key] = compiled
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return compiled
+
+
+_DELETED = object()
+_MISSING = object()
+
+
+class StateOverlay:
+    """Vista copy-on-write del almacenamiento de un contrato durante una transacción"""
+
+    __slots__ = ("base", "writes", "reads", "read_all", "meter")
+
+    def __init__(self, base: Dict[Any, Any], meter: GasMeter):
+        self.base = base
+        self.writes: Dict[Any, Any] = {}
+        self.reads: set = set()
+        self.read_all = False
+        self.meter = meter
+
+    def _load(self, key):
+        self.meter.charge(self.meter.schedule.storage_read)
+        self.reads.add(key)
+        value = self.writes.get(key, _MISSING)
+        if value is _MISSING:
+            return self.base.get(key, _MISSING)
+        return _MISSING if value is _DELETED else value
+
+    def get(self, key, default=None):
+        value = self._load(key)
+        return default if value is _MISSING else value
+
+    def __getitem__(self, key):
+        value = self._load(key)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key) -> bool:
+        return self._load(key) is not _MISSING
+
+    def __setitem__(self, key, value):
+        self.meter.charge(self.meter.schedule.storage_write)
+        _check_storable(key)
+        self.writes[key] = _check_storable(value)
+
+    def __delitem__(self, key):
+        if self._load(key) is _MISSING:
+            raise KeyError(key)
+        self.meter.charge(self.meter.schedule.storage_write)
+        self.writes[key] = _DELETED
+
+    def _merged(self) -> Dict[Any, Any]:
+        self.read_all = True
+        merged = dict(self.base)
+        for key, value in self.writes.items():
+            if value is _DELETED:
+                merged.pop(key, None)
+            else:
+                merged[key] = value
+        self.meter.charge(self.meter.schedule.storage_read * max(len(merged), 1))
+        return merged
+
+    def __len__(self) -> int:
+        return len(self._merged())
+
+    def keys(self) -> list:
+        return list(self._merged())
+
+    def values(self) -> list:
+        return list(self._merged().values())
+
+    def items(self) -> list:
+        return list(self._merged().items())
+
+    def conflicts(self, written: Optional[set]) -> bool:
+        """Si la transacción leyó o escribió claves modificadas por otra anterior"""
+        if not written:
+            return False
+        if self.read_all:
+            return True
+        return not written.isdisjoint(self.reads) or not written.isdisjoint(self.writes)
+
+    def commit(self):
+        base = self.base
+        for key, value in self.writes.items():
+            if value is _DELETED:
+                base.pop(key, None)
+            else:
+                base[key] = value
+
+
+@dataclass
+class ContractCall:
+    """Invocación de una función de contrato"""
+    contract_id: str
+    function_name: str
+    parameters: Dict[str, Any]
+    caller: str
+    gas_limit: int = 100000
+
+
+@dataclass
+class ExecutionResult:
+    """Resultado de una invocación"""
+    contract_id: str
+    function_name: str
+    success: bool
+    result: Any = None
+    gas_used: int = 0
+    error: Optional[str] = None
+    reexecuted: bool = False
+
+
+@dataclass
+class DeployedContract:
+    """Contrato cargado en el runtime"""
+    compiled: CompiledContract
+    balance: float = 0.0
+    info: Dict[str, Any] = field(default_factory=dict)
+
+
+class ContractRuntime:
+    """Ejecuta contratos compilados sobre overlays de estado transaccionales"""
+
+    def __init__(self, storage: Optional[Dict[str, Dict[Any, Any]]] = None,
+                 schedule: Optional[GasSchedule] = None, cache_size: int = 256, workers: int = 0):
+        self.schedule = schedule or GasSchedule()
+        self.workers = workers
+        self._executor = None
+        self.cache = ContractCache(cache_size, self.schedule)
+        self.storage: Dict[str, Dict[Any, Any]] = storage if storage is not None else {}
+        self.contracts: Dict[str, DeployedContract] = {}
+        self.stats = {"calls": 0, "reverted": 0, "out_of_gas": 0, "speculated": 0, "reexecuted": 0}
+        self._lock = threading.RLock()
+
+    def deploy(self, contract_id: str, code: str, balance: float = 0.0) -> DeployedContract:
+        deployed = DeployedContract(self.cache.get(code), balance)
+        with self._lock:
+            self.contracts[contract_id] = deployed
+            self.storage.setdefault(contract_id, {})
+        return deployed
+
+    def _run(self, call: ContractCall, timestamp: float,
+             parameters: Optional[Dict[str, Any]] = None) -> Tuple[ExecutionResult, Optional[StateOverlay]]:
+        """Ejecuta sin confirmar: devuelve el resultado y el overlay pendiente"""
+        result = ExecutionResult(call.contract_id, call.function_name, False)
+        deployed = self.contracts.get(call.contract_id)
+        if deployed is None:
+            result.error = "Contract not found"
+            return result, None
+        compiled = deployed.compiled
+        if not compiled.is_public(call.function_name):
+            result.error = f"Function {call.function_name} not found"
+            return result, None
+
+        parameters = call.parameters if parameters is None else parameters
+        meter = GasMeter(call.gas_limit, self.schedule)
+        try:
+            meter.charge(self.schedule.intrinsic_gas(parameters))
+        except OutOfGas:
+            result.error = "Gas limit exceeded"
+            return result, None
+
+        overlay = StateOverlay(self.storage[call.contract_id], meter)
+        namespace = compiled.bind({
+            "storage": overlay,
+            "caller": call.caller,
+            "timestamp": timestamp,
+            "context": MappingProxyType({
+                "contract_id": call.contract_id,
+                "caller": call.caller,
+                "block_timestamp": timestamp,
+                "gas_limit": call.gas_limit,
+                "balance": deployed.balance,
+            }),
+            "__gas": meter.charge,
+            "__enter": meter.enter,
+            "__leave": meter.leave,
+        })
+
+        previous = getattr(_active, "meter", None)
+        _active.meter = meter
+        try:
+            result.result = namespace[call.function_name](**parameters)
+            result.success = True
+        except OutOfGas as e:
+            result.error = str(e)
+        except RecursionError:
+            result.error = "Recursion limit reached"
+        except Exception as e:
+            result.error = f"{type(e).__name__}: {e}"
+        finally:
+            _active.meter = previous
+        result.gas_used = meter.used
+        return result, overlay
+
+    def _record(self, result: ExecutionResult):
+        self.stats["calls"] += 1
+        if not result.success:
+            self.stats["out_of_gas" if result.error and result.error.startswith("Out of gas") else "reverted"] += 1
+
+    def execute(self, call: ContractCall, timestamp: Optional[float] = None) -> ExecutionResult:
+        """Ejecuta y confirma una invocación; si falla, el almacenamiento queda intacto"""
+        with self._lock:
+            result, overlay = self._run(call, time.time() if timestamp is None else timestamp)
+            if result.success:
+                overlay.commit()
+            self._record(result)
+            return result
+
+    def _speculate(self, calls: List[ContractCall], timestamp: float) -> List[Tuple[ExecutionResult, Any]]:
+        """Ejecuta un tramo de invocaciones contra el estado previo al bloque"""
+        outcomes = []
+        for call in calls:
+            parameters = call.parameters
+            # Copia propia si la especulación pudiera modificar los parámetros
+            if any(not isinstance(value, STORABLE_TYPES) for value in parameters.values()):
+                parameters = copy.deepcopy(parameters)
+            outcomes.append(self._run(call, timestamp, parameters))
+        return outcomes
+
+    def execute_block(self, calls: List[ContractCall], timestamp: Optional[float] = None,
+                      parallel: bool = False) -> List[ExecutionResult]:
+        """
+        Ejecuta las invocaciones de un bloque con el resultado de la ejecución en serie.
+
+        En paralelo, tramos del bloque se ejecutan en los workers contra el estado previo
+        y se confirman en orden; las que leyeron o escribieron claves ya modificadas por
+        una anterior del mismo bloque se reejecutan sobre el estado actualizado.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if not parallel or self.workers < 2 or len(calls) < 2:
+                results = []
+                for call in calls:
+                    result, overlay = self._run(call, timestamp)
+                    if result.success:
+                        overlay.commit()
+                    self._record(result)
+                    results.append(result)
+                return results
+
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="contract")
+            size = -(-len(calls) // self.workers)
+            speculative = [outcome
+                           for chunk in self._executor.map(self._speculate, [calls[i:i + size] for i in
+                                                                             range(0, len(calls), size)],
+                                                           [timestamp] * self.workers)
+                           for outcome in chunk]
+            self.stats["speculated"] += len(calls)
+            written: Dict[str, set] = {}
+            results = []
+            for call, (result, overlay) in zip(calls, speculative):
+                if overlay is not None and overlay.conflicts(written.get(call.contract_id)):
+                    result, overlay = self._run(call, timestamp)
+                    result.reexecuted = True
+                    self.stats["reexecuted"] += 1
+                if result.success:
+                    overlay.commit()
+                    if overlay.writes:
+                        written.setdefault(call.contract_id, set()).update(overlay.writes)
+                self._record(result)
+                results.append(result)
+            return results
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+TOKEN_CONTRACT = '''
+def mint(account, amount):
+    storage[account] = storage.get(account, 0) + amount
+    return storage[account]
+
+def transfer(recipient, amount):
+    balance = storage.get(caller, 0)
+    if amount <= 0 or balance < amount:
+        return False
+    storage[caller] = balance - amount
+    storage[recipient] = storage.get(recipient, 0) + amount
+    return True
+
+def balance_of(account):
+    return storage.get(account, 0)
+'''
+
+
+def _legacy_call(code: str, storage: Dict[str, Any], function_name: str,
+                 parameters: Dict[str, Any], caller: str) -> Any:
+    """Ruta anterior: exec del código fuente completo en cada llamada"""
+    safe_globals = {
+        '__builtins__': {
+            'len': len, 'str': str, 'int': int, 'float': float, 'bool': bool, 'list': list,
+            'dict': dict, 'max': max, 'min': min, 'sum': sum, 'abs': abs, 'round': round
+        },
+        'context': {'caller': caller, 'storage': storage},
+        'storage': storage,
+        'caller': caller,
+        'timestamp': time.time()
+    }
+    exec(code, safe_globals)
+    return safe_globals[function_name](**parameters)
+
+
+def _transfer_workload(calls: int, accounts: int, seed: int, disjoint: bool) -> List[ContractCall]:
+    import random
+
+    rng = random.Random(seed)
+    workload = []
+    for i in range(calls):
+        if disjoint:
+            # Pares fijos: transferencias de pares distintos no comparten claves
+            pair = (i * 2) % accounts
+            sender, recipient = f"acct_{pair}", f"acct_{pair + 1}"
+        else:
+            sender, recipient = (f"acct_{n}" for n in rng.sample(range(accounts), 2))
+        workload.append(ContractCall("token", "transfer", {"recipient": recipient, "amount": 1}, sender))
+    return workload
+
+
+def benchmark_contract_runtime(calls: int = 20_000, accounts: int = 1_000, block_size: int = 100,
+                               workers: int = 4, legacy_calls: int = 2_000) -> Dict[str, float]:
+    """Llamadas/s de un contrato de transferencia de tokens"""
+    def fresh_runtime(workers: int = 0) -> ContractRuntime:
+        runtime = ContractRuntime(workers=workers)
+        runtime.deploy("token", TOKEN_CONTRACT)
+        runtime.storage["token"].update({f"acct_{n}": 10 ** 9 for n in range(accounts)})
+        return runtime
+
+    def rate(count: int, seconds: float) -> float:
+        return count / seconds if seconds else float("inf")
+
+    def clock() -> float:
+        # Colección completa antes de cada fase: con un heap grande una de
+        # generación 2 a mitad de una fase corta domina su tiempo
+        gc.collect()
+        return time.perf_counter()
+
+    report: Dict[str, float] = {"calls": calls, "block_size": block_size}
+    random_calls = _transfer_workload(calls, accounts, 1, disjoint=False)
+
+    legacy_storage = {f"acct_{n}": 10 ** 9 for n in range(accounts)}
+    start = clock()
+    for call in random_calls[:legacy_calls]:
+        _legacy_call(TOKEN_CONTRACT, legacy_storage, call.function_name, call.parameters, call.caller)
+    report["legacy_calls_per_second"] = rate(legacy_calls, time.perf_counter() - start)
+
+    runtime = fresh_runtime()
+    start = clock()
+    for call in random_calls:
+        runtime.execute(call, 0.0)
+    report["runtime_calls_per_second"] = rate(calls, time.perf_counter() - start)
+    serial_state = dict(runtime.storage["token"])
+
+    runtime = fresh_runtime()
+    start = clock()
+    for offset in range(0, calls, block_size):
+        runtime.execute_block(random_calls[offset:offset + block_size], 0.0)
+    report["block_calls_per_second"] = rate(calls, time.perf_counter() - start)
+
+    for label, workload in (("random", random_calls),
+                            ("disjoint", _transfer_workload(calls, accounts, 1, disjoint=True))):
+        runtime = fresh_runtime(workers)
+        start = clock()
+        for offset in range(0, calls, block_size):
+            runtime.execute_block(workload[offset:offset + block_size], 0.0, parallel=True)
+        report[f"parallel_{label}_calls_per_second"] = rate(calls, time.perf_counter() - start)
+        report[f"parallel_{label}_reexecuted"] = runtime.stats["reexecuted"]
+        if label == "random":
+            report["parallel_matches_serial"] = runtime.storage["token"] == serial_state
+        runtime.close()
+
+    start = clock()
+    for _ in range(100):
+        CompiledContract(TOKEN_CONTRACT, GasSchedule())
+    report["compile_us"] = (time.perf_counter() - start) / 100 * 1e6
+    report["transfer_gas"] = fresh_runtime().execute(random_calls[0], 0.0).gas_used
+    return report
+
+
+if __name__ == "__main__":
+    import json
+
+    print("📜 Benchmark del runtime de contratos (transferencias de tokens)")
+    print(json.dumps(benchmark_contract_runtime(), indent=2))
@@ -0,0 +1,453 @@
+#!/usr/bin/env python3
+"""
+Plano de Datos del Dashboard - AEGIS Framework
+Distribución de métricas a clientes del dashboard desde un único event loop.
+
+Características principales:
+- Un solo event loop asyncio (en su propio hilo) para ingesta, agregación y envío
+- Agregados por métrica precalculados (metrics_tsdb: anillo crudo y rollups
+  10 s / 1 min / 1 h) y resumen por ventana calculado una vez por tick
+- Un frame por cliente y tick con todos sus topics: los fragmentos de cada
+  topic se serializan una sola vez (JSON o binario) y se concatenan
+- Suscripción por topic (tipo de métrica, o "*")
+- Clientes lentos: como máximo un envío en vuelo; los ticks perdidos no se
+  encolan y el cliente recibe después una instantánea del estado actual
+- /api/metrics servido desde un JSON cacheado por tick
+- Benchmark de emisiones/s y CPU con 100 clientes simulados
+"""
+
+import asyncio
+import inspect
+import json
+import logging
+import struct
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from metrics_tsdb import TimeSeriesStore
+
+logger = logging.getLogger(__name__)
+
+ALL_TOPICS = "*"
+JSON_FRAMES = "json"
+BINARY_FRAMES = "binary"
+
+# Frame binario: cabecera, luego por topic nombre/unidad, resumen y puntos (timestamp, valor)
+BINARY_MAGIC = b"AGDB"
+FRAME_HEADER = struct.Struct("<4sBIdH")
+TOPIC_HEADER = struct.Struct("<H5d")
+DELTA_FRAME = 1
+SNAPSHOT_FRAME = 2
+
+Frame = Union[str, bytes]
+SendFunction = Callable[[Frame], Union[None, Awaitable[None]]]
+
+
+@dataclass
+class TopicState:
+    """Estado de un topic: puntos recientes, puntos del tick y fragmentos cacheados"""
+    name: str
+    unit: str = ""
+    recent: Deque[Tuple[float, float, str]] = field(default_factory=deque)
+    pending: List[Tuple[float, float, str]] = field(default_factory=list)
+    summary: Dict[str, float] = field(default_factory=dict)
+    version: int = 0
+    delta: Dict[str, Frame] = field(default_factory=dict)     # codificación -> fragmento del último tick
+    snapshot: Dict[str, Frame] = field(default_factory=dict)  # codificación -> fragmento de estado completo
+
+
+@dataclass
+class DashboardClient:
+    """Cliente suscrito al plano de datos"""
+    client_id: str
+    send: SendFunction
+    topics: Set[str] = field(default_factory=lambda: {ALL_TOPICS})
+    encoding: str = JSON_FRAMES
+    in_flight: bool = False
+    needs_snapshot: bool = True  # el primer frame siempre es una instantánea
+    missed: Set[str] = field(default_factory=set)
+    frames_sent: int = 0
+    ticks_skipped: int = 0
+    asynchronous: bool = False  # send es una corrutina; si no, va al pool de envío
+
+    def wants(self, topic: str) -> bool:
+        return ALL_TOPICS in self.topics or topic in self.topics
+
+
+class DashboardDataPlane:
+    """Agregación por topic y envío por lotes a los clientes del dashboard
+
+    Todos los métodos, salvo los terminados en ``_threadsafe``, ``metrics_json``
+    y ``start``/``stop``, deben llamarse desde el event loop del plano.
+    """
+
+    def __init__(self, tick_interval: float = 1.0, history: int = 1000, snapshot_points: int = 50,
+                 summary_window: float = 60.0, clock: Callable[[], float] = time.time,
+                 send_workers: int = 8):
+        self.tick_interval = tick_interval
+        self.snapshot_points = snapshot_points
+        self.summary_window = summary_window
+        self.clock = clock
+        self.store = TimeSeriesStore(raw_capacity=history)
+        self.topics: Dict[str, TopicState] = {}
+        self.clients: Dict[str, DashboardClient] = {}
+        self.dirty: Set[str] = set()
+        self.seq = 0
+        self._metrics_json = "{}"
+        self.stats = {"ticks": 0, "frames": 0, "bytes": 0, "snapshots": 0, "skipped": 0, "send_errors": 0}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._tasks: List[asyncio.Task] = []
+        self._background: List[Callable[[], Awaitable[None]]] = []
+        self._send_pool = ThreadPoolExecutor(max_workers=send_workers, thread_name_prefix="dashboard-send")
+
+    # ----------------------------------------------------------------- ingesta
+
+    def publish(self, topic: str, timestamp: float, value: float, node_id: str = "", unit: str = ""):
+        """Registra un punto de una métrica"""
+        state = self.topics.get(topic)
+        if state is None:
+            state = self.topics[topic] = TopicState(topic, recent=deque(maxlen=self.snapshot_points))
+        if unit:
+            state.unit = unit
+        point = (float(timestamp), float(value), node_id)
+        state.recent.append(point)
+        state.pending.append(point)
+        self.store.append(topic, value, timestamp, {"node_id": node_id} if node_id else None)
+        self.dirty.add(topic)
+
+    def publish_threadsafe(self, topic: str, timestamp: float, value: float, node_id: str = "", unit: str = ""):
+        self.call_threadsafe(self.publish, topic, timestamp, value, node_id, unit)
+
+    # ---------------------------------------------------------------- clientes
+
+    def connect(self, client_id: str, send: SendFunction, topics: Iterable[str] = (ALL_TOPICS,),
+                encoding: str = JSON_FRAMES) -> DashboardClient:
+        client = DashboardClient(client_id, send, set(topics) or {ALL_TOPICS}, encoding,
+                                 asynchronous=inspect.iscoroutinefunction(send)
+                                 or inspect.iscoroutinefunction(getattr(send, "__call__", None)))
+        self.clients[client_id] = client
+        return client
+
+    def subscribe(self, client_id: str, topics: Iterable[str]):
+        """Reemplaza los topics del cliente; los nuevos llegan como instantánea"""
+        client = self.clients.get(client_id)
+        if client is None:
+            return
+        client.topics = set(topics) or {ALL_TOPICS}
+        client.needs_snapshot = True
+
+    def disconnect(self, client_id: str):
+        self.clients.pop(client_id, None)
+
+    def call_threadsafe(self, fn: Callable, *args):
+        """Ejecuta ``fn(*args)`` en el event loop del plano"""
+        if self.loop is None:
+            fn(*args)
+        else:
+            self.loop.call_soon_threadsafe(fn, *args)
+
+    # ------------------------------------------------------------------- ticks
+
+    def _encode_topic(self, state: TopicState, points: List[Tuple[float, float, str]], encoding: str) -> Frame:
+        summary = state.summary
+        if encoding == BINARY_FRAMES:
+            name, unit = state.name.encode(), state.unit.encode()
+            array = np.array([(t, v) for t, v, _ in points], dtype="<f8").reshape(-1, 2)
+            return b"".join((
+                bytes((len(name),)), name, bytes((len(unit),)), unit,
+                TOPIC_HEADER.pack(len(points), summary.get("count", 0), summary.get("min", 0.0),
+                                  summary.get("max", 0.0), summary.get("avg", 0.0), summary.get("latest", 0.0)),
+                array.tobytes(),
+            ))
+        payload = {"unit": state.unit, "points": [[t, v, n] for t, v, n in points], "summary": summary}
+        return "%s:%s" % (json.dumps(state.name), json.dumps(payload, separators=(",", ":")))
+
+    def _fragment(self, state: TopicState, encoding: str, snapshot: bool) -> Frame:
+        cache = state.snapshot if snapshot else state.delta
+        fragment = cache.get(encoding)
+        if fragment is None:
+            points = list(state.recent) if snapshot else state.pending
+            fragment = cache[encoding] = self._encode_topic(state, points, encoding)
+        return fragment
+
+    def _frame(self, client: DashboardClient, topics: List[TopicState], snapshot: bool, now: float) -> Frame:
+        kind = SNAPSHOT_FRAME if snapshot else DELTA_FRAME
+        fragments = [self._fragment(state, client.encoding, snapshot) for state in topics]
+        if client.encoding == BINARY_FRAMES:
+            return FRAME_HEADER.pack(BINARY_MAGIC, kind, self.seq, now, len(fragments)) + b"".join(fragments)
+        return '{"type":"%s","seq":%d,"t":%r,"topics":{%s}}' % (
+            "snapshot" if snapshot else "delta", self.seq, now, ",".join(fragments))
+
+    def _rebuild_metrics_json(self):
+        """Respuesta de /api/metrics (mismo formato que antes), una vez por tick"""
+        data = {}
+        for name, state in self.topics.items():
+            data[name] = [{"timestamp": t, "value": v, "node_id": n, "unit": state.unit} for t, v, n in state.recent]
+        self._metrics_json = json.dumps(data)
+
+    def metrics_json(self) -> str:
+        """Últimos ``snapshot_points`` puntos por métrica, serializados (seguro desde cualquier hilo)"""
+        return self._metrics_json
+
+    async def tick(self) -> int:
+        """Cierra un tick: resume los topics modificados y envía un frame por cliente
+
+        Devuelve el número de frames enviados.
+        """
+        now = self.clock()
+        self.seq += 1
+        self.stats["ticks"] += 1
+        dirty = self.dirty
+        self.dirty = set()
+        for name in dirty:
+            state = self.topics[name]
+            state.summary = self.store.stats(name, start=now - self.summary_window) or {}
+            state.version += 1
+            state.delta = {}
+            state.snapshot = {}
+        if dirty:
+            self._rebuild_metrics_json()
+
+        sent = 0
+        for client in list(self.clients.values()):
+            wanted = [name for name in dirty if client.wants(name)]
+            if client.in_flight:
+                # Cliente lento: no se encola nada, solo se recuerda qué topics cambiaron
+                client.missed.update(wanted)
+                client.ticks_skipped += 1
+                self.stats["skipped"] += 1
+                continue
+            snapshot = client.needs_snapshot or bool(client.missed)
+            if client.needs_snapshot:
+                names = [name for name in self.topics if client.wants(name)]
+            elif client.missed:
+                names = sorted(client.missed.union(wanted))
+            else:
+                names = wanted
+            if not names:
+                continue
+            frame = self._frame(client, [self.topics[name] for name in names], snapshot, now)
+            client.needs_snapshot = False
+            client.missed = set()
+            client.in_flight = True
+            self._tasks.append(asyncio.ensure_future(self._deliver(client, frame)))
+            sent += 1
+            if snapshot:
+                self.stats["snapshots"] += 1
+
+        for name in dirty:
+            self.topics[name].pending = []
+        self._tasks = [task for task in self._tasks if not task.done()]
+        return sent
+
+    async def _deliver(self, client: DashboardClient, frame: Frame):
+        try:
+            if client.asynchronous:
+                await client.send(frame)
+            else:
+                await asyncio.get_running_loop().run_in_executor(self._send_pool, client.send, frame)
+            client.frames_sent += 1
+            self.stats["frames"] += 1
+            self.stats["bytes"] += len(frame)
+        except Exception as e:
+            self.stats["send_errors"] += 1
+            self.clients.pop(client.client_id, None)
+            logger.warning(f"⚠️ Cliente {client.client_id} desconectado del plano de datos: {e}")
+        finally:
+            client.in_flight = False
+
+    async def drain(self):
+        """Espera a que terminen los envíos en vuelo"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            self._tasks = []
+
+    # ------------------------------------------------------------ event loop
+
+    def add_background(self, factory: Callable[[], Awaitable[None]]):
+        """Corrutina adicional (p. ej. el recolector) a ejecutar en el loop del plano"""
+        self._background.append(factory)
+
+    async def run(self):
+        background = [asyncio.ensure_future(factory()) for factory in self._background]
+        try:
+            while True:
+                started = time.monotonic()
+                try:
+                    await self.tick()
+                except Exception as e:
+                    logger.error(f"❌ Error en tick del plano de datos: {e}")
+                await asyncio.sleep(max(0.0, self.tick_interval - (time.monotonic() - started)))
+        finally:
+            for task in background:
+                task.cancel()
+            await asyncio.gather(*background, return_exceptions=True)
+
+    def start(self):
+        """Arranca el event loop del plano en un hilo propio"""
+        if self._thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def runner():
+            asyncio.set_event_loop(self.loop)
+            self._runner = self.loop.create_task(self.run())
+            ready.set()
+            try:
+                self.loop.run_until_complete(self._runner)
+            except asyncio.CancelledError:
+                pass
+            finally:
+                self.loop.close()
+
+        self._thread = threading.Thread(target=runner, name="dashboard-data-plane", daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self.loop.call_soon_threadsafe(self._runner.cancel)
+        self._thread.join(timeout=5)
+        self._thread = None
+        self.loop = None
+        self._send_pool.shutdown(wait=False)
+
+
+def decode_binary_frame(frame: bytes) -> Dict[str, Any]:
+    """Decodifica un frame binario (referencia para clientes y pruebas)"""
+    magic, kind, seq, timestamp, count = FRAME_HEADER.unpack_from(frame, 0)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Not a dashboard frame")
+    offset = FRAME_HEADER.size
+    topics = {}
+    for _ in range(count):
+        name_length = frame[offset]
+        name = frame[offset + 1:offset + 1 + name_length].decode()
+        offset += 1 + name_length
+        unit_length = frame[offset]
+        unit = frame[offset + 1:offset + 1 + unit_length].decode()
+        offset += 1 + unit_length
+        points, total, minimum, maximum, average, latest = TOPIC_HEADER.unpack_from(frame, offset)
+        offset += TOPIC_HEADER.size
+        values = np.frombuffer(frame, dtype="<f8", count=points * 2, offset=offset).reshape(-1, 2)
+        offset += points * 16
+        topics[name] = {"unit": unit, "points": values.tolist(),
+                        "summary": {"count": total, "min": minimum, "max": maximum, "avg": average,
+                                    "latest": latest}}
+    return {"type": "snapshot" if kind == SNAPSHOT_FRAME else "delta", "seq": seq, "t": timestamp,
+            "topics": topics}
+
+
+# ---------------------------------------------------------------- benchmark
+
+def _legacy_emit_all(history: Dict[str, deque], clients: List[Callable[[str], None]],
+                     metrics: List[Dict[str, Any]]):
+    """Camino anterior: un emit por métrica y cliente, serializando cada vez"""
+    for metric in metrics:
+        history[metric["metric_type"]].append(metric)
+        for send in clients:
+            send(json.dumps(metric))
+
+
+def _legacy_metrics_response(history: Dict[str, deque]) -> str:
+    data = {}
+    for metric_type, points in history.items():
+        if points:
+            data[metric_type] = [{"timestamp": m["timestamp"], "value": m["value"], "node_id": m["node_id"],
+                                  "unit": m["unit"]} for m in list(points)[-50:]]
+    return json.dumps(data)
+
+
+def benchmark_dashboard(clients: int = 100, ticks: int = 30, metric_types: int = 10, nodes: int = 20,
+                        slow_clients: int = 10, encoding: str = JSON_FRAMES) -> List[Dict[str, Any]]:
+    """
+    Emisiones/s y CPU por tick con ``clients`` clientes simulados y
+    ``metric_types`` x ``nodes`` puntos por tick (1 s), para el camino
+    anterior (un emit por métrica y cliente) y para el plano de datos. En el
+    plano, ``slow_clients`` tardan 3 ticks en aceptar cada frame.
+    """
+    rng = np.random.default_rng(0)
+    batches = []
+    for tick in range(ticks):
+        batches.append([{"metric_id": f"m{tick}_{t}_{n}", "metric_type": f"metric_{t}", "node_id": f"node_{n}",
+                         "value": float(rng.random() * 100), "unit": "percent", "timestamp": 1000.0 + tick,
+                         "metadata": {}} for t in range(metric_types) for n in range(nodes)])
+
+    results = []
+    sent = [0, 0]
+
+    def sink(frame):
+        sent[0] += 1
+        sent[1] += len(frame)
+
+    history: Dict[str, deque] = {}
+    legacy_clients = [sink] * clients
+    started_cpu = time.process_time()
+    for batch in batches:
+        for metric in batch:
+            history.setdefault(metric["metric_type"], deque(maxlen=1000))
+        _legacy_emit_all(history, legacy_clients, batch)
+    cpu = time.process_time() - started_cpu
+    api_started = time.perf_counter()
+    for _ in range(20):
+        _legacy_metrics_response(history)
+    results.append({"path": "per-metric emits", "emits": sent[0], "emits_per_tick": sent[0] / ticks,
+                    "bytes_per_tick": sent[1] / ticks, "cpu_ms_per_tick": cpu / ticks * 1000,
+                    "api_metrics_ms": (time.perf_counter() - api_started) / 20 * 1000})
+
+    async def run_plane():
+        clock = [1000.0]
+        plane = DashboardDataPlane(clock=lambda: clock[0])
+        counters = {"frames": 0, "bytes": 0, "slow_frames": 0}
+
+        async def fast(frame):
+            counters["frames"] += 1
+            counters["bytes"] += len(frame)
+
+        async def slow(frame):
+            counters["slow_frames"] += 1
+            await asyncio.sleep(0.003)  # 3 ticks en el reloj simulado de abajo
+
+        for i in range(clients):
+            topics = (ALL_TOPICS,) if i % 2 else tuple(f"metric_{t}" for t in range(0, metric_types, 2))
+            plane.connect(f"client{i}", slow if i < slow_clients else fast, topics, encoding)
+        cpu_started = time.process_time()
+        for batch in batches:
+            for metric in batch:
+                plane.publish(metric["metric_type"], metric["timestamp"], metric["value"], metric["node_id"],
+                              metric["unit"])
+            await plane.tick()
+            clock[0] += 1.0
+            await asyncio.sleep(0.001)  # un tick = 1 ms de tiempo real para los clientes lentos
+        await plane.drain()
+        cpu_used = time.process_time() - cpu_started
+        api_started = time.perf_counter()
+        for _ in range(20):
+            plane.metrics_json()
+        api_ms = (time.perf_counter() - api_started) / 20 * 1000
+        frames = counters["frames"] + counters["slow_frames"]
+        return {"path": f"data plane ({encoding})", "emits": frames, "emits_per_tick": frames / ticks,
+                "bytes_per_tick": counters["bytes"] / ticks, "cpu_ms_per_tick": cpu_used / ticks * 1000,
+                "api_metrics_ms": api_ms, "snapshots": plane.stats["snapshots"],
+                "skipped_ticks": plane.stats["skipped"]}
+
+    results.append(asyncio.run(run_plane()))
+    return results
+
+
+if __name__ == "__main__":
+    rows = benchmark_dashboard()
+    rows += benchmark_dashboard(encoding=BINARY_FRAMES)[1:]
+    for row in rows:
+        print(f"{row['path']:>22}: {row['emits_per_tick']:8.0f} emits/tick  {row['bytes_per_tick'] / 1024:8.1f} KB/tick  "
+              f"CPU {row['cpu_ms_per_tick']:7.2f} ms/tick  /api/metrics {row['api_metrics_ms']:.3f} ms"
+              + (f"  snapshots {row['snapshots']} skipped {row['skipped_ticks']}" if "snapshots" in row else ""))
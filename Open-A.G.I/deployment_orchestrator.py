@@ -44,6 +44,8 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import psutil
 import netifaces
 
+from probe_engine import ProbeEngine
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -693,9 +695,9 @@ class ConfigurationManager:
 class HealthChecker:
     """Verificador de salud de servicios"""
     
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.timeout = 10
+    def __init__(self, max_concurrency: int = 64):
+        # Sondeo asíncrono con sesiones keep-alive por nodo (sin bloquear el loop)
+        self.probe_engine = ProbeEngine(max_concurrency=max_concurrency, default_timeout=10)
     
     async def check_service_health(self, service_config: ServiceConfiguration, node_config: NodeConfiguration) -> Dict[str, Any]:
         """Verifica salud de servicio"""
@@ -709,23 +711,35 @@ class HealthChecker:
         }
         
         try:
-            # Verificar health check HTTP si está configurado
+            # Lanzar en paralelo el check HTTP y los de puertos
+            http_task = None
             if service_config.health_check and "http" in service_config.health_check:
                 http_check = service_config.health_check["http"]
-                url = f"http://{node_config.ip_address}:{http_check['port']}{http_check['path']}"
-                
-                start_time = time.time()
-                response = self.session.get(url)
-                response_time = time.time() - start_time
+                http_task = self.probe_engine.get(
+                    node_config.ip_address, http_check['port'], http_check['path']
+                )
+            port_tasks = [
+                self._check_port_connectivity(node_config.ip_address, port)
+                for port in service_config.ports
+            ]
+            results = await asyncio.gather(*([http_task] if http_task else []), *port_tasks)
+            
+            # Verificar health check HTTP si está configurado
+            if http_task is not None:
+                response = results[0]
+                results = results[1:]
+                if response.error is not None:
+                    raise ConnectionError(response.error)
+                response_time = response.latency
                 
                 health_result["response_time"] = response_time
                 
-                if response.status_code == 200:
+                if response.status == 200:
                     health_result["status"] = HealthStatus.HEALTHY
                     health_result["checks"].append({
                         "type": "http",
                         "status": "passed",
-                        "response_code": response.status_code,
+                        "response_code": response.status,
                         "response_time": response_time
                     })
                 else:
@@ -733,13 +747,12 @@ class HealthChecker:
                     health_result["checks"].append({
                         "type": "http",
                         "status": "failed",
-                        "response_code": response.status_code,
+                        "response_code": response.status,
                         "response_time": response_time
                     })
             
             # Verificar conectividad de puertos
-            for port in service_config.ports:
-                port_check = self._check_port_connectivity(node_config.ip_address, port)
+            for port_check in results:
                 health_result["checks"].append(port_check)
                 
                 if port_check["status"] == "failed" and health_result["status"] != HealthStatus.UNHEALTHY:
@@ -747,7 +760,7 @@ class HealthChecker:
             
             # Si no hay checks específicos, verificar conectividad básica
             if not health_result["checks"]:
-                basic_check = self._check_basic_connectivity(node_config.ip_address)
+                basic_check = await self._check_basic_connectivity(node_config.ip_address)
                 health_result["checks"].append(basic_check)
                 
                 if basic_check["status"] == "passed":
@@ -766,56 +779,45 @@ class HealthChecker:
         
         return health_result
     
-    def _check_port_connectivity(self, ip_address: str, port: int) -> Dict[str, Any]:
+    async def check_many(self, targets: List[Tuple[ServiceConfiguration, NodeConfiguration]]) -> List[Dict[str, Any]]:
+        """Verifica muchos pares servicio/nodo en paralelo (concurrencia acotada)"""
+        return list(await asyncio.gather(
+            *(self.check_service_health(service, node) for service, node in targets)
+        ))
+    
+    async def _check_port_connectivity(self, ip_address: str, port: int) -> Dict[str, Any]:
         """Verifica conectividad de puerto"""
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((ip_address, port))
-            sock.close()
-            
-            if result == 0:
-                return {
-                    "type": "port",
-                    "port": port,
-                    "status": "passed",
-                    "message": f"Puerto {port} accesible"
-                }
-            else:
-                return {
-                    "type": "port",
-                    "port": port,
-                    "status": "failed",
-                    "message": f"Puerto {port} no accesible"
-                }
-        except Exception as e:
+        result = await self.probe_engine.check_tcp(ip_address, port, timeout=5)
+        
+        if result.ok:
             return {
                 "type": "port",
                 "port": port,
-                "status": "failed",
-                "error": str(e)
+                "status": "passed",
+                "message": f"Puerto {port} accesible"
             }
-    
-    def _check_basic_connectivity(self, ip_address: str) -> Dict[str, Any]:
-        """Verifica conectividad básica"""
-        try:
-            # Ping básico usando socket
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.settimeout(5)
-            result = sock.connect_ex((ip_address, 22))  # SSH port como proxy de conectividad
-            sock.close()
-            
-            return {
-                "type": "connectivity",
-                "status": "passed" if result == 0 else "failed",
-                "message": f"Conectividad a {ip_address}: {'OK' if result == 0 else 'FAIL'}"
-            }
-        except Exception as e:
+        else:
             return {
-                "type": "connectivity",
+                "type": "port",
+                "port": port,
                 "status": "failed",
-                "error": str(e)
+                "message": f"Puerto {port} no accesible",
+                "error": result.error
             }
+    
+    async def _check_basic_connectivity(self, ip_address: str) -> Dict[str, Any]:
+        """Verifica conectividad básica"""
+        # Conexión TCP al puerto SSH como proxy de conectividad
+        result = await self.probe_engine.check_tcp(ip_address, 22, timeout=5)
+        
+        return {
+            "type": "connectivity",
+            "status": "passed" if result.ok else "failed",
+            "message": f"Conectividad a {ip_address}: {'OK' if result.ok else 'FAIL'}"
+        }
+    
+    async def close(self):
+        await self.probe_engine.close()
 
 class DeploymentOrchestrator:
     """Orquestador principal de despliegue"""
@@ -1251,13 +1253,10 @@ class DeploymentOrchestrator:
         try:
             logger.info("🏥 Verificando salud post-despliegue")
             
-            health_results = []
-            
-            # Verificar cada servicio en cada nodo
-            for service in config.services:
-                for node in config.nodes:
-                    health_result = await self.health_checker.check_service_health(service, node)
-                    health_results.append(health_result)
+            # Verificar cada servicio en cada nodo (en paralelo)
+            health_results = await self.health_checker.check_many([
+                (service, node) for service in config.services for node in config.nodes
+            ])
             
             # Actualizar estado de salud del despliegue
             healthy_services = sum(1 for result in health_results if result["status"] == HealthStatus.HEALTHY)
@@ -21,12 +21,12 @@ from typing import Dict, List, Set, Optional, Tuple, Any, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
 from collections import defaultdict, deque
-import pickle
-import base64
 from datetime import datetime, timedelta
 import random
 import math
 
+from tensor_codec import EncodedTensor, UpdateCodec, pack_tensors, unpack_tensors, unpack_update, apply_delta
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -72,6 +72,17 @@ class ModelUpdate:
     loss: float
     accuracy: float
     signature: str = ""
+    # Gradientes tal como llegan del códec (dispersos/cuantizados), si los hay
+    encoded_gradients: Optional[Dict[str, EncodedTensor]] = None
+
+    def dense_gradients(self) -> Dict[str, np.ndarray]:
+        """Gradientes densos (decodifica los comprimidos bajo demanda, sin cachear)"""
+        if self.gradients or not self.encoded_gradients:
+            return self.gradients
+        return {name: tensor.to_dense() for name, tensor in self.encoded_gradients.items()}
+
+    def layer_names(self) -> List[str]:
+        return list(self.gradients.keys() or (self.encoded_gradients or {}).keys())
 
 @dataclass
 class TrainingRound:
@@ -130,7 +141,8 @@ class PrivacyPreservingAggregator:
             return {}
         
         # Obtener estructura del modelo
-        layer_names = list(updates[0].gradients.keys())
+        layer_names = updates[0].layer_names()
+        dense_updates = [update.dense_gradients() for update in updates]
         aggregated_gradients = {}
         
         for layer_name in layer_names:
@@ -138,11 +150,11 @@ class PrivacyPreservingAggregator:
             layer_gradients = []
             weights = []
             
-            for update in updates:
-                if layer_name in update.gradients:
+            for update, gradients in zip(updates, dense_updates):
+                if layer_name in gradients:
                     # Añadir ruido para privacidad
                     noisy_gradient = self.add_differential_privacy_noise(
-                        {layer_name: update.gradients[layer_name]}
+                        {layer_name: gradients[layer_name]}
                     )[layer_name]
                     
                     layer_gradients.append(noisy_gradient)
@@ -209,7 +221,7 @@ class ByzantineRobustAggregator:
     
     def _is_gradient_anomalous(self, update: ModelUpdate) -> bool:
         """Detecta si los gradientes son anómalos"""
-        for layer_name, gradient in update.gradients.items():
+        for layer_name, gradient in update.dense_gradients().items():
             # Verificar magnitud de gradientes
             gradient_norm = np.linalg.norm(gradient)
             if gradient_norm > 100.0:  # Umbral configurable
@@ -238,11 +250,12 @@ class ByzantineRobustAggregator:
         if not updates:
             return {}
         
-        layer_names = list(updates[0].gradients.keys())
+        layer_names = updates[0].layer_names()
+        dense_updates = [update.dense_gradients() for update in updates]
         aggregated_gradients = {}
         
         for layer_name in layer_names:
-            gradients = [update.gradients[layer_name] for update in updates if layer_name in update.gradients]
+            gradients = [grads[layer_name] for grads in dense_updates if layer_name in grads]
             
             if gradients:
                 # Calcular mediana geométrica (aproximación iterativa)
@@ -308,13 +321,13 @@ class AttackDetector:
     def _detect_poisoning_attack(self, update: ModelUpdate) -> bool:
         """Detecta ataques de envenenamiento"""
         # Verificar magnitud de gradientes
-        for layer_name, gradient in update.gradients.items():
+        for layer_name, gradient in update.dense_gradients().items():
             gradient_norm = np.linalg.norm(gradient)
             
             # Comparar con historial del nodo
             node_history = self.update_history.get(update.node_id, [])
             if node_history:
-                historical_norms = [np.linalg.norm(u.gradients.get(layer_name, np.array([0]))) 
+                historical_norms = [np.linalg.norm(u.dense_gradients().get(layer_name, np.array([0]))) 
                                   for u in node_history[-10:]]  # Últimas 10 actualizaciones
                 avg_norm = np.mean(historical_norms)
                 
@@ -347,7 +360,7 @@ class AttackDetector:
     def _detect_backdoor_attack(self, update: ModelUpdate) -> bool:
         """Detecta ataques de backdoor"""
         # Verificar patrones sospechosos en gradientes
-        for layer_name, gradient in update.gradients.items():
+        for layer_name, gradient in update.dense_gradients().items():
             # Detectar patrones regulares que podrían indicar backdoors
             if self._has_suspicious_patterns(gradient):
                 return True
@@ -614,16 +627,25 @@ class DistributedLearningCoordinator:
         weights = [update.data_size / total_data_size for update in updates]
         
         # Obtener estructura del modelo
-        layer_names = list(updates[0].gradients.keys())
+        layer_names = updates[0].layer_names()
         aggregated_gradients = {}
         
         for layer_name in layer_names:
             # Promedio ponderado de gradientes
-            weighted_gradient = np.zeros_like(updates[0].gradients[layer_name])
+            weighted_gradient = None
             
             for update, weight in zip(updates, weights):
                 if layer_name in update.gradients:
-                    weighted_gradient += weight * update.gradients[layer_name]
+                    gradient = update.gradients[layer_name]
+                    if weighted_gradient is None:
+                        weighted_gradient = np.zeros_like(gradient, dtype=np.result_type(gradient, np.float32))
+                    weighted_gradient += weight * gradient
+                elif update.encoded_gradients and layer_name in update.encoded_gradients:
+                    # Forma dispersa/cuantizada: se acumula sin reconstruir el tensor
+                    encoded = update.encoded_gradients[layer_name]
+                    if weighted_gradient is None:
+                        weighted_gradient = np.zeros(encoded.shape, dtype=np.result_type(encoded.dtype, np.float32))
+                    encoded.accumulate_into(weighted_gradient, weight)
             
             aggregated_gradients[layer_name] = weighted_gradient
         
@@ -720,21 +742,33 @@ class DistributedLearningCoordinator:
         for node_id in self.current_round.participating_nodes:
             await self._send_completion_notification(node_id, completion_data)
     
-    def _serialize_model(self, model: Dict[str, np.ndarray]) -> str:
-        """Serializa el modelo para transmisión"""
+    def _serialize_model(self, model: Dict[str, np.ndarray]) -> bytes:
+        """Serializa el modelo para transmisión (contenedor binario de tensores)"""
         if not model:
-            return ""
+            return b""
         
         try:
-            # Convertir numpy arrays a listas para JSON
-            serializable_model = {
-                layer_name: weights.tolist()
-                for layer_name, weights in model.items()
-            }
-            return base64.b64encode(pickle.dumps(serializable_model)).decode('utf-8')
+            return pack_tensors(model, {"model_version": self.global_model_version})
         except Exception as e:
             logger.error(f"❌ Error serializando modelo: {e}")
-            return ""
+            return b""
+    
+    def _deserialize_model(self, payload: bytes) -> Dict[str, np.ndarray]:
+        """Reconstruye un modelo serializado con ``_serialize_model``"""
+        if not payload:
+            return {}
+        _, tensors = unpack_tensors(payload)
+        return {layer_name: tensor.to_dense() for layer_name, tensor in tensors.items()}
+    
+    async def receive_encoded_update(self, payload: bytes,
+                                     global_weights: Optional[Dict[str, np.ndarray]] = None) -> bool:
+        """Recibe una actualización en formato binario del códec"""
+        try:
+            update = decode_model_update(payload, global_weights)
+        except Exception as e:
+            logger.error(f"❌ Error decodificando actualización: {e}")
+            return False
+        return await self.receive_model_update(update)
     
     async def _send_completion_notification(self, node_id: str, completion_data: Dict[str, Any]):
         """Envía notificación de finalización a un nodo"""
@@ -849,6 +883,49 @@ class DistributedLearningCoordinator:
             }
         }
 
+
+def encode_model_update(update: ModelUpdate, codec: UpdateCodec,
+                        global_weights: Optional[Dict[str, np.ndarray]] = None) -> bytes:
+    """Codifica una actualización: gradientes comprimidos y pesos como delta del modelo global
+
+    Sin ``global_weights`` los pesos no se envían: el coordinador agrega gradientes.
+    """
+    meta = {
+        "node_id": update.node_id,
+        "model_id": update.model_id,
+        "update_id": update.update_id,
+        "metadata": update.metadata,
+        "timestamp": update.timestamp,
+        "local_epochs": update.local_epochs,
+        "data_size": update.data_size,
+        "loss": update.loss,
+        "accuracy": update.accuracy,
+        "signature": update.signature
+    }
+    weights = update.weights if global_weights is not None else None
+    return codec.encode_update(update.gradients, meta, weights, global_weights)
+
+
+def decode_model_update(payload: bytes, global_weights: Optional[Dict[str, np.ndarray]] = None) -> ModelUpdate:
+    """Decodifica una actualización manteniendo los gradientes en su forma comprimida"""
+    meta, gradients, weight_deltas = unpack_update(payload)
+    return ModelUpdate(
+        node_id=meta["node_id"],
+        model_id=meta["model_id"],
+        update_id=meta["update_id"],
+        gradients={},
+        weights=apply_delta(global_weights or {}, weight_deltas),
+        metadata=meta.get("metadata", {}),
+        timestamp=meta["timestamp"],
+        local_epochs=meta["local_epochs"],
+        data_size=meta["data_size"],
+        loss=meta["loss"],
+        accuracy=meta["accuracy"],
+        signature=meta.get("signature", ""),
+        encoded_gradients=gradients
+    )
+
+
 # Función principal para testing
 async def main():
     """Función principal para pruebas"""
@@ -6,7 +6,7 @@ Implementación robusta para detección, recuperación y mantenimiento de nodos
 Características principales:
 - Heartbeat distribuido con detección inteligente
 - Recuperación automática de nodos caídos
-- Replicación de datos críticos
+- Replicación de datos críticos con hashing consistente, hinted handoff y anti-entropía Merkle
 - Balanceador de carga resiliente
 - Monitoreo de salud en tiempo real
 """
@@ -16,14 +16,18 @@ import time
 import json
 import hashlib
 import logging
-from typing import Dict, List, Set, Optional, Tuple, Any
+from typing import Dict, List, Set, Optional, Tuple, Any, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
 from collections import defaultdict, deque
 import aiohttp
+from aiohttp import web
 import socket
 from datetime import datetime, timedelta
 
+from probe_engine import PhiAccrualFailureDetector, ProbeEngine
+from replication_ring import ConsistentHashRing, HintedHandoffStore, MerkleRangeTree
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -80,6 +84,16 @@ class HeartbeatManager:
         self.failure_detector_threshold = 3  # Fallos consecutivos para marcar como sospechoso
         self.recovery_timeout = 30.0  # Tiempo para intentar recuperación
         self.running = False
+        # Sondeo concurrente con sesiones keep-alive y detección phi-accrual
+        self.probe_engine = ProbeEngine(max_concurrency=64)
+        self.phi_detector = PhiAccrualFailureDetector(
+            threshold=8.0,
+            acceptable_pause=heartbeat_interval / 2,
+            first_heartbeat_estimate=heartbeat_interval
+        )
+        self.last_round_duration = 0.0
+        # Callbacks invocados con el node_id cuando un nodo vuelve a responder
+        self.recovery_listeners: List[Callable[[str], None]] = []
         
     async def start_heartbeat_service(self):
         """Inicia el servicio de heartbeat"""
@@ -95,6 +109,11 @@ class HeartbeatManager:
         
         await asyncio.gather(*tasks)
     
+    async def stop_heartbeat_service(self):
+        """Detiene el servicio y cierra las sesiones keep-alive"""
+        self.running = False
+        await self.probe_engine.close()
+    
     async def _send_heartbeats(self):
         """Envía heartbeats periódicos a todos los nodos conocidos"""
         while self.running:
@@ -107,12 +126,20 @@ class HeartbeatManager:
                     "sequence": int(time.time())
                 }
                 
-                # Enviar a todos los nodos activos
-                for node_id, node_info in self.nodes.items():
-                    if node_info.status in [NodeStatus.HEALTHY, NodeStatus.DEGRADED]:
-                        await self._send_heartbeat_to_node(node_info, heartbeat_data)
+                # Enviar a todos los nodos activos en paralelo; los nodos que ya
+                # recibieron tráfico de datos en este intervalo no necesitan heartbeat
+                round_start = time.time()
+                targets = [
+                    node_info for node_info in list(self.nodes.values())
+                    if node_info.status in [NodeStatus.HEALTHY, NodeStatus.DEGRADED]
+                    and not self.probe_engine.recently_sent(node_info.node_id, self.heartbeat_interval)
+                ]
+                await asyncio.gather(
+                    *(self._send_heartbeat_to_node(node_info, heartbeat_data) for node_info in targets)
+                )
+                self.last_round_duration = time.time() - round_start
                 
-                await asyncio.sleep(self.heartbeat_interval)
+                await asyncio.sleep(max(self.heartbeat_interval - self.last_round_duration, 0.0))
                 
             except Exception as e:
                 logger.error(f"❌ Error enviando heartbeats: {e}")
@@ -121,21 +148,49 @@ class HeartbeatManager:
     async def _send_heartbeat_to_node(self, node_info: NodeInfo, heartbeat_data: Dict):
         """Envía heartbeat a un nodo específico"""
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=3)) as session:
-                url = f"http://{node_info.address}:{node_info.port}/heartbeat"
-                async with session.post(url, json=heartbeat_data) as response:
-                    if response.status == 200:
-                        # Heartbeat exitoso
-                        node_info.failure_count = 0
-                        if node_info.status == NodeStatus.SUSPECTED:
-                            node_info.status = NodeStatus.HEALTHY
-                            logger.info(f"✅ Nodo {node_info.node_id} recuperado")
-                    else:
-                        await self._handle_heartbeat_failure(node_info)
+            result = await self.probe_engine.post(
+                node_info.address, node_info.port, "/heartbeat", heartbeat_data,
+                timeout=3, target=node_info.node_id
+            )
+            if result.ok:
+                # Heartbeat exitoso
+                self.record_arrival(node_info.node_id)
+            else:
+                await self._handle_heartbeat_failure(node_info)
                         
         except Exception as e:
             await self._handle_heartbeat_failure(node_info)
     
+    def record_arrival(self, node_id: str, load_metrics: Optional[Dict[str, float]] = None):
+        """Registra evidencia de vida de un nodo: respuesta de heartbeat o tráfico de datos"""
+        node_info = self.nodes.get(node_id)
+        if node_info is None:
+            return
+        
+        self.phi_detector.heartbeat(node_id)
+        node_info.last_heartbeat = time.time()
+        node_info.failure_count = 0
+        if load_metrics:
+            node_info.load_metrics = load_metrics
+        if node_info.status in [NodeStatus.SUSPECTED, NodeStatus.FAILED]:
+            node_info.status = NodeStatus.HEALTHY
+            logger.info(f"✅ Nodo {node_id} recuperado")
+            for listener in self.recovery_listeners:
+                listener(node_id)
+    
+    def piggyback_heartbeat(self, node_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Adjunta el heartbeat a un mensaje de datos saliente hacia un nodo
+        
+        El envío solo sustituye al heartbeat explícito cuando se entrega: quien
+        envía llama a ``probe_engine.note_sent`` tras una respuesta correcta.
+        """
+        payload["heartbeat"] = {
+            "node_id": self.node_id,
+            "timestamp": time.time(),
+            "status": "healthy"
+        }
+        return payload
+    
     async def _handle_heartbeat_failure(self, node_info: NodeInfo):
         """Maneja fallos de heartbeat"""
         node_info.failure_count += 1
@@ -162,8 +217,12 @@ class HeartbeatManager:
                 current_time = time.time()
                 
                 for node_id, node_info in list(self.nodes.items()):
-                    # Verificar timeout de heartbeat
-                    if current_time - node_info.last_heartbeat > self.heartbeat_interval * 3:
+                    # Verificar heartbeat: phi-accrual si hay historial, timeout fijo si no
+                    if self.phi_detector.has_history(node_id):
+                        timed_out = not self.phi_detector.is_available(node_id, current_time)
+                    else:
+                        timed_out = current_time - node_info.last_heartbeat > self.heartbeat_interval * 3
+                    if timed_out:
                         if node_info.status == NodeStatus.HEALTHY:
                             node_info.status = NodeStatus.SUSPECTED
                             logger.warning(f"⏰ Timeout de heartbeat para nodo {node_id}")
@@ -223,14 +282,32 @@ class HeartbeatManager:
             }
 
 class DataReplicationManager:
-    """Gestor de replicación de datos críticos"""
+    """Gestor de replicación de datos críticos
+    
+    La colocación usa un anillo de hashing consistente con nodos virtuales, de
+    modo que un cambio de membresía solo mueve ~1/N de las claves. Las escrituras
+    a réplicas caídas quedan como hints y se entregan cuando el nodo se recupera;
+    la lectura repara réplicas desactualizadas y la anti-entropía Merkle
+    resincroniza solo los rangos que difieren.
+    """
     
-    def __init__(self, node_id: str, replication_factor: int = 3):
+    def __init__(self, node_id: str, replication_factor: int = 3, vnodes: int = 128,
+                 merkle_depth: int = 10):
         self.node_id = node_id
         self.replication_factor = replication_factor
         self.data_store: Dict[str, Any] = {}
         self.replica_locations: Dict[str, List[str]] = {}  # data_key -> [node_ids]
         self.consistency_level = "quorum"  # "one", "quorum", "all"
+        self.heartbeat_manager: Optional[HeartbeatManager] = None
+        self.ring = ConsistentHashRing(vnodes)
+        self.ring.add_node(node_id)
+        self.hints = HintedHandoffStore()
+        self.merkle_depth = merkle_depth
+        # Un árbol por réplica par: cubre las claves que ambos nodos deben guardar
+        self.merkle_trees: Dict[str, MerkleRangeTree] = {}
+        self._merkle_ring_version = -1
+        self.stats = {"hints_stored": 0, "hints_delivered": 0, "read_repairs": 0,
+                      "anti_entropy_keys_pushed": 0, "anti_entropy_keys_pulled": 0}
         
     async def store_data(self, key: str, data: Any, critical: bool = False) -> bool:
         """Almacena datos con replicación automática"""
@@ -247,28 +324,37 @@ class DataReplicationManager:
             # Seleccionar nodos para replicación
             replica_nodes = await self._select_replica_nodes(key, critical)
             self.replica_locations[key] = replica_nodes
+            self._index_key(key)
             
-            # Replicar a nodos seleccionados
+            # Replicar a réplicas disponibles; las caídas reciben un hint
             replication_tasks = []
+            local_ack = self.node_id in replica_nodes
             for node_id in replica_nodes:
+                if node_id == self.node_id:
+                    continue
+                if not self._is_available(node_id):
+                    self._store_hint(node_id, key, self.data_store[key])
+                    continue
                 task = asyncio.create_task(
-                    self._replicate_to_node(node_id, key, self.data_store[key])
+                    self._replicate_or_hint(node_id, key, self.data_store[key])
                 )
                 replication_tasks.append(task)
             
             # Esperar replicación según nivel de consistencia
             if self.consistency_level == "all":
                 results = await asyncio.gather(*replication_tasks, return_exceptions=True)
-                success_count = sum(1 for r in results if r is True)
+                success_count = sum(1 for r in results if r is True) + local_ack
                 return success_count == len(replica_nodes)
             
             elif self.consistency_level == "quorum":
                 results = await asyncio.gather(*replication_tasks, return_exceptions=True)
-                success_count = sum(1 for r in results if r is True)
+                success_count = sum(1 for r in results if r is True) + local_ack
                 return success_count >= (len(replica_nodes) // 2 + 1)
             
             else:  # "one"
                 # Al menos una replicación exitosa
+                if local_ack:
+                    return True
                 for task in asyncio.as_completed(replication_tasks):
                     result = await task
                     if result is True:
@@ -279,23 +365,66 @@ class DataReplicationManager:
             logger.error(f"❌ Error almacenando datos {key}: {e}")
             return False
     
-    async def _select_replica_nodes(self, key: str, critical: bool) -> List[str]:
-        """Selecciona nodos óptimos para replicación"""
-        # Implementación simplificada - en producción usaría consistent hashing
-        available_nodes = [
-            node_id for node_id, node_info in self.heartbeat_manager.nodes.items()
-            if node_info.status in [NodeStatus.HEALTHY, NodeStatus.DEGRADED]
-        ]
+    async def read_data(self, key: str) -> Optional[Any]:
+        """Lee la versión más reciente de las réplicas y repara las desactualizadas"""
+        replica_nodes = await self._select_replica_nodes(key, False)
+        remote_nodes = [n for n in replica_nodes if n != self.node_id and self._is_available(n)]
+        responses = await asyncio.gather(
+            *(self._fetch_from_node(node_id, key) for node_id in remote_nodes),
+            return_exceptions=True
+        )
         
-        # Para datos críticos, preferir nodos con mejor reputación
-        if critical:
-            available_nodes.sort(
-                key=lambda nid: self.heartbeat_manager.nodes[nid].reputation_score,
-                reverse=True
-            )
+        entries: Dict[str, Optional[Dict]] = {}
+        if self.node_id in replica_nodes or key in self.data_store:
+            entries[self.node_id] = self.data_store.get(key)
+        for node_id, response in zip(remote_nodes, responses):
+            if not isinstance(response, Exception):
+                entries[node_id] = response
+        
+        candidates = [entry for entry in entries.values() if entry]
+        if not candidates:
+            return None
+        newest = max(candidates, key=self._entry_order)
+        
+        # Read repair: propagar la versión más reciente a quien no la tenga
+        for node_id, entry in entries.items():
+            if entry and entry.get("checksum") == newest.get("checksum"):
+                continue
+            if node_id == self.node_id:
+                self.apply_replica(key, newest)
+            else:
+                self.stats["read_repairs"] += 1
+                asyncio.ensure_future(self._replicate_or_hint(node_id, key, newest))
+        return newest.get("data")
+    
+    async def _select_replica_nodes(self, key: str, critical: bool) -> List[str]:
+        """Selecciona las réplicas de la clave en el anillo de hashing consistente
         
-        # Seleccionar hasta replication_factor nodos
-        return available_nodes[:min(self.replication_factor, len(available_nodes))]
+        La lista de preferencia es determinista para que todos los nodos coincidan
+        en la colocación; los nodos caídos siguen en ella y reciben hints.
+        """
+        self._sync_ring()
+        return self.ring.get_nodes(key, self.replication_factor)
+    
+    def _sync_ring(self):
+        """Alinea la membresía del anillo con los nodos conocidos"""
+        members = set(self.heartbeat_manager.nodes) if self.heartbeat_manager else set()
+        members.add(self.node_id)
+        self.ring.set_nodes(members)
+    
+    def _is_available(self, node_id: str) -> bool:
+        node_info = self.heartbeat_manager.nodes.get(node_id) if self.heartbeat_manager else None
+        return node_info is not None and node_info.status in [NodeStatus.HEALTHY, NodeStatus.DEGRADED]
+    
+    def _store_hint(self, node_id: str, key: str, data_entry: Dict):
+        if self.hints.add(node_id, key, data_entry):
+            self.stats["hints_stored"] += 1
+    
+    async def _replicate_or_hint(self, node_id: str, key: str, data_entry: Dict) -> bool:
+        success = await self._replicate_to_node(node_id, key, data_entry)
+        if not success:
+            self._store_hint(node_id, key, data_entry)
+        return success
     
     async def _replicate_to_node(self, node_id: str, key: str, data_entry: Dict) -> bool:
         """Replica datos a un nodo específico"""
@@ -304,21 +433,230 @@ class DataReplicationManager:
             if not node_info:
                 return False
             
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=5)) as session:
-                url = f"http://{node_info.address}:{node_info.port}/replicate"
-                payload = {
-                    "key": key,
-                    "data_entry": data_entry,
-                    "source_node": self.node_id
-                }
-                
-                async with session.post(url, json=payload) as response:
-                    return response.status == 200
+            payload = {
+                "key": key,
+                "data_entry": data_entry,
+                "source_node": self.node_id
+            }
+            # El heartbeat viaja con los datos replicados
+            self.heartbeat_manager.piggyback_heartbeat(node_id, payload)
+            
+            result = await self.heartbeat_manager.probe_engine.post(
+                node_info.address, node_info.port, "/replicate", payload,
+                timeout=5, target=node_id
+            )
+            if result.ok:
+                self.heartbeat_manager.probe_engine.note_sent(node_id)
+                self.heartbeat_manager.record_arrival(node_id)
+            return result.ok
                     
         except Exception as e:
             logger.error(f"❌ Error replicando a nodo {node_id}: {e}")
             return False
     
+    async def _fetch_from_node(self, node_id: str, key: str) -> Optional[Dict]:
+        """Obtiene la entrada de una clave desde una réplica"""
+        node_info = self.heartbeat_manager.nodes.get(node_id)
+        if not node_info:
+            return None
+        result = await self.heartbeat_manager.probe_engine.post(
+            node_info.address, node_info.port, "/replicate/get",
+            {"key": key, "source_node": self.node_id},
+            timeout=5, target=node_id, read_json=True
+        )
+        if not result.ok or not result.body:
+            return None
+        self.heartbeat_manager.record_arrival(node_id)
+        return result.body.get("data_entry")
+    
+    async def deliver_hints(self, node_id: str) -> int:
+        """Entrega las escrituras pendientes a un nodo recuperado"""
+        delivered = 0
+        for key, data_entry in self.hints.pending(node_id).items():
+            if not self._is_available(node_id):
+                break
+            if await self._replicate_to_node(node_id, key, data_entry):
+                self.hints.discard(node_id, key)
+                delivered += 1
+        if delivered:
+            self.stats["hints_delivered"] += delivered
+            logger.info(f"📬 {delivered} hints entregados a nodo {node_id}")
+        return delivered
+    
+    def on_node_recovered(self, node_id: str):
+        """Callback del gestor de heartbeats: programa la entrega de hints"""
+        if not self.hints.count(node_id):
+            return
+        try:
+            asyncio.get_running_loop().create_task(self.deliver_hints(node_id))
+        except RuntimeError:
+            pass  # Sin loop activo: se entregarán en el siguiente mantenimiento
+    
+    # --- Lado receptor (lo invocan los manejadores HTTP de /replicate y /merkle) ---
+    
+    def add_routes(self, app: web.Application):
+        """Registra los manejadores de /replicate, /replicate/get, /merkle y /merkle/range"""
+        app.router.add_post("/replicate", self._handle_replicate)
+        app.router.add_post("/replicate/get", self._handle_replicate_get)
+        app.router.add_post("/merkle", self._handle_merkle)
+        app.router.add_post("/merkle/range", self._handle_merkle_range)
+    
+    async def _read_request(self, request: web.Request) -> Dict[str, Any]:
+        """Cuerpo JSON de una petición entrante; el tráfico cuenta como heartbeat del emisor"""
+        body = await request.json()
+        if not isinstance(body, dict):
+            raise ValueError("se esperaba un objeto JSON")
+        sender = body.get("source_node") or body.get("peer")
+        if self.heartbeat_manager is not None and isinstance(sender, str):
+            self.heartbeat_manager.record_arrival(sender)
+        return body
+    
+    async def _respond(self, request: web.Request, build: Callable[[Dict[str, Any]], Dict[str, Any]]) -> web.Response:
+        try:
+            body = await self._read_request(request)
+            return web.json_response(build(body))
+        except (KeyError, TypeError, ValueError, IndexError) as e:
+            return web.json_response({"error": f"petición inválida: {e}"}, status=400)
+    
+    async def _handle_replicate(self, request: web.Request) -> web.Response:
+        def build(body):
+            entry = body["data_entry"]
+            if not isinstance(entry, dict) or "checksum" not in entry:
+                raise ValueError("data_entry sin checksum")
+            return {"applied": self.apply_replica(str(body["key"]), entry)}
+        return await self._respond(request, build)
+    
+    async def _handle_replicate_get(self, request: web.Request) -> web.Response:
+        return await self._respond(request, lambda body: {"data_entry": self.data_store.get(str(body["key"]))})
+    
+    async def _handle_merkle(self, request: web.Request) -> web.Response:
+        def build(body):
+            level, indices = int(body["level"]), [int(index) for index in body["indices"]]
+            if level < 0 or any(index < 0 for index in indices):
+                raise ValueError("nivel o índice negativo")
+            return {"hashes": self.get_merkle_hashes(str(body["peer"]), level, indices)}
+        return await self._respond(request, build)
+    
+    async def _handle_merkle_range(self, request: web.Request) -> web.Response:
+        def build(body):
+            ranges = [int(index) for index in body["ranges"]]
+            if any(index < 0 for index in ranges):
+                raise ValueError("rango negativo")
+            return {"entries": self.get_range_entries(str(body["peer"]), ranges)}
+        return await self._respond(request, build)
+    
+    def apply_replica(self, key: str, data_entry: Dict) -> bool:
+        """Aplica una réplica recibida si es más reciente (last-write-wins)"""
+        current = self.data_store.get(key)
+        if current and self._entry_order(current) >= self._entry_order(data_entry):
+            return False
+        self.data_store[key] = data_entry
+        self._index_key(key)
+        return True
+    
+    def get_merkle_hashes(self, peer_id: str, level: int, indices: List[int]) -> List[str]:
+        return self._merkle_tree_for(peer_id).hashes(level, indices)
+    
+    def get_range_entries(self, peer_id: str, ranges: List[int]) -> Dict[str, Dict[str, Any]]:
+        """Checksum y marca temporal de las claves de los rangos indicados"""
+        keys = self._merkle_tree_for(peer_id).bucket_entries(ranges)
+        return {
+            key: {"checksum": checksum, "timestamp": self.data_store[key]["timestamp"],
+                  "version": self.data_store[key]["version"]}
+            for key, checksum in keys.items()
+        }
+    
+    # --- Anti-entropía Merkle ---
+    
+    def _refresh_merkle_index(self):
+        """Reconstruye los árboles por réplica si cambió la membresía del anillo"""
+        self._sync_ring()
+        if self._merkle_ring_version == self.ring.version:
+            return
+        self._merkle_ring_version = self.ring.version
+        self.merkle_trees = {}
+        for key in self.data_store:
+            self._index_key(key, refresh=False)
+    
+    def _index_key(self, key: str, refresh: bool = True):
+        if refresh and self._merkle_ring_version != self.ring.version:
+            self._refresh_merkle_index()
+            return
+        replicas = self.ring.get_nodes(key, self.replication_factor)
+        if self.node_id not in replicas:
+            return
+        checksum = self.data_store[key]["checksum"]
+        for peer_id in replicas:
+            if peer_id != self.node_id:
+                tree = self.merkle_trees.get(peer_id)
+                if tree is None:
+                    tree = self.merkle_trees[peer_id] = MerkleRangeTree(self.merkle_depth)
+                tree.update(key, checksum)
+    
+    def _merkle_tree_for(self, peer_id: str) -> MerkleRangeTree:
+        self._refresh_merkle_index()
+        tree = self.merkle_trees.get(peer_id)
+        if tree is None:
+            tree = self.merkle_trees[peer_id] = MerkleRangeTree(self.merkle_depth)
+        return tree
+    
+    async def run_anti_entropy(self, peer_id: str) -> Dict[str, int]:
+        """Compara árboles Merkle con una réplica y sincroniza solo los rangos distintos"""
+        node_info = self.heartbeat_manager.nodes.get(peer_id) if self.heartbeat_manager else None
+        if node_info is None or not self._is_available(peer_id):
+            return {}
+        engine = self.heartbeat_manager.probe_engine
+        tree = self._merkle_tree_for(peer_id)
+        
+        async def fetch_hashes(level: int, indices: List[int]) -> List[str]:
+            result = await engine.post(
+                node_info.address, node_info.port, "/merkle",
+                {"peer": self.node_id, "level": level, "indices": indices},
+                timeout=5, target=peer_id, read_json=True
+            )
+            if not result.ok or not result.body:
+                raise ConnectionError(result.error or f"HTTP {result.status}")
+            return result.body["hashes"]
+        
+        try:
+            ranges, hashes_exchanged = await tree.diff_remote(fetch_hashes)
+            remote_entries: Dict[str, Dict[str, Any]] = {}
+            if ranges:
+                result = await engine.post(
+                    node_info.address, node_info.port, "/merkle/range",
+                    {"peer": self.node_id, "ranges": ranges},
+                    timeout=10, target=peer_id, read_json=True
+                )
+                if not result.ok or not result.body:
+                    raise ConnectionError(result.error or f"HTTP {result.status}")
+                remote_entries = result.body["entries"]
+        except Exception as e:
+            logger.warning(f"[WARN] Anti-entropía con {peer_id} fallida: {e}")
+            return {}
+        
+        pushed = pulled = 0
+        local_keys = tree.bucket_entries(ranges)
+        for key in set(local_keys) | set(remote_entries):
+            local, remote = self.data_store.get(key), remote_entries.get(key)
+            if remote is not None and local is not None and remote["checksum"] == local["checksum"]:
+                continue
+            if remote is None or (local is not None and self._entry_order(local) > self._entry_order(remote)):
+                if await self._replicate_to_node(peer_id, key, local):
+                    pushed += 1
+            else:
+                entry = await self._fetch_from_node(peer_id, key)
+                if entry and self.apply_replica(key, entry):
+                    pulled += 1
+        
+        self.stats["anti_entropy_keys_pushed"] += pushed
+        self.stats["anti_entropy_keys_pulled"] += pulled
+        return {"ranges": len(ranges), "hashes_exchanged": hashes_exchanged,
+                "keys_pushed": pushed, "keys_pulled": pulled}
+    
+    @staticmethod
+    def _entry_order(entry: Dict) -> Tuple[float, str]:
+        return (entry.get("timestamp", 0.0), entry.get("version", ""))
+    
     def _generate_version(self, key: str) -> str:
         """Genera versión única para el dato"""
         return f"{self.node_id}_{int(time.time() * 1000000)}"
@@ -342,6 +680,7 @@ class NodeRecoveryManager:
         }
         self.recovery_history: Dict[str, List[FailureEvent]] = defaultdict(list)
         self.max_recovery_attempts = 3
+        self.probe_engine = ProbeEngine(max_concurrency=16)
         
     async def initiate_recovery(self, node_info: NodeInfo, failure_type: FailureType) -> bool:
         """Inicia proceso de recuperación para un nodo"""
@@ -476,10 +815,11 @@ class NodeRecoveryManager:
     async def _ping_node(self, node_info: NodeInfo, timeout: int = 5) -> bool:
         """Verifica si un nodo responde"""
         try:
-            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
-                url = f"http://{node_info.address}:{node_info.port}/ping"
-                async with session.get(url) as response:
-                    return response.status == 200
+            result = await self.probe_engine.get(
+                node_info.address, node_info.port, "/ping",
+                timeout=timeout, target=node_info.node_id
+            )
+            return result.ok
         except:
             return False
 
@@ -497,6 +837,8 @@ class FaultToleranceOrchestrator:
         
         # Referencias cruzadas
         self.replication_manager.heartbeat_manager = self.heartbeat_manager
+        self.recovery_manager.probe_engine = self.heartbeat_manager.probe_engine
+        self.heartbeat_manager.recovery_listeners.append(self.replication_manager.on_node_recovered)
         
         # Estado del sistema
         self.system_health = "healthy"
@@ -548,12 +890,12 @@ class FaultToleranceOrchestrator:
         """Mantenimiento periódico del sistema"""
         while True:
             try:
+                # Optimizar replicación: hints pendientes y anti-entropía
+                await self._optimize_replication()
+                
                 # Limpiar historial antiguo
                 await self._cleanup_old_events()
                 
-                # Optimizar replicación
-                await self._optimize_replication()
-                
                 # Generar reporte de salud
                 await self._generate_health_report()
                 
@@ -563,6 +905,20 @@ class FaultToleranceOrchestrator:
                 logger.error(f"❌ Error en mantenimiento periódico: {e}")
                 await asyncio.sleep(60)
     
+    async def _optimize_replication(self):
+        """Entrega hints pendientes y ejecuta anti-entropía con las réplicas vecinas"""
+        replication = self.replication_manager
+        for node_id in replication.hints.nodes_with_hints():
+            if replication._is_available(node_id):
+                await replication.deliver_hints(node_id)
+        
+        replication._refresh_merkle_index()
+        for peer_id in list(replication.merkle_trees):
+            result = await replication.run_anti_entropy(peer_id)
+            if result.get("ranges"):
+                logger.info(f"🌳 Anti-entropía con {peer_id}: {result['ranges']} rangos, "
+                            f"{result['keys_pushed']} enviadas, {result['keys_pulled']} recibidas")
+    
     async def get_system_status(self) -> Dict[str, Any]:
         """Obtiene estado completo del sistema"""
         return {
@@ -580,7 +936,8 @@ class FaultToleranceOrchestrator:
             },
             "active_failures": len(self.active_failures),
             "replication_factor": self.replication_manager.replication_factor,
-            "data_entries": len(self.replication_manager.data_store)
+            "data_entries": len(self.replication_manager.data_store),
+            "pending_hints": self.replication_manager.hints.count()
         }
 
 # Función principal para testing
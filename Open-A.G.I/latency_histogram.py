@@ -0,0 +1,388 @@
+"""
+Latency Histogram Module for AEGIS
+
+This module provides the bounded latency statistics behind the API server's
+MetricsCollector:
+- Log-linear (HDR-style) buckets: exact below 2**precision_bits units, then
+  2**(precision_bits - 1) linear sub-buckets per power of two, so every
+  bucket is narrower than 1/64 of its value at the default precision
+- Fixed memory per histogram, independent of traffic
+- Mergeable snapshots (numpy count vectors) with p50/p90/p99/p99.9
+- Rolling windows by slot rotation: expired slots fold into a cumulative
+  histogram, so recording touches exactly one histogram
+- Prometheus text exposition format export
+- A benchmark of recording overhead (ns/request) against unbounded lists
+"""
+
+import math
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+# Prometheus bucket boundaries (seconds) for the exported histogram
+DEFAULT_PROMETHEUS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass(frozen=True)
+class HistogramLayout:
+    """Bucket layout shared by histograms that can be merged"""
+    unit: float = 1e-6          # seconds per integer unit (1 µs)
+    precision_bits: int = 7     # 64 sub-buckets per power of two
+    max_exponent: int = 32      # values up to 2**32 units (~71 min) are resolved
+
+    @property
+    def half_bits(self) -> int:
+        return self.precision_bits - 1
+
+    @property
+    def highest(self) -> int:
+        return (1 << self.max_exponent) - 1
+
+    @property
+    def size(self) -> int:
+        return self.index(self.highest) + 1
+
+    def index(self, units: int) -> int:
+        shift = units.bit_length() - self.precision_bits
+        if shift < 0:
+            shift = 0
+        return (shift << self.half_bits) + (units >> shift)
+
+    def bounds(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Lower and upper (exclusive) bound of every bucket, in units"""
+        indices = np.arange(self.size)
+        linear = 1 << self.precision_bits
+        half = 1 << self.half_bits
+        shift = np.where(indices < linear, 0, (indices - linear) // half + 1)
+        lower = np.where(indices < linear, indices, (indices - (shift << self.half_bits)) << shift)
+        return lower.astype(np.float64), (lower + (1 << shift)).astype(np.float64)
+
+
+DEFAULT_LAYOUT = HistogramLayout()
+_BOUNDS: Dict[HistogramLayout, Tuple[np.ndarray, np.ndarray]] = {}
+
+
+def _layout_bounds(layout: HistogramLayout) -> Tuple[np.ndarray, np.ndarray]:
+    bounds = _BOUNDS.get(layout)
+    if bounds is None:
+        bounds = _BOUNDS[layout] = layout.bounds()
+    return bounds
+
+
+class HistogramSnapshot:
+    """Immutable-by-convention histogram counts with exact count/sum/min/max"""
+
+    def __init__(self, layout: HistogramLayout = DEFAULT_LAYOUT, counts: Optional[np.ndarray] = None,
+                 count: int = 0, total: float = 0.0, minimum: float = math.inf, maximum: float = 0.0):
+        self.layout = layout
+        self.counts = counts if counts is not None else np.zeros(layout.size, dtype=np.int64)
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def merge(self, other: "HistogramSnapshot") -> "HistogramSnapshot":
+        """New snapshot holding both sets of observations"""
+        if other.layout != self.layout:
+            raise ValueError("Cannot merge histograms with different layouts")
+        return HistogramSnapshot(self.layout, self.counts + other.counts, self.count + other.count,
+                                 self.total + other.total, min(self.minimum, other.minimum),
+                                 max(self.maximum, other.maximum))
+
+    @classmethod
+    def merge_all(cls, snapshots: Iterable["HistogramSnapshot"],
+                  layout: HistogramLayout = DEFAULT_LAYOUT) -> "HistogramSnapshot":
+        merged = cls(layout)
+        for snapshot in snapshots:
+            merged = merged.merge(snapshot)
+        return merged
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantiles(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> Dict[float, float]:
+        """Values (seconds) at the given quantiles
+
+        Each value is the midpoint of the bucket holding the ranked
+        observation, clamped to the exact min/max.
+        """
+        if not self.count:
+            return {q: 0.0 for q in qs}
+        lower, upper = _layout_bounds(self.layout)
+        cumulative = np.cumsum(self.counts)
+        ranks = np.maximum(1, np.ceil(np.asarray(qs, dtype=np.float64) * self.count))
+        indices = np.searchsorted(cumulative, ranks)
+        values = (lower[indices] + upper[indices] - 1) / 2 * self.layout.unit
+        return {q: float(min(max(v, self.minimum), self.maximum)) for q, v in zip(qs, values)}
+
+    def cumulative_le(self, boundaries: Sequence[float]) -> List[int]:
+        """Observations at or below each boundary (seconds), bucket-resolution"""
+        if not self.count:
+            return [0] * len(boundaries)
+        _, upper = _layout_bounds(self.layout)
+        cumulative = np.cumsum(self.counts)
+        units = np.asarray(boundaries, dtype=np.float64) / self.layout.unit
+        # Buckets whose values all lie at or below the boundary
+        positions = np.searchsorted(upper - 1, units, side="right")
+        return [int(cumulative[p - 1]) if p else 0 for p in positions]
+
+    def summary(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, float]:
+        result = {
+            "count": self.count,
+            "avg": self.mean,
+            "min": self.minimum if self.count else 0.0,
+            "max": self.maximum,
+        }
+        for q, value in self.quantiles(qs).items():
+            result[quantile_label(q)] = value
+        return result
+
+
+def quantile_label(q: float) -> str:
+    """0.5 -> "p50", 0.999 -> "p999" """
+    digits = f"{q * 100:g}".replace(".", "")
+    return f"p{digits}"
+
+
+class LatencyHistogram:
+    """Fixed-size log-linear histogram of durations in seconds
+
+    Observations are appended to a small pending buffer and folded into the
+    bucket counts with vectorized numpy operations every `buffer_size`
+    records (and before any read), which keeps recording close to the cost
+    of a list append while memory stays fixed.
+    """
+
+    __slots__ = ("layout", "buffer_size", "counts", "count", "total", "minimum", "maximum", "pending")
+
+    def __init__(self, layout: HistogramLayout = DEFAULT_LAYOUT, buffer_size: int = 1024):
+        self.layout = layout
+        self.buffer_size = buffer_size
+        self.pending: List[float] = []
+        self.reset()
+
+    def reset(self):
+        self.pending.clear()
+        self.counts: Optional[np.ndarray] = None  # allocated on first flush
+        self.count = 0
+        self.total = 0.0
+        self.minimum = math.inf
+        self.maximum = 0.0
+
+    def record(self, seconds: float):
+        pending = self.pending
+        pending.append(seconds)
+        if len(pending) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Fold pending observations into the bucket counts"""
+        if not self.pending:
+            return
+        layout = self.layout
+        values = np.array(self.pending, dtype=np.float64)
+        self.pending.clear()
+        units = np.clip(values / layout.unit, 0, layout.highest).astype(np.int64)
+        # frexp's exponent is the bit length for positive integers (and 0 for 0)
+        shift = np.maximum(np.frexp(units)[1] - layout.precision_bits, 0)
+        indices = (shift << layout.half_bits) + (units >> shift)
+        if self.counts is None:
+            self.counts = np.zeros(layout.size, dtype=np.int64)
+        self.counts += np.bincount(indices, minlength=layout.size)
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+    def snapshot(self) -> HistogramSnapshot:
+        self.flush()
+        counts = self.counts.copy() if self.counts is not None else None
+        return HistogramSnapshot(self.layout, counts, self.count, self.total, self.minimum, self.maximum)
+
+    def __len__(self) -> int:
+        return self.count + len(self.pending)
+
+
+class RollingLatencyHistogram:
+    """Latency histogram with a cumulative view and a rolling window
+
+    The window is split into `slots` sub-histograms; recording goes to the
+    current slot. When a slot ages out it is folded into the cumulative
+    counts and reused, so memory is fixed at slots + 1 histograms.
+    """
+
+    def __init__(self, window: float = 60.0, slots: int = 6, layout: HistogramLayout = DEFAULT_LAYOUT,
+                 clock: Callable[[], float] = time.monotonic):
+        self.window = window
+        self.slots = slots
+        self.slot_width = window / slots
+        self.layout = layout
+        self.clock = clock
+        self.ring = [LatencyHistogram(layout) for _ in range(slots)]
+        self.retired = HistogramSnapshot(layout)
+        now = clock()
+        self._slot = int(now // self.slot_width)
+        self._slot_end = (self._slot + 1) * self.slot_width
+        self.current = self.ring[self._slot % slots]
+
+    def record(self, seconds: float, now: Optional[float] = None):
+        if now is None:
+            now = self.clock()
+        if now >= self._slot_end:
+            self._rotate(now)
+        self.current.record(seconds)
+
+    def _rotate(self, now: float):
+        target = int(now // self.slot_width)
+        # Retire every slot that has left the window (at most the whole ring)
+        for slot in range(max(self._slot + 1, target - self.slots + 1), target + 1):
+            histogram = self.ring[slot % self.slots]
+            if len(histogram):
+                self.retired = self.retired.merge(histogram.snapshot())
+                histogram.reset()
+        self._slot = target
+        self._slot_end = (target + 1) * self.slot_width
+        self.current = self.ring[target % self.slots]
+
+    def window_snapshot(self, window: Optional[float] = None) -> HistogramSnapshot:
+        """Observations from the last `window` seconds (slot resolution, default the full window)"""
+        now = self.clock()
+        if now >= self._slot_end:
+            self._rotate(now)
+        slots = self.slots if window is None else max(1, min(self.slots, math.ceil(window / self.slot_width)))
+        recent = (self.ring[(self._slot - k) % self.slots] for k in range(slots))
+        return HistogramSnapshot.merge_all((h.snapshot() for h in recent if len(h)), self.layout)
+
+    @property
+    def count(self) -> int:
+        """Observations since creation"""
+        return self.retired.count + sum(len(histogram) for histogram in self.ring)
+
+    def snapshot(self) -> HistogramSnapshot:
+        """All observations since creation"""
+        return self.retired.merge(self.window_snapshot())
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(labels.items()) + ([extra] if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape_label(str(value))}"' for key, value in items) + "}"
+
+
+def prometheus_histogram(name: str, help_text: str, series: Iterable[Tuple[Dict[str, str], HistogramSnapshot]],
+                         buckets: Sequence[float] = DEFAULT_PROMETHEUS_BUCKETS) -> str:
+    """Prometheus text format for cumulative histograms (one per label set)"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, snapshot in series:
+        for boundary, count in zip(buckets, snapshot.cumulative_le(buckets)):
+            lines.append(f"{name}_bucket{_labels(labels, ('le', f'{boundary:g}'))} {count}")
+        lines.append(f"{name}_bucket{_labels(labels, ('le', '+Inf'))} {snapshot.count}")
+        lines.append(f"{name}_sum{_labels(labels)} {snapshot.total:.9g}")
+        lines.append(f"{name}_count{_labels(labels)} {snapshot.count}")
+    return "\n".join(lines) + "\n"
+
+
+def prometheus_summary(name: str, help_text: str, series: Iterable[Tuple[Dict[str, str], HistogramSnapshot]],
+                       qs: Sequence[float] = DEFAULT_QUANTILES) -> str:
+    """Prometheus text format for quantile summaries (used for rolling windows)"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+    for labels, snapshot in series:
+        for q, value in snapshot.quantiles(qs).items():
+            lines.append(f"{name}{_labels(labels, ('quantile', f'{q:g}'))} {value:.9g}")
+        lines.append(f"{name}_sum{_labels(labels)} {snapshot.total:.9g}")
+        lines.append(f"{name}_count{_labels(labels)} {snapshot.count}")
+    return "\n".join(lines) + "\n"
+
+
+def benchmark_recording(requests: int = 1_000_000, endpoints: int = 20, seed: int = 0) -> List[Dict[str, float]]:
+    """
+    ns/request for recording and ms for a /metrics read after `requests`
+    observations, plus retained memory, for the previous list-based
+    collector and the histogram collector (imported from api_server).
+    """
+    from api_server import MetricsCollector
+
+    class ListMetricsCollector:
+        """Previous collector: unbounded lists per server and per endpoint"""
+
+        def __init__(self):
+            self.request_count = 0
+            self.error_count = 0
+            self.response_times = []
+            self.endpoint_metrics = {}
+
+        def record_request(self, endpoint, response_time, success=True, status_code=None):
+            self.request_count += 1
+            if not success:
+                self.error_count += 1
+            self.response_times.append(response_time)
+            if endpoint not in self.endpoint_metrics:
+                self.endpoint_metrics[endpoint] = {"count": 0, "errors": 0, "response_times": []}
+            self.endpoint_metrics[endpoint]["count"] += 1
+            if not success:
+                self.endpoint_metrics[endpoint]["errors"] += 1
+            self.endpoint_metrics[endpoint]["response_times"].append(response_time)
+
+        def get_metrics(self):
+            times = self.response_times
+            return {"avg_response_time": sum(times) / len(times), "max_response_time": max(times),
+                    "min_response_time": min(times), "endpoint_metrics": self.endpoint_metrics}
+
+    rng = np.random.default_rng(seed)
+    latencies = rng.lognormal(mean=math.log(0.02), sigma=0.8, size=requests).tolist()
+    names = [f"GET /api/v1/resource{i}" for i in range(endpoints)]
+    endpoint_of = [names[i] for i in rng.integers(0, endpoints, size=requests)]
+    statuses = rng.choice([200, 404, 500], p=[0.97, 0.02, 0.01], size=requests).tolist()
+
+    results = []
+    for name, factory in (("unbounded lists", ListMetricsCollector), ("histograms", MetricsCollector)):
+        collector = factory()
+        record = collector.record_request
+        started = time.perf_counter_ns()
+        for endpoint, latency, status in zip(endpoint_of, latencies, statuses):
+            record(endpoint, latency, status < 400, status)
+        ns_per_request = (time.perf_counter_ns() - started) / requests
+        started = time.perf_counter()
+        collector.get_metrics()
+        read_ms = (time.perf_counter() - started) * 1000
+        del collector, record
+
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        collector = factory()
+        for endpoint, latency, status in zip(endpoint_of, latencies, statuses):
+            collector.record_request(endpoint, latency, status < 400, status)
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        del collector
+        results.append({"collector": name, "ns_per_request": ns_per_request, "metrics_read_ms": read_ms,
+                        "retained_mb": retained / 2 ** 20})
+
+    # Quantile accuracy against the exact values
+    exact = np.quantile(latencies, DEFAULT_QUANTILES)
+    histogram = LatencyHistogram()
+    for latency in latencies:
+        histogram.record(latency)
+    estimated = histogram.snapshot().quantiles()
+    results.append({"collector": "quantile error", **{
+        quantile_label(q): abs(estimated[q] - e) / e for q, e in zip(DEFAULT_QUANTILES, exact)}})
+    return results
+
+
+if __name__ == "__main__":
+    rows = benchmark_recording()
+    for row in rows[:-1]:
+        print(f"{row['collector']:>16}: record {row['ns_per_request']:6.0f} ns/request  "
+              f"/metrics {row['metrics_read_ms']:8.1f} ms  retained {row['retained_mb']:7.1f} MB")
+    errors = ", ".join(f"{key} {value:.3%}" for key, value in rows[-1].items() if key != "collector")
+    print(f"Relative quantile error: {errors}")
@@ -9,15 +9,26 @@ loguru implementation in main.py with advanced features including:
 - Structured logging with JSON support
 - Performance monitoring integration
 - Security-aware logging with sensitive data filtering
+- Non-blocking pipeline: callers only enqueue; a background writer formats,
+  redacts and writes records in batches, and rotation/compression run off-thread
 """
 
 import logging
 import logging.handlers
+import atexit
+import copy
 import json
 import os
+import re
 import sys
+import threading
+import time
 import traceback
-from typing import Dict, Any, Optional
+import weakref
+import zipfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Optional, Callable, List
 from datetime import datetime
 from pathlib import Path
 import asyncio
@@ -57,55 +68,91 @@ class LogConfig:
     include_timestamp: bool = True
     include_thread_info: bool = False
     sensitive_fields: list = None
+    # Asynchronous pipeline: the calling thread only enqueues records
+    async_pipeline: bool = True
+    queue_size: int = 10000
+    batch_size: int = 512
+    flush_interval: float = 0.05
+    overflow_policy: str = "drop_newest"  # "drop_newest", "drop_oldest", "block"
+    block_timeout: float = 0.1
     
     def __post_init__(self):
         if self.sensitive_fields is None:
             self.sensitive_fields = ["password", "secret", "token", "key", "private"]
 
+class SensitiveDataRedactor:
+    """Precompiled redaction of sensitive keys and ``key=value`` pairs
+    
+    All sensitive field names are folded into one case-insensitive pattern, so
+    a clean message costs a single regex scan regardless of how many fields
+    are configured.
+    """
+    
+    MASK = "***MASKED***"
+    
+    def __init__(self, sensitive_fields: list):
+        self.sensitive_fields = list(sensitive_fields)
+        alternatives = "|".join(
+            re.escape(field) for field in sorted(self.sensitive_fields, key=len, reverse=True)
+        ) or r"(?!)"
+        self._key_pattern = re.compile(alternatives, re.IGNORECASE)
+        self._pair_pattern = re.compile(
+            r"(?P<key>[\"']?[\w.-]*(?:" + alternatives + r")[\w.-]*[\"']?)"
+            r"(?P<sep>\s*[=:]\s*)(?P<quote>[\"']?)(?P<value>[^\s,;&\"'}\])]+)",
+            re.IGNORECASE
+        )
+    
+    def is_sensitive_key(self, key: Any) -> bool:
+        return isinstance(key, str) and self._key_pattern.search(key) is not None
+    
+    def redact_text(self, text: str) -> str:
+        """Mask the value of every sensitive ``key=value`` / ``key: value`` pair"""
+        return self._pair_pattern.sub(
+            lambda m: f"{m.group('key')}{m.group('sep')}{m.group('quote')}{self.MASK}", text
+        )
+    
+    def redact_value(self, value: Any) -> Any:
+        """Mask sensitive keys in mappings (recursively) and pairs in strings"""
+        if isinstance(value, dict):
+            return {
+                key: self.MASK if self.is_sensitive_key(key) else self.redact_value(item)
+                for key, item in value.items()
+            }
+        if isinstance(value, (list, tuple)):
+            return type(value)(self.redact_value(item) for item in value)
+        if isinstance(value, str):
+            return self.redact_text(value)
+        return value
+
+
 class SensitiveDataFilter(logging.Filter):
     """Filter to remove sensitive data from logs"""
     
     def __init__(self, sensitive_fields: list):
         super().__init__()
         self.sensitive_fields = sensitive_fields
+        self.redactor = SensitiveDataRedactor(sensitive_fields)
     
     def filter(self, record: logging.LogRecord) -> bool:
         """Filter sensitive data from log records"""
-        # Convert record args to string and check for sensitive data
-        if record.args:
-            args_str = str(record.args)
-            for field in self.sensitive_fields:
-                if field.lower() in args_str.lower():
-                    # Replace sensitive data with masked values
-                    record.args = self._mask_sensitive_data(record.args)
+        redact_record(record, self.redactor)
         return True
-    
-    def _mask_sensitive_data(self, data) -> tuple:
-        """Mask sensitive data in log arguments"""
-        if isinstance(data, dict):
-            masked_data = {}
-            for key, value in data.items():
-                if any(sensitive_field.lower() in key.lower() for sensitive_field in self.sensitive_fields):
-                    masked_data[key] = "***MASKED***"
-                else:
-                    masked_data[key] = value
-            return (masked_data,)
-        elif isinstance(data, (list, tuple)):
-            masked_data = []
-            for item in data:
-                if isinstance(item, dict):
-                    masked_item = {}
-                    for key, value in item.items():
-                        if any(sensitive_field.lower() in key.lower() for sensitive_field in self.sensitive_fields):
-                            masked_item[key] = "***MASKED***"
-                        else:
-                            masked_item[key] = value
-                    masked_data.append(masked_item)
-                else:
-                    masked_data.append(item)
-            return (masked_data,)
+
+
+def redact_record(record: logging.LogRecord, redactor: SensitiveDataRedactor):
+    """Redact a standard logging record in place (arguments and final message)"""
+    if record.args:
+        if isinstance(record.args, dict):
+            record.args = redactor.redact_value(record.args)
         else:
-            return data
+            record.args = tuple(
+                redactor.redact_value(arg) if isinstance(arg, (dict, list, tuple)) else arg
+                for arg in record.args
+            )
+    message = record.getMessage()
+    redacted = redactor.redact_text(message)
+    if redacted != message:
+        record.msg, record.args = redacted, None
 
 class StructuredFormatter(logging.Formatter):
     """Formatter for structured logging with JSON support"""
@@ -137,17 +184,332 @@ class StructuredFormatter(logging.Formatter):
             
             if record.exc_info:
                 log_entry["exception"] = self.formatException(record.exc_info)
+            elif record.exc_text:
+                log_entry["exception"] = record.exc_text
             
             return json.dumps(log_entry, ensure_ascii=False)
         else:
             return super().format(record)
 
+class StreamSink:
+    """Pipeline sink writing batches to a text stream"""
+    
+    def __init__(self, stream):
+        self.stream = stream
+    
+    def write(self, data: str):
+        self.stream.write(data)
+    
+    def flush(self):
+        self.stream.flush()
+    
+    def close(self):
+        self.flush()
+
+
+class RotatingFileSink:
+    """Pipeline sink with size-based rotation and off-thread zip compression
+    
+    Batches are appended with one buffered write each. When the file exceeds
+    ``max_bytes`` it is renamed aside and reopened; compressing the rotated file
+    and pruning old backups happen on a separate worker thread, so neither the
+    callers nor the pipeline writer wait for them.
+    """
+    
+    def __init__(self, path: Path, max_bytes: int, backup_count: int,
+                 compression: Optional[str] = "zip", buffer_size: int = 1 << 20):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.rotations = 0
+        self.compressions = 0
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="aegis-log-compress")
+        self._open()
+    
+    def _open(self):
+        self._file = open(self.path, "ab", buffering=self.buffer_size)
+        self._size = self._file.tell()
+    
+    def write(self, data: str):
+        encoded = data.encode("utf-8", errors="replace")
+        self._file.write(encoded)
+        self._size += len(encoded)
+        if self.max_bytes and self._size >= self.max_bytes:
+            self.rotate()
+    
+    def flush(self):
+        self._file.flush()
+    
+    def rotate(self):
+        self._file.close()
+        rotated = self.path.with_name(f"{self.path.name}.{time.time_ns()}")
+        os.replace(self.path, rotated)
+        self.rotations += 1
+        self._open()
+        if self.compression == "zip":
+            self._compressor.submit(self._compress, rotated)
+        else:
+            self._prune()
+    
+    def _compress(self, rotated: Path):
+        try:
+            with zipfile.ZipFile(f"{rotated}.zip", "w", zipfile.ZIP_DEFLATED) as archive:
+                archive.write(rotated, arcname=rotated.name)
+            rotated.unlink()
+            self.compressions += 1
+        except Exception as e:
+            print(f"AEGIS log compression failed for {rotated}: {e}", file=sys.stderr)
+        self._prune()
+    
+    def _prune(self):
+        backups = sorted(
+            (p for p in self.path.parent.glob(f"{self.path.name}.*") if p.is_file()),
+            key=lambda p: p.name
+        )
+        for old in backups[:-self.backup_count] if self.backup_count else backups:
+            try:
+                old.unlink()
+            except OSError:
+                pass
+    
+    def close(self):
+        try:
+            self._file.close()
+        finally:
+            self._compressor.shutdown(wait=True)
+
+
+_active_pipelines = weakref.WeakSet()
+
+
+class LogPipeline:
+    """Bounded, non-blocking log pipeline with a batching background writer
+    
+    ``submit`` is the only work done on the caller's thread: a ``deque.append``
+    (atomic under the GIL, no lock taken). The writer thread wakes every
+    ``flush_interval`` seconds, or as soon as a batch fills up or an ERROR+
+    record arrives, then formats, redacts and writes whole batches.
+    
+    Overflow policies when ``queue_size`` records are pending:
+    - ``drop_newest``: the new record is discarded (the caller never waits)
+    - ``drop_oldest``: the oldest pending record is discarded
+    - ``block``: the caller waits up to ``block_timeout`` for space, then drops
+    """
+    
+    POLICIES = ("drop_newest", "drop_oldest", "block")
+    YIELD_EVERY = 16
+    
+    def __init__(self, formatter: Callable[[Any], str], sinks: List[Any],
+                 queue_size: int = 10000, batch_size: int = 512,
+                 flush_interval: float = 0.05, overflow_policy: str = "drop_newest",
+                 block_timeout: float = 0.1, wake_level: int = logging.ERROR):
+        if overflow_policy not in self.POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+        self.formatter = formatter
+        self.sinks = sinks
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.wake_level = wake_level
+        
+        self._queue = deque()
+        self._wakeup = threading.Event()
+        self._space = threading.Condition()
+        self._stop = threading.Event()
+        self._drop_lock = threading.Lock()
+        self._draining = False
+        self.counters = {
+            "written": 0, "dropped": 0, "block_timeouts": 0, "batches": 0,
+            "bytes_written": 0, "format_errors": 0, "write_errors": 0,
+            "max_queue_depth": 0
+        }
+        
+        self._thread = threading.Thread(target=self._run, name="aegis-log-writer", daemon=True)
+        self._thread.start()
+        _active_pipelines.add(self)
+    
+    def submit(self, levelno: int, entry: Any) -> bool:
+        """Enqueue a record; returns False if it was dropped"""
+        queue = self._queue
+        if len(queue) >= self.queue_size:
+            if not self._make_room():
+                return False
+        queue.append(entry)
+        if levelno >= self.wake_level or len(queue) >= self.batch_size:
+            self._wakeup.set()
+        return True
+    
+    def _make_room(self) -> bool:
+        if self.overflow_policy == "drop_oldest":
+            try:
+                self._queue.popleft()
+            except IndexError:
+                pass
+            self._count_drop()
+            return True
+        if self.overflow_policy == "block" and self._thread.is_alive():
+            self._wakeup.set()
+            with self._space:
+                if self._space.wait_for(lambda: len(self._queue) < self.queue_size, self.block_timeout):
+                    return True
+            with self._drop_lock:
+                self.counters["block_timeouts"] += 1
+        self._count_drop()
+        return False
+    
+    def _count_drop(self):
+        with self._drop_lock:
+            self.counters["dropped"] += 1
+    
+    def _run(self):
+        while not self._stop.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self._drain()
+        self._drain()
+    
+    def _drain(self):
+        queue = self._queue
+        if not queue:
+            return
+        self._draining = True
+        try:
+            self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], len(queue))
+            while queue:
+                batch = []
+                try:
+                    for _ in range(self.batch_size):
+                        batch.append(queue.popleft())
+                except IndexError:
+                    pass
+                with self._space:
+                    self._space.notify_all()
+                self._write_batch(batch)
+            for sink in self.sinks:
+                try:
+                    sink.flush()
+                except Exception:
+                    self.counters["write_errors"] += 1
+        finally:
+            self._draining = False
+    
+    def _write_batch(self, batch: List[Any]):
+        lines = []
+        for index, entry in enumerate(batch, 1):
+            try:
+                lines.append(self.formatter(entry))
+            except Exception:
+                self.counters["format_errors"] += 1
+            if index % self.YIELD_EVERY == 0:
+                # Release the GIL so logging callers are not held for a whole batch
+                time.sleep(0)
+        if not lines:
+            return
+        data = "\n".join(lines) + "\n"
+        for sink in self.sinks:
+            try:
+                sink.write(data)
+            except Exception:
+                self.counters["write_errors"] += 1
+        self.counters["written"] += len(lines)
+        self.counters["batches"] += 1
+        self.counters["bytes_written"] += len(data)
+    
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Wait until every record submitted so far has been written"""
+        if not self._thread.is_alive():
+            self._drain()
+            return True
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if not self._queue and not self._draining:
+                return True
+            self._wakeup.set()
+            time.sleep(0.001)
+        return False
+    
+    def close(self, timeout: float = 5.0):
+        """Stop the writer after draining pending records and close the sinks"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self._wakeup.set()
+        self._thread.join(timeout)
+        self._drain()
+        for sink in self.sinks:
+            try:
+                sink.close()
+            except Exception:
+                pass
+        _active_pipelines.discard(self)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.counters)
+        stats["queue_depth"] = len(self._queue)
+        stats["overflow_policy"] = self.overflow_policy
+        for sink in self.sinks:
+            if isinstance(sink, RotatingFileSink):
+                stats["rotations"] = sink.rotations
+                stats["compressions"] = sink.compressions
+        return stats
+
+
+@atexit.register
+def _close_active_pipelines():
+    for pipeline in list(_active_pipelines):
+        pipeline.close()
+
+
+_exception_formatter = logging.Formatter()
+
+
+class PipelineHandler(logging.Handler):
+    """Standard logging handler that hands prepared records to a LogPipeline"""
+    
+    def __init__(self, pipeline: LogPipeline):
+        super().__init__()
+        self.pipeline = pipeline
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Snapshot the record like QueueHandler.prepare before it crosses threads
+        
+        The message is interpolated now, while the arguments still hold the values
+        they had at the call site, and the traceback is rendered to text so the
+        queued record does not keep frames (and their locals) alive.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+    
+    def handle(self, record: logging.LogRecord) -> bool:
+        # No handler lock or filters on the hot path: submit() is thread-safe
+        try:
+            record = self.prepare(record)
+        except Exception:
+            self.handleError(record)
+            return False
+        return self.pipeline.submit(record.levelno, record)
+    
+    def emit(self, record: logging.LogRecord):
+        self.handle(record)
+
+
 class AEGISLogger:
     """Main logging system for AEGIS"""
     
     def __init__(self, config: LogConfig = None):
         self.config = config or LogConfig()
         self.logger = None
+        self.pipeline: Optional[LogPipeline] = None
+        self.redactor = SensitiveDataRedactor(self.config.sensitive_fields)
         self._setup_logger()
     
     def _setup_logger(self):
@@ -156,6 +518,10 @@ class AEGISLogger:
         log_dir = Path(self.config.log_dir)
         log_dir.mkdir(exist_ok=True)
         
+        if self.config.async_pipeline:
+            self._setup_pipeline(log_dir)
+            return
+        
         # Initialize logger
         if LOGURU_AVAILABLE:
             # Configure loguru
@@ -179,24 +545,17 @@ class AEGISLogger:
                     format="{time:YYYY-MM-DD HH:mm:ss} | {level: <8} | {name}:{function}:{line} - {message}",
                     rotation=f"{self.config.max_file_size} B",
                     retention=self.config.backup_count,
-                    compression="zip"
+                    compression="zip",
+                    filter=self._loguru_filter
                 )
             
             self.logger = logger
         else:
             # Configure standard logging
-            self.logger = logging.getLogger("AEGIS")
-            self.logger.setLevel(getattr(logging, self.config.log_level))
-            
-            # Clear existing handlers
-            self.logger.handlers.clear()
+            self.logger = self._std_logger()
             
             # Create formatter
-            formatter = StructuredFormatter(
-                json_format=self.config.json_format,
-                include_timestamp=self.config.include_timestamp,
-                include_thread_info=self.config.include_thread_info
-            )
+            formatter = self._std_formatter()
             
             # Add console handler
             if self.config.enable_console:
@@ -217,11 +576,116 @@ class AEGISLogger:
                 file_handler.addFilter(SensitiveDataFilter(self.config.sensitive_fields))
                 self.logger.addHandler(file_handler)
     
+    def _std_logger(self) -> logging.Logger:
+        std_logger = logging.getLogger("AEGIS")
+        std_logger.setLevel(getattr(logging, self.config.log_level))
+        # Clear existing handlers
+        std_logger.handlers.clear()
+        return std_logger
+    
+    def _std_formatter(self) -> StructuredFormatter:
+        return StructuredFormatter(
+            json_format=self.config.json_format,
+            include_timestamp=self.config.include_timestamp,
+            include_thread_info=self.config.include_thread_info
+        )
+    
+    def _setup_pipeline(self, log_dir: Path):
+        """Route every record through a LogPipeline; callers only enqueue"""
+        sinks = []
+        if self.config.enable_console:
+            sinks.append(StreamSink(sys.stderr if LOGURU_AVAILABLE else sys.stdout))
+        if self.config.enable_file:
+            sinks.append(RotatingFileSink(
+                log_dir / self.config.log_file,
+                max_bytes=self.config.max_file_size,
+                backup_count=self.config.backup_count
+            ))
+        
+        if LOGURU_AVAILABLE:
+            formatter = self._format_loguru_record
+        else:
+            std_formatter = self._std_formatter()
+            
+            def formatter(record: logging.LogRecord) -> str:
+                redact_record(record, self.redactor)
+                return std_formatter.format(record)
+        
+        self.pipeline = LogPipeline(
+            formatter, sinks,
+            queue_size=self.config.queue_size,
+            batch_size=self.config.batch_size,
+            flush_interval=self.config.flush_interval,
+            overflow_policy=self.config.overflow_policy,
+            block_timeout=self.config.block_timeout
+        )
+        
+        if LOGURU_AVAILABLE:
+            logger.remove()  # Remove default handler
+            pipeline = self.pipeline
+            logger.add(
+                lambda message: pipeline.submit(message.record["level"].no, message.record),
+                level=self.config.log_level,
+                format="{message}"
+            )
+            self.logger = logger
+        else:
+            self.logger = self._std_logger()
+            self.logger.addHandler(PipelineHandler(self.pipeline))
+    
+    def _format_loguru_record(self, record: Dict[str, Any]) -> str:
+        """Format and redact a loguru record on the pipeline writer thread"""
+        message = self.redactor.redact_text(record["message"])
+        exception = None
+        if record["exception"] is not None:
+            exc_type, exc_value, exc_tb = record["exception"]
+            exception = "".join(traceback.format_exception(exc_type, exc_value, exc_tb)).rstrip()
+        
+        if self.config.json_format:
+            log_entry = {
+                "level": record["level"].name,
+                "message": message,
+                "module": record["module"],
+                "function": record["function"],
+                "line": record["line"]
+            }
+            if self.config.include_timestamp:
+                log_entry["timestamp"] = record["time"].isoformat()
+            if self.config.include_thread_info:
+                log_entry["thread_id"] = record["thread"].id
+                log_entry["thread_name"] = record["thread"].name
+            if exception:
+                log_entry["exception"] = exception
+            return json.dumps(log_entry, ensure_ascii=False)
+        
+        line = (f"{record['time']:%Y-%m-%d %H:%M:%S} | {record['level'].name: <8} | "
+                f"{record['name']}:{record['function']}:{record['line']} - {message}")
+        return f"{line}\n{exception}" if exception else line
+    
     def _loguru_filter(self, record):
         """Filter for loguru to handle sensitive data"""
-        # This would be implemented to filter sensitive data in loguru
+        record["message"] = self.redactor.redact_text(record["message"])
         return True
     
+    def flush(self, timeout: float = 5.0) -> bool:
+        """Block until queued records are written (no-op without the pipeline)"""
+        if self.pipeline is None:
+            return True
+        return self.pipeline.flush(timeout)
+    
+    def close(self):
+        """Drain the pipeline and release its writer thread and files"""
+        if self.pipeline is not None:
+            if LOGURU_AVAILABLE:
+                logger.remove()
+            self.pipeline.close()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Pipeline counters: written, dropped, batches, queue depth, rotations"""
+        if self.pipeline is None:
+            return {"async_pipeline": False}
+        return dict(self.pipeline.get_stats(), async_pipeline=True)
+    
     def trace(self, message: str, *args, **kwargs):
         """Log a trace message"""
         if LOGURU_AVAILABLE:
@@ -309,6 +773,8 @@ aegis_logger = None
 def initialize_logging(config: LogConfig = None):
     """Initialize the logging system"""
     global aegis_logger
+    if aegis_logger is not None:
+        aegis_logger.close()
     aegis_logger = AEGISLogger(config)
     return aegis_logger
 
@@ -322,8 +788,10 @@ def get_logger():
 def shutdown_logging():
     """Shutdown the logging system"""
     global aegis_logger
-    if aegis_logger and LOGURU_AVAILABLE:
-        logger.remove()
+    if aegis_logger:
+        aegis_logger.close()
+        if LOGURU_AVAILABLE:
+            logger.remove()
     aegis_logger = None
 
 # Convenience functions that match the existing loguru interface
@@ -359,6 +827,53 @@ def exception(message, *args, **kwargs):
     """Log an exception with traceback"""
     get_logger().exception(message, *args, **kwargs)
 
+
+def _percentile_us(sorted_ns: List[int], q: float) -> float:
+    """Percentile of sorted nanosecond latencies, in microseconds"""
+    return sorted_ns[min(int(q * len(sorted_ns)), len(sorted_ns) - 1)] / 1000
+
+
+def benchmark_log_latency(records: int = 20000, log_dir: Optional[str] = None,
+                          max_file_size: int = 256 * 1024) -> Dict[str, Dict[str, Any]]:
+    """Measure per-call logging latency with and without the async pipeline
+    
+    Each mode logs ``records`` messages to a file sink small enough to rotate
+    (and compress) several times, then reports p50/p99/p99.9/max in microseconds.
+    """
+    import tempfile
+    
+    results = {}
+    with tempfile.TemporaryDirectory(dir=log_dir) as bench_dir:
+        for async_pipeline in (False, True):
+            mode = "pipeline" if async_pipeline else "synchronous"
+            instance = initialize_logging(LogConfig(
+                log_level="INFO", log_dir=bench_dir, log_file=f"bench_{mode}.log",
+                enable_console=False, max_file_size=max_file_size, backup_count=3,
+                async_pipeline=async_pipeline, queue_size=max(records, 10000)
+            ))
+            latencies = []
+            start = time.perf_counter()
+            for i in range(records):
+                call_start = time.perf_counter_ns()
+                instance.info(f"benchmark record {i} peer=node_{i % 64} token=abc{i}")
+                latencies.append(time.perf_counter_ns() - call_start)
+            call_time = time.perf_counter() - start
+            instance.flush(timeout=60)
+            total_time = time.perf_counter() - start
+            
+            latencies.sort()
+            results[mode] = {
+                "p50_us": _percentile_us(latencies, 0.50),
+                "p99_us": _percentile_us(latencies, 0.99),
+                "p999_us": _percentile_us(latencies, 0.999),
+                "max_us": latencies[-1] / 1000,
+                "calls_per_second": records / call_time,
+                "drain_seconds": total_time - call_time,
+                "stats": instance.get_stats()
+            }
+        shutdown_logging()
+    return results
+
 # Example usage and testing
 async def start_logging_system(config: Dict[str, Any] = None):
     """Start the logging system as a module"""
@@ -385,12 +900,18 @@ async def start_logging_system(config: Dict[str, Any] = None):
         logger_instance.log_performance("test_operation", 0.1234, {"test": "data"})
         logger_instance.log_security_event("test_event", "LOW", {"test": "security_data"})
         
+        # Make the startup records durable before reporting success
+        logger_instance.flush()
         return True
     except Exception as e:
         error(f"Failed to start logging system: {e}")
         return False
 
 if __name__ == "__main__":
+    if "--benchmark" in sys.argv:
+        print(json.dumps(benchmark_log_latency(), indent=2))
+        sys.exit(0)
+    
     # Test the logging system
     async def main():
         config = {
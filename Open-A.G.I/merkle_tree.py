@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Árbol de Merkle Incremental - AEGIS Framework
+Árbol de Merkle nativo para bloques con pruebas de inclusión verificables
+solo con cabeceras.
+
+Características principales:
+- Árbol append-only: O(log n) por hoja añadida mientras se arma el bloque
+- Estructura RFC 6962 (separación de dominio hoja/nodo, sin duplicar hojas)
+- Pruebas de inclusión compactas y multi-pruebas por lotes
+- Verificación para clientes ligeros a partir de la raíz de la cabecera
+- Benchmark de árboles de 10k a 1M hojas
+"""
+
+import hashlib
+import time
+from typing import Dict, List, Optional, Sequence, Union
+
+LEAF_PREFIX = b"\x00"
+NODE_PREFIX = b"\x01"
+
+
+def hash_leaf(data: Union[str, bytes]) -> bytes:
+    """Hash de una hoja con prefijo de dominio"""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(LEAF_PREFIX + data).digest()
+
+
+def hash_node(left: bytes, right: bytes) -> bytes:
+    """Hash de un nodo interno con prefijo de dominio"""
+    return hashlib.sha256(NODE_PREFIX + left + right).digest()
+
+
+def _split_point(size: int) -> int:
+    """Mayor potencia de dos estrictamente menor que size"""
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+class IncrementalMerkleTree:
+    """Árbol de Merkle append-only con los subárboles completos por nivel
+
+    ``levels[k][i]`` es la raíz del subárbol completo de 2^k hojas que empieza
+    en la hoja ``i * 2^k``. Añadir una hoja cierra como mucho log n subárboles,
+    y la raíz se obtiene plegando los picos (subárboles completos más a la
+    derecha) en O(log n).
+    """
+
+    def __init__(self, leaves: Optional[Sequence[bytes]] = None):
+        self.levels: List[List[bytes]] = [[]]
+        for leaf in leaves or ():
+            self.append_hash(leaf)
+
+    def __len__(self) -> int:
+        return len(self.levels[0])
+
+    def append(self, data: Union[str, bytes]) -> int:
+        """Añade una hoja a partir de sus datos y devuelve su índice"""
+        return self.append_hash(hash_leaf(data))
+
+    def append_hash(self, leaf_hash: bytes) -> int:
+        """Añade una hoja ya hasheada y devuelve su índice"""
+        levels = self.levels
+        levels[0].append(leaf_hash)
+        level = 0
+        while len(levels[level]) % 2 == 0:
+            if level + 1 == len(levels):
+                levels.append([])
+            current = levels[level]
+            levels[level + 1].append(hash_node(current[-2], current[-1]))
+            level += 1
+        return len(levels[0]) - 1
+
+    def root(self) -> bytes:
+        """Raíz del árbol (hash de la cadena vacía si no hay hojas)"""
+        size = len(self)
+        if size == 0:
+            return hashlib.sha256(b"").digest()
+        acc = None
+        for level, nodes in enumerate(self.levels):
+            if size >> level & 1:
+                acc = nodes[-1] if acc is None else hash_node(nodes[-1], acc)
+        return acc
+
+    def root_hex(self) -> str:
+        return self.root().hex()
+
+    def _subtree_hash(self, start: int, size: int) -> bytes:
+        """Raíz RFC 6962 de las hojas [start, start + size)"""
+        if size & (size - 1) == 0:
+            level = size.bit_length() - 1
+            return self.levels[level][start >> level]
+        k = _split_point(size)
+        return hash_node(self._subtree_hash(start, k), self._subtree_hash(start + k, size - k))
+
+    def inclusion_proof(self, index: int) -> List[bytes]:
+        """Ruta de auditoría de la hoja index (de la hoja hacia la raíz)"""
+        size = len(self)
+        if not 0 <= index < size:
+            raise IndexError(f"Hoja {index} fuera de rango (tamaño {size})")
+        path: List[bytes] = []
+        start = 0
+        while size > 1:
+            k = _split_point(size)
+            if index - start < k:
+                path.append(self._subtree_hash(start + k, size - k))
+                size = k
+            else:
+                path.append(self._subtree_hash(start, k))
+                start += k
+                size -= k
+        path.reverse()
+        return path
+
+    def multi_proof(self, indices: Sequence[int]) -> List[bytes]:
+        """Hashes mínimos para probar varias hojas a la vez (orden en profundidad)"""
+        targets = sorted(set(indices))
+        if targets and not (0 <= targets[0] and targets[-1] < len(self)):
+            raise IndexError("Índices fuera de rango")
+        proof: List[bytes] = []
+        self._collect_multi_proof(0, len(self), targets, proof)
+        return proof
+
+    def _collect_multi_proof(self, start: int, size: int, targets: List[int], proof: List[bytes]):
+        if not targets:
+            proof.append(self._subtree_hash(start, size))
+            return
+        if size == 1:
+            return
+        k = _split_point(size)
+        split = _bisect(targets, start + k)
+        self._collect_multi_proof(start, k, targets[:split], proof)
+        self._collect_multi_proof(start + k, size - k, targets[split:], proof)
+
+
+def _bisect(values: List[int], pivot: int) -> int:
+    lo, hi = 0, len(values)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if values[mid] < pivot:
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+def _as_bytes(value: Union[str, bytes]) -> bytes:
+    return bytes.fromhex(value) if isinstance(value, str) else value
+
+
+def verify_inclusion(leaf_hash: Union[str, bytes], index: int, tree_size: int,
+                     proof: Sequence[Union[str, bytes]], root: Union[str, bytes]) -> bool:
+    """Verifica una ruta de auditoría contra la raíz (RFC 9162, 2.1.3.2)"""
+    if not 0 <= index < tree_size:
+        return False
+    fn, sn = index, tree_size - 1
+    result = _as_bytes(leaf_hash)
+    for sibling in proof:
+        sibling = _as_bytes(sibling)
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            result = hash_node(sibling, result)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            result = hash_node(result, sibling)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and result == _as_bytes(root)
+
+
+def verify_multi_proof(leaves: Dict[int, Union[str, bytes]], tree_size: int,
+                       proof: Sequence[Union[str, bytes]], root: Union[str, bytes]) -> bool:
+    """Verifica una multi-prueba: ``leaves`` asocia índice de hoja con su hash"""
+    targets = sorted(leaves)
+    if not targets or targets[0] < 0 or targets[-1] >= tree_size:
+        return False
+    hashes = [_as_bytes(h) for h in proof]
+    position = 0
+
+    def rebuild(start: int, size: int, subset: List[int]) -> Optional[bytes]:
+        nonlocal position
+        if not subset:
+            if position >= len(hashes):
+                return None
+            position += 1
+            return hashes[position - 1]
+        if size == 1:
+            return _as_bytes(leaves[subset[0]])
+        k = _split_point(size)
+        split = _bisect(subset, start + k)
+        left = rebuild(start, k, subset[:split])
+        right = rebuild(start + k, size - k, subset[split:])
+        if left is None or right is None:
+            return None
+        return hash_node(left, right)
+
+    result = rebuild(0, tree_size, targets)
+    return result is not None and position == len(hashes) and result == _as_bytes(root)
+
+
+def benchmark_merkle(sizes: Sequence[int] = (10_000, 100_000, 1_000_000),
+                     proofs: int = 1000, batch: int = 64) -> List[Dict[str, float]]:
+    """Mide construcción, raíz, pruebas y verificación para varios tamaños"""
+    results = []
+    for size in sizes:
+        payloads = [f"tx_{i}".encode() for i in range(size)]
+
+        start = time.perf_counter()
+        tree = IncrementalMerkleTree()
+        for payload in payloads:
+            tree.append(payload)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        root = tree.root()
+        root_time = time.perf_counter() - start
+
+        step = max(1, size // proofs)
+        indices = list(range(0, size, step))[:proofs]
+        start = time.perf_counter()
+        paths = [tree.inclusion_proof(i) for i in indices]
+        prove = (time.perf_counter() - start) / len(indices)
+
+        start = time.perf_counter()
+        ok = all(verify_inclusion(tree.levels[0][i], i, size, path, root) for i, path in zip(indices, paths))
+        verify = (time.perf_counter() - start) / len(indices)
+
+        batch_indices = indices[:batch]
+        multi = tree.multi_proof(batch_indices)
+        multi_ok = verify_multi_proof({i: tree.levels[0][i] for i in batch_indices}, size, multi, root)
+
+        results.append({
+            "leaves": size,
+            "build_seconds": build,
+            "append_us": build / size * 1e6,
+            "root_us": root_time * 1e6,
+            "proof_us": prove * 1e6,
+            "verify_us": verify * 1e6,
+            "proof_hashes": len(paths[0]),
+            "proof_bytes": 32 * len(paths[0]),
+            "multi_proof_hashes": len(multi),
+            "single_proofs_hashes": sum(len(paths[j]) for j in range(len(batch_indices))),
+            "verified": ok and multi_ok,
+        })
+    return results
+
+
+if __name__ == "__main__":
+    import json
+
+    print("🌳 Benchmark del árbol de Merkle incremental")
+    print(json.dumps(benchmark_merkle(), indent=2))
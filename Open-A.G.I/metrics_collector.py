@@ -11,6 +11,8 @@ enhances the basic metrics collection in monitoring_dashboard.py with:
 - Resource utilization monitoring
 - System health metrics
 - Metrics export in multiple formats
+- Columnar history with 10 s / 1 min / 1 h rollups (see metrics_tsdb)
+- Host metrics from the shared sampler (see host_sampler)
 """
 
 import asyncio
@@ -21,10 +23,12 @@ from typing import Dict, Any, List, Optional, Callable
 from dataclasses import dataclass, field
 from enum import Enum
 from collections import defaultdict, deque
-import psutil
 import threading
 from datetime import datetime
 
+from host_sampler import get_host_sampler
+from metrics_tsdb import TimeSeriesStore, RAW
+
 # Try to import required libraries
 try:
     import prometheus_client
@@ -84,11 +88,17 @@ class MetricsCollectorConfig:
     websocket_port: int = 9091
 
 class Metric:
-    """A single metric with its history"""
+    """A single metric with its history
+    
+    Numeric samples are kept in a columnar TimeSeriesStore (shared by the
+    collector) keyed by metric name and interned label set; non-numeric values
+    are only kept as the current value.
+    """
     
-    def __init__(self, config: MetricConfig):
+    def __init__(self, config: MetricConfig, store: Optional[TimeSeriesStore] = None,
+                 history_size: int = 1000):
         self.config = config
-        self.history = deque(maxlen=1000)  # Store last 1000 values
+        self.store = store or TimeSeriesStore(raw_capacity=history_size)
         self.current_value = None
         self.last_updated = None
         self.labels = {}
@@ -111,11 +121,8 @@ class Metric:
         self.last_updated = time.time()
         
         # Store in history
-        self.history.append({
-            "value": value,
-            "timestamp": self.last_updated,
-            "labels": labels or {}
-        })
+        if isinstance(value, (int, float)):
+            self.store.append(self.config.name, value, self.last_updated, labels)
         
         # Update Prometheus metric if available
         if self.prometheus_metric:
@@ -148,26 +155,25 @@ class Metric:
     
     def get_history(self, limit: int = None) -> List[Dict]:
         """Get the history of the metric"""
+        samples = self.store.query(self.config.name, resolution=RAW)
+        timestamps, values, series = samples["timestamp"], samples["value"], samples["series"]
         if limit:
-            return list(self.history)[-limit:]
-        return list(self.history)
+            timestamps, values, series = timestamps[-limit:], values[-limit:], series[-limit:]
+        labels = {sid: self.store.labels_for(sid) for sid in set(series.tolist())}
+        return [
+            {"value": value, "timestamp": timestamp, "labels": labels[sid]}
+            for value, timestamp, sid in zip(values.tolist(), timestamps.tolist(), series.tolist())
+        ]
+    
+    def query(self, start: float = None, end: float = None, labels: Dict[str, str] = None,
+              resolution: Any = None) -> Dict[str, Any]:
+        """Range query; see TimeSeriesStore.query for the result columns"""
+        return self.store.query(self.config.name, start, end, labels, resolution)
     
-    def get_stats(self) -> Dict[str, Any]:
+    def get_stats(self, start: float = None, end: float = None,
+                  labels: Dict[str, str] = None) -> Dict[str, Any]:
         """Get statistics for the metric"""
-        if not self.history:
-            return {}
-        
-        values = [entry["value"] for entry in self.history if isinstance(entry["value"], (int, float))]
-        if not values:
-            return {}
-        
-        return {
-            "count": len(values),
-            "min": min(values),
-            "max": max(values),
-            "avg": sum(values) / len(values),
-            "latest": values[-1] if values else None
-        }
+        return self.store.stats(self.config.name, start, end, labels)
 
 class MetricsCollector:
     """Main metrics collector for AEGIS"""
@@ -179,6 +185,10 @@ class MetricsCollector:
         self.running = False
         self.collection_task = None
         self.websocket_server = None
+        # Columnar history shared by all metrics
+        self.tsdb = TimeSeriesStore(raw_capacity=self.config.history_size)
+        # Host counters come from the process-wide sampler
+        self.host = get_host_sampler().subscribe(interval=self.config.collection_interval)
         
         # Initialize Prometheus if enabled
         if self.config.enable_prometheus and PROMETHEUS_AVAILABLE:
@@ -237,7 +247,7 @@ class MetricsCollector:
     
     def register_metric(self, config: MetricConfig) -> Metric:
         """Register a new metric"""
-        metric = Metric(config)
+        metric = Metric(config, store=self.tsdb)
         self.metrics[config.name] = metric
         return metric
     
@@ -274,23 +284,19 @@ class MetricsCollector:
     def collect_system_metrics(self):
         """Collect system metrics"""
         try:
-            # CPU usage
-            cpu_percent = psutil.cpu_percent(interval=1)
-            self.set_metric_value("cpu_usage_percent", cpu_percent)
+            # CPU usage is averaged over the time since the previous collection
+            host = self.host.poll()
+            self.set_metric_value("cpu_usage_percent", host.cpu_percent)
             
             # Memory usage
-            memory = psutil.virtual_memory()
-            self.set_metric_value("memory_usage_bytes", memory.used)
+            self.set_metric_value("memory_usage_bytes", host.memory_used)
             
             # Disk usage
-            disk = psutil.disk_usage("/")
-            disk_percent = (disk.used / disk.total) * 100
-            self.set_metric_value("disk_usage_percent", disk_percent)
+            self.set_metric_value("disk_usage_percent", host.disk_percent)
             
             # Network usage
-            net_io = psutil.net_io_counters()
-            self.set_metric_value("network_bytes_sent", net_io.bytes_sent)
-            self.set_metric_value("network_bytes_received", net_io.bytes_recv)
+            self.set_metric_value("network_bytes_sent", host.net_bytes_sent)
+            self.set_metric_value("network_bytes_received", host.net_bytes_recv)
             
         except Exception as e:
             logger.error(f"Failed to collect system metrics: {e}")
@@ -355,6 +361,14 @@ class MetricsCollector:
             return metric.get_history(limit)
         return []
     
+    def query_metric(self, metric_name: str, start: float = None, end: float = None,
+                     labels: Dict[str, str] = None, resolution: Any = None) -> Dict[str, Any]:
+        """Vectorized range query over raw samples or rollups of a metric"""
+        metric = self.get_metric(metric_name)
+        if metric:
+            return metric.query(start, end, labels, resolution)
+        return {}
+    
     async def start_metrics_collector(self, config: Dict[str, Any] = None):
         """Start the metrics collector as a module"""
         try:
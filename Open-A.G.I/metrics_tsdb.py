@@ -0,0 +1,456 @@
+"""
+Time-Series Store Module for AEGIS
+
+This module provides the columnar in-memory storage behind metrics_collector:
+- Fixed-capacity numpy ring buffers (timestamp/value columns) per series
+- Label sets interned to integer series IDs
+- Incremental multi-resolution rollups (10 s, 1 min, 1 h) with min/max/sum/count
+- Vectorized range and statistics queries that pick the finest resolution
+  covering the requested window
+- A benchmark against the previous deque-of-dicts history
+"""
+
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+RAW = "raw"
+DEFAULT_ROLLUPS: Tuple[Tuple[float, int], ...] = (
+    (10.0, 8640),    # 10 s buckets for one day
+    (60.0, 10080),   # 1 min buckets for one week
+    (3600.0, 8760),  # 1 h buckets for one year
+)
+ROLLUP_COLUMNS = ("timestamp", "min", "max", "sum", "count")
+
+
+class ColumnRing:
+    """Fixed-capacity ring of float64 columns in chronological order
+
+    Arrays start small and double up to ``capacity``, so idle series do not pay
+    for their full retention up front. While timestamps are appended in order,
+    range lookups use binary search on each of the (at most two) contiguous
+    segments; an out-of-order append switches the ring to mask filtering.
+    """
+
+    def __init__(self, capacity: int, columns: Sequence[str], initial: int = 64):
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        size = min(initial, capacity)
+        self.data: Dict[str, np.ndarray] = {name: np.empty(size) for name in self.columns}
+        self.size = 0
+        self.head = 0  # next write position
+        self.ordered = True
+
+    def __len__(self) -> int:
+        return self.size
+
+    def append(self, *row: float):
+        allocated = len(self.data[self.columns[0]])
+        if self.size == allocated < self.capacity:
+            new_size = min(allocated * 2, self.capacity)
+            for name in self.columns:
+                grown = np.empty(new_size)
+                grown[:allocated] = self.data[name]
+                self.data[name] = grown
+        if self.ordered and self.size and row[0] < self.last(self.columns[0]):
+            self.ordered = False
+        index = self.head
+        for name, value in zip(self.columns, row):
+            self.data[name][index] = value
+        self.head = (index + 1) % self.capacity
+        if self.size < self.capacity:
+            self.size += 1
+
+    def _last_index(self) -> int:
+        return (self.head - 1) % self.capacity
+
+    def last(self, column: str) -> float:
+        return float(self.data[column][self._last_index()])
+
+    def first(self, column: str) -> float:
+        start = self.head if self.size == self.capacity else 0
+        return float(self.data[column][start])
+
+    def _segments(self) -> List[Tuple[int, int]]:
+        if self.size < self.capacity:
+            return [(0, self.size)]
+        return [(self.head, self.capacity), (0, self.head)]
+
+    def select(self, start: Optional[float] = None, end: Optional[float] = None,
+               key: Optional[str] = None, extra: Optional[Sequence[float]] = None,
+               copy: bool = True) -> Dict[str, np.ndarray]:
+        """Rows with ``start <= key <= end`` as chronological column arrays
+
+        ``extra`` appends one more row (e.g. an open rollup bucket) in the same
+        concatenation; ``copy=False`` may return views into the ring.
+        """
+        key = key or self.columns[0]
+        pieces: Dict[str, List[np.ndarray]] = {name: [] for name in self.columns}
+        for lo, hi in self._segments():
+            if lo == hi:
+                continue
+            keys = self.data[key][lo:hi]
+            if self.ordered:
+                a = lo + (np.searchsorted(keys, start, "left") if start is not None else 0)
+                b = lo + (np.searchsorted(keys, end, "right") if end is not None else hi - lo)
+                for name in self.columns:
+                    pieces[name].append(self.data[name][a:b])
+            else:
+                mask = np.ones(hi - lo, dtype=bool)
+                if start is not None:
+                    mask &= keys >= start
+                if end is not None:
+                    mask &= keys <= end
+                for name in self.columns:
+                    pieces[name].append(self.data[name][lo:hi][mask])
+        if extra is not None:
+            for name, value in zip(self.columns, extra):
+                pieces[name].append(np.array((value,)))
+        return {
+            name: (np.concatenate(parts) if len(parts) > 1 else
+                   (parts[0].copy() if copy else parts[0]) if parts else np.empty(0))
+            for name, parts in pieces.items()
+        }
+
+    def find(self, column: str, value: float) -> Optional[int]:
+        """Physical index of the row whose ``column`` equals ``value``"""
+        for lo, hi in self._segments():
+            keys = self.data[column][lo:hi]
+            if self.ordered:
+                i = int(np.searchsorted(keys, value))
+                if i < len(keys) and keys[i] == value:
+                    return lo + i
+            else:
+                hits = np.flatnonzero(keys == value)
+                if len(hits):
+                    return lo + int(hits[0])
+        return None
+
+    def nbytes(self) -> int:
+        return sum(array.nbytes for array in self.data.values())
+
+
+class Rollup:
+    """Incrementally maintained min/max/sum/count buckets at one resolution"""
+
+    def __init__(self, resolution: float, capacity: int):
+        self.resolution = resolution
+        self.ring = ColumnRing(capacity, ROLLUP_COLUMNS, initial=16)
+        self.open: Optional[List[float]] = None  # bucket still receiving samples
+        self.late_dropped = 0
+
+    def add(self, timestamp: float, value: float):
+        bucket = timestamp - timestamp % self.resolution
+        current = self.open
+        if current is None or bucket > current[0]:
+            if current is not None:
+                self.ring.append(*current)
+            self.open = [bucket, value, value, value, 1.0]
+        elif bucket == current[0]:
+            if value < current[1]:
+                current[1] = value
+            if value > current[2]:
+                current[2] = value
+            current[3] += value
+            current[4] += 1.0
+        else:
+            # Late sample for an already closed bucket: update it in place
+            index = self.ring.find("timestamp", bucket)
+            if index is None:
+                self.late_dropped += 1
+                return
+            data = self.ring.data
+            data["min"][index] = min(data["min"][index], value)
+            data["max"][index] = max(data["max"][index], value)
+            data["sum"][index] += value
+            data["count"][index] += 1.0
+
+    def oldest(self) -> Optional[float]:
+        if len(self.ring):
+            return self.ring.first("timestamp")
+        return self.open[0] if self.open else None
+
+    def select(self, start: Optional[float], end: Optional[float],
+               copy: bool = True) -> Dict[str, np.ndarray]:
+        bucket_start = None if start is None else start - start % self.resolution
+        current = self.open
+        include_open = current is not None and (bucket_start is None or current[0] >= bucket_start) \
+            and (end is None or current[0] <= end)
+        return self.ring.select(bucket_start, end, extra=current if include_open else None, copy=copy)
+
+    def aggregate(self, start: Optional[float], end: Optional[float]) -> Tuple[int, float, float, float]:
+        """(count, sum, min, max) over the window without materializing the buckets"""
+        bucket_start = None if start is None else start - start % self.resolution
+        rows = self.ring.select(bucket_start, end, copy=False)
+        count, total, minimum, maximum = 0, 0.0, np.inf, -np.inf
+        if len(rows["count"]):
+            count, total = int(rows["count"].sum()), float(rows["sum"].sum())
+            minimum, maximum = float(rows["min"].min()), float(rows["max"].max())
+        current = self.open
+        if current is not None and (bucket_start is None or current[0] >= bucket_start) \
+                and (end is None or current[0] <= end):
+            count += int(current[4])
+            total += current[3]
+            minimum, maximum = min(minimum, current[1]), max(maximum, current[2])
+        return count, total, minimum, maximum
+
+
+class Series:
+    """Raw samples plus rollups for one metric and label set"""
+
+    def __init__(self, raw_capacity: int, rollups: Sequence[Tuple[float, int]]):
+        self.raw = ColumnRing(raw_capacity, ("timestamp", "value"))
+        self.rollups = [Rollup(resolution, capacity) for resolution, capacity in rollups]
+        self.last_value: Optional[float] = None
+        self.last_timestamp: Optional[float] = None
+
+    def append(self, timestamp: float, value: float):
+        self.raw.append(timestamp, value)
+        for rollup in self.rollups:
+            rollup.add(timestamp, value)
+        if self.last_timestamp is None or timestamp >= self.last_timestamp:
+            self.last_value, self.last_timestamp = value, timestamp
+
+    def nbytes(self) -> int:
+        return self.raw.nbytes() + sum(rollup.ring.nbytes() for rollup in self.rollups)
+
+
+class TimeSeriesStore:
+    """Columnar time-series store keyed by metric name and interned label set"""
+
+    def __init__(self, raw_capacity: int = 1000,
+                 rollups: Sequence[Tuple[float, int]] = DEFAULT_ROLLUPS):
+        self.raw_capacity = raw_capacity
+        self.rollup_specs = tuple(sorted(rollups))
+        self._label_ids: Dict[Tuple[Tuple[str, str], ...], int] = {(): 0}
+        self._labels: List[Dict[str, str]] = [{}]
+        self._series: Dict[str, Dict[int, Series]] = {}
+
+    # ------------------------------------------------------------------ writes
+
+    def intern_labels(self, labels: Optional[Dict[str, str]]) -> int:
+        """Integer ID for a label set (order-insensitive)"""
+        if not labels:
+            return 0
+        key = tuple(sorted((str(k), str(v)) for k, v in labels.items()))
+        series_id = self._label_ids.get(key)
+        if series_id is None:
+            series_id = self._label_ids[key] = len(self._labels)
+            self._labels.append(dict(key))
+        return series_id
+
+    def labels_for(self, series_id: int) -> Dict[str, str]:
+        return dict(self._labels[series_id])
+
+    def append(self, metric: str, value: float, timestamp: Optional[float] = None,
+               labels: Optional[Dict[str, str]] = None) -> int:
+        series_id = self.intern_labels(labels)
+        by_labels = self._series.get(metric)
+        if by_labels is None:
+            by_labels = self._series[metric] = {}
+        series = by_labels.get(series_id)
+        if series is None:
+            series = by_labels[series_id] = Series(self.raw_capacity, self.rollup_specs)
+        series.append(time.time() if timestamp is None else float(timestamp), float(value))
+        return series_id
+
+    # ----------------------------------------------------------------- queries
+
+    def metrics(self) -> List[str]:
+        return list(self._series)
+
+    def series_ids(self, metric: str, labels: Optional[Dict[str, str]] = None) -> List[int]:
+        """Series of a metric, optionally restricted to those matching ``labels``"""
+        by_labels = self._series.get(metric, {})
+        if labels is None:
+            return list(by_labels)
+        wanted = {(str(k), str(v)) for k, v in labels.items()}
+        return [sid for sid in by_labels if wanted <= set(self._labels[sid].items())]
+
+    def _pick_resolution(self, series: List[Series], start: Optional[float]) -> Any:
+        if start is None:
+            return RAW
+        if all(not len(s.raw) or s.raw.first("timestamp") <= start for s in series):
+            return RAW
+        for index, (resolution, _) in enumerate(self.rollup_specs):
+            oldest = [s.rollups[index].oldest() for s in series]
+            if all(o is None or o <= start for o in oldest):
+                return resolution
+        return self.rollup_specs[-1][0] if self.rollup_specs else RAW
+
+    def query(self, metric: str, start: Optional[float] = None, end: Optional[float] = None,
+              labels: Optional[Dict[str, str]] = None, resolution: Any = None) -> Dict[str, Any]:
+        """Samples in ``[start, end]``
+
+        ``resolution`` is ``"raw"``, one of the rollup resolutions in seconds, or
+        ``None`` to use the finest resolution whose retention covers ``start``.
+        Raw results have ``timestamp``/``value``/``series`` arrays; rollup results
+        have ``timestamp``/``min``/``max``/``avg``/``count`` with buckets from all
+        matching series merged.
+        """
+        by_labels = self._series.get(metric, {})
+        ids = self.series_ids(metric, labels)
+        series = [by_labels[sid] for sid in ids]
+        if resolution is None:
+            resolution = self._pick_resolution(series, start)
+
+        if resolution == RAW:
+            parts = [(sid, s.raw.select(start, end)) for sid, s in zip(ids, series)]
+            timestamps = np.concatenate([p["timestamp"] for _, p in parts]) if parts else np.empty(0)
+            values = np.concatenate([p["value"] for _, p in parts]) if parts else np.empty(0)
+            series_col = (np.concatenate([np.full(len(p["value"]), sid, dtype=np.int64) for sid, p in parts])
+                          if parts else np.empty(0, dtype=np.int64))
+            if len(parts) > 1:
+                order = np.argsort(timestamps, kind="stable")
+                timestamps, values, series_col = timestamps[order], values[order], series_col[order]
+            return {"resolution": RAW, "timestamp": timestamps, "value": values, "series": series_col}
+
+        index = [r for r, _ in self.rollup_specs].index(float(resolution))
+        parts = [s.rollups[index].select(start, end) for s in series]
+        columns = {name: (np.concatenate([p[name] for p in parts]) if parts else np.empty(0))
+                   for name in ROLLUP_COLUMNS}
+        if len(parts) > 1 and len(columns["timestamp"]):
+            # Merge buckets with the same start across series
+            order = np.argsort(columns["timestamp"], kind="stable")
+            columns = {name: array[order] for name, array in columns.items()}
+            starts, first = np.unique(columns["timestamp"], return_index=True)
+            columns = {
+                "timestamp": starts,
+                "min": np.minimum.reduceat(columns["min"], first),
+                "max": np.maximum.reduceat(columns["max"], first),
+                "sum": np.add.reduceat(columns["sum"], first),
+                "count": np.add.reduceat(columns["count"], first),
+            }
+        with np.errstate(invalid="ignore", divide="ignore"):
+            avg = columns["sum"] / columns["count"]
+        return {"resolution": float(resolution), "timestamp": columns["timestamp"],
+                "min": columns["min"], "max": columns["max"], "avg": avg,
+                "count": columns["count"]}
+
+    def stats(self, metric: str, start: Optional[float] = None, end: Optional[float] = None,
+              labels: Optional[Dict[str, str]] = None, resolution: Any = None) -> Dict[str, Any]:
+        """count/min/max/avg over a window, plus the most recent value
+
+        Reductions run per series on the selected slices; no merge or sort is
+        needed because the aggregates are order-independent.
+        """
+        by_labels = self._series.get(metric, {})
+        series = [by_labels[sid] for sid in self.series_ids(metric, labels)]
+        if resolution is None:
+            resolution = self._pick_resolution(series, start)
+
+        count, total, minimum, maximum = 0, 0.0, np.inf, -np.inf
+        if resolution == RAW:
+            for s in series:
+                values = s.raw.select(start, end, copy=False)["value"]
+                if len(values):
+                    count += len(values)
+                    total += float(values.sum())
+                    minimum = min(minimum, float(values.min()))
+                    maximum = max(maximum, float(values.max()))
+        else:
+            index = [r for r, _ in self.rollup_specs].index(float(resolution))
+            for s in series:
+                n, subtotal, low, high = s.rollups[index].aggregate(start, end)
+                count, total = count + n, total + subtotal
+                minimum, maximum = min(minimum, low), max(maximum, high)
+        if not count:
+            return {}
+        return {
+            "count": count,
+            "min": minimum,
+            "max": maximum,
+            "avg": total / count,
+            "latest": self.latest(metric, labels),
+        }
+
+    def latest(self, metric: str, labels: Optional[Dict[str, str]] = None) -> Optional[float]:
+        by_labels = self._series.get(metric, {})
+        newest = None
+        for sid in self.series_ids(metric, labels):
+            series = by_labels[sid]
+            if series.last_timestamp is not None and (newest is None or series.last_timestamp >= newest.last_timestamp):
+                newest = series
+        return newest.last_value if newest else None
+
+    def memory_bytes(self) -> int:
+        return sum(series.nbytes() for by_labels in self._series.values() for series in by_labels.values())
+
+
+def benchmark_tsdb(samples: int = 100000, history_size: int = 1000, label_sets: int = 4,
+                   queries: int = 200, seed: int = 7) -> Dict[str, Dict[str, float]]:
+    """Compare the deque-of-dicts history with the columnar store
+
+    Both ingest ``samples`` gauge updates spread over ``label_sets`` label sets,
+    one per second, and retain ``history_size`` raw samples in total (the store
+    additionally keeps its rollups). Memory is measured with tracemalloc and
+    reported per retained raw sample; query latency is the mean over ``queries`` calls.
+    """
+    import tracemalloc
+    from collections import deque
+
+    rng = np.random.default_rng(seed)
+    values = rng.random(samples) * 100
+    labels = [{"node": f"node_{i}"} for i in range(label_sets)]
+    base = time.time() - samples
+
+    def timed(fn):
+        start = time.perf_counter()
+        for _ in range(queries):
+            fn()
+        return (time.perf_counter() - start) / queries * 1e6
+
+    results = {}
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    history = deque(maxlen=history_size)
+    for i in range(samples):
+        history.append({"value": float(values[i]), "timestamp": base + i, "labels": labels[i % label_sets]})
+    deque_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+
+    def deque_stats():
+        vals = [entry["value"] for entry in history if isinstance(entry["value"], (int, float))]
+        return min(vals), max(vals), sum(vals) / len(vals)
+
+    window_start = base + samples - history_size // 2
+
+    def deque_range():
+        return [entry for entry in history if entry["timestamp"] >= window_start]
+
+    results["deque_of_dicts"] = {
+        "bytes_per_sample": deque_bytes / len(history),
+        "retained_samples": len(history),
+        "stats_us": timed(deque_stats),
+        "range_us": timed(deque_range),
+        "history_copy_us": timed(lambda: list(history)),
+    }
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    store = TimeSeriesStore(raw_capacity=history_size // label_sets)
+    for i in range(samples):
+        store.append("bench", values[i], base + i, labels[i % label_sets])
+    store_bytes = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    retained = sum(len(s.raw) for s in store._series["bench"].values())
+
+    results["columnar_store"] = {
+        "bytes_per_sample_with_rollups": store_bytes / retained,
+        "raw_bytes_per_sample": sum(s.raw.nbytes() for s in store._series["bench"].values()) / retained,
+        "retained_samples": retained,
+        "stats_us": timed(lambda: store.stats("bench")),
+        "range_us": timed(lambda: store.query("bench", window_start, resolution=RAW)),
+        "history_copy_us": timed(lambda: store.query("bench", resolution=RAW)),
+        "full_day_stats_us": timed(lambda: store.stats("bench", base + samples - 86400)),
+        "rollup_buckets_10s": sum(len(s.rollups[0].ring) for s in store._series["bench"].values()),
+    }
+    return results
+
+
+if __name__ == "__main__":
+    import json
+
+    print(json.dumps(benchmark_tsdb(), indent=2))
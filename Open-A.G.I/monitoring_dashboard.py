@@ -7,13 +7,15 @@ de IA distribuida y colaborativa.
 Características principales:
 - Monitoreo en tiempo real de nodos P2P
 - Visualización de métricas de rendimiento
-- Dashboard web interactivo con WebSockets
+- Dashboard web interactivo con WebSockets (frames por lotes y por topic,
+  ver dashboard_stream)
 - Alertas automáticas y notificaciones
 - Análisis de tendencias y predicciones
 - Integración con sistemas de logging
 """
 
 import asyncio
+import math
 import time
 import json
 import os
@@ -25,7 +27,6 @@ import sqlite3
 import threading
 from datetime import datetime, timedelta
 import statistics
-import psutil
 import socket
 import requests
 from flask import Flask, render_template, jsonify, request
@@ -37,6 +38,13 @@ import numpy as np
 from werkzeug.serving import make_server
 import queue
 
+from alert_rules import (
+    FIRING, AlertEvent, AlertNotification, CompiledRule, LevelInhibitor, NotificationRouter, RuleEngine
+)
+from dashboard_stream import ALL_TOPICS, JSON_FRAMES, DashboardDataPlane
+from host_sampler import get_host_sampler
+from rate_limiting import RateLimitPolicy
+
 # Use the configured logger from main
 try:
     from main import logger
@@ -136,6 +144,8 @@ class MetricsCollector:
         self.collection_interval = 5  # segundos
         self.running = False
         self.collection_thread = None
+        # Lecturas del host compartidas con los demás recolectores
+        self.host = get_host_sampler().subscribe(interval=self.collection_interval)
     
     def start_collection(self):
         """Inicia recolección de métricas"""
@@ -156,69 +166,85 @@ class MetricsCollector:
         """Loop principal de recolección"""
         while self.running:
             try:
-                # Recolectar métricas del sistema
-                self._collect_system_metrics()
-                
-                # Recolectar métricas de red
-                self._collect_network_metrics()
-                
-                # Recolectar métricas de aplicación
-                self._collect_application_metrics()
-                
+                self.collect_once()
                 time.sleep(self.collection_interval)
                 
             except Exception as e:
                 logger.error(f"❌ Error recolectando métricas: {e}")
                 time.sleep(self.collection_interval)
     
+    def collect_once(self):
+        """Una ronda de recolección (sistema, red y aplicación)"""
+        self._collect_system_metrics()
+        self._collect_network_metrics()
+        self._collect_application_metrics()
+    
+    async def run_async(self, on_metrics: Callable[[List[Metric]], None]):
+        """Recolección dentro de un event loop, sin hilo propio
+        
+        Las llamadas bloqueantes (lecturas del host, sockets) van al executor por defecto;
+        ``on_metrics`` recibe cada ronda en el hilo del loop.
+        """
+        self.running = True
+        loop = asyncio.get_running_loop()
+        logger.info(f"📊 Recolección de métricas iniciada para {self.node_id}")
+        while self.running:
+            try:
+                await loop.run_in_executor(None, self.collect_once)
+                on_metrics(self.get_metrics())
+            except Exception as e:
+                logger.error(f"❌ Error recolectando métricas: {e}")
+            await asyncio.sleep(self.collection_interval)
+    
     def _collect_system_metrics(self):
         """Recolecta métricas del sistema operativo"""
         try:
-            current_time = time.time()
+            # CPU promediada desde la ronda anterior, sin bloquear un segundo
+            host = self.host.poll()
+            current_time = host.timestamp
             
             # CPU
-            cpu_percent = psutil.cpu_percent(interval=1)
             cpu_metric = Metric(
                 metric_id=f"cpu_{current_time}",
                 metric_type=MetricType.CPU_USAGE,
                 node_id=self.node_id,
-                value=cpu_percent,
+                value=host.cpu_percent,
                 unit="percent",
                 timestamp=current_time,
-                metadata={"cores": psutil.cpu_count()}
+                metadata={"cores": host.cpu_count}
             )
             self.metrics_queue.put(cpu_metric)
             
             # Memoria
-            memory = psutil.virtual_memory()
             memory_metric = Metric(
                 metric_id=f"memory_{current_time}",
                 metric_type=MetricType.MEMORY_USAGE,
                 node_id=self.node_id,
-                value=memory.percent,
+                value=host.memory_percent,
                 unit="percent",
                 timestamp=current_time,
                 metadata={
-                    "total": memory.total,
-                    "available": memory.available,
-                    "used": memory.used
+                    "total": host.memory_total,
+                    "available": host.memory_available,
+                    "used": host.memory_used
                 }
             )
             self.metrics_queue.put(memory_metric)
             
             # Disco
-            disk = psutil.disk_usage('/')
             disk_metric = Metric(
                 metric_id=f"disk_{current_time}",
                 metric_type=MetricType.DISK_IO,
                 node_id=self.node_id,
-                value=(disk.used / disk.total) * 100,
+                value=host.disk_percent,
                 unit="percent",
                 timestamp=current_time,
                 metadata={
-                    "total": disk.total,
-                    "used": disk.used,
-                    "free": disk.free
+                    "total": host.disk_total,
+                    "used": host.disk_used,
+                    "free": host.disk_free,
+                    "read_rate": host.disk_read_rate,
+                    "write_rate": host.disk_write_rate
                 }
             )
             self.metrics_queue.put(disk_metric)
@@ -234,7 +260,7 @@ class MetricsCollector:
             # Latencia de red (ping a localhost como ejemplo)
             start_time = time.time()
             try:
-                socket.create_connection(("127.0.0.1", 80), timeout=1)
+                socket.create_connection(("127.0.0.1", 80), timeout=1).close()
                 latency = (time.time() - start_time) * 1000  # ms
             except:
                 latency = 1000  # timeout
@@ -295,12 +321,25 @@ class MetricsCollector:
         return metrics
 
 class AlertManager:
-    """Gestor de alertas del sistema"""
+    """Gestor de alertas del sistema
+
+    Los umbrales se compilan en reglas del RuleEngine (alert_rules.py): cada
+    métrica se evalúa al llegar y solo los cambios de estado crean o
+    resuelven alertas, en lugar de una alerta por muestra sobre el umbral.
+    """
     
     def __init__(self):
         self.alerts: Dict[str, Alert] = {}
         self.thresholds: Dict[MetricType, Dict[str, Any]] = {}
         self.notification_callbacks: List[Callable] = []
+        self.engine = RuleEngine()
+        # Avisos agrupados por regla y limitados; sin repetición mientras sigan activas
+        self.router = NotificationRouter(self._notify_callbacks, group_by=("rule_id",), group_wait=0.0,
+                                         group_interval=10.0, repeat_interval=math.inf,
+                                         rate_limit=RateLimitPolicy(30, 60.0))
+        self._alert_ids: Dict[str, str] = {}  # fingerprint -> alert_id activa
+        # Inhibición: la advertencia de una serie se suprime mientras está en crítico
+        self.inhibitor = LevelInhibitor(critical=AlertLevel.CRITICAL, warning=AlertLevel.WARNING)
         self._setup_default_thresholds()
     
     def _setup_default_thresholds(self):
@@ -309,24 +348,60 @@ class AlertManager:
             MetricType.CPU_USAGE: {
                 "warning_threshold": 70.0,
                 "critical_threshold": 90.0,
-                "operator": "greater_than"
+                "operator": "greater_than",
+                "hysteresis": 5.0
             },
             MetricType.MEMORY_USAGE: {
                 "warning_threshold": 80.0,
                 "critical_threshold": 95.0,
-                "operator": "greater_than"
+                "operator": "greater_than",
+                "hysteresis": 3.0
             },
             MetricType.NETWORK_LATENCY: {
                 "warning_threshold": 200.0,
                 "critical_threshold": 1000.0,
-                "operator": "greater_than"
+                "operator": "greater_than",
+                "hysteresis": 50.0
             },
             MetricType.MODEL_ACCURACY: {
                 "warning_threshold": 0.85,
                 "critical_threshold": 0.75,
-                "operator": "less_than"
+                "operator": "less_than",
+                "hysteresis": 0.02
             }
         }
+        self._compile_thresholds()
+    
+    def set_threshold(self, metric_type: MetricType, warning_threshold: float, critical_threshold: float,
+                      operator: str = "greater_than", hysteresis: float = 0.0):
+        """Cambia los umbrales de un tipo de métrica y recompila las reglas"""
+        self.thresholds[metric_type] = {
+            "warning_threshold": warning_threshold,
+            "critical_threshold": critical_threshold,
+            "operator": operator,
+            "hysteresis": hysteresis
+        }
+        self._compile_thresholds()
+    
+    def _compile_thresholds(self):
+        """Compila los umbrales en reglas por métrica (una por nivel)"""
+        for rule_id in list(self.engine.rules):
+            self.engine.remove_rule(rule_id)
+        rules = []
+        for metric_type, config in self.thresholds.items():
+            greater = config.get("operator", "greater_than") == "greater_than"
+            hysteresis = config.get("hysteresis", 0.0)
+            for level, key in ((AlertLevel.WARNING, "warning_threshold"), (AlertLevel.CRITICAL, "critical_threshold")):
+                threshold = config.get(key)
+                if threshold is None or math.isinf(threshold):
+                    continue
+                rules.append(CompiledRule(
+                    f"{metric_type.value}.{level.value}", metric_type.value, ">=" if greater else "<=", threshold,
+                    clear_threshold=threshold - hysteresis if greater else threshold + hysteresis,
+                    payload=level
+                ))
+        self.engine.add_rules(rules)
+        self._apply_events(self.engine.drain())
     
     def add_notification_callback(self, callback: Callable):
         """Agrega callback para notificaciones"""
@@ -335,74 +410,69 @@ class AlertManager:
     def evaluate_metric(self, metric: Metric):
         """Evalúa una métrica contra umbrales para generar alertas"""
         try:
-            # Obtener configuración de umbrales
-            config = self.thresholds.get(metric.metric_type, {})
-            warning_threshold = config.get("warning_threshold", float('inf'))
-            critical_threshold = config.get("critical_threshold", float('inf'))
-            operator = config.get("operator", "greater_than")
-            
-            alert_level = None
-            threshold_value = 0.0  # Initialize with default value
-            
-            # Evaluar contra umbrales
-            if operator == "greater_than":
-                if metric.value >= critical_threshold:
-                    alert_level = AlertLevel.CRITICAL
-                    threshold_value = critical_threshold
-                elif metric.value >= warning_threshold:
-                    alert_level = AlertLevel.WARNING
-                    threshold_value = warning_threshold
-            elif operator == "less_than":
-                if metric.value <= critical_threshold:
-                    alert_level = AlertLevel.CRITICAL
-                    threshold_value = critical_threshold
-                elif metric.value <= warning_threshold:
-                    alert_level = AlertLevel.WARNING
-                    threshold_value = warning_threshold
-            
-            if alert_level:
-                self._create_alert(metric, alert_level, threshold_value)
+            if self.engine.ingest(metric.metric_type.value, metric.value, {"node_id": metric.node_id}, metric.timestamp):
+                self._apply_events(self.engine.drain(), metric)
+            self.router.flush()
                 
         except Exception as e:
             logger.error(f"❌ Error evaluando métrica: {e}")
     
-    def _create_alert(self, metric: Metric, level: AlertLevel, threshold_value: float):
+    def _apply_events(self, events: List[AlertEvent], metric: Optional[Metric] = None):
+        """Crea o resuelve alertas según las transiciones del motor de reglas"""
+        events = self.inhibitor.apply(events)
+        for event in events:
+            if event.status == FIRING:
+                self._create_alert(event, metric)
+            else:
+                alert_id = self._alert_ids.pop(event.fingerprint, None)
+                if alert_id in self.alerts:
+                    self.alerts[alert_id].resolved = True
+                    logger.info(f"✅ Alerta resuelta: {alert_id}")
+        self.router.submit(events)
+    
+    def _create_alert(self, event: AlertEvent, metric: Optional[Metric] = None):
         """Crea nueva alerta"""
         try:
-            alert_id = f"{metric.node_id}_{metric.metric_type.value}_{int(metric.timestamp)}"
+            level: AlertLevel = event.rule.payload
+            metric_type = MetricType(event.rule.metric)
+            node_id = event.labels.get("node_id", "")
+            unit = metric.unit if metric is not None else ""
+            alert_id = f"{node_id}_{metric_type.value}_{level.value}_{int(event.since)}"
             
-            # Evitar alertas duplicadas recientes
-            if alert_id in self.alerts:
-                return
-            
-            title = f"{metric.metric_type.value.replace('_', ' ').title()} {level.value.title()}"
-            message = f"Node {metric.node_id}: {metric.metric_type.value} is {metric.value:.2f} {metric.unit} (threshold: {threshold_value:.2f})"
+            title = f"{metric_type.value.replace('_', ' ').title()} {level.value.title()}"
+            message = f"Node {node_id}: {metric_type.value} is {event.value:.2f} {unit} (threshold: {event.rule.threshold:.2f})"
             
             alert = Alert(
                 alert_id=alert_id,
                 level=level,
                 title=title,
                 message=message,
-                node_id=metric.node_id,
-                metric_type=metric.metric_type,
-                threshold_value=threshold_value if threshold_value is not None else 0.0,
-                current_value=metric.value,
-                timestamp=metric.timestamp
+                node_id=node_id,
+                metric_type=metric_type,
+                threshold_value=event.rule.threshold,
+                current_value=event.value,
+                timestamp=event.timestamp
             )
             
             self.alerts[alert_id] = alert
+            self._alert_ids[event.fingerprint] = alert_id
             
-            # Notificar callbacks
+            logger.warning(f"🚨 {level.value.upper()}: {message}")
+            
+        except Exception as e:
+            logger.error(f"❌ Error creando alerta: {e}")
+    
+    def _notify_callbacks(self, notification: AlertNotification):
+        """Notifica a los callbacks las alertas nuevas de un grupo"""
+        for event in notification.started:
+            alert = self.alerts.get(self._alert_ids.get(event.fingerprint, ""))
+            if alert is None:
+                continue
             for callback in self.notification_callbacks:
                 try:
                     callback(alert)
                 except Exception as e:
                     logger.error(f"❌ Error en callback de notificación: {e}")
-            
-            logger.warning(f"🚨 {level.value.upper()}: {message}")
-            
-        except Exception as e:
-            logger.error(f"❌ Error creando alerta: {e}")
     
     def get_active_alerts(self) -> List[Alert]:
         """Obtiene alertas activas"""
@@ -507,8 +577,8 @@ class DashboardServer:
         self.alert_manager = AlertManager()
         self.node_manager = NodeManager()
         
-        # Almacenamiento de datos
-        self.metrics_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
+        # Plano de datos: historial, agregados y envío por lotes en un único event loop
+        self.data_plane = DashboardDataPlane(tick_interval=1.0, history=1000, snapshot_points=50)
         self.server_thread = None
         self.server = None
         
@@ -526,21 +596,8 @@ class DashboardServer:
         @self.app.route('/api/metrics')
         def get_metrics():
             try:
-                # Obtener métricas recientes
-                metrics_data = {}
-                for metric_type, history in self.metrics_history.items():
-                    if history:
-                        recent_metrics = list(history)[-50:]  # Últimas 50
-                        metrics_data[metric_type] = [
-                            {
-                                'timestamp': m.timestamp,
-                                'value': m.value,
-                                'node_id': m.node_id,
-                                'unit': m.unit
-                            } for m in recent_metrics
-                        ]
-                
-                return jsonify(metrics_data)
+                # Últimas 50 por métrica, serializadas una vez por tick en el plano de datos
+                return self.app.response_class(self.data_plane.metrics_json(), mimetype='application/json')
                 
             except Exception as e:
                 logger.error(f"❌ Error obteniendo métricas: {e}")
@@ -592,20 +649,39 @@ class DashboardServer:
         
         @self.socketio.on('connect')
         def handle_connect():
-            # Use session ID instead of request.sid
+            sid = request.sid
             logger.info(f"🔌 Cliente conectado")
             join_room('dashboard')
+            self.data_plane.call_threadsafe(self.data_plane.connect, sid, self._frame_sender(sid, JSON_FRAMES),
+                                            (ALL_TOPICS,), JSON_FRAMES)
         
         @self.socketio.on('disconnect')
         def handle_disconnect():
-            # Use session ID instead of request.sid
             logger.info(f"🔌 Cliente desconectado")
             leave_room('dashboard')
+            self.data_plane.call_threadsafe(self.data_plane.disconnect, request.sid)
         
         @self.socketio.on('subscribe_metrics')
         def handle_subscribe_metrics(data):
-            metric_types = data.get('metric_types', [])
+            sid = request.sid
+            metric_types = data.get('metric_types') or [ALL_TOPICS]
+            encoding = data.get('format', JSON_FRAMES)
             logger.info(f"📊 Cliente suscrito a métricas: {metric_types}")
+            self.data_plane.call_threadsafe(self._subscribe_client, sid, metric_types, encoding)
+    
+    def _frame_sender(self, sid: str, encoding: str) -> Callable:
+        """Envía un frame del plano de datos a un único cliente Socket.IO"""
+        def send(frame):
+            self.socketio.emit('metrics_batch', frame, to=sid)
+        return send
+    
+    def _subscribe_client(self, sid: str, metric_types: List[str], encoding: str):
+        """Cambia topics (y codificación) de un cliente; se ejecuta en el loop del plano"""
+        client = self.data_plane.clients.get(sid)
+        if client is None or client.encoding != encoding:
+            self.data_plane.connect(sid, self._frame_sender(sid, encoding), metric_types, encoding)
+        else:
+            self.data_plane.subscribe(sid, metric_types)
     
     def _setup_alert_notifications(self):
         """Configura notificaciones de alertas"""
@@ -618,9 +694,6 @@ class DashboardServer:
     def start_server(self):
         """Inicia servidor del dashboard"""
         try:
-            # Iniciar recolección de métricas
-            self.metrics_collector.start_collection()
-            
             # Registrar nodo del dashboard
             dashboard_node = NodeInfo(
                 node_id="dashboard_node",
@@ -643,8 +716,9 @@ class DashboardServer:
             self.server_thread.daemon = True
             self.server_thread.start()
             
-            # Iniciar loop de procesamiento
-            self._start_processing_loop()
+            # Recolección, agregación y envío a clientes en el event loop del plano de datos
+            self.data_plane.add_background(lambda: self.metrics_collector.run_async(self._ingest_metrics))
+            self.data_plane.start()
             
             logger.info(f"🌐 Dashboard iniciado en http://{self.host}:{self.port}")
             
@@ -658,45 +732,24 @@ class DashboardServer:
         except Exception as e:
             logger.error(f"❌ Error en servidor web: {e}")
     
-    def _start_processing_loop(self):
-        """Inicia loop de procesamiento de datos"""
-        def processing_loop():
-            while True:
-                try:
-                    # Procesar métricas nuevas
-                    new_metrics = self.metrics_collector.get_metrics()
-                    
-                    for metric in new_metrics:
-                        # Almacenar en historial
-                        self.metrics_history[metric.metric_type.value].append(metric)
-                        
-                        # Evaluar alertas
-                        self.alert_manager.evaluate_metric(metric)
-                        
-                        # Emitir a clientes WebSocket
-                        self.socketio.emit('new_metric', asdict(metric))
-                    
-                    # Actualizar estado de nodos
-                    self.node_manager.update_node_status(
-                        "dashboard_node", 
-                        NodeStatus.ONLINE, 
-                        1.0
-                    )
-                    
-                    time.sleep(1)  # Procesar cada segundo
-                    
-                except Exception as e:
-                    logger.error(f"❌ Error en loop de procesamiento: {e}")
-                    time.sleep(5)
+    def _ingest_metrics(self, metrics: List[Metric]):
+        """Procesa una ronda de métricas en el loop del plano de datos"""
+        for metric in metrics:
+            # Evaluar alertas
+            self.alert_manager.evaluate_metric(metric)
+            
+            # Historial y agregados; los clientes reciben un lote por tick
+            self.data_plane.publish(metric.metric_type.value, metric.timestamp, metric.value,
+                                    metric.node_id, metric.unit)
         
-        processing_thread = threading.Thread(target=processing_loop)
-        processing_thread.daemon = True
-        processing_thread.start()
+        # Actualizar estado de nodos
+        self.node_manager.update_node_status("dashboard_node", NodeStatus.ONLINE, 1.0)
     
     def stop_server(self):
         """Detiene servidor del dashboard"""
         try:
             self.metrics_collector.stop_collection()
+            self.data_plane.stop()
             
             if self.server:
                 self.server.shutdown()
@@ -965,36 +1018,38 @@ DASHBOARD_HTML_TEMPLATE = '''
         }
 
         // Socket event handlers
+        // Topics shown in the charts
+        const chartTopics = {
+            cpu_usage: ['cpu-chart', chartData.cpu],
+            memory_usage: ['memory-chart', chartData.memory],
+            network_latency: ['latency-chart', chartData.latency],
+            model_accuracy: ['accuracy-chart', chartData.accuracy]
+        };
+
         socket.on('connect', function() {
             console.log('Connected to dashboard server');
+            socket.emit('subscribe_metrics', { metric_types: Object.keys(chartTopics) });
             loadInitialData();
         });
 
-        socket.on('new_metric', function(metric) {
-            const timestamp = new Date(metric.timestamp * 1000);
-            
-            switch(metric.metric_type) {
-                case 'cpu_usage':
-                    chartData.cpu.x.push(timestamp);
-                    chartData.cpu.y.push(metric.value);
-                    updateChart('cpu-chart', chartData.cpu);
-                    break;
-                case 'memory_usage':
-                    chartData.memory.x.push(timestamp);
-                    chartData.memory.y.push(metric.value);
-                    updateChart('memory-chart', chartData.memory);
-                    break;
-                case 'network_latency':
-                    chartData.latency.x.push(timestamp);
-                    chartData.latency.y.push(metric.value);
-                    updateChart('latency-chart', chartData.latency);
-                    break;
-                case 'model_accuracy':
-                    chartData.accuracy.x.push(timestamp);
-                    chartData.accuracy.y.push(metric.value);
-                    updateChart('accuracy-chart', chartData.accuracy);
-                    break;
-            }
+        // One batch per tick: "snapshot" replaces the series, "delta" appends
+        socket.on('metrics_batch', function(message) {
+            const batch = typeof message === 'string' ? JSON.parse(message) : message;
+            Object.keys(batch.topics).forEach(topic => {
+                const target = chartTopics[topic];
+                if (!target) return;
+                const [chartId, data] = target;
+                const points = batch.topics[topic].points;
+                if (batch.type === 'snapshot') {
+                    data.x = [];
+                    data.y = [];
+                }
+                points.forEach(point => {
+                    data.x.push(new Date(point[0] * 1000));
+                    data.y.push(point[1]);
+                });
+                updateChart(chartId, data);
+            });
         });
 
         socket.on('new_alert', function(alert) {
@@ -28,6 +28,9 @@ from datetime import datetime, timedelta
 import threading
 import queue
 
+from topology_analytics import TopologyAnalytics, bfs_distances
+from p2p_routing import LinkTable, RoutingTable, yen_k_shortest_paths
+
 # Use the configured logger from main
 try:
     from main import logger
@@ -102,6 +105,12 @@ class MessageType(Enum):
     BROADCAST = "broadcast"
 
 
+# Solo cargas de aplicación viajan por relay: los mensajes de control
+# (heartbeat, handshake, relay anidado...) alteran el estado del enlace directo
+RELAYABLE_MESSAGE_TYPES = frozenset({MessageType.DATA.value, MessageType.CONSENSUS.value, MessageType.SYNC.value})
+MAX_RELAY_HOPS = 8
+
+
 class NetworkProtocol(Enum):
     """Protocolos de red soportados"""
     TCP = "tcp"
@@ -151,6 +160,9 @@ class NetworkTopology:
     average_path_length: float
     node_degrees: Dict[str, int]
     critical_nodes: List[str]
+    connected_components: int = 0
+    diameter_upper_bound: int = 0
+    average_path_length_error: float = 0.0
 
 
 class PeerDiscoveryService:
@@ -541,6 +553,15 @@ class ConnectionManager:
         self.connection_pool: Dict[str, asyncio.Queue] = {}
         self.max_connections = 50
         self.connection_timeout = 30
+        # Tabla de enlaces compartida (asignada por P2PNetworkManager) para RTT de heartbeats
+        self.link_table: Optional[LinkTable] = None
+        # Callback async(message) para mensajes relay cuyo destino es este nodo;
+        # sin él, el mensaje interno se procesa como si llegara del origen
+        self.relay_delivery_handler: Optional[Callable] = None
+        # Callback(peer_id, vecinos) con los vecinos anunciados en heartbeats
+        self.peer_links_handler: Optional[Callable[[str, List[str]], None]] = None
+        # Heartbeats enviados pendientes de respuesta (peer -> timestamp)
+        self.pending_heartbeats: Dict[str, float] = {}
 
         # Estadísticas de conexión
         self.connection_stats = {
@@ -770,6 +791,10 @@ class ConnectionManager:
 
         if message_type == 'heartbeat':
             await self._handle_heartbeat(peer_id, message)
+        elif message_type == 'heartbeat_response':
+            await self._handle_heartbeat_response(peer_id, message)
+        elif message_type == 'relay':
+            await self._handle_relay_message(peer_id, message)
         elif message_type == 'data':
             await self._handle_data_message(peer_id, message)
         elif message_type == 'broadcast':
@@ -777,17 +802,104 @@ class ConnectionManager:
         else:
             logger.debug(f"📨 Mensaje {message_type} de {peer_id}")
 
+    def _record_peer_links(self, peer_id: str, message: Dict[str, Any]):
+        """Entrega los vecinos anunciados por el peer a la tabla de enlaces"""
+        neighbors = message.get("neighbors")
+        if self.peer_links_handler and isinstance(neighbors, list):
+            self.peer_links_handler(peer_id, [n for n in neighbors if isinstance(n, str)])
+
     async def _handle_heartbeat(self, peer_id: str, message: Dict[str, Any]):
         """Maneja mensaje de heartbeat"""
-        # Responder heartbeat
+        self._record_peer_links(peer_id, message)
+
+        # Responder heartbeat (con nuestros vecinos, para que el peer enrute a través de nosotros)
         response = {
             "type": "heartbeat_response",
             "node_id": self.node_id,
-            "timestamp": time.time()
+            "timestamp": time.time(),
+            "echo_timestamp": message.get("timestamp"),
+            "neighbors": self.get_connected_peers()
         }
 
         await self.send_message(peer_id, response)
 
+    async def _handle_heartbeat_response(self, peer_id: str, message: Dict[str, Any]):
+        """Registra el RTT medido con la respuesta de heartbeat"""
+        self._record_peer_links(peer_id, message)
+        echo_timestamp = message.get("echo_timestamp")
+        if not isinstance(echo_timestamp, (int, float)):
+            return
+        if self.pending_heartbeats.get(peer_id) == echo_timestamp:
+            del self.pending_heartbeats[peer_id]
+        if self.link_table is None:
+            return
+
+        rtt_ms = max((time.time() - echo_timestamp) * 1000.0, 0.0)
+        self.link_table.record_rtt(self.node_id, peer_id, rtt_ms)
+
+    async def send_heartbeats(self) -> int:
+        """Envía un heartbeat a cada peer; el anterior sin respuesta cuenta como pérdida"""
+        neighbors = self.get_connected_peers()
+        sent_count = 0
+
+        for peer_id in neighbors:
+            if peer_id in self.pending_heartbeats and self.link_table is not None:
+                self.link_table.record_loss(self.node_id, peer_id)
+
+            timestamp = time.time()
+            self.pending_heartbeats[peer_id] = timestamp
+            heartbeat_msg = {
+                "type": "heartbeat",
+                "node_id": self.node_id,
+                "timestamp": timestamp,
+                "neighbors": neighbors
+            }
+            if await self.send_message(peer_id, heartbeat_msg):
+                sent_count += 1
+
+        return sent_count
+
+    async def _handle_relay_message(self, peer_id: str, message: Dict[str, Any]):
+        """Entrega o reenvía un mensaje que viaja por una ruta de relay"""
+        route = message.get("route")
+        ttl = message.get("ttl")
+        index = self._relay_position(peer_id, route)
+        if index is None or not isinstance(ttl, int) or not 0 < ttl <= MAX_RELAY_HOPS:
+            logger.warning(f"⚠️ Ruta de relay inválida recibida de {peer_id}: {route}")
+            return
+
+        if index < len(route) - 1:
+            if ttl > 1:
+                await self.send_message(route[index + 1], dict(message, ttl=ttl - 1))
+            else:
+                logger.warning(f"⚠️ TTL de relay agotado en ruta {route}")
+            return
+
+        if self.relay_delivery_handler:
+            await self.relay_delivery_handler(message)
+            return
+
+        # El origen es el primer salto de la ruta validada, no el node_id declarado
+        inner, origin = message.get("message"), route[0]
+        if not isinstance(inner, dict):
+            logger.warning(f"⚠️ Mensaje relay sin contenido de {origin}")
+        elif inner.get("type") not in RELAYABLE_MESSAGE_TYPES:
+            logger.warning(f"⚠️ Mensaje {inner.get('type')} no admitido por relay desde {origin}")
+        else:
+            logger.debug(f"📨 Mensaje relay de {origin} entregado")
+            await self._process_peer_message(origin, inner)
+
+    def _relay_position(self, peer_id: str, route: Any) -> Optional[int]:
+        """Posición de este nodo en una ruta sin repeticiones a la que llega desde el salto previo"""
+        if not isinstance(route, list) or not 2 <= len(route) <= MAX_RELAY_HOPS + 1:
+            return None
+        if len(set(route)) != len(route) or self.node_id not in route:
+            return None
+        index = route.index(self.node_id)
+        if index == 0 or route[index - 1] != peer_id:
+            return None
+        return index
+
     async def _handle_data_message(self, peer_id: str, message: Dict[str, Any]):
         """Maneja mensaje de datos"""
         logger.debug(f"📊 Datos recibidos de {peer_id}: {len(str(message))} bytes")
@@ -815,6 +927,7 @@ class ConnectionManager:
             # Serializar y enviar mensaje
             message_data = json.dumps(message).encode() + b'\n'
             writer.write(message_data)
+            self._record_load(peer_id, writer)
             await writer.drain()
 
             # Actualizar estadísticas
@@ -829,6 +942,19 @@ class ConnectionManager:
             await self._disconnect_peer(peer_id)
             return False
 
+    def _record_load(self, peer_id: str, writer: asyncio.StreamWriter):
+        """Carga del enlace: ocupación del buffer de escritura respecto a su límite alto"""
+        transport = getattr(writer, "transport", None)
+        if self.link_table is None or transport is None:
+            return
+        try:
+            high_water = transport.get_write_buffer_limits()[1]
+            buffered = transport.get_write_buffer_size()
+        except (AttributeError, NotImplementedError):
+            return
+        if high_water > 0:
+            self.link_table.set_load(self.node_id, peer_id, buffered / high_water)
+
     async def broadcast_message(self, message: Dict[str, Any], exclude_peers: Optional[List[str]] = None) -> int:
         """Envía mensaje broadcast a todos los peers conectados"""
         exclude_peers = exclude_peers or []
@@ -855,7 +981,10 @@ class ConnectionManager:
                 logger.debug(f"⚠️ Error cerrando conexión con {peer_id}: {e}")
 
             del self.active_connections[peer_id]
+            self.pending_heartbeats.pop(peer_id, None)
             self.connection_stats["active_connections"] -= 1
+            if self.link_table is not None:
+                self.link_table.remove_link(self.node_id, peer_id)
 
             logger.info(f"🔌 Peer {peer_id} desconectado")
 
@@ -878,6 +1007,10 @@ class NetworkTopologyManager:
         self.topology_cache = None
         self.last_analysis = 0
         self.analysis_interval = 300  # 5 minutos
+        # Analítica incremental: articulaciones O(V+E), union-find y métricas muestreadas
+        self.analytics = TopologyAnalytics(path_sample_size=64)
+        # Costes de enlace medidos (latencia/pérdida); sin tabla cada salto cuesta 1
+        self.link_table: Optional[LinkTable] = None
 
     def update_peer_connections(self, peer_connections: Dict[str, List[str]]):
         """Actualiza información de conexiones de peers"""
@@ -888,6 +1021,23 @@ class NetworkTopologyManager:
                 self.network_graph[peer_id].add(connected_peer)
                 self.network_graph[connected_peer].add(peer_id)
 
+        self.analytics.set_graph(self.network_graph)
+        self.topology_cache = None
+
+    def add_peer_connection(self, peer_a: str, peer_b: str):
+        """Registra un enlace nuevo sin reconstruir la topología"""
+        self.network_graph[peer_a].add(peer_b)
+        self.network_graph[peer_b].add(peer_a)
+        self.analytics.add_edge(peer_a, peer_b)
+        self.topology_cache = None
+
+    def remove_peer_connection(self, peer_a: str, peer_b: str):
+        """Elimina un enlace sin reconstruir la topología"""
+        self.network_graph.get(peer_a, set()).discard(peer_b)
+        self.network_graph.get(peer_b, set()).discard(peer_a)
+        self.analytics.remove_edge(peer_a, peer_b)
+        self.topology_cache = None
+
     async def analyze_topology(self) -> NetworkTopology:
         """Analiza la topología actual de la red"""
         try:
@@ -924,6 +1074,8 @@ class NetworkTopologyManager:
             # Identificar nodos críticos
             critical_nodes = await self._identify_critical_nodes()
 
+            path_metrics = self.analytics.path_metrics()
+
             # Crear objeto de topología
             topology = NetworkTopology(
                 total_nodes=total_nodes,
@@ -932,7 +1084,10 @@ class NetworkTopologyManager:
                 clustering_coefficient=clustering_coefficient,
                 average_path_length=average_path_length,
                 node_degrees=node_degrees,
-                critical_nodes=critical_nodes
+                critical_nodes=critical_nodes,
+                connected_components=self.analytics.component_count(),
+                diameter_upper_bound=path_metrics.diameter_upper_bound,
+                average_path_length_error=path_metrics.average_path_length_error
             )
 
             # Actualizar caché
@@ -947,34 +1102,19 @@ class NetworkTopologyManager:
             return NetworkTopology(0, 0, 0, 0.0, 0.0, {}, [])
 
     async def _calculate_network_diameter(self) -> int:
-        """Calcula el diámetro de la red (camino más largo entre cualquier par de nodos)"""
+        """Calcula el diámetro de la red (camino más largo entre cualquier par de nodos)
+
+        Exacto hasta ``analytics.path_sample_size`` nodos; por encima se estima
+        por muestreo (ver ``NetworkTopology.diameter_upper_bound``).
+        """
         if not self.network_graph:
             return 0
 
-        max_distance = 0
-
-        for start_node in self.network_graph:
-            distances = await self._bfs_distances(start_node)
-            if distances:
-                max_distance = max(max_distance, max(distances.values()))
-
-        return max_distance
+        return self.analytics.path_metrics().diameter
 
     async def _bfs_distances(self, start_node: str) -> Dict[str, int]:
         """Calcula distancias BFS desde un nodo"""
-        distances = {start_node: 0}
-        queue = deque([start_node])
-
-        while queue:
-            current = queue.popleft()
-            current_distance = distances[current]
-
-            for neighbor in self.network_graph.get(current, set()):
-                if neighbor not in distances:
-                    distances[neighbor] = current_distance + 1
-                    queue.append(neighbor)
-
-        return distances
+        return bfs_distances(self.network_graph, start_node)
 
     async def _calculate_clustering_coefficient(self) -> float:
         """Calcula el coeficiente de clustering promedio"""
@@ -1008,24 +1148,11 @@ class NetworkTopologyManager:
         return total_coefficient / node_count if node_count > 0 else 0.0
 
     async def _calculate_average_path_length(self) -> float:
-        """Calcula la longitud promedio de camino"""
+        """Calcula la longitud promedio de camino (muestreada en redes grandes)"""
         if not self.network_graph:
             return 0.0
 
-        total_distance = 0
-        path_count = 0
-
-        nodes = list(self.network_graph.keys())
-
-        for i, start_node in enumerate(nodes):
-            distances = await self._bfs_distances(start_node)
-
-            for j, end_node in enumerate(nodes):
-                if i < j and end_node in distances:
-                    total_distance += distances[end_node]
-                    path_count += 1
-
-        return total_distance / path_count if path_count > 0 else 0.0
+        return self.analytics.path_metrics().average_path_length
 
     async def _identify_critical_nodes(self) -> List[str]:
         """Identifica nodos críticos para la conectividad"""
@@ -1048,32 +1175,17 @@ class NetworkTopologyManager:
                 if degree > threshold:
                     critical_nodes.append(node_id)
 
-        # Nodos puente (cuya eliminación aumenta componentes conectados)
+        # Nodos puente (puntos de articulación, una sola pasada de Tarjan)
+        articulation_points = self.analytics.articulation_points()
         for node in self.network_graph:
-            if await self._is_bridge_node(node):
-                if node not in critical_nodes:
-                    critical_nodes.append(node)
+            if node in articulation_points and node not in critical_nodes:
+                critical_nodes.append(node)
 
         return critical_nodes
 
     async def _is_bridge_node(self, node: str) -> bool:
         """Verifica si un nodo es un puente crítico"""
-        # Contar componentes conectados sin el nodo
-        temp_graph = {
-            n: connections - {node}
-            for n, connections in self.network_graph.items()
-            if n != node
-        }
-
-        # Remover nodo del grafo temporal
-        if node in temp_graph:
-            del temp_graph[node]
-
-        # Contar componentes conectados
-        original_components = await self._count_connected_components(self.network_graph)
-        modified_components = await self._count_connected_components(temp_graph)
-
-        return modified_components > original_components
+        return node in self.analytics.articulation_points()
 
     async def _count_connected_components(self, graph: Dict[str, Set[str]]) -> int:
         """Cuenta componentes conectados en el grafo"""
@@ -1088,41 +1200,32 @@ class NetworkTopologyManager:
         return components
 
     async def _dfs_visit(self, node: str, graph: Dict[str, Set[str]], visited: Set[str]):
-        """Visita nodos usando DFS"""
+        """Visita nodos usando DFS (iterativo, sin límite de recursión)"""
         visited.add(node)
+        stack = [node]
 
-        for neighbor in graph.get(node, set()):
-            if neighbor not in visited:
-                await self._dfs_visit(neighbor, graph, visited)
+        while stack:
+            current = stack.pop()
+            for neighbor in graph.get(current, set()):
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    stack.append(neighbor)
 
-    def get_optimal_routes(self, source: str, destination: str) -> List[List[str]]:
-        """Encuentra rutas óptimas entre dos nodos"""
+    def get_optimal_routes(self, source: str, destination: str, max_routes: int = 3) -> List[List[str]]:
+        """Encuentra rutas óptimas entre dos nodos (k caminos más cortos de Yen)"""
         if source not in self.network_graph or destination not in self.network_graph:
             return []
 
-        # Implementar algoritmo de rutas múltiples (ej: k-shortest paths)
-        routes = []
-
-        # Por simplicidad, usar BFS para encontrar camino más corto
-        queue = deque([(source, [source])])
-        visited = {source}
+        # Ponderar por latencia/pérdida medidas cuando haya tabla de enlaces
+        adjacency = {}
+        for node, neighbors in self.network_graph.items():
+            weights = {}
+            for neighbor in neighbors:
+                cost = self.link_table.cost(node, neighbor) if self.link_table else None
+                weights[neighbor] = cost if cost is not None else 1.0
+            adjacency[node] = weights
 
-        while queue:
-            current, path = queue.popleft()
-
-            if current == destination:
-                routes.append(path)
-                if len(routes) >= 3:  # Limitar a 3 rutas
-                    break
-                continue
-
-            for neighbor in self.network_graph.get(current, set()):
-                if neighbor not in visited or len(path) < 5:  # Permitir revisitas en caminos cortos
-                    new_path = path + [neighbor]
-                    queue.append((neighbor, new_path))
-                    visited.add(neighbor)
-
-        return routes
+        return [path for _, path in yen_k_shortest_paths(adjacency, source, destination, max_routes)]
 
 
 class P2PNetworkManager:
@@ -1138,6 +1241,15 @@ class P2PNetworkManager:
         self.connection_manager = ConnectionManager(node_id, port)
         self.topology_manager = NetworkTopologyManager(node_id)
 
+        # Enrutamiento: tabla de enlaces (RTT de heartbeats) y k rutas por destino
+        self.link_table = LinkTable()
+        self.routing_table = RoutingTable(node_id, self.link_table, k=3)
+        self.connection_manager.link_table = self.link_table
+        self.topology_manager.link_table = self.link_table
+        # Vecinos anunciados por cada peer en los heartbeats
+        self.remote_links: Dict[str, Set[str]] = {}
+        self.connection_manager.peer_links_handler = self.update_remote_links
+
         # Estado de la red
         self.network_active = False
         self.peer_list: Dict[str, PeerInfo] = {}
@@ -1220,12 +1332,13 @@ class P2PNetworkManager:
     async def _update_network_topology(self):
         """Actualiza información de topología de red"""
         try:
-            # Recopilar información de conexiones
-            peer_connections = {}
+            # Recopilar información de conexiones: las propias y las anunciadas por cada peer
+            connected_peers = self.connection_manager.get_connected_peers()
+            peer_connections = {self.node_id: connected_peers}
 
-            for peer_id in self.connection_manager.get_connected_peers():
-                # En implementación real, esto consultaría a cada peer por sus conexiones
-                peer_connections[peer_id] = []
+            for peer_id in connected_peers:
+                peer_connections[peer_id] = sorted(self.remote_links.get(peer_id, ()))
+                self.link_table.add_link(self.node_id, peer_id)
 
             # Actualizar topología
             self.topology_manager.update_peer_connections(peer_connections)
@@ -1237,14 +1350,8 @@ class P2PNetworkManager:
         """Bucle de heartbeat para mantener conexiones"""
         while self.network_active:
             try:
-                heartbeat_msg = {
-                    "type": "heartbeat",
-                    "node_id": self.node_id,
-                    "timestamp": time.time()
-                }
-
-                # Enviar heartbeat a todos los peers conectados
-                await self.connection_manager.broadcast_message(heartbeat_msg)
+                # Enviar heartbeat (con nuestros vecinos) a todos los peers conectados
+                await self.connection_manager.send_heartbeats()
 
                 await asyncio.sleep(self.heartbeat_interval)
 
@@ -1253,7 +1360,7 @@ class P2PNetworkManager:
                 await asyncio.sleep(10)
 
     async def send_message(self, peer_id: str, message_type: MessageType, payload: Dict[str, Any]) -> bool:
-        """Envía mensaje a un peer específico"""
+        """Envía mensaje a un peer específico (por relay si no hay conexión directa)"""
         message = {
             "type": message_type.value,
             "node_id": self.node_id,
@@ -1261,7 +1368,41 @@ class P2PNetworkManager:
             "timestamp": time.time()
         }
 
-        return await self.connection_manager.send_message(peer_id, message)
+        if peer_id in self.connection_manager.active_connections:
+            return await self.connection_manager.send_message(peer_id, message)
+
+        return await self.send_via_relay(peer_id, message)
+
+    async def send_via_relay(self, peer_id: str, message: Dict[str, Any]) -> bool:
+        """Envía un mensaje por la mejor ruta de relay cacheada hacia el destino"""
+        route = self.routing_table.best_route(peer_id)
+        if route is None or route.next_hop is None:
+            logger.warning(f"⚠️ Sin ruta hacia {peer_id}")
+            return False
+        if len(route.path) - 1 > MAX_RELAY_HOPS:
+            logger.warning(f"⚠️ Ruta hacia {peer_id} excede {MAX_RELAY_HOPS} saltos")
+            return False
+
+        relay_message = {
+            "type": "relay",
+            "node_id": self.node_id,
+            "route": route.path,
+            "ttl": len(route.path) - 1,
+            "message": message,
+            "timestamp": time.time()
+        }
+        return await self.connection_manager.send_message(route.next_hop, relay_message)
+
+    def update_remote_links(self, peer_id: str, neighbors: List[str]):
+        """Registra los enlaces anunciados por un peer para enrutar a través de él"""
+        announced = {neighbor for neighbor in neighbors if neighbor not in (peer_id, self.node_id)}
+        previous = self.remote_links.get(peer_id, set())
+
+        for neighbor in previous - announced:
+            self.link_table.remove_link(peer_id, neighbor)
+        for neighbor in announced - previous:
+            self.link_table.add_link(peer_id, neighbor)
+        self.remote_links[peer_id] = announced
 
     async def broadcast_message(self, message_type: MessageType, payload: Dict[str, Any]) -> int:
         """Envía mensaje broadcast a todos los peers"""
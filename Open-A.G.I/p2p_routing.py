@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Enrutamiento P2P - AEGIS Framework
+Tabla de enlaces ponderada por latencia/pérdida y rutas k-más-cortas para relay de mensajes.
+
+Características principales:
+- Tabla de enlaces alimentada por RTT de heartbeats (EWMA de latencia, varianza y pérdida)
+- Rutas k-más-cortas sin ciclos (algoritmo de Yen sobre Dijkstra)
+- Tabla de enrutamiento cacheada por destino con invalidación incremental
+- Selección O(1) de la mejor ruta de relay para envíos
+"""
+
+import heapq
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+
+Edge = Tuple[str, str]
+Adjacency = Dict[str, Dict[str, float]]
+
+
+def _edge(a: str, b: str) -> Edge:
+    """Clave canónica de un enlace no dirigido"""
+    return (a, b) if a <= b else (b, a)
+
+
+@dataclass
+class LinkMetrics:
+    """Métricas medidas de un enlace"""
+    rtt_ms: float
+    rtt_var_ms: float = 0.0
+    loss_rate: float = 0.0
+    load: float = 0.0  # utilización 0..1
+    samples: int = 0
+    last_update: float = field(default_factory=time.time)
+
+    @property
+    def cost(self) -> float:
+        """Coste del enlace: latencia esperada incluyendo retransmisiones y carga"""
+        delivery = max(1.0 - self.loss_rate, 0.01)
+        return (self.rtt_ms + self.rtt_var_ms) / delivery * (1.0 + self.load)
+
+
+class LinkTable:
+    """Tabla de enlaces con costes derivados de heartbeats
+
+    Los cambios de coste por debajo de ``change_threshold`` (relativo) no se
+    notifican, para que el jitter normal de RTT no invalide rutas cacheadas.
+    """
+
+    def __init__(self, default_rtt_ms: float = 100.0, alpha: float = 0.125,
+                 beta: float = 0.25, loss_alpha: float = 0.1, change_threshold: float = 0.1):
+        self.default_rtt_ms = default_rtt_ms
+        self.alpha = alpha  # peso EWMA del RTT (RFC 6298)
+        self.beta = beta  # peso EWMA de la varianza del RTT
+        self.loss_alpha = loss_alpha
+        self.change_threshold = change_threshold
+        self.links: Dict[Edge, LinkMetrics] = {}
+        self.adjacency: Adjacency = {}
+        self._listeners: List[Callable[[Edge, Optional[float], Optional[float]], None]] = []
+
+    def add_listener(self, callback: Callable[[Edge, Optional[float], Optional[float]], None]):
+        """Registra callback(edge, coste_anterior, coste_nuevo); None = enlace ausente"""
+        self._listeners.append(callback)
+
+    def _publish(self, edge: Edge, old_cost: Optional[float], new_cost: Optional[float]):
+        a, b = edge
+        if new_cost is None:
+            self.adjacency.get(a, {}).pop(b, None)
+            self.adjacency.get(b, {}).pop(a, None)
+        else:
+            self.adjacency.setdefault(a, {})[b] = new_cost
+            self.adjacency.setdefault(b, {})[a] = new_cost
+        for callback in self._listeners:
+            callback(edge, old_cost, new_cost)
+
+    def _maybe_publish(self, edge: Edge, metrics: LinkMetrics):
+        published = self.adjacency.get(edge[0], {}).get(edge[1])
+        cost = metrics.cost
+        if published is None or abs(cost - published) > self.change_threshold * published:
+            self._publish(edge, published, cost)
+
+    def add_link(self, a: str, b: str, rtt_ms: Optional[float] = None):
+        """Registra un enlace (con RTT inicial por defecto si no se conoce)"""
+        if a == b:
+            return
+        edge = _edge(a, b)
+        if edge in self.links:
+            return
+        self.links[edge] = LinkMetrics(rtt_ms=rtt_ms if rtt_ms is not None else self.default_rtt_ms)
+        self._maybe_publish(edge, self.links[edge])
+
+    def remove_link(self, a: str, b: str):
+        edge = _edge(a, b)
+        if self.links.pop(edge, None) is not None:
+            self._publish(edge, self.adjacency.get(edge[0], {}).get(edge[1]), None)
+
+    def remove_node(self, node: str):
+        for neighbor in list(self.adjacency.get(node, {})):
+            self.remove_link(node, neighbor)
+        self.adjacency.pop(node, None)
+
+    def record_rtt(self, a: str, b: str, rtt_ms: float):
+        """Incorpora una muestra de RTT (heartbeat) al enlace a-b"""
+        edge = _edge(a, b)
+        metrics = self.links.get(edge)
+        if metrics is None:
+            self.links[edge] = metrics = LinkMetrics(rtt_ms=rtt_ms, rtt_var_ms=rtt_ms / 2)
+        elif metrics.samples == 0:
+            metrics.rtt_ms = rtt_ms
+            metrics.rtt_var_ms = rtt_ms / 2
+        else:
+            metrics.rtt_var_ms = (1 - self.beta) * metrics.rtt_var_ms + self.beta * abs(metrics.rtt_ms - rtt_ms)
+            metrics.rtt_ms = (1 - self.alpha) * metrics.rtt_ms + self.alpha * rtt_ms
+        metrics.loss_rate = (1 - self.loss_alpha) * metrics.loss_rate
+        metrics.samples += 1
+        metrics.last_update = time.time()
+        self._maybe_publish(edge, metrics)
+
+    def record_loss(self, a: str, b: str):
+        """Registra un heartbeat perdido en el enlace a-b"""
+        metrics = self.links.get(_edge(a, b))
+        if metrics is None:
+            return
+        metrics.loss_rate = (1 - self.loss_alpha) * metrics.loss_rate + self.loss_alpha
+        metrics.last_update = time.time()
+        self._maybe_publish(_edge(a, b), metrics)
+
+    def set_load(self, a: str, b: str, load: float):
+        metrics = self.links.get(_edge(a, b))
+        if metrics is None:
+            return
+        metrics.load = min(max(load, 0.0), 1.0)
+        self._maybe_publish(_edge(a, b), metrics)
+
+    def cost(self, a: str, b: str) -> Optional[float]:
+        return self.adjacency.get(a, {}).get(b)
+
+
+def dijkstra(adjacency: Adjacency, source: str, target: Optional[str] = None,
+             banned_nodes: FrozenSet[str] = frozenset(),
+             banned_edges: FrozenSet[Edge] = frozenset()
+             ) -> Tuple[Dict[str, float], Dict[str, str]]:
+    """Dijkstra con nodos/enlaces excluidos; se detiene al fijar ``target``"""
+    distances = {source: 0.0}
+    previous: Dict[str, str] = {}
+    visited: Set[str] = set()
+    heap = [(0.0, source)]
+
+    while heap:
+        distance, node = heapq.heappop(heap)
+        if node in visited:
+            continue
+        visited.add(node)
+        if node == target:
+            break
+        for neighbor, weight in adjacency.get(node, {}).items():
+            if neighbor in banned_nodes or neighbor in visited:
+                continue
+            if banned_edges and _edge(node, neighbor) in banned_edges:
+                continue
+            candidate = distance + weight
+            if candidate < distances.get(neighbor, float("inf")):
+                distances[neighbor] = candidate
+                previous[neighbor] = node
+                heapq.heappush(heap, (candidate, neighbor))
+
+    return distances, previous
+
+
+def _build_path(previous: Dict[str, str], source: str, target: str) -> List[str]:
+    path = [target]
+    while path[-1] != source:
+        path.append(previous[path[-1]])
+    path.reverse()
+    return path
+
+
+def path_cost(adjacency: Adjacency, path: List[str]) -> float:
+    return sum(adjacency[a][b] for a, b in zip(path, path[1:]))
+
+
+def shortest_path(adjacency: Adjacency, source: str, target: str,
+                  banned_nodes: FrozenSet[str] = frozenset(),
+                  banned_edges: FrozenSet[Edge] = frozenset()) -> Optional[Tuple[float, List[str]]]:
+    distances, previous = dijkstra(adjacency, source, target, banned_nodes, banned_edges)
+    if target not in distances:
+        return None
+    return distances[target], _build_path(previous, source, target)
+
+
+def yen_k_shortest_paths(adjacency: Adjacency, source: str, target: str,
+                         k: int = 3) -> List[Tuple[float, List[str]]]:
+    """K caminos más cortos sin ciclos (Yen), ordenados por coste"""
+    if source not in adjacency or target not in adjacency or k <= 0:
+        return []
+    if source == target:
+        return [(0.0, [source])]
+
+    first = shortest_path(adjacency, source, target)
+    if first is None:
+        return []
+
+    paths: List[Tuple[float, List[str]]] = [first]
+    candidates: List[Tuple[float, List[str]]] = []
+    seen = {tuple(first[1])}
+
+    while len(paths) < k:
+        last_path = paths[-1][1]
+        for i in range(len(last_path) - 1):
+            spur_node = last_path[i]
+            root_path = last_path[:i + 1]
+
+            banned_edges = set()
+            for _, path in paths:
+                if len(path) > i + 1 and path[:i + 1] == root_path:
+                    banned_edges.add(_edge(path[i], path[i + 1]))
+            banned_nodes = frozenset(root_path[:-1])
+
+            spur = shortest_path(adjacency, spur_node, target, banned_nodes, frozenset(banned_edges))
+            if spur is None:
+                continue
+
+            total_path = root_path[:-1] + spur[1]
+            key = tuple(total_path)
+            if key not in seen:
+                seen.add(key)
+                heapq.heappush(candidates, (path_cost(adjacency, total_path), total_path))
+
+        if not candidates:
+            break
+        paths.append(heapq.heappop(candidates))
+
+    return paths
+
+
+@dataclass
+class Route:
+    """Ruta hacia un destino"""
+    path: List[str]
+    cost: float
+
+    @property
+    def next_hop(self) -> Optional[str]:
+        return self.path[1] if len(self.path) > 1 else None
+
+
+class RoutingTable:
+    """Tabla de enrutamiento por destino desde ``node_id``
+
+    Cada destino guarda sus k mejores rutas. Al cambiar un enlace:
+    - si empeora o desaparece, se invalidan solo los destinos cuyas rutas lo usan;
+    - si mejora o aparece, se invalidan los destinos cuyo peor coste cacheado
+      supera la cota inferior dist(origen, extremo) + coste del enlace.
+    """
+
+    def __init__(self, node_id: str, link_table: LinkTable, k: int = 3):
+        self.node_id = node_id
+        self.link_table = link_table
+        self.k = k
+        self.routes: Dict[str, List[Route]] = {}
+        self._edge_index: Dict[Edge, Set[str]] = {}
+        self._distances: Optional[Dict[str, float]] = None
+        self.stats = {"computations": 0, "invalidations": 0, "lookups": 0}
+        link_table.add_listener(self._on_link_change)
+
+    def _source_distances(self) -> Dict[str, float]:
+        if self._distances is None:
+            self._distances = dijkstra(self.link_table.adjacency, self.node_id)[0]
+        return self._distances
+
+    def _invalidate(self, destination: str):
+        routes = self.routes.pop(destination, None)
+        if routes is None:
+            return
+        self.stats["invalidations"] += 1
+        for route in routes:
+            for a, b in zip(route.path, route.path[1:]):
+                users = self._edge_index.get(_edge(a, b))
+                if users is not None:
+                    users.discard(destination)
+
+    def _on_link_change(self, edge: Edge, old_cost: Optional[float], new_cost: Optional[float]):
+        if new_cost is None and old_cost is None:
+            return
+        if old_cost is not None and (new_cost is None or new_cost > old_cost):
+            # Empeora: afecta solo a destinos que usan el enlace
+            self._distances = None
+            for destination in list(self._edge_index.get(edge, ())):
+                self._invalidate(destination)
+            return
+
+        # Mejora o enlace nuevo: puede crear rutas mejores
+        self._distances = None
+        distances = self._source_distances()
+        a, b = edge
+        lower_bound = min(distances.get(a, float("inf")), distances.get(b, float("inf"))) + new_cost
+        for destination, routes in list(self.routes.items()):
+            if len(routes) < self.k or routes[-1].cost > lower_bound:
+                self._invalidate(destination)
+
+    def _compute(self, destination: str) -> List[Route]:
+        self.stats["computations"] += 1
+        paths = yen_k_shortest_paths(self.link_table.adjacency, self.node_id, destination, self.k)
+        routes = [Route(path=path, cost=cost) for cost, path in paths]
+        self.routes[destination] = routes
+        for route in routes:
+            for a, b in zip(route.path, route.path[1:]):
+                self._edge_index.setdefault(_edge(a, b), set()).add(destination)
+        return routes
+
+    def get_routes(self, destination: str) -> List[Route]:
+        """Las k mejores rutas hacia el destino (cacheadas)"""
+        self.stats["lookups"] += 1
+        routes = self.routes.get(destination)
+        if routes is None:
+            routes = self._compute(destination)
+        return routes
+
+    def best_route(self, destination: str, exclude: Iterable[str] = ()) -> Optional[Route]:
+        """Mejor ruta hacia el destino; O(1) si ya está en caché
+
+        ``exclude`` permite descartar relays (p.ej. sospechosos de fallo),
+        usando la siguiente de las k rutas.
+        """
+        excluded = set(exclude)
+        for route in self.get_routes(destination):
+            if not excluded.intersection(route.path[1:-1]):
+                return route
+        return None
+
+    def next_hop(self, destination: str) -> Optional[str]:
+        route = self.best_route(destination)
+        return route.next_hop if route else None
@@ -28,6 +28,7 @@ from enum import Enum
 import threading
 import queue
 import psutil
+from host_sampler import get_host_sampler
 try:
     import GPUtil
 except ImportError:
@@ -167,6 +168,9 @@ class MetricsCollector:
         # Historial de métricas
         self.metrics_history: Dict[str, deque] = defaultdict(lambda: deque(maxlen=1000))
         
+        # Lecturas del host compartidas con los demás recolectores
+        self.host = get_host_sampler().subscribe(interval=collection_interval)
+        
         logger.info("📊 Recolector de métricas inicializado")
     
     def start_collection(self):
@@ -215,15 +219,17 @@ class MetricsCollector:
     def _collect_system_metrics(self) -> List[PerformanceMetric]:
         """Recolecta métricas del sistema"""
         metrics = []
-        timestamp = time.time()
         node_id = "local"  # En un sistema distribuido, esto sería dinámico
         
         try:
+            # CPU y tasas promediadas desde la ronda anterior
+            host = self.host.poll()
+            timestamp = host.timestamp
+            
             # CPU
-            cpu_percent = psutil.cpu_percent(interval=1)
             metrics.append(PerformanceMetric(
                 metric_type=MetricType.CPU_USAGE,
-                value=cpu_percent,
+                value=host.cpu_percent,
                 timestamp=timestamp,
                 node_id=node_id,
                 unit="%",
@@ -232,51 +238,50 @@ class MetricsCollector:
             ))
             
             # Memoria
-            memory = psutil.virtual_memory()
             metrics.append(PerformanceMetric(
                 metric_type=MetricType.MEMORY_USAGE,
-                value=memory.percent,
+                value=host.memory_percent,
                 timestamp=timestamp,
                 node_id=node_id,
                 unit="%",
                 threshold_warning=80.0,
                 threshold_critical=95.0,
-                metadata={"total": memory.total, "available": memory.available}
+                metadata={"total": host.memory_total, "available": host.memory_available}
             ))
             
             # Disco I/O
-            disk_io = psutil.disk_io_counters()
-            if disk_io:
-                metrics.append(PerformanceMetric(
-                    metric_type=MetricType.DISK_IO,
-                    value=disk_io.read_bytes + disk_io.write_bytes,
-                    timestamp=timestamp,
-                    node_id=node_id,
-                    unit="bytes",
-                    metadata={
-                        "read_bytes": disk_io.read_bytes,
-                        "write_bytes": disk_io.write_bytes,
-                        "read_count": disk_io.read_count,
-                        "write_count": disk_io.write_count
-                    }
-                ))
+            metrics.append(PerformanceMetric(
+                metric_type=MetricType.DISK_IO,
+                value=host.disk_read_bytes + host.disk_write_bytes,
+                timestamp=timestamp,
+                node_id=node_id,
+                unit="bytes",
+                metadata={
+                    "read_bytes": host.disk_read_bytes,
+                    "write_bytes": host.disk_write_bytes,
+                    "read_count": host.disk_read_count,
+                    "write_count": host.disk_write_count,
+                    "read_rate": host.disk_read_rate,
+                    "write_rate": host.disk_write_rate
+                }
+            ))
             
             # Red I/O
-            net_io = psutil.net_io_counters()
-            if net_io:
-                metrics.append(PerformanceMetric(
-                    metric_type=MetricType.NETWORK_IO,
-                    value=net_io.bytes_sent + net_io.bytes_recv,
-                    timestamp=timestamp,
-                    node_id=node_id,
-                    unit="bytes",
-                    metadata={
-                        "bytes_sent": net_io.bytes_sent,
-                        "bytes_recv": net_io.bytes_recv,
-                        "packets_sent": net_io.packets_sent,
-                        "packets_recv": net_io.packets_recv
-                    }
-                ))
+            metrics.append(PerformanceMetric(
+                metric_type=MetricType.NETWORK_IO,
+                value=host.net_bytes_sent + host.net_bytes_recv,
+                timestamp=timestamp,
+                node_id=node_id,
+                unit="bytes",
+                metadata={
+                    "bytes_sent": host.net_bytes_sent,
+                    "bytes_recv": host.net_bytes_recv,
+                    "packets_sent": host.net_packets_sent,
+                    "packets_recv": host.net_packets_recv,
+                    "sent_rate": host.net_sent_rate,
+                    "recv_rate": host.net_recv_rate
+                }
+            ))
             
         except Exception as e:
             logger.error(f"❌ Error recolectando métricas del sistema: {e}")
@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Motor de Sondeo Asíncrono - AEGIS Framework
+Sondeo concurrente de nodos con sesiones keep-alive y detección de fallos phi-accrual.
+
+Características principales:
+- Pool de sesiones HTTP keep-alive por nodo (sin handshake TCP por heartbeat)
+- Sondeo concurrente acotado por semáforo: el tiempo de ronda no crece con el clúster
+- Comprobaciones TCP no bloqueantes (asyncio.open_connection)
+- Detector de fallos phi-accrual basado en el historial de inter-llegadas
+- Piggybacking: el tráfico de datos cuenta como heartbeat en ambos sentidos
+"""
+
+import asyncio
+import logging
+import math
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import aiohttp  # type: ignore
+    HAS_AIOHTTP = True
+except Exception:
+    aiohttp = None  # type: ignore
+    HAS_AIOHTTP = False
+
+logger = logging.getLogger(__name__)
+
+
+class _ArrivalWindow:
+    """Ventana de inter-llegadas con media y varianza acumuladas en O(1)"""
+
+    def __init__(self, max_samples: int):
+        self.intervals: deque = deque(maxlen=max_samples)
+        self.total = 0.0
+        self.total_squares = 0.0
+        self.last_arrival: Optional[float] = None
+
+    def add(self, interval: float):
+        if len(self.intervals) == self.intervals.maxlen:
+            dropped = self.intervals[0]
+            self.total -= dropped
+            self.total_squares -= dropped * dropped
+        self.intervals.append(interval)
+        self.total += interval
+        self.total_squares += interval * interval
+
+    @property
+    def mean(self) -> float:
+        return self.total / len(self.intervals)
+
+    @property
+    def std_deviation(self) -> float:
+        mean = self.mean
+        return math.sqrt(max(self.total_squares / len(self.intervals) - mean * mean, 0.0))
+
+
+class PhiAccrualFailureDetector:
+    """Detector de fallos phi-accrual (Hayashibara et al.)
+
+    En lugar de un timeout fijo, calcula phi = -log10(P(llegada posterior a t))
+    según la distribución observada de inter-llegadas de cada nodo. phi = 8
+    equivale a ~1e-8 de probabilidad de que el nodo siga vivo y solo vaya lento.
+    """
+
+    def __init__(self, threshold: float = 8.0, max_samples: int = 1000,
+                 min_std_deviation: float = 0.1, acceptable_pause: float = 0.0,
+                 first_heartbeat_estimate: float = 1.0):
+        self.threshold = threshold
+        self.max_samples = max_samples
+        self.min_std_deviation = min_std_deviation
+        self.acceptable_pause = acceptable_pause
+        self.first_heartbeat_estimate = first_heartbeat_estimate
+        self.windows: Dict[str, _ArrivalWindow] = {}
+
+    def heartbeat(self, node_id: str, now: Optional[float] = None):
+        """Registra una llegada (heartbeat explícito o tráfico de datos)"""
+        now = time.time() if now is None else now
+        window = self.windows.get(node_id)
+        if window is None:
+            window = self.windows[node_id] = _ArrivalWindow(self.max_samples)
+            # Sembrar con la estimación inicial para tener varianza desde el principio
+            estimate = self.first_heartbeat_estimate
+            window.add(estimate - estimate / 4)
+            window.add(estimate + estimate / 4)
+        elif window.last_arrival is not None:
+            window.add(max(now - window.last_arrival, 0.0))
+        window.last_arrival = now
+
+    def phi(self, node_id: str, now: Optional[float] = None) -> float:
+        window = self.windows.get(node_id)
+        if window is None or window.last_arrival is None:
+            return 0.0
+        now = time.time() if now is None else now
+        elapsed = now - window.last_arrival
+        mean = window.mean + self.acceptable_pause
+        std = max(window.std_deviation, self.min_std_deviation)
+
+        # Aproximación logística de la CDF normal (Akka)
+        y = (elapsed - mean) / std
+        exponent = -y * (1.5976 + 0.070566 * y * y)
+        if elapsed > mean:
+            # -log10(e / (1 + e)) calculado en escala logarítmica para evitar underflow
+            return -exponent / math.log(10) + math.log10(1.0 + math.exp(exponent))
+        e = math.exp(min(exponent, 700.0))
+        return -math.log10(1.0 - 1.0 / (1.0 + e))
+
+    def is_available(self, node_id: str, now: Optional[float] = None) -> bool:
+        return self.phi(node_id, now) < self.threshold
+
+    def has_history(self, node_id: str) -> bool:
+        return node_id in self.windows
+
+    def remove(self, node_id: str):
+        self.windows.pop(node_id, None)
+
+
+@dataclass
+class ProbeResult:
+    """Resultado de un sondeo"""
+    target: str
+    ok: bool
+    status: Optional[int] = None
+    latency: Optional[float] = None
+    error: Optional[str] = None
+    body: Any = None
+
+
+class ProbeEngine:
+    """Sondeo concurrente de nodos con sesiones keep-alive reutilizadas"""
+
+    def __init__(self, max_concurrency: int = 64, connections_per_node: int = 2,
+                 keepalive_timeout: float = 60.0, default_timeout: float = 3.0,
+                 max_idle: float = 300.0):
+        self.max_concurrency = max_concurrency
+        self.connections_per_node = connections_per_node
+        self.keepalive_timeout = keepalive_timeout
+        self.default_timeout = default_timeout
+        self.max_idle = max_idle
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._sessions: Dict[str, Any] = {}
+        self._last_used: Dict[str, float] = {}
+        self.last_sent: Dict[str, float] = {}
+        self.stats = {"probes": 0, "failures": 0, "sessions_created": 0}
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Creado de forma perezosa para ligarse al loop en ejecución
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    def _session_for(self, address: str, port: int):
+        key = f"{address}:{port}"
+        session = self._sessions.get(key)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.connections_per_node,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            self._sessions[key] = session
+            self.stats["sessions_created"] += 1
+        self._last_used[key] = time.time()
+        return session
+
+    def note_sent(self, node_id: str, now: Optional[float] = None):
+        """Registra tráfico de datos saliente hacia un nodo (sustituye al heartbeat explícito)"""
+        self.last_sent[node_id] = time.time() if now is None else now
+
+    def recently_sent(self, node_id: str, interval: float, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        return now - self.last_sent.get(node_id, 0.0) < interval
+
+    async def request(self, method: str, address: str, port: int, path: str,
+                      payload: Optional[Dict[str, Any]] = None,
+                      timeout: Optional[float] = None, target: Optional[str] = None,
+                      read_json: bool = False) -> ProbeResult:
+        """Petición HTTP por la sesión keep-alive del nodo, acotada por el semáforo"""
+        target = target or f"{address}:{port}"
+        if not HAS_AIOHTTP:
+            return ProbeResult(target=target, ok=False, error="aiohttp no disponible")
+
+        url = f"http://{address}:{port}{path}"
+        client_timeout = aiohttp.ClientTimeout(total=timeout or self.default_timeout)
+        async with self.semaphore:
+            self.stats["probes"] += 1
+            start = time.perf_counter()
+            try:
+                session = self._session_for(address, port)
+                async with session.request(method, url, json=payload, timeout=client_timeout) as response:
+                    body = None
+                    if read_json and response.status == 200:
+                        body = await response.json()
+                    else:
+                        await response.read()
+                    latency = time.perf_counter() - start
+                    ok = response.status == 200
+                    if not ok:
+                        self.stats["failures"] += 1
+                    return ProbeResult(target=target, ok=ok, status=response.status,
+                                       latency=latency, body=body)
+            except Exception as e:
+                self.stats["failures"] += 1
+                return ProbeResult(target=target, ok=False, latency=time.perf_counter() - start,
+                                   error=str(e) or type(e).__name__)
+
+    async def get(self, address: str, port: int, path: str, **kwargs) -> ProbeResult:
+        return await self.request("GET", address, port, path, **kwargs)
+
+    async def post(self, address: str, port: int, path: str, payload: Dict[str, Any], **kwargs) -> ProbeResult:
+        return await self.request("POST", address, port, path, payload=payload, **kwargs)
+
+    async def check_tcp(self, address: str, port: int, timeout: Optional[float] = None) -> ProbeResult:
+        """Comprueba que un puerto acepta conexiones sin bloquear el loop"""
+        target = f"{address}:{port}"
+        async with self.semaphore:
+            self.stats["probes"] += 1
+            start = time.perf_counter()
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(address, port), timeout or self.default_timeout
+                )
+                latency = time.perf_counter() - start
+                writer.close()
+                try:
+                    await writer.wait_closed()
+                except Exception:
+                    pass
+                return ProbeResult(target=target, ok=True, latency=latency)
+            except Exception as e:
+                self.stats["failures"] += 1
+                return ProbeResult(target=target, ok=False, latency=time.perf_counter() - start,
+                                   error=str(e) or type(e).__name__)
+
+    async def probe_many(self, probes: Iterable[Tuple[str, Any]]) -> Dict[str, Any]:
+        """Ejecuta en paralelo pares (clave, corrutina); la concurrencia la limita el semáforo"""
+        keys: List[str] = []
+        coroutines = []
+        for key, coroutine in probes:
+            keys.append(key)
+            coroutines.append(coroutine)
+        results = await asyncio.gather(*coroutines, return_exceptions=True)
+        return dict(zip(keys, results))
+
+    async def close_idle(self):
+        """Cierra sesiones sin uso reciente"""
+        now = time.time()
+        for key, last_used in list(self._last_used.items()):
+            if now - last_used > self.max_idle:
+                session = self._sessions.pop(key, None)
+                self._last_used.pop(key, None)
+                if session is not None:
+                    await session.close()
+
+    async def close(self):
+        for session in self._sessions.values():
+            try:
+                await session.close()
+            except Exception:
+                pass
+        self._sessions.clear()
+        self._last_used.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, open_sessions=len(self._sessions))
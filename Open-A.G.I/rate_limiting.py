@@ -0,0 +1,380 @@
+"""
+Rate Limiting Module for AEGIS
+
+This module provides the request rate limiting used by the API server,
+offering:
+- GCRA (generic cell rate algorithm) limiting with one float of state per key
+- Optional sliding-window-counter mode
+- Sharded key stores with idle-key expiry, so silent clients cost nothing
+- Per-route and per-auth-level policies on top of a default policy
+- Exact retry-after computation
+- A microbenchmark of decisions/s and memory at 1M distinct clients
+"""
+
+import math
+import threading
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+GCRA = "gcra"
+SLIDING_WINDOW = "sliding_window"
+
+
+@dataclass(frozen=True)
+class RateLimitPolicy:
+    """A rate limit: `requests` per `window` seconds, allowing bursts of `burst`"""
+    requests: int
+    window: float
+    burst: Optional[int] = None
+    mode: str = GCRA
+
+    def __post_init__(self):
+        if self.requests < 1 or self.window <= 0:
+            raise ValueError("Rate limit policies need requests >= 1 and window > 0")
+        if self.mode not in (GCRA, SLIDING_WINDOW):
+            raise ValueError(f"Unknown rate limit mode: {self.mode}")
+
+    @property
+    def emission_interval(self) -> float:
+        """Seconds of budget consumed by one request"""
+        return self.window / self.requests
+
+    @property
+    def capacity(self) -> int:
+        return self.burst if self.burst is not None else self.requests
+
+
+@dataclass
+class RateLimitDecision:
+    """Outcome of a rate limit check"""
+    allowed: bool
+    retry_after: float
+    remaining: int
+    limit: int
+    policy: RateLimitPolicy
+
+    def headers(self) -> Dict[str, str]:
+        """Standard rate limit response headers"""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(self.remaining),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(math.ceil(self.retry_after))
+        return headers
+
+
+class ShardedStore:
+    """Key -> state dictionaries split into shards
+
+    Each shard has its own lock and its own sweep deadline. Entries whose
+    state has fully replenished are indistinguishable from absent keys, so a
+    shard past its deadline is rebuilt without them on its next access:
+    memory tracks the recently active clients, not every client ever seen,
+    and each sweep only touches one shard.
+    """
+
+    def __init__(self, shards: int = 64, sweep_interval: float = 60.0):
+        size = 1 << max(0, (shards - 1).bit_length())
+        self.mask = size - 1
+        self.shards: List[Dict[Hashable, Any]] = [{} for _ in range(size)]
+        self.locks = [threading.Lock() for _ in range(size)]
+        self.sweep_interval = sweep_interval
+        self.next_sweep = [0.0] * size
+        self.evicted = 0
+
+    def shard_for(self, key: Hashable) -> int:
+        return hash(key) & self.mask
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self.shards)
+
+    def sweep(self, index: int, live: Callable[[Any, float], bool], now: float) -> int:
+        """Rebuild a shard keeping only live entries (caller holds the lock)"""
+        shard = self.shards[index]
+        kept = {key: state for key, state in shard.items() if live(state, now)}
+        removed = len(shard) - len(kept)
+        self.shards[index] = kept
+        self.next_sweep[index] = now + self.sweep_interval
+        self.evicted += removed
+        return removed
+
+    def clear(self):
+        for shard in self.shards:
+            shard.clear()
+
+
+class PolicyLimiter:
+    """Rate limiter for a single policy"""
+
+    def __init__(self, policy: RateLimitPolicy, shards: int = 64,
+                 clock: Callable[[], float] = time.monotonic):
+        self.policy = policy
+        self.clock = clock
+        self.store = ShardedStore(shards, sweep_interval=policy.window)
+        self._interval = policy.emission_interval
+        self._tolerance = policy.capacity * self._interval
+        self._live = self._sliding_live if policy.mode == SLIDING_WINDOW else self._gcra_live
+
+    def __len__(self) -> int:
+        return len(self.store)
+
+    def check(self, key: Hashable, cost: int = 1) -> RateLimitDecision:
+        if self.policy.mode == SLIDING_WINDOW:
+            return self._check_sliding(key, cost)
+        return self._check_gcra(key, cost)
+
+    @staticmethod
+    def _gcra_live(tat: float, now: float) -> bool:
+        return tat > now
+
+    def _sliding_live(self, state: Tuple[int, int, int], now: float) -> bool:
+        return state[0] >= int(now // self.policy.window) - 1
+
+    def _check_gcra(self, key: Hashable, cost: int) -> RateLimitDecision:
+        # State is the theoretical arrival time (TAT): the instant at which the
+        # client's budget is fully replenished
+        now = self.clock()
+        interval, tolerance = self._interval, self._tolerance
+        store = self.store
+        index = hash(key) & store.mask
+        with store.locks[index]:
+            if now >= store.next_sweep[index]:
+                store.sweep(index, self._gcra_live, now)
+            shard = store.shards[index]
+            tat = shard.get(key, now)
+            if tat < now:
+                tat = now
+            new_tat = tat + interval * cost
+            allow_at = new_tat - tolerance
+            if allow_at > now:
+                return RateLimitDecision(False, allow_at - now, 0, self.policy.capacity, self.policy)
+            shard[key] = new_tat
+        remaining = int((now - allow_at) / interval + 1e-9)
+        return RateLimitDecision(True, 0.0, remaining, self.policy.capacity, self.policy)
+
+    def _check_sliding(self, key: Hashable, cost: int) -> RateLimitDecision:
+        # State is (current window number, previous window count, current count);
+        # the previous window is weighted by the part of it still inside the sliding window
+        now = self.clock()
+        window, limit = self.policy.window, self.policy.capacity
+        current = int(now // window)
+        elapsed = now / window - current
+        store = self.store
+        index = hash(key) & store.mask
+        with store.locks[index]:
+            if now >= store.next_sweep[index]:
+                store.sweep(index, self._sliding_live, now)
+            shard = store.shards[index]
+            number, previous, count = shard.get(key, (current, 0, 0))
+            if number != current:
+                previous = count if number == current - 1 else 0
+                count = 0
+            estimate = previous * (1.0 - elapsed) + count
+            allowed = estimate + cost <= limit
+            if allowed:
+                count += cost
+                estimate += cost
+                shard[key] = (current, previous, count)
+        if allowed:
+            return RateLimitDecision(True, 0.0, max(0, int(limit - estimate)), limit, self.policy)
+        return RateLimitDecision(False, self._sliding_retry_after(previous, count, elapsed, cost),
+                                 0, limit, self.policy)
+
+    def _sliding_retry_after(self, previous: int, count: int, elapsed: float, cost: int) -> float:
+        """Time until the sliding estimate leaves room for `cost` more requests"""
+        window, room = self.policy.window, self.policy.capacity - cost
+        if count <= room and previous:
+            # Wait inside the current window for the previous window to decay
+            needed = 1.0 - (room - count) / previous
+            return max(0.0, (needed - elapsed) * window)
+        # Wait into the next window, where the current count becomes the decaying one
+        needed = 1.0 - room / count if count else 0.0
+        return (1.0 - elapsed + max(0.0, needed)) * window
+
+    def peek_retry_after(self, key: Hashable) -> float:
+        """Seconds until `key` may make another request (without consuming budget)"""
+        now = self.clock()
+        index = self.store.shard_for(key)
+        state = self.store.shards[index].get(key)
+        if state is None:
+            return 0.0
+        if self.policy.mode == SLIDING_WINDOW:
+            window = self.policy.window
+            current = int(now // window)
+            number, previous, count = state
+            if number != current:
+                previous = count if number == current - 1 else 0
+                count = 0
+            elapsed = now / window - current
+            if previous * (1.0 - elapsed) + count + 1 <= self.policy.capacity:
+                return 0.0
+            return self._sliding_retry_after(previous, count, elapsed, 1)
+        return max(0.0, state + self._interval - self._tolerance - now)
+
+    def sweep(self) -> int:
+        """Evict every expired key now (normally done shard by shard on access)"""
+        now = self.clock()
+        removed = 0
+        for index in range(len(self.store.shards)):
+            with self.store.locks[index]:
+                removed += self.store.sweep(index, self._live, now)
+        return removed
+
+
+class RateLimiterSet:
+    """Default, per-route and per-auth-level rate limit policies
+
+    Policy resolution: an exact route match ("GET /path"), then the longest
+    matching path prefix, then the caller's auth level, then the default.
+    Each policy keeps its own key store, so a client's budget for one route
+    does not consume its budget for another.
+    """
+
+    def __init__(self, default: RateLimitPolicy,
+                 routes: Optional[Dict[str, RateLimitPolicy]] = None,
+                 auth_levels: Optional[Dict[Hashable, RateLimitPolicy]] = None,
+                 shards: int = 64, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self.shards = shards
+        self.default = PolicyLimiter(default, shards, clock)
+        self.routes: Dict[str, PolicyLimiter] = {}
+        self.prefixes: List[Tuple[str, PolicyLimiter]] = []
+        self.auth_levels: Dict[Hashable, PolicyLimiter] = {}
+        for route, policy in (routes or {}).items():
+            self.add_route_policy(route, policy)
+        for level, policy in (auth_levels or {}).items():
+            self.auth_levels[level] = PolicyLimiter(policy, shards, clock)
+
+    def add_route_policy(self, route: str, policy: RateLimitPolicy):
+        """Limit a route: "METHOD /path" for an exact match, "/prefix/*" for a subtree"""
+        limiter = PolicyLimiter(policy, self.shards, self.clock)
+        if route.endswith("*"):
+            self.prefixes.append((route[:-1], limiter))
+            self.prefixes.sort(key=lambda item: len(item[0]), reverse=True)
+        else:
+            self.routes[route] = limiter
+
+    def resolve(self, route: Optional[str] = None, auth_level: Optional[Hashable] = None) -> PolicyLimiter:
+        if route is not None:
+            limiter = self.routes.get(route)
+            if limiter is not None:
+                return limiter
+            path = route.split(" ", 1)[-1]
+            for prefix, limiter in self.prefixes:
+                if path.startswith(prefix) or route.startswith(prefix):
+                    return limiter
+        if auth_level is not None:
+            limiter = self.auth_levels.get(auth_level)
+            if limiter is not None:
+                return limiter
+        return self.default
+
+    def check(self, client_id: Hashable, route: Optional[str] = None,
+              auth_level: Optional[Hashable] = None, cost: int = 1) -> RateLimitDecision:
+        return self.resolve(route, auth_level).check(client_id, cost)
+
+    def limiters(self) -> List[PolicyLimiter]:
+        return [self.default, *self.routes.values(), *(limiter for _, limiter in self.prefixes),
+                *self.auth_levels.values()]
+
+    def sweep(self) -> int:
+        return sum(limiter.sweep() for limiter in self.limiters())
+
+    def stats(self) -> Dict[str, int]:
+        limiters = self.limiters()
+        return {
+            "policies": len(limiters),
+            "tracked_keys": sum(len(limiter) for limiter in limiters),
+            "evicted_keys": sum(limiter.store.evicted for limiter in limiters),
+        }
+
+
+class _ListRateLimiter:
+    """Previous per-client timestamp-list limiter (benchmark baseline)"""
+
+    def __init__(self, max_requests: int, window_seconds: int):
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.requests: Dict[str, list] = {}
+
+    def is_allowed(self, client_id: str) -> bool:
+        now = time.time()
+        if client_id not in self.requests:
+            self.requests[client_id] = []
+        self.requests[client_id] = [t for t in self.requests[client_id] if now - t < self.window_seconds]
+        if len(self.requests[client_id]) < self.max_requests:
+            self.requests[client_id].append(now)
+            return True
+        return False
+
+
+def benchmark_rate_limiter(clients: int = 1_000_000, hot_requests: int = 200_000,
+                           max_requests: int = 100, window: float = 60.0) -> List[Dict[str, float]]:
+    """
+    Decisions/s for one hot client and for `clients` distinct clients, and the
+    memory retained after the distinct-client pass (and once those clients
+    have been idle for a window), for the previous list limiter and the
+    GCRA / sliding-window limiters.
+    """
+    keys = [f"10.{(i >> 16) & 255}.{(i >> 8) & 255}.{i & 255}" for i in range(clients)]
+    # The distinct-client pass runs on a frozen clock, so all clients are
+    # still inside their window when memory is measured (a flood arriving at once)
+    start = time.monotonic()
+    clock = [start]
+    candidates = [
+        ("timestamp-list", lambda: _ListRateLimiter(max_requests, int(window)), "is_allowed"),
+        ("gcra", lambda: PolicyLimiter(RateLimitPolicy(max_requests, window), clock=lambda: clock[0]), "check"),
+        ("sliding-window", lambda: PolicyLimiter(RateLimitPolicy(max_requests, window, mode=SLIDING_WINDOW),
+                                                 clock=lambda: clock[0]), "check"),
+    ]
+    results = []
+    for name, factory, method in candidates:
+        limiter = factory()
+        decide = getattr(limiter, method)
+        started = time.perf_counter()
+        for _ in range(hot_requests):
+            decide("hot-client")
+        hot_rate = hot_requests / (time.perf_counter() - started)
+
+        limiter = factory()
+        decide = getattr(limiter, method)
+        started = time.perf_counter()
+        for key in keys:
+            decide(key)
+        distinct_rate = clients / (time.perf_counter() - started)
+
+        # Memory is measured on a separate pass (tracemalloc slows allocation)
+        del limiter, decide
+        tracemalloc.start()
+        baseline = tracemalloc.get_traced_memory()[0]
+        limiter = factory()
+        decide = getattr(limiter, method)
+        for key in keys:
+            decide(key)
+        retained = tracemalloc.get_traced_memory()[0] - baseline
+        if isinstance(limiter, PolicyLimiter):
+            # Same clients after two windows of silence
+            clock[0] = start + 2 * window
+            limiter.sweep()
+            clock[0] = start
+        idle = tracemalloc.get_traced_memory()[0] - baseline
+        tracemalloc.stop()
+        results.append({
+            "limiter": name,
+            "hot_decisions_per_second": hot_rate,
+            "distinct_decisions_per_second": distinct_rate,
+            "retained_mb": retained / 2 ** 20,
+            "retained_after_idle_mb": idle / 2 ** 20,
+        })
+        del limiter, decide
+    return results
+
+
+if __name__ == "__main__":
+    for row in benchmark_rate_limiter():
+        print(f"{row['limiter']:>15}: hot {row['hot_decisions_per_second']:>10,.0f}/s  "
+              f"1M clients {row['distinct_decisions_per_second']:>10,.0f}/s  "
+              f"retained {row['retained_mb']:7.1f} MB, after idle window {row['retained_after_idle_mb']:7.1f} MB")
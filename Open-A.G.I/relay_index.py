@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Índice de Relés TOR - AEGIS Framework
+Selección de paths ponderada por ancho de banda en tiempo logarítmico.
+
+Características principales:
+- Índice construido una vez por refresco de descriptores, no por circuito
+- Particiones por flag (Guard, Exit) y por países preferidos
+- Árbol de Fenwick de dos niveles (país -> relé) sobre anchos de banda
+  enteros: un único número aleatorio elige país y relé en O(log n)
+- Exclusiones sin reconstruir: países usados enmascarados en el nivel de
+  país; relés ya elegidos, familias y /16 anulados temporalmente
+- Aleatoriedad criptográfica (secrets) o semilla determinista para pruebas
+- Benchmark sobre un consenso sintético de 7k relés con verificación
+  estadística de la proporción por ancho de banda
+"""
+
+import math
+import secrets
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from stake_sampling import FenwickTree, seed_stream
+
+GUARD_FLAG = "Guard"
+EXIT_FLAG = "Exit"
+
+
+def relay_weight(node) -> int:
+    """Peso entero de un relé (+1 para que los relés sin medir sigan siendo elegibles)"""
+    return max(0, int(node.bandwidth or 0)) + 1
+
+
+def family_keys(node) -> Tuple[str, ...]:
+    """Claves de familia: familia declarada y subred /16 (EnforceDistinctSubnets)"""
+    keys = []
+    family = getattr(node, "family", None)
+    if family:
+        keys.append(f"family:{family}")
+    octets = str(node.address).split(".")
+    if len(octets) == 4:
+        keys.append(f"net:{octets[0]}.{octets[1]}")
+    return tuple(keys)
+
+
+def random_draws(seed: Optional[bytes] = None) -> Iterator[int]:
+    """Enteros aleatorios: secrets por defecto, derivados de una semilla si se da"""
+    if seed is not None:
+        return seed_stream(seed)
+
+    def stream():
+        while True:
+            yield secrets.randbits(128)
+    return stream()
+
+
+class RelayPartition:
+    """Relés de una partición agrupados por país, con un Fenwick por nivel"""
+
+    def __init__(self, nodes: Sequence[Any]):
+        by_country: Dict[str, List[Any]] = {}
+        for node in nodes:
+            by_country.setdefault(node.country or "Unknown", []).append(node)
+        self.countries = sorted(by_country)
+        self.country_slot = {country: i for i, country in enumerate(self.countries)}
+        self.relays: List[List[Any]] = [by_country[country] for country in self.countries]
+        self.position: Dict[str, Tuple[int, int]] = {}
+        self.members: Dict[str, List[Tuple[int, int]]] = {}
+        self.trees: List[FenwickTree] = []
+        self.country_tree = FenwickTree(max(1, len(self.countries)))
+        for c, relays in enumerate(self.relays):
+            tree = FenwickTree(len(relays))
+            for i, node in enumerate(relays):
+                tree.set(i, relay_weight(node))
+                self.position[node.fingerprint] = (c, i)
+                for key in family_keys(node):
+                    self.members.setdefault(key, []).append((c, i))
+            self.trees.append(tree)
+            self.country_tree.set(c, tree.total())
+        self.size = len(self.position)
+        self._zeroed: List[Tuple[int, int, int]] = []
+        self._masked: Set[int] = set()
+
+    def __len__(self) -> int:
+        return self.size
+
+    def total(self) -> int:
+        return self.country_tree.total()
+
+    def mask_countries(self, countries: Iterable[str]) -> None:
+        """Excluye países hasta el próximo restore()"""
+        for country in countries:
+            c = self.country_slot.get(country)
+            if c is not None and c not in self._masked:
+                self._masked.add(c)
+                self.country_tree.set(c, 0)
+
+    def exclude(self, relays: Iterable[str] = (), families: Iterable[str] = ()) -> None:
+        """Excluye relés concretos y familias completas hasta el próximo restore()"""
+        for fingerprint in relays:
+            position = self.position.get(fingerprint)
+            if position is not None:
+                self.zero(*position)
+        for key in families:
+            for position in self.members.get(key, ()):
+                self.zero(*position)
+
+    def zero(self, c: int, i: int) -> None:
+        """Excluye un relé hasta el próximo restore()"""
+        tree = self.trees[c]
+        weight = tree.weights[i]
+        if weight:
+            self._zeroed.append((c, i, weight))
+            tree.set(i, 0)
+            if c not in self._masked:
+                self.country_tree.set(c, tree.total())
+
+    def restore(self) -> None:
+        touched = set(self._masked)
+        for c, i, weight in reversed(self._zeroed):
+            self.trees[c].set(i, weight)
+            touched.add(c)
+        for c in touched:
+            self.country_tree.set(c, self.trees[c].total())
+        self._zeroed.clear()
+        self._masked.clear()
+
+    def pick(self, value: int) -> Optional[Tuple[int, int]]:
+        """(país, relé) para un entero aleatorio, proporcional al peso vigente"""
+        total = self.country_tree.total()
+        if total <= 0:
+            return None
+        target = value % total
+        c = self.country_tree.find(target)
+        # El resto dentro del país es uniforme en [0, peso del país)
+        i = self.trees[c].find(target - self.country_tree.prefix_sum(c))
+        return c, i
+
+
+class RelayIndex:
+    """Índice de relés para construir paths diversos ponderados por ancho de banda"""
+
+    def __init__(self, nodes: Sequence[Any], preferred_countries: Sequence[str] = ()):
+        self.nodes = nodes
+        self.preferred_countries = tuple(preferred_countries)
+        preferred = set(self.preferred_countries)
+        guards = [node for node in nodes if GUARD_FLAG in node.flags]
+        self.partitions: Dict[Tuple[Optional[str], bool], RelayPartition] = {
+            (None, False): RelayPartition(nodes),
+            (GUARD_FLAG, False): RelayPartition(guards),
+            (EXIT_FLAG, False): RelayPartition([node for node in nodes if EXIT_FLAG in node.flags]),
+            (GUARD_FLAG, True): RelayPartition([node for node in guards if node.country in preferred]),
+            (None, True): RelayPartition([node for node in nodes if node.country in preferred]),
+        }
+        self.built_at = time.time()
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def sample(self, partition: RelayPartition, draws: Iterator[int], exclude_countries: Iterable[str] = (),
+               exclude_relays: Iterable[str] = (), exclude_families: Iterable[str] = ()) -> Optional[Any]:
+        """Relé de la partición con probabilidad proporcional al ancho de banda entre los no excluidos"""
+        if not partition.size:
+            return None
+        partition.mask_countries(exclude_countries)
+        partition.exclude(exclude_relays, exclude_families)
+        try:
+            picked = partition.pick(next(draws))
+            return None if picked is None else partition.relays[picked[0]][picked[1]]
+        finally:
+            partition.restore()
+
+    def _hop_partitions(self, hop: int, path_length: int) -> List[RelayPartition]:
+        """Particiones candidatas para un salto, de la más a la menos restrictiva"""
+        if hop == 0:
+            keys = [(GUARD_FLAG, True), (None, True), (GUARD_FLAG, False)]
+        elif hop == path_length - 1:
+            keys = [(EXIT_FLAG, False)]
+        else:
+            keys = []
+        keys.append((None, False))
+        return [self.partitions[key] for key in keys]
+
+    def select_path(self, path_length: int = 3, seed: Optional[bytes] = None,
+                    draws: Optional[Iterator[int]] = None) -> List[Any]:
+        """
+        Path de relés distintos: Guard de país preferido al inicio, Exit al
+        final, sin repetir país, familia ni /16 mientras sea posible.
+
+        Raises:
+            ValueError: si no hay relés suficientes
+        """
+        if len(self.nodes) < path_length:
+            raise ValueError("No hay suficientes nodos disponibles")
+        draws = draws if draws is not None else random_draws(seed)
+        path: List[Any] = []
+        used_countries: Set[str] = set()
+        used_relays: Set[str] = set()
+        used_families: Set[str] = set()
+
+        for hop in range(path_length):
+            node = None
+            for partition in self._hop_partitions(hop, path_length):
+                node = self.sample(partition, draws, used_countries, used_relays, used_families)
+                if node is not None:
+                    break
+            if node is None:
+                # Sin candidatos diversos: cualquier relé no elegido
+                node = self.sample(self.partitions[(None, False)], draws, exclude_relays=used_relays)
+            if node is None:
+                raise ValueError("No se pueden encontrar suficientes nodos diversos")
+            path.append(node)
+            used_countries.add(node.country or "Unknown")
+            used_relays.add(node.fingerprint)
+            used_families.update(family_keys(node))
+        return path
+
+
+def _legacy_select_path(node_cache: List[Any], preferred_countries: Sequence[str], path_length: int = 3) -> List[Any]:
+    """Selección anterior (reagrupa el caché en cada salto; referencia del benchmark)"""
+    nodes_by_country: Dict[str, List[Any]] = {}
+    for node in node_cache:
+        nodes_by_country.setdefault(node.country or 'Unknown', []).append(node)
+    selected_path, used_countries = [], set()
+    preferred_available = [c for c in preferred_countries if c in nodes_by_country]
+    for i in range(path_length):
+        candidates = []
+        if i == 0 and preferred_available:
+            for country in preferred_available:
+                if country not in used_countries:
+                    candidates.extend(nodes_by_country[country])
+        else:
+            for country, nodes in nodes_by_country.items():
+                if country not in used_countries:
+                    candidates.extend(nodes)
+        if not candidates:
+            candidates = [n for n in node_cache if n not in selected_path]
+        selected_node = secrets.choice(candidates)
+        selected_path.append(selected_node)
+        used_countries.add(selected_node.country or 'Unknown')
+    return selected_path
+
+
+def bandwidth_share_check(index: RelayIndex, samples: int = 100_000, seed: bytes = b"share-check") -> Dict[str, float]:
+    """
+    Compara la frecuencia de selección sin restricciones con la proporción de
+    ancho de banda (chi-cuadrado sobre los relés agrupados en ~100 cubetas).
+
+    Returns:
+        dict con chi2, grados de libertad y z = (chi2 - gl) / sqrt(2 gl)
+        (|z| < 3 es compatible con la proporción esperada)
+    """
+    partition = index.partitions[(None, False)]
+    draws = random_draws(seed)
+    counts = Counter(index.sample(partition, draws).fingerprint for _ in range(samples))
+    total_weight = sum(relay_weight(node) for node in index.nodes)
+
+    # Cubetas de peso similar para que cada esperado sea grande
+    buckets: List[Tuple[float, int]] = []
+    expected, observed = 0.0, 0
+    bucket_size = total_weight / 100
+    for node in sorted(index.nodes, key=relay_weight):
+        expected += samples * relay_weight(node) / total_weight
+        observed += counts.get(node.fingerprint, 0)
+        if expected * total_weight / samples >= bucket_size:
+            buckets.append((expected, observed))
+            expected, observed = 0.0, 0
+    if expected:
+        buckets.append((expected, observed))
+    chi2 = sum((o - e) ** 2 / e for e, o in buckets)
+    dof = max(1, len(buckets) - 1)
+    return {'chi2': chi2, 'dof': dof, 'z': (chi2 - dof) / math.sqrt(2 * dof)}
+
+
+def benchmark_path_selection(relays: int = 7000, paths: int = 5000, seed: int = 0) -> Dict[str, float]:
+    """
+    Paths por segundo con el índice frente a la selección anterior, sobre un
+    consenso sintético (FakeTorController) filtrado como TorGateway.
+    """
+    import asyncio
+    from tor_circuit_pool import FakeTorController
+    from tor_integration import TorGateway
+
+    gateway = TorGateway(controller=FakeTorController(relays=relays, seed=seed), pool_size=0)
+    asyncio.run(gateway._refresh_node_list(force=True))
+    nodes = gateway.node_cache
+
+    started = time.perf_counter()
+    index = RelayIndex(nodes, gateway.preferred_countries)
+    build_seconds = time.perf_counter() - started
+
+    legacy_paths = max(1, paths // 10)
+    started = time.perf_counter()
+    for _ in range(legacy_paths):
+        _legacy_select_path(nodes, gateway.preferred_countries)
+    legacy_rate = legacy_paths / (time.perf_counter() - started)
+
+    started = time.perf_counter()
+    for _ in range(paths):
+        index.select_path(3)
+    index_rate = paths / (time.perf_counter() - started)
+
+    check = bandwidth_share_check(index)
+    return {
+        'relays': len(nodes),
+        'index_build_ms': build_seconds * 1000,
+        'legacy_paths_per_second': legacy_rate,
+        'index_paths_per_second': index_rate,
+        'share_chi2_z': check['z'],
+        'share_chi2': check['chi2'],
+        'share_dof': check['dof'],
+    }
+
+
+if __name__ == "__main__":
+    result = benchmark_path_selection()
+    print(f"Relés elegibles:           {result['relays']}")
+    print(f"Construcción del índice:   {result['index_build_ms']:.1f} ms")
+    print(f"Selección anterior:        {result['legacy_paths_per_second']:.0f} paths/s")
+    print(f"Índice ponderado:          {result['index_paths_per_second']:.0f} paths/s")
+    print(f"Proporción por bandwidth:  chi2 = {result['share_chi2']:.1f} ({result['share_dof']} gl), "
+          f"z = {result['share_chi2_z']:.2f}")
@@ -29,6 +29,8 @@ from collections import defaultdict, deque
 import statistics
 import hashlib
 
+from host_sampler import HostSnapshot, HostSubscription, get_host_sampler
+
 # Use the configured logger from main
 try:
     from main import logger
@@ -239,7 +241,13 @@ class ResourceMonitor:
         self.running = False
         self.current_utilization: Optional[ResourceUtilization] = None
         self.capacity: Optional[ResourceCapacity] = None
-        self._monitor_thread: Optional[threading.Thread] = None
+        self._subscription: Optional[HostSubscription] = None
+        self._gpu_available: Optional[bool] = None  # None hasta el primer intento
+        # GPUtil lanza nvidia-smi en cada lectura: se consulta en un hilo propio y
+        # las muestras del host solo leen el último valor
+        self._gpu_load = 0.0
+        self._gpu_stop = threading.Event()
+        self._gpu_thread: Optional[threading.Thread] = None
         
     def start_monitoring(self):
         """Iniciar monitoreo de recursos"""
@@ -247,16 +255,25 @@ class ResourceMonitor:
             return
         
         self.running = True
-        self._monitor_thread = threading.Thread(target=self._monitor_loop, daemon=True)
-        self._monitor_thread.start()
+        # Las muestras llegan del muestreador compartido del host, sin hilo propio
+        self._subscription = get_host_sampler().subscribe(self._on_host_sample, interval=self.update_interval)
+        if self._gpu_available is not False:
+            self._gpu_stop.clear()
+            self._gpu_thread = threading.Thread(target=self._gpu_loop, name="gpu-monitor", daemon=True)
+            self._gpu_thread.start()
         
         logger.info("Monitor de recursos iniciado")
     
     def stop_monitoring(self):
         """Detener monitoreo de recursos"""
         self.running = False
-        if self._monitor_thread:
-            self._monitor_thread.join(timeout=5.0)
+        if self._subscription:
+            self._subscription.close()
+            self._subscription = None
+        self._gpu_stop.set()
+        thread, self._gpu_thread = self._gpu_thread, None
+        if thread is not None:
+            thread.join(timeout=5.0)
         
         logger.info("Monitor de recursos detenido")
     
@@ -274,8 +291,7 @@ class ResourceMonitor:
         """Detectar capacidades del sistema"""
         cpu_count = psutil.cpu_count(logical=True) or 1  # Default to 1 if None
         cpu_freq = psutil.cpu_freq()
-        memory = psutil.virtual_memory()
-        disk = psutil.disk_usage('/')
+        host = get_host_sampler().current()
         
         # Detectar GPU (simplificado)
         gpu_count = 0
@@ -291,55 +307,49 @@ class ResourceMonitor:
         return ResourceCapacity(
             cpu_cores=cpu_count,
             cpu_frequency=cpu_freq.current / 1000 if cpu_freq else 2.0,  # GHz
-            memory_total=memory.total // (1024 * 1024),  # MB
-            storage_total=disk.total // (1024 * 1024),  # MB
+            memory_total=host.memory_total // (1024 * 1024),  # MB
+            storage_total=host.disk_total // (1024 * 1024),  # MB
             network_bandwidth=100.0,  # Estimación por defecto
             gpu_count=gpu_count,
             gpu_memory=gpu_memory
         )
     
-    def _monitor_loop(self):
-        """Bucle principal de monitoreo"""
-        while self.running:
+    def _on_host_sample(self, host: HostSnapshot):
+        """Actualizar la utilización con cada muestra del host"""
+        try:
+            self.current_utilization = ResourceUtilization(
+                cpu_percent=host.cpu_percent,
+                memory_percent=host.memory_percent,
+                storage_percent=host.disk_percent,
+                network_io=(host.net_sent_rate + host.net_recv_rate) / (1024 * 1024),  # MB/s
+                gpu_percent=self._gpu_load
+            )
+        except Exception as e:
+            logger.error(f"Error en monitoreo de recursos: {e}")
+    
+    def _gpu_loop(self):
+        """Refrescar la carga de GPU cacheada fuera del hilo del muestreador compartido"""
+        while True:
             try:
-                # CPU
-                cpu_percent = psutil.cpu_percent(interval=1)
-                
-                # Memoria
-                memory = psutil.virtual_memory()
-                memory_percent = memory.percent
-                
-                # Almacenamiento
-                disk = psutil.disk_usage('/')
-                storage_percent = (disk.used / disk.total) * 100
-                
-                # Red
-                net_io = psutil.net_io_counters()
-                network_io = (net_io.bytes_sent + net_io.bytes_recv) / (1024 * 1024)  # MB
-                
-                # GPU (si está disponible)
-                gpu_percent = 0.0
-                try:
-                    import GPUtil
-                    gpus = GPUtil.getGPUs()
-                    if gpus:
-                        gpu_percent = statistics.mean(gpu.load * 100 for gpu in gpus)
-                except ImportError:
-                    pass
-                
-                self.current_utilization = ResourceUtilization(
-                    cpu_percent=cpu_percent,
-                    memory_percent=memory_percent,
-                    storage_percent=storage_percent,
-                    network_io=network_io,
-                    gpu_percent=gpu_percent
-                )
-                
-                time.sleep(self.update_interval)
-                
+                self._gpu_load = self._gpu_percent()
             except Exception as e:
-                logger.error(f"Error en monitoreo de recursos: {e}")
-                time.sleep(self.update_interval)
+                logger.debug(f"Error leyendo GPU: {e}")
+            if self._gpu_available is False or self._gpu_stop.wait(self.update_interval):
+                return
+    
+    def _gpu_percent(self) -> float:
+        """Carga media de GPU (si está disponible)"""
+        if self._gpu_available is False:
+            return 0.0
+        try:
+            import GPUtil
+        except ImportError:
+            # No reintentar la importación en cada muestra
+            self._gpu_available = False
+            return 0.0
+        self._gpu_available = True
+        gpus = GPUtil.getGPUs()
+        return statistics.mean(gpu.load * 100 for gpu in gpus) if gpus else 0.0
 
 class LoadBalancer:
     """Balanceador de carga inteligente"""
@@ -32,6 +32,8 @@ from cryptography.hazmat.backends import default_backend
 import jwt
 import bcrypt
 
+from threat_correlation import ThreatCorrelator, BoundedEventStore, PatternDetection
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -567,8 +569,9 @@ class AuthenticationManager:
 class IntrusionDetectionSystem:
     """Sistema de detección de intrusiones en tiempo real"""
     
-    def __init__(self):
-        self.security_events: List[SecurityEvent] = []
+    def __init__(self, event_retention: float = 3600.0, max_events: int = 100000):
+        # Eventos recientes acotados por antigüedad y tamaño
+        self.security_events = BoundedEventStore(retention=event_retention, max_events=max_events)
         self.threat_patterns: Dict[str, Dict[str, Any]] = {}
         self.monitoring_active = False
         self.alert_thresholds = {
@@ -580,6 +583,9 @@ class IntrusionDetectionSystem:
         
         # Cargar patrones de amenazas conocidas
         self._load_threat_patterns()
+        
+        # Correlador en streaming con los indicadores compilados
+        self.correlator = ThreatCorrelator(self.threat_patterns)
     
     def _load_threat_patterns(self):
         """Carga patrones de amenazas conocidas"""
@@ -650,10 +656,27 @@ class IntrusionDetectionSystem:
         
         # Activar respuesta automática si es necesario
         if threat_level in [ThreatLevel.HIGH, ThreatLevel.CRITICAL]:
-            asyncio.create_task(self._trigger_automated_response(event))
+            self._schedule_automated_response(event)
+        
+        # Correlación incremental: los patrones se detectan al cruzar el umbral
+        detections = self.correlator.observe(
+            node_id, event_type, event.additional_data, event.timestamp, event_id
+        )
+        for detection in detections:
+            pattern_event = self._register_pattern_detection(detection)
+            self._schedule_automated_response(pattern_event)
         
         return event_id
     
+    def _schedule_automated_response(self, event: SecurityEvent):
+        """Programa la respuesta automática si hay un bucle de eventos activo"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            logger.debug(f"Sin bucle de eventos activo; respuesta diferida para {event.event_id}")
+            return
+        loop.create_task(self._trigger_automated_response(event))
+    
     def _assess_threat_level(self, event_type: str, additional_data: Dict[str, Any]) -> ThreatLevel:
         """Evalúa el nivel de amenaza de un evento"""
         # Mapeo básico de tipos de eventos a niveles de amenaza
@@ -749,37 +772,36 @@ class IntrusionDetectionSystem:
                 await asyncio.sleep(5)
     
     async def _analyze_behavior_patterns(self):
-        """Analiza patrones de comportamiento para detectar anomalías"""
+        """Mantenimiento de las ventanas de correlación
+
+        La detección ocurre en ``record_security_event``; aquí solo se expiran
+        eventos y ventanas antiguas para acotar la memoria.
+        """
         while self.monitoring_active:
             try:
                 await asyncio.sleep(30)
                 
-                # Analizar eventos recientes
-                recent_events = [
-                    event for event in self.security_events
-                    if time.time() - event.timestamp < 3600  # Última hora
-                ]
-                
-                # Detectar patrones sospechosos
-                await self._detect_threat_patterns(recent_events)
+                now = time.time()
+                self.security_events.evict_expired(now)
+                self.correlator.evict_expired(now)
                 
             except Exception as e:
                 logger.error(f"❌ Error analizando patrones de comportamiento: {e}")
                 await asyncio.sleep(10)
     
     async def _detect_threat_patterns(self, events: List[SecurityEvent]):
-        """Detecta patrones de amenazas en los eventos"""
+        """Detecta patrones de amenazas en un lote de eventos (análisis bajo demanda)"""
+        matching_events: Dict[str, List[SecurityEvent]] = defaultdict(list)
+        
+        # Una sola pasada: cada evento se compara con todos los indicadores a la vez
+        for event in events:
+            for pattern_name in self.correlator.indicators.match(event.event_type, event.additional_data):
+                matching_events[pattern_name].append(event)
+        
+        # Verificar si se supera el umbral
         for pattern_name, pattern_config in self.threat_patterns.items():
-            matching_events = []
-            
-            for event in events:
-                # Verificar si el evento coincide con indicadores del patrón
-                if self._event_matches_pattern(event, pattern_config):
-                    matching_events.append(event)
-            
-            # Verificar si se supera el umbral
-            if len(matching_events) >= pattern_config["threshold"]:
-                await self._handle_pattern_detection(pattern_name, matching_events)
+            if len(matching_events[pattern_name]) >= pattern_config["threshold"]:
+                await self._handle_pattern_detection(pattern_name, matching_events[pattern_name])
     
     def _event_matches_pattern(self, event: SecurityEvent, pattern_config: Dict[str, Any]) -> bool:
         """Verifica si un evento coincide con un patrón de amenaza"""
@@ -798,28 +820,42 @@ class IntrusionDetectionSystem:
     
     async def _handle_pattern_detection(self, pattern_name: str, matching_events: List[SecurityEvent]):
         """Maneja la detección de un patrón de amenaza"""
-        logger.warning(f"🎯 Patrón de amenaza detectado: {pattern_name} ({len(matching_events)} eventos)")
+        pattern_event = self._register_pattern_detection(PatternDetection(
+            pattern_name=pattern_name,
+            node_id="system",
+            event_ids=[e.event_id for e in matching_events],
+            window_start=min((e.timestamp for e in matching_events), default=time.time()),
+            timestamp=time.time()
+        ))
+        
+        # Activar respuesta automática
+        await self._trigger_automated_response(pattern_event)
+    
+    def _register_pattern_detection(self, detection: PatternDetection) -> SecurityEvent:
+        """Registra el evento de patrón detectado"""
+        logger.warning(f"🎯 Patrón de amenaza detectado: {detection.pattern_name} "
+                       f"({detection.event_count} eventos, nodo {detection.node_id})")
         
         # Crear evento de patrón detectado
         pattern_event = SecurityEvent(
             event_id=f"pattern_{int(time.time())}_{secrets.token_hex(4)}",
             node_id="system",
-            event_type=f"pattern_detected_{pattern_name}",
+            event_type=f"pattern_detected_{detection.pattern_name}",
             threat_level=ThreatLevel.HIGH,
-            description=f"Patrón de amenaza detectado: {pattern_name}",
+            description=f"Patrón de amenaza detectado: {detection.pattern_name}",
             timestamp=time.time(),
             source_ip="",
             additional_data={
-                "pattern_name": pattern_name,
-                "matching_events": [e.event_id for e in matching_events],
-                "event_count": len(matching_events)
+                "pattern_name": detection.pattern_name,
+                "source_node": detection.node_id,
+                "matching_events": detection.event_ids,
+                "event_count": detection.event_count,
+                "window_start": detection.window_start
             }
         )
         
         self.security_events.append(pattern_event)
-        
-        # Activar respuesta automática
-        await self._trigger_automated_response(pattern_event)
+        return pattern_event
     
     async def _process_security_events(self):
         """Procesa eventos de seguridad pendientes"""
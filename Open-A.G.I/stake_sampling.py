@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+Muestreo de Validadores por Stake - AEGIS Framework
+Selección ponderada por stake en tiempo logarítmico con semillas verificables.
+
+Características principales:
+- Árbol de Fenwick sobre stakes enteros (sin deriva de coma flotante)
+- Altas, bajas, recompensas y penalizaciones en O(log n)
+- Selección en O(log n) por descenso binario sobre sumas prefijas
+- Semilla determinista derivada del hash del bloque anterior
+- Comités de k validadores distintos
+- Benchmark de rendimiento con 100k validadores
+"""
+
+import hashlib
+import time
+from typing import Dict, Iterator, List, Optional
+
+# Unidades enteras por unidad de stake (micro-tokens)
+STAKE_SCALE = 10 ** 6
+
+
+def derive_seed(previous_hash: str, block_height: int, domain: str = "validator") -> bytes:
+    """Semilla verificable: cualquier nodo con la cabecera anterior la recalcula"""
+    return hashlib.sha256(f"{domain}:{block_height}:{previous_hash}".encode()).digest()
+
+
+def seed_stream(seed: bytes) -> Iterator[int]:
+    """Secuencia determinista de enteros de 256 bits a partir de una semilla"""
+    counter = 0
+    while True:
+        yield int.from_bytes(hashlib.sha256(seed + counter.to_bytes(8, "big")).digest(), "big")
+        counter += 1
+
+
+class FenwickTree:
+    """Árbol de Fenwick de pesos enteros no negativos"""
+
+    def __init__(self, capacity: int = 16):
+        self.weights: List[int] = [0] * capacity
+        self._tree: List[int] = [0] * (capacity + 1)
+
+    def __len__(self) -> int:
+        return len(self.weights)
+
+    def grow(self, capacity: int):
+        """Amplía la capacidad reconstruyendo el árbol en O(n)"""
+        self.weights.extend([0] * (capacity - len(self.weights)))
+        tree = [0] + list(self.weights)
+        for i in range(1, len(tree)):
+            parent = i + (i & -i)
+            if parent < len(tree):
+                tree[parent] += tree[i]
+        self._tree = tree
+
+    def set(self, index: int, weight: int):
+        delta = weight - self.weights[index]
+        if not delta:
+            return
+        self.weights[index] = weight
+        tree, size = self._tree, len(self._tree)
+        i = index + 1
+        while i < size:
+            tree[i] += delta
+            i += i & -i
+
+    def total(self) -> int:
+        return self.prefix_sum(len(self.weights))
+
+    def prefix_sum(self, count: int) -> int:
+        """Suma de los primeros count pesos"""
+        total, tree, i = 0, self._tree, count
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target: int) -> int:
+        """Menor índice cuya suma prefija inclusiva supera target (0 <= target < total)"""
+        tree, size = self._tree, len(self._tree) - 1
+        position = 0
+        step = 1 << (size.bit_length() - 1) if size else 0
+        while step:
+            nxt = position + step
+            if nxt <= size and tree[nxt] <= target:
+                position = nxt
+                target -= tree[nxt]
+            step >>= 1
+        return position
+
+
+class StakeSampler:
+    """Muestreo de validadores proporcional al stake
+
+    Cada validador ocupa una posición fija del árbol de Fenwick; las posiciones
+    liberadas se reutilizan. La selección es determinista para una semilla dada
+    siempre que los nodos hayan aplicado las mismas operaciones de stake en el
+    mismo orden (como ocurre al reproducir la cadena).
+    """
+
+    def __init__(self, initial_capacity: int = 16):
+        self.tree = FenwickTree(initial_capacity)
+        self.slots: Dict[str, int] = {}
+        self.ids: List[Optional[str]] = [None] * initial_capacity
+        self._free: List[int] = list(range(initial_capacity - 1, -1, -1))
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, validator_id: str) -> bool:
+        return validator_id in self.slots
+
+    @staticmethod
+    def to_units(stake_amount: float) -> int:
+        return max(0, int(round(stake_amount * STAKE_SCALE)))
+
+    def set_stake(self, validator_id: str, stake_amount: float):
+        """Fija el stake de un validador (0 lo elimina)"""
+        units = self.to_units(stake_amount)
+        if units == 0:
+            self.remove(validator_id)
+            return
+        slot = self.slots.get(validator_id)
+        if slot is None:
+            if not self._free:
+                old = len(self.tree)
+                self.tree.grow(old * 2)
+                self.ids.extend([None] * old)
+                self._free = list(range(old * 2 - 1, old - 1, -1))
+            slot = self._free.pop()
+            self.slots[validator_id] = slot
+            self.ids[slot] = validator_id
+        self.tree.set(slot, units)
+
+    def remove(self, validator_id: str):
+        slot = self.slots.pop(validator_id, None)
+        if slot is None:
+            return
+        self.tree.set(slot, 0)
+        self.ids[slot] = None
+        self._free.append(slot)
+
+    def stake_of(self, validator_id: str) -> float:
+        slot = self.slots.get(validator_id)
+        return self.tree.weights[slot] / STAKE_SCALE if slot is not None else 0.0
+
+    def total_stake(self) -> float:
+        return self.tree.total() / STAKE_SCALE
+
+    def pick(self, value: int) -> Optional[str]:
+        """Validador correspondiente a un entero aleatorio de 256 bits"""
+        total = self.tree.total()
+        if total <= 0:
+            return None
+        return self.ids[self.tree.find(value % total)]
+
+    def select(self, seed: bytes) -> Optional[str]:
+        return self.pick(next(seed_stream(seed)))
+
+    def committee(self, seed: bytes, size: int) -> List[str]:
+        """k validadores distintos, muestreados sin reemplazo por stake"""
+        size = min(size, len(self.slots))
+        chosen: List[str] = []
+        removed = []
+        stream = seed_stream(seed)
+        try:
+            while len(chosen) < size:
+                validator_id = self.pick(next(stream))
+                if validator_id is None:
+                    break
+                slot = self.slots[validator_id]
+                removed.append((slot, self.tree.weights[slot]))
+                self.tree.set(slot, 0)
+                chosen.append(validator_id)
+        finally:
+            for slot, weight in removed:
+                self.tree.set(slot, weight)
+        return chosen
+
+
+def _legacy_select(stakes: Dict[str, float], seed: bytes) -> Optional[str]:
+    """Selección lineal equivalente a la implementación anterior"""
+    total = sum(stakes.values())
+    random_value = int.from_bytes(seed[:4], "big") / 0xFFFFFFFF
+    cumulative = 0.0
+    for validator_id, stake in stakes.items():
+        cumulative += stake / total
+        if random_value <= cumulative:
+            return validator_id
+    return list(stakes)[-1] if stakes else None
+
+
+def benchmark_sampling(validators: int = 100_000, selections: int = 20_000,
+                       updates: int = 20_000, committee_size: int = 64,
+                       legacy_selections: int = 50) -> Dict[str, float]:
+    """Rendimiento de altas, actualizaciones, selecciones y comités"""
+    import random
+
+    rng = random.Random(7)
+    stakes = {f"validator_{i}": rng.uniform(1000, 100000) for i in range(validators)}
+    sampler = StakeSampler()
+
+    start = time.perf_counter()
+    for validator_id, stake in stakes.items():
+        sampler.set_stake(validator_id, stake)
+    build = time.perf_counter() - start
+
+    ids = list(stakes)
+    start = time.perf_counter()
+    for _ in range(updates):
+        sampler.set_stake(ids[rng.randrange(validators)], rng.uniform(1000, 100000))
+    update = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for height in range(selections):
+        sampler.select(derive_seed("00" * 32, height))
+    select = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for height in range(100):
+        sampler.committee(derive_seed("00" * 32, height, "committee"), committee_size)
+    committee = (time.perf_counter() - start) / 100
+
+    start = time.perf_counter()
+    for height in range(legacy_selections):
+        _legacy_select(stakes, derive_seed("00" * 32, height))
+    legacy = (time.perf_counter() - start) / legacy_selections
+
+    return {
+        "validators": validators,
+        "build_seconds": build,
+        "updates_per_second": updates / update,
+        "selections_per_second": selections / select,
+        "committee_us": committee * 1e6,
+        "committee_size": committee_size,
+        "legacy_selections_per_second": 1 / legacy,
+    }
+
+
+if __name__ == "__main__":
+    import json
+
+    print("🎲 Benchmark de muestreo de validadores por stake")
+    print(json.dumps(benchmark_sampling(), indent=2))
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Motor de Correlación de Amenazas en Streaming - AEGIS Framework
+Correlación incremental de eventos de seguridad para el sistema de detección de intrusiones.
+
+Características principales:
+- Indicadores compilados una sola vez en un autómata Aho-Corasick
+- Contadores de ventana deslizante por patrón y nodo actualizados en O(1)
+- Disparo inmediato al cruzar el umbral (sin esperar al análisis periódico)
+- Almacén de eventos acotado con expiración por antigüedad
+- Benchmark de reproducción con millones de eventos sintéticos
+"""
+
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class AhoCorasick:
+    """Autómata Aho-Corasick: encuentra todos los patrones de un texto en una pasada"""
+
+    def __init__(self, patterns: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+        for pattern in patterns:
+            if pattern:
+                self._add(pattern)
+        self._build_failure_links()
+
+    def _add(self, pattern: str):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+            state = next_state
+        self._output[state].add(pattern)
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                candidate = self._goto[fallback].get(char, 0)
+                self._fail[child] = candidate if candidate != child else 0
+                self._output[child] |= self._output[self._fail[child]]
+
+    def find_all(self, text: str) -> Set[str]:
+        found: Set[str] = set()
+        goto, fail, output = self._goto, self._fail, self._output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+        return found
+
+
+class CompiledIndicators:
+    """Indicadores de todos los patrones compilados una sola vez
+
+    Conserva la semántica de ``_event_matches_pattern``: un indicador coincide si
+    es subcadena del tipo de evento (autómata Aho-Corasick, cacheado por tipo) o
+    si es una clave de ``additional_data`` (búsqueda en tabla hash).
+    """
+
+    def __init__(self, threat_patterns: Dict[str, Dict[str, Any]], cache_size: int = 4096):
+        self.indicator_patterns: Dict[str, Set[str]] = {}
+        for pattern_name, config in threat_patterns.items():
+            for indicator in config.get("indicators", []):
+                self.indicator_patterns.setdefault(indicator, set()).add(pattern_name)
+        self.automaton = AhoCorasick(self.indicator_patterns)
+        self.cache_size = cache_size
+        self._type_cache: Dict[str, frozenset] = {}
+
+    def _patterns_for_type(self, event_type: str) -> frozenset:
+        cached = self._type_cache.get(event_type)
+        if cached is None:
+            names: Set[str] = set()
+            for indicator in self.automaton.find_all(event_type):
+                names |= self.indicator_patterns[indicator]
+            cached = frozenset(names)
+            if len(self._type_cache) >= self.cache_size:
+                self._type_cache.clear()
+            self._type_cache[event_type] = cached
+        return cached
+
+    def match(self, event_type: str, additional_data: Optional[Dict[str, Any]] = None) -> Set[str]:
+        """Nombres de los patrones con los que coincide el evento"""
+        names = self._patterns_for_type(event_type)
+        if not additional_data:
+            return set(names)
+        matched = set(names)
+        indicator_patterns = self.indicator_patterns
+        for key in additional_data:
+            patterns = indicator_patterns.get(key)
+            if patterns:
+                matched |= patterns
+        return matched
+
+
+@dataclass
+class PatternDetection:
+    """Cruce de umbral de un patrón en un nodo"""
+    pattern_name: str
+    node_id: str
+    event_ids: List[str]
+    window_start: float
+    timestamp: float
+    event_count: int = field(init=False)
+
+    def __post_init__(self):
+        self.event_count = len(self.event_ids)
+
+
+class ThreatCorrelator:
+    """Ventanas deslizantes por (patrón, nodo) sobre el flujo de eventos
+
+    Cada ventana guarda como mucho ``threshold`` marcas (timestamp, event_id):
+    al añadir una marca se descarta la más antigua, y hay detección cuando la
+    ventana está llena y su marca más antigua sigue dentro de ``time_window``.
+    Tras disparar, la ventana se vacía para no repetir la alerta en cada evento.
+    """
+
+    def __init__(self, threat_patterns: Dict[str, Dict[str, Any]], max_tracked_keys: int = 100000):
+        self.threat_patterns = threat_patterns
+        self.indicators = CompiledIndicators(threat_patterns)
+        self.max_tracked_keys = max_tracked_keys
+        self.windows: Dict[Tuple[str, str], deque] = {}
+        self.stats = {"events": 0, "matches": 0, "detections": 0, "windows_evicted": 0}
+
+    def observe(self, node_id: str, event_type: str, additional_data: Optional[Dict[str, Any]],
+                timestamp: float, event_id: str = "") -> List[PatternDetection]:
+        """Procesa un evento y devuelve las detecciones que dispara"""
+        self.stats["events"] += 1
+        matched = self.indicators.match(event_type, additional_data)
+        if not matched:
+            return []
+
+        detections = []
+        for pattern_name in matched:
+            config = self.threat_patterns[pattern_name]
+            threshold = config["threshold"]
+            key = (pattern_name, node_id)
+            window = self.windows.get(key)
+            if window is None:
+                if len(self.windows) >= self.max_tracked_keys:
+                    self.evict_expired(timestamp)
+                window = self.windows[key] = deque(maxlen=threshold)
+            window.append((timestamp, event_id))
+            self.stats["matches"] += 1
+            if len(window) == threshold and timestamp - window[0][0] <= config["time_window"]:
+                detections.append(PatternDetection(
+                    pattern_name=pattern_name,
+                    node_id=node_id,
+                    event_ids=[eid for _, eid in window],
+                    window_start=window[0][0],
+                    timestamp=timestamp
+                ))
+                window.clear()
+        self.stats["detections"] += len(detections)
+        return detections
+
+    def evict_expired(self, now: float):
+        """Elimina ventanas cuyo último evento ya salió de la ventana temporal"""
+        expired = [
+            key for key, window in self.windows.items()
+            if not window or now - window[-1][0] > self.threat_patterns[key[0]]["time_window"]
+        ]
+        for key in expired:
+            del self.windows[key]
+        self.stats["windows_evicted"] += len(expired)
+
+    def window_count(self, pattern_name: str, node_id: str, now: float) -> int:
+        """Eventos del patrón para el nodo dentro de la ventana temporal"""
+        window = self.windows.get((pattern_name, node_id))
+        if not window:
+            return 0
+        limit = self.threat_patterns[pattern_name]["time_window"]
+        return sum(1 for ts, _ in window if now - ts <= limit)
+
+
+class BoundedEventStore:
+    """Eventos recientes con límite de tamaño y de antigüedad"""
+
+    def __init__(self, retention: float = 3600.0, max_events: int = 100000):
+        self.retention = retention
+        self.events: deque = deque(maxlen=max_events)
+
+    def append(self, event: Any):
+        self.events.append(event)
+        self.evict_expired(event.timestamp)
+
+    def evict_expired(self, now: float):
+        events, cutoff = self.events, now - self.retention
+        while events and events[0].timestamp < cutoff:
+            events.popleft()
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.events)
+
+    def __len__(self) -> int:
+        return len(self.events)
+
+    def __getitem__(self, index):
+        return self.events[index]
+
+
+def synthetic_events(count: int, nodes: int = 1000, attack_ratio: float = 0.02,
+                     seed: int = 42) -> Iterator[Tuple[str, str, Dict[str, Any], float, str]]:
+    """Flujo sintético (node_id, event_type, additional_data, timestamp, event_id)"""
+    rng = random.Random(seed)
+    benign = ["heartbeat_ok", "peer_connected", "consensus_vote", "model_sync", "request_served"]
+    attacks = [
+        ("multiple_failed_logins", {}),
+        ("high_request_rate", {}),
+        ("auth_event", {"rapid_requests": True}),
+        ("transfer", {"large_data_transfer": 10 ** 9}),
+        ("unauthorized_access", {}),
+    ]
+    node_ids = [f"node_{i}" for i in range(nodes)]
+    attackers = node_ids[: max(1, nodes // 50)]
+    timestamp = 1_700_000_000.0
+    for i in range(count):
+        timestamp += 0.001
+        if rng.random() < attack_ratio:
+            event_type, data = attacks[rng.randrange(len(attacks))]
+            node = attackers[rng.randrange(len(attackers))]
+        else:
+            event_type, data = benign[rng.randrange(len(benign))], {"bytes": 512}
+            node = node_ids[rng.randrange(nodes)]
+        yield node, event_type, data, timestamp, f"evt_{i}"
+
+
+def replay_benchmark(events: int = 2_000_000, nodes: int = 1000,
+                     threat_patterns: Optional[Dict[str, Dict[str, Any]]] = None,
+                     legacy_sample: int = 50_000, seed: int = 42) -> Dict[str, Any]:
+    """Reproduce eventos sintéticos y mide eventos/s y latencia de detección
+
+    La latencia de detección del motor en streaming es el tiempo de proceso del
+    evento que cruza el umbral. Como referencia se mide una pasada del análisis
+    anterior (todos los patrones contra todos los eventos de la última hora)
+    sobre ``legacy_sample`` eventos; ese análisis además corría cada 30 s.
+    """
+    patterns = threat_patterns or DEFAULT_THREAT_PATTERNS
+    stream = list(synthetic_events(events, nodes, seed=seed))
+    correlator = ThreatCorrelator(patterns)
+
+    detection_latencies = []
+    start = time.perf_counter()
+    for node_id, event_type, data, timestamp, event_id in stream:
+        event_start = time.perf_counter_ns()
+        if correlator.observe(node_id, event_type, data, timestamp, event_id):
+            detection_latencies.append(time.perf_counter_ns() - event_start)
+    elapsed = time.perf_counter() - start
+
+    # Pasada del análisis anterior: comprobación por subcadenas evento a evento
+    sample = stream[:legacy_sample]
+    legacy_start = time.perf_counter()
+    for config in patterns.values():
+        indicators = config.get("indicators", [])
+        matches = 0
+        for _, event_type, data, _, _ in sample:
+            if any(indicator in event_type for indicator in indicators) or \
+                    any(indicator in data for indicator in indicators):
+                matches += 1
+    legacy_elapsed = time.perf_counter() - legacy_start
+
+    detection_latencies.sort()
+
+    def pick(q: float) -> float:
+        if not detection_latencies:
+            return 0.0
+        return detection_latencies[min(int(q * len(detection_latencies)), len(detection_latencies) - 1)] / 1000
+
+    return {
+        "events": events,
+        "events_per_second": events / elapsed,
+        "detections": correlator.stats["detections"],
+        "detection_latency_p50_us": pick(0.5),
+        "detection_latency_p99_us": pick(0.99),
+        "tracked_windows": len(correlator.windows),
+        "legacy_scan_events_per_second": len(sample) / legacy_elapsed,
+        "legacy_worst_case_latency_s": 30.0 + legacy_elapsed * min(events, 3600 * 1000) / len(sample),
+    }
+
+
+# Copia de los patrones por defecto del IDS para el benchmark independiente
+DEFAULT_THREAT_PATTERNS: Dict[str, Dict[str, Any]] = {
+    "brute_force": {"indicators": ["multiple_failed_logins", "rapid_requests"], "threshold": 5, "time_window": 300},
+    "ddos": {"indicators": ["high_request_rate", "resource_exhaustion"], "threshold": 100, "time_window": 60},
+    "data_exfiltration": {"indicators": ["large_data_transfer", "unusual_access_patterns"], "threshold": 3, "time_window": 600},
+    "privilege_escalation": {"indicators": ["unauthorized_access", "permission_changes"], "threshold": 1, "time_window": 300},
+}
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    print(f"🛡️ Reproduciendo {count} eventos sintéticos")
+    print(json.dumps(replay_benchmark(count), indent=2))
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Analítica de Topología - AEGIS Framework
+Algoritmos de grafos síncronos e iterativos para el análisis de la malla P2P.
+
+Características principales:
+- Puntos de articulación y puentes en una sola pasada O(V+E) (Tarjan iterativo)
+- Componentes conectados incrementales con union-find
+- Estimación por muestreo de diámetro y longitud media de camino con cotas de error
+- Sin recursión: apto para mallas de miles de peers
+"""
+
+import math
+import random
+from collections import deque
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class UnionFind:
+    """Union-find con compresión de caminos (halving) y unión por tamaño"""
+
+    def __init__(self):
+        self.parent: Dict[str, str] = {}
+        self.size: Dict[str, int] = {}
+        self.components = 0
+
+    def add(self, node: str):
+        if node not in self.parent:
+            self.parent[node] = node
+            self.size[node] = 1
+            self.components += 1
+
+    def find(self, node: str) -> str:
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    def union(self, a: str, b: str) -> bool:
+        """Une los conjuntos de a y b; devuelve True si eran distintos"""
+        self.add(a)
+        self.add(b)
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return False
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
+        self.components -= 1
+        return True
+
+    def connected(self, a: str, b: str) -> bool:
+        if a not in self.parent or b not in self.parent:
+            return False
+        return self.find(a) == self.find(b)
+
+    def component_size(self, node: str) -> int:
+        return self.size[self.find(node)]
+
+
+def find_articulation_points_and_bridges(
+    graph: Dict[str, Set[str]]
+) -> Tuple[Set[str], List[Tuple[str, str]]]:
+    """Encuentra puntos de articulación y puentes en una pasada O(V+E)
+
+    Versión iterativa del algoritmo de Tarjan (tiempos de descubrimiento y
+    low-link) con pila explícita, sin límite de profundidad de recursión.
+    """
+    discovery: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    articulation_points: Set[str] = set()
+    bridges: List[Tuple[str, str]] = []
+    timer = 0
+
+    for root in graph:
+        if root in discovery:
+            continue
+
+        discovery[root] = low[root] = timer
+        timer += 1
+        root_children = 0
+        # Pila de (nodo, padre, iterador de vecinos)
+        stack = [(root, None, iter(graph.get(root, ())))]
+
+        while stack:
+            node, parent, neighbors = stack[-1]
+            advanced = False
+
+            for neighbor in neighbors:
+                if neighbor == node:
+                    continue
+                if neighbor not in discovery:
+                    discovery[neighbor] = low[neighbor] = timer
+                    timer += 1
+                    if node == root:
+                        root_children += 1
+                    stack.append((neighbor, node, iter(graph.get(neighbor, ()))))
+                    advanced = True
+                    break
+                if neighbor != parent:
+                    low[node] = min(low[node], discovery[neighbor])
+
+            if advanced:
+                continue
+
+            # Todos los vecinos procesados: propagar low-link al padre
+            stack.pop()
+            if parent is not None:
+                low[parent] = min(low[parent], low[node])
+                if low[node] > discovery[parent]:
+                    bridges.append((parent, node))
+                if parent != root and low[node] >= discovery[parent]:
+                    articulation_points.add(parent)
+
+        if root_children > 1:
+            articulation_points.add(root)
+
+    return articulation_points, bridges
+
+
+def bfs_distances(graph: Dict[str, Set[str]], start_node: str) -> Dict[str, int]:
+    """Calcula distancias BFS desde un nodo"""
+    distances = {start_node: 0}
+    queue = deque([start_node])
+
+    while queue:
+        current = queue.popleft()
+        next_distance = distances[current] + 1
+
+        for neighbor in graph.get(current, ()):
+            if neighbor not in distances:
+                distances[neighbor] = next_distance
+                queue.append(neighbor)
+
+    return distances
+
+
+@dataclass
+class PathMetricsEstimate:
+    """Estimación de métricas de camino con cotas de error"""
+    average_path_length: float
+    average_path_length_error: float  # semiancho del intervalo de confianza al 95%
+    diameter_lower_bound: int
+    diameter_upper_bound: int
+    sampled_sources: int
+    exact: bool
+
+    @property
+    def diameter(self) -> int:
+        """Mejor estimación del diámetro (cota inferior, exacta si exact=True)"""
+        return self.diameter_lower_bound
+
+
+def estimate_path_metrics(
+    graph: Dict[str, Set[str]],
+    sample_size: int = 64,
+    seed: Optional[int] = None,
+    components: Optional[UnionFind] = None
+) -> PathMetricsEstimate:
+    """Estima longitud media de camino y diámetro con BFS desde nodos muestreados
+
+    - Longitud media: estimador de razón (suma de distancias / pares alcanzables)
+      con intervalo de confianza al 95% por método delta y corrección de
+      población finita.
+    - Diámetro: cota inferior = mayor excentricidad observada (reforzada con
+      un barrido doble desde el nodo más lejano); cota superior = 2·min(ecc)
+      por componente, o tamaño-1 para componentes sin nodo muestreado.
+
+    Si el grafo tiene como mucho ``sample_size`` nodos el cálculo es exacto.
+    """
+    nodes = list(graph)
+    n = len(nodes)
+    if n == 0:
+        return PathMetricsEstimate(0.0, 0.0, 0, 0, 0, True)
+
+    exact = n <= sample_size
+    if exact:
+        sources = nodes
+    else:
+        rng = random.Random(seed)
+        sources = rng.sample(nodes, sample_size)
+
+    if components is None:
+        components = UnionFind()
+        for node, neighbors in graph.items():
+            components.add(node)
+            for neighbor in neighbors:
+                components.union(node, neighbor)
+
+    distance_sums: List[float] = []
+    reachable_counts: List[float] = []
+    diameter_lower = 0
+    min_eccentricity: Dict[str, int] = {}
+    farthest_node = None
+
+    for source in sources:
+        distances = bfs_distances(graph, source)
+        eccentricity = 0
+        farthest = source
+        total = 0
+        for node, distance in distances.items():
+            total += distance
+            if distance > eccentricity:
+                eccentricity = distance
+                farthest = node
+        distance_sums.append(total)
+        reachable_counts.append(len(distances) - 1)
+
+        if eccentricity > diameter_lower:
+            diameter_lower = eccentricity
+            farthest_node = farthest
+
+        root = components.find(source)
+        if root not in min_eccentricity or eccentricity < min_eccentricity[root]:
+            min_eccentricity[root] = eccentricity
+
+    # Barrido doble: la excentricidad del nodo más lejano suele alcanzar el diámetro
+    if not exact and farthest_node is not None:
+        sweep = bfs_distances(graph, farthest_node)
+        diameter_lower = max(diameter_lower, max(sweep.values()))
+
+    total_pairs = sum(reachable_counts)
+    average = sum(distance_sums) / total_pairs if total_pairs > 0 else 0.0
+
+    if exact:
+        diameter_upper = diameter_lower
+        error = 0.0
+    else:
+        diameter_upper = 0
+        seen_roots = set()
+        for node in nodes:
+            root = components.find(node)
+            if root in seen_roots:
+                continue
+            seen_roots.add(root)
+            if root in min_eccentricity:
+                bound = min(2 * min_eccentricity[root], components.size[root] - 1)
+            else:
+                bound = components.size[root] - 1
+            diameter_upper = max(diameter_upper, bound)
+        diameter_upper = max(diameter_upper, diameter_lower)
+
+        k = len(sources)
+        mean_count = total_pairs / k
+        if mean_count > 0 and k > 1:
+            residuals = [s - average * c for s, c in zip(distance_sums, reachable_counts)]
+            variance = sum(r * r for r in residuals) / (k - 1)
+            finite_population = 1.0 - k / n
+            error = 1.96 * math.sqrt(variance * finite_population / k) / mean_count
+        else:
+            error = 0.0
+
+    return PathMetricsEstimate(
+        average_path_length=average,
+        average_path_length_error=error,
+        diameter_lower_bound=diameter_lower,
+        diameter_upper_bound=diameter_upper,
+        sampled_sources=len(sources),
+        exact=exact
+    )
+
+
+class TopologyAnalytics:
+    """Estado incremental de la topología con resultados cacheados por versión
+
+    Las altas de enlaces actualizan el union-find en O(α(n)); las bajas lo
+    invalidan y se reconstruye de forma perezosa en la siguiente consulta.
+    Puntos de articulación y métricas de camino se recalculan solo cuando la
+    versión del grafo ha cambiado.
+    """
+
+    def __init__(self, path_sample_size: int = 64, seed: Optional[int] = None):
+        self.graph: Dict[str, Set[str]] = {}
+        self.path_sample_size = path_sample_size
+        self.seed = seed
+        self.version = 0
+        self._components = UnionFind()
+        self._components_valid = True
+        self._critical_cache: Optional[Tuple[int, Set[str], List[Tuple[str, str]]]] = None
+        self._path_cache: Optional[Tuple[int, PathMetricsEstimate]] = None
+
+    def set_graph(self, graph: Dict[str, Set[str]]):
+        """Reemplaza el grafo completo (lista de adyacencia no dirigida)"""
+        self.graph = {node: set(neighbors) for node, neighbors in graph.items()}
+        for node, neighbors in graph.items():
+            for neighbor in neighbors:
+                self.graph.setdefault(neighbor, set()).add(node)
+        self._invalidate(components=True)
+
+    def add_node(self, node: str):
+        if node not in self.graph:
+            self.graph[node] = set()
+            if self._components_valid:
+                self._components.add(node)
+            self._invalidate()
+
+    def remove_node(self, node: str):
+        neighbors = self.graph.pop(node, None)
+        if neighbors is None:
+            return
+        for neighbor in neighbors:
+            self.graph[neighbor].discard(node)
+        self._invalidate(components=True)
+
+    def add_edge(self, a: str, b: str):
+        if a == b:
+            self.add_node(a)
+            return
+        if b in self.graph.get(a, ()):
+            return
+        self.graph.setdefault(a, set()).add(b)
+        self.graph.setdefault(b, set()).add(a)
+        if self._components_valid:
+            self._components.union(a, b)
+        self._invalidate()
+
+    def remove_edge(self, a: str, b: str):
+        if b not in self.graph.get(a, ()):
+            return
+        self.graph[a].discard(b)
+        self.graph[b].discard(a)
+        self._invalidate(components=True)
+
+    def add_edges(self, edges: Iterable[Tuple[str, str]]):
+        for a, b in edges:
+            self.add_edge(a, b)
+
+    def _invalidate(self, components: bool = False):
+        self.version += 1
+        if components:
+            self._components_valid = False
+
+    @property
+    def components(self) -> UnionFind:
+        """Union-find de componentes conectados (reconstruido si hubo bajas)"""
+        if not self._components_valid:
+            uf = UnionFind()
+            for node, neighbors in self.graph.items():
+                uf.add(node)
+                for neighbor in neighbors:
+                    uf.union(node, neighbor)
+            self._components = uf
+            self._components_valid = True
+        return self._components
+
+    def component_count(self) -> int:
+        return self.components.components
+
+    def connected(self, a: str, b: str) -> bool:
+        return self.components.connected(a, b)
+
+    def _critical(self) -> Tuple[Set[str], List[Tuple[str, str]]]:
+        if self._critical_cache is None or self._critical_cache[0] != self.version:
+            points, bridges = find_articulation_points_and_bridges(self.graph)
+            self._critical_cache = (self.version, points, bridges)
+        return self._critical_cache[1], self._critical_cache[2]
+
+    def articulation_points(self) -> Set[str]:
+        """Nodos cuya eliminación aumenta el número de componentes"""
+        return self._critical()[0]
+
+    def bridges(self) -> List[Tuple[str, str]]:
+        """Enlaces cuya eliminación aumenta el número de componentes"""
+        return self._critical()[1]
+
+    def path_metrics(self) -> PathMetricsEstimate:
+        if self._path_cache is None or self._path_cache[0] != self.version:
+            estimate = estimate_path_metrics(
+                self.graph, self.path_sample_size, self.seed, self.components
+            )
+            self._path_cache = (self.version, estimate)
+        return self._path_cache[1]
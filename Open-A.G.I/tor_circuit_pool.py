@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Pool de Circuitos TOR - AEGIS Framework
+Circuitos pre-construidos con sesiones SOCKS persistentes para TorGateway.
+
+Características principales:
+- Objetivo de circuitos listos por (propósito, nivel de seguridad),
+  construidos en segundo plano con concurrencia limitada
+- Rotación por uso y edad sin bloquear a los emisores: el reemplazo se
+  construye antes de que el circuito se agote y el retirado se cierra
+  cuando termina su último envío
+- Una sesión aiohttp keep-alive por circuito con credenciales SOCKS propias;
+  TorGateway adjunta sus streams al circuito pre-construido
+  (__LeaveStreamsUnattached + eventos STREAM)
+- Refresco de la lista de nodos por temporizador, fuera del camino de envío
+- Controlador TOR simulado y benchmark de latencia/throughput bajo concurrencia
+"""
+
+import asyncio
+import random
+import secrets
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+try:
+    from aiohttp_socks import ProxyConnector
+    AIOHTTP_SOCKS_AVAILABLE = True
+except ImportError:
+    ProxyConnector = None
+    AIOHTTP_SOCKS_AVAILABLE = False
+
+try:
+    from main import logger
+except ImportError:
+    import logging
+    logger = logging.getLogger(__name__)
+
+# Cabeceras comunes para evitar fingerprinting
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0',
+    'Accept': 'application/octet-stream',
+    'Accept-Language': 'en-US,en;q=0.5',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1'
+}
+
+PoolKey = Tuple[str, Hashable]
+
+
+def circuit_wear(circuit) -> float:
+    """Fracción consumida de la vida útil del circuito (uso o edad, la mayor)"""
+    usage = circuit.usage_count / max(1, circuit.max_usage)
+    age = (time.time() - circuit.created_at) / max(1e-9, circuit.max_age)
+    return max(usage, age)
+
+
+class PooledCircuit:
+    """Circuito del pool con su sesión keep-alive"""
+
+    def __init__(self, circuit, key: PoolKey):
+        self.circuit = circuit
+        self.key = key
+        self.circuit_id = circuit.circuit_id
+        # Credenciales SOCKS únicas: identifican los streams de la sesión para
+        # adjuntarlos a este circuito (y TOR no los mezcla con otros)
+        self.socks_username = f"aegis-{secrets.token_hex(8)}"
+        self.socks_password = secrets.token_hex(16)
+        self.session = None
+        self.in_flight = 0
+        self.alive = True
+        self.retiring = False
+
+    @property
+    def usable(self) -> bool:
+        return self.alive and not self.retiring and not self.circuit.should_rotate()
+
+
+def socks_session_factory(socks_host: str = "127.0.0.1", socks_port: int = 9050,
+                          timeout: float = 30.0, keepalive: float = 300.0) -> Callable[[PooledCircuit], Any]:
+    """Sesiones aiohttp a través del proxy SOCKS5 de TOR (requiere aiohttp-socks)"""
+    if not AIOHTTP_SOCKS_AVAILABLE:
+        raise RuntimeError("aiohttp-socks no disponible: pip install aiohttp-socks")
+
+    def factory(entry: PooledCircuit):
+        connector = ProxyConnector.from_url(
+            f"socks5://{entry.socks_username}:{entry.socks_password}@{socks_host}:{socks_port}",
+            rdns=True, keepalive_timeout=keepalive)
+        return aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS,
+                                     timeout=aiohttp.ClientTimeout(total=timeout))
+    return factory
+
+
+def direct_session_factory(timeout: float = 30.0, keepalive: float = 300.0) -> Callable[[PooledCircuit], Any]:
+    """Sesiones keep-alive sin proxy (pruebas y benchmark contra un servidor local)"""
+
+    def factory(entry: PooledCircuit):
+        connector = aiohttp.TCPConnector(keepalive_timeout=keepalive)
+        return aiohttp.ClientSession(connector=connector, headers=DEFAULT_HEADERS,
+                                     timeout=aiohttp.ClientTimeout(total=timeout))
+    return factory
+
+
+class CircuitPool:
+    """Pool de circuitos pre-construidos por (propósito, nivel de seguridad)"""
+
+    def __init__(self, build: Callable[[str, Any], Awaitable[Optional[Any]]],
+                 close: Callable[[str], Awaitable[None]],
+                 session_factory: Callable[[PooledCircuit], Any],
+                 target_size: int = 2, max_concurrent_builds: int = 2,
+                 refresh: Optional[Callable[[], Awaitable[None]]] = None,
+                 refresh_interval: float = 3600.0, maintenance_interval: float = 5.0,
+                 prewarm_wear: float = 0.8, retry_delay: float = 1.0):
+        """
+        Args:
+            build: Corrutina (propósito, nivel) -> TorCircuit o None
+            close: Corrutina que cierra un circuito por id
+            session_factory: PooledCircuit -> aiohttp.ClientSession
+            target_size: Circuitos listos por clave
+            max_concurrent_builds: Construcciones simultáneas
+            refresh: Corrutina que refresca la lista de nodos
+            refresh_interval: Segundos entre refrescos de nodos
+            maintenance_interval: Segundos entre pasadas de mantenimiento
+            prewarm_wear: Desgaste a partir del cual se construye el reemplazo
+            retry_delay: Espera tras una construcción fallida
+        """
+        self._build = build
+        self._close = close
+        self._session_factory = session_factory
+        self.target_size = target_size
+        self.max_concurrent_builds = max_concurrent_builds
+        self._refresh = refresh
+        self.refresh_interval = refresh_interval
+        self.maintenance_interval = maintenance_interval
+        self.prewarm_wear = prewarm_wear
+        self.retry_delay = retry_delay
+
+        self._entries: Dict[PoolKey, List[PooledCircuit]] = defaultdict(list)
+        self._targets: Dict[PoolKey, int] = {}
+        self._building: Dict[PoolKey, int] = defaultdict(int)
+        self._by_id: Dict[str, PooledCircuit] = {}
+        self._conditions: Dict[PoolKey, asyncio.Condition] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._tasks: set = set()
+        self._maintenance_task: Optional[asyncio.Task] = None
+        self._last_refresh = 0.0
+        self.running = False
+        self.stats = defaultdict(int)
+
+    def __contains__(self, circuit_id: str) -> bool:
+        return circuit_id in self._by_id
+
+    def get(self, circuit_id: str) -> Optional[PooledCircuit]:
+        return self._by_id.get(circuit_id)
+
+    async def start(self, keys: Iterable[PoolKey] = ()) -> None:
+        """Refresca nodos, registra las claves y lanza el mantenimiento"""
+        self._semaphore = asyncio.Semaphore(self.max_concurrent_builds)
+        self.running = True
+        if self._refresh is not None:
+            await self._refresh()
+            self._last_refresh = time.time()
+        for purpose, level in keys:
+            self.ensure(purpose, level)
+        self._maintenance_task = asyncio.create_task(self._maintain())
+
+    def ensure(self, purpose: str, level, target: Optional[int] = None) -> None:
+        """Registra (o ajusta) el objetivo de una clave y lanza construcciones"""
+        key = (purpose, level)
+        if target is not None or key not in self._targets:
+            self._targets[key] = self.target_size if target is None else target
+        self._conditions.setdefault(key, asyncio.Condition())
+        self._replenish(key)
+
+    async def wait_ready(self, purpose: str, level, count: Optional[int] = None,
+                         timeout: Optional[float] = None) -> bool:
+        """Espera a que la clave tenga ``count`` circuitos usables"""
+        key = (purpose, level)
+        self.ensure(purpose, level)
+        count = self._targets[key] if count is None else count
+        condition = self._conditions[key]
+
+        async def ready():
+            async with condition:
+                await condition.wait_for(lambda: self._usable_count(key) >= count)
+        try:
+            await asyncio.wait_for(ready(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def acquire(self, purpose: str, level, timeout: float = 30.0) -> PooledCircuit:
+        """
+        Circuito usable con menos envíos en curso; espera a una construcción
+        solo si la clave no tiene ninguno listo.
+
+        Raises:
+            asyncio.TimeoutError: si no hay circuito en ``timeout`` segundos
+        """
+        key = (purpose, level)
+        self.ensure(purpose, level)
+        entry = self._pick(key)
+        if entry is None:
+            self.stats['waits'] += 1
+            condition = self._conditions[key]
+
+            async def wait():
+                async with condition:
+                    await condition.wait_for(lambda: self._pick(key) is not None)
+            await asyncio.wait_for(wait(), timeout)
+            entry = self._pick(key)
+        entry.in_flight += 1
+        self.stats['acquired'] += 1
+        self._replenish(key)
+        return entry
+
+    def release(self, entry: PooledCircuit, success: bool = True) -> None:
+        """Devuelve el circuito; lo retira si agotó su uso o edad"""
+        entry.in_flight -= 1
+        if success:
+            entry.circuit.usage_count += 1
+            entry.circuit.last_used = time.time()
+        if entry.retiring:
+            if entry.in_flight == 0:
+                self._spawn(self._close_entry(entry))
+        elif not entry.usable:
+            self._retire(entry)
+        self._replenish(entry.key)
+
+    def mark_failed(self, circuit_id: str) -> None:
+        """Marca un circuito como caído (seguro desde el hilo de eventos de stem)"""
+        entry = self._by_id.get(circuit_id)
+        if entry is not None:
+            entry.alive = False
+
+    def _usable_count(self, key: PoolKey) -> int:
+        return sum(1 for entry in self._entries[key] if entry.usable)
+
+    def _pick(self, key: PoolKey) -> Optional[PooledCircuit]:
+        best = None
+        for entry in self._entries[key]:
+            if entry.usable and (best is None or (entry.in_flight, entry.circuit.usage_count)
+                                 < (best.in_flight, best.circuit.usage_count)):
+                best = entry
+        return best
+
+    def _replenish(self, key: PoolKey) -> None:
+        """Lanza construcciones hasta cubrir el objetivo (los circuitos casi agotados no cuentan)"""
+        if not self.running:
+            return
+        fresh = sum(1 for entry in self._entries[key]
+                    if entry.usable and circuit_wear(entry.circuit) < self.prewarm_wear)
+        missing = self._targets.get(key, 0) - fresh - self._building[key]
+        for _ in range(max(0, missing)):
+            self._building[key] += 1
+            self._spawn(self._build_one(key))
+
+    def _trim(self, key: PoolKey) -> None:
+        """Retira los circuitos más desgastados que ya tienen reemplazo listo"""
+        usable = [entry for entry in self._entries[key] if entry.usable]
+        excess = len(usable) - self._targets.get(key, 0)
+        if excess <= 0:
+            return
+        usable.sort(key=lambda entry: circuit_wear(entry.circuit), reverse=True)
+        for entry in usable[:excess]:
+            if circuit_wear(entry.circuit) >= self.prewarm_wear:
+                self._retire(entry)
+
+    def _retire(self, entry: PooledCircuit) -> None:
+        if entry.retiring:
+            return
+        entry.retiring = True
+        entries = self._entries[entry.key]
+        if entry in entries:
+            entries.remove(entry)
+        self.stats['retired'] += 1
+        if entry.in_flight == 0:
+            self._spawn(self._close_entry(entry))
+
+    def _spawn(self, coroutine) -> None:
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _build_one(self, key: PoolKey) -> None:
+        purpose, level = key
+        try:
+            async with self._semaphore:
+                started = time.perf_counter()
+                circuit = await self._build(purpose, level)
+                if circuit is None:
+                    raise RuntimeError("construcción de circuito fallida")
+                entry = PooledCircuit(circuit, key)
+                entry.session = self._session_factory(entry)
+                self.stats['build_seconds'] += time.perf_counter() - started
+            if not self.running:
+                await self._close_entry(entry)
+                return
+            self._entries[key].append(entry)
+            self._by_id[entry.circuit_id] = entry
+            self.stats['built'] += 1
+            self._trim(key)
+            condition = self._conditions[key]
+            async with condition:
+                condition.notify_all()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats['build_failures'] += 1
+            logger.warning(f"Pool TOR: fallo construyendo circuito {key}: {e}")
+            await asyncio.sleep(self.retry_delay)
+        finally:
+            self._building[key] -= 1
+        if self.running:
+            self._replenish(key)
+
+    async def _close_entry(self, entry: PooledCircuit) -> None:
+        self._by_id.pop(entry.circuit_id, None)
+        try:
+            if entry.session is not None:
+                await entry.session.close()
+            await self._close(entry.circuit_id)
+        except Exception as e:
+            logger.warning(f"Pool TOR: error cerrando circuito {entry.circuit_id}: {e}")
+
+    async def _maintain(self) -> None:
+        while self.running:
+            await asyncio.sleep(self.maintenance_interval)
+            try:
+                if self._refresh is not None and time.time() - self._last_refresh >= self.refresh_interval:
+                    self._last_refresh = time.time()
+                    await self._refresh()
+                for key in list(self._targets):
+                    for entry in list(self._entries[key]):
+                        if not entry.usable:
+                            self._retire(entry)
+                    self._trim(key)
+                    self._replenish(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Pool TOR: error de mantenimiento: {e}")
+
+    async def stop(self) -> None:
+        """Cancela construcciones y cierra todas las sesiones y circuitos"""
+        self.running = False
+        if self._maintenance_task is not None:
+            self._maintenance_task.cancel()
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._maintenance_task is not None:
+            await asyncio.gather(self._maintenance_task, return_exceptions=True)
+        entries = [entry for entries in self._entries.values() for entry in entries]
+        self._entries.clear()
+        for entry in entries:
+            await self._close_entry(entry)
+
+    def status(self) -> Dict[str, Any]:
+        keys = {}
+        for (purpose, level), target in self._targets.items():
+            entries = self._entries[(purpose, level)]
+            keys[f"{purpose}/{getattr(level, 'name', level)}"] = {
+                'target': target,
+                'usable': self._usable_count((purpose, level)),
+                'building': self._building[(purpose, level)],
+                'in_flight': sum(entry.in_flight for entry in entries),
+            }
+        return {'keys': keys, **{name: value for name, value in self.stats.items()}}
+
+
+class FakeTorController:
+    """Controlador TOR simulado (interfaz de stem.control.Controller usada por TorGateway)"""
+
+    COUNTRIES = ['US', 'DE', 'NL', 'FR', 'SE', 'CH', 'GB', 'CA', 'FI', 'RO', 'CN', 'RU']
+
+    def __init__(self, relays: int = 300, build_latency: float = 0.0, seed: int = 0,
+                 build_failure_rate: float = 0.0):
+        rng = random.Random(seed)
+        self._rng = rng
+        self.build_latency = build_latency
+        self.build_failure_rate = build_failure_rate
+        self.descriptors = []
+        for i in range(relays):
+            flags = ['Running', 'Valid']
+            for flag, probability in (('Fast', 0.9), ('Stable', 0.8), ('Guard', 0.4), ('Exit', 0.2)):
+                if rng.random() < probability:
+                    flags.append(flag)
+            self.descriptors.append(SimpleNamespace(
+                fingerprint=f"{i:040X}",
+                nickname=f"relay{i}",
+                address=f"{rng.randint(1, 223)}.{rng.randint(0, 255)}.{(i >> 8) & 255}.{i & 255}",
+                or_port=9001,
+                dir_port=9030,
+                flags=flags,
+                bandwidth=int(rng.lognormvariate(8, 1.5)),
+                country=rng.choice(self.COUNTRIES),
+            ))
+        self.status_walks = 0
+        self.built: List[str] = []
+        self.closed: List[str] = []
+        self.conf: Dict[str, str] = {}
+        self.listeners: List[Tuple[Callable, tuple]] = []
+        self.attached: List[Tuple[str, str]] = []
+        self._next_id = 1
+
+    def authenticate(self):
+        pass
+
+    def is_alive(self) -> bool:
+        return True
+
+    def add_event_listener(self, listener, *events):
+        self.listeners.append((listener, events))
+
+    def remove_event_listener(self, listener):
+        self.listeners = [(other, events) for other, events in self.listeners if other != listener]
+
+    def set_conf(self, key, value):
+        self.conf[key] = value
+
+    def reset_conf(self, *keys):
+        for key in keys:
+            self.conf.pop(key, None)
+
+    def attach_stream(self, stream_id, circuit_id):
+        self.attached.append((stream_id, circuit_id))
+
+    def emit_stream(self, stream_id: str, socks_username: Optional[str], status: str = 'NEW'):
+        """Simula el evento STREAM que TOR emite al abrirse una conexión SOCKS"""
+        event = SimpleNamespace(id=stream_id, status=status, circ_id=None, socks_username=socks_username)
+        for listener, events in self.listeners:
+            if 'STREAM' in events:
+                listener(event)
+
+    def get_network_statuses(self):
+        self.status_walks += 1
+        return list(self.descriptors)
+
+    def new_circuit(self, path=None, await_build=True):
+        if self.build_latency:
+            time.sleep(self.build_latency)
+        if self._rng.random() < self.build_failure_rate:
+            raise RuntimeError("circuit build failed")
+        circuit_id = str(self._next_id)
+        self._next_id += 1
+        self.built.append(circuit_id)
+        return circuit_id
+
+    def close_circuit(self, circuit_id):
+        self.closed.append(circuit_id)
+
+    def get_info(self, keys):
+        return {'status/circuit-established': '1', 'status/enough-dir-info': '1',
+                'status/bootstrap-phase': 'PROGRESS=100 TAG=done'}
+
+    def remove_ephemeral_hidden_service(self, service_id):
+        pass
+
+    def close(self):
+        pass
+
+
+# ===== Benchmark =====
+
+async def _run_senders(gateway, target: str, port: int, messages: int, concurrency: int) -> Dict[str, float]:
+    latencies: List[float] = []
+    failures = 0
+    per_worker = [messages // concurrency + (1 if i < messages % concurrency else 0) for i in range(concurrency)]
+
+    async def worker(count):
+        nonlocal failures
+        for _ in range(count):
+            started = time.perf_counter()
+            ok = await gateway.send_message(target, port, b"x" * 256)
+            latencies.append(time.perf_counter() - started)
+            failures += not ok
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(count) for count in per_worker))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        'p50_ms': latencies[len(latencies) // 2] * 1000,
+        'p99_ms': latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        'messages_per_second': messages / elapsed,
+        'failures': failures,
+    }
+
+
+async def _benchmark_once(messages: int, concurrency: int, build_latency: float, pooled: bool,
+                          pool_size: int) -> Dict[str, Any]:
+    from aiohttp import web
+    from tor_integration import TorGateway
+
+    async def receive(request):
+        await request.read()
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_post('/message', receive)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    controller = FakeTorController(build_latency=build_latency)
+    gateway = TorGateway(controller=controller, pool_size=pool_size if pooled else 0,
+                         session_factory=direct_session_factory())
+    try:
+        await gateway.initialize()
+        if pooled:
+            await gateway.circuit_pool.wait_ready("general", gateway.security_level, timeout=60)
+        result = await _run_senders(gateway, '127.0.0.1', port, messages, concurrency)
+        result.update(mode='pool' if pooled else 'per-message', concurrency=concurrency,
+                      circuits_built=len(controller.built), status_walks=controller.status_walks)
+        return result
+    finally:
+        await gateway.shutdown()
+        await runner.cleanup()
+
+
+def benchmark_circuit_pool(messages: int = 200, concurrencies=(1, 8, 32), build_latency: float = 0.05,
+                           pool_size: int = 4) -> List[Dict[str, Any]]:
+    """
+    Latencia y throughput de TorGateway.send_message contra un servidor local,
+    con circuito nuevo por mensaje frente al pool (controlador simulado con
+    ``build_latency`` segundos por circuito).
+    """
+    results = []
+    for concurrency in concurrencies:
+        for pooled in (False, True):
+            results.append(asyncio.run(_benchmark_once(messages, concurrency, build_latency, pooled, pool_size)))
+    return results
+
+
+if __name__ == "__main__":
+    print(f"{'modo':>12} {'conc':>5} {'p50 ms':>8} {'p99 ms':>8} {'msg/s':>9} {'circuitos':>9}")
+    for row in benchmark_circuit_pool():
+        print(f"{row['mode']:>12} {row['concurrency']:>5} {row['p50_ms']:8.2f} {row['p99_ms']:8.2f} "
+              f"{row['messages_per_second']:9.1f} {row['circuits_built']:9d}")
@@ -12,6 +12,7 @@ Características principales:
 """
 
 import asyncio
+import functools
 import json
 import time
 import os
@@ -25,7 +26,6 @@ from datetime import datetime, timedelta
 import threading
 import subprocess
 import signal
-import secrets
 
 # Try to import stem for TOR control
 try:
@@ -39,6 +39,16 @@ except ImportError:
     stem = None
     STEM_AVAILABLE = False
 
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    aiohttp = None
+    AIOHTTP_AVAILABLE = False
+
+from tor_circuit_pool import AIOHTTP_SOCKS_AVAILABLE, CircuitPool, PooledCircuit, socks_session_factory
+from relay_index import RelayIndex
+
 # Try to import cryptography libraries
 try:
     from cryptography.hazmat.primitives.asymmetric import ed25519
@@ -58,6 +68,11 @@ except ImportError:
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
 
+def _event_type(name: str):
+    """Tipo de evento de stem (o su nombre con controladores simulados)"""
+    return getattr(stem.control.EventType, name) if STEM_AVAILABLE else name
+
+
 class CircuitState(Enum):
     """Estados del circuito TOR"""
     BUILDING = "building"
@@ -82,6 +97,7 @@ class TorNode:
     flags: List[str]
     bandwidth: int
     country: Optional[str] = None
+    family: Optional[str] = None
     
 class TorCircuit:
     """Gestión de circuitos TOR con diversidad geográfica"""
@@ -95,6 +111,7 @@ class TorCircuit:
         self.last_used = time.time()
         self.usage_count = 0
         self.max_usage = self._calculate_max_usage()
+        self.max_age = self._calculate_max_age()
     
     def _calculate_max_usage(self) -> int:
         """Calcula el uso máximo basado en el nivel de seguridad"""
@@ -105,16 +122,19 @@ class TorCircuit:
         }
         return base_usage[self.security_level]
     
-    def should_rotate(self) -> bool:
-        """Determina si el circuito debe rotarse"""
+    def _calculate_max_age(self) -> float:
+        """Calcula la edad máxima (segundos) basada en el nivel de seguridad"""
         age_limit = {
             SecurityLevel.STANDARD: 3600,  # 1 hora
             SecurityLevel.HIGH: 1800,      # 30 minutos
             SecurityLevel.PARANOID: 600    # 10 minutos
         }
-        
+        return age_limit[self.security_level]
+    
+    def should_rotate(self) -> bool:
+        """Determina si el circuito debe rotarse"""
         current_time = time.time()
-        age_exceeded = (current_time - self.created_at) > age_limit[self.security_level]
+        age_exceeded = (current_time - self.created_at) > self.max_age
         usage_exceeded = self.usage_count >= self.max_usage
         
         return age_exceeded or usage_exceeded
@@ -122,14 +142,30 @@ class TorCircuit:
 class TorGateway:
     """Gateway principal para comunicaciones TOR"""
     
-    def __init__(self, control_port: int = 9051, socks_port: int = 9050):
+    def __init__(self, control_port: int = 9051, socks_port: int = 9050, controller=None,
+                 pool_size: int = 2, session_factory: Optional[Callable] = None):
+        """
+        Args:
+            control_port: Puerto de control de TOR
+            socks_port: Puerto SOCKS de TOR
+            controller: Controlador ya conectado (p.ej. FakeTorController en pruebas)
+            pool_size: Circuitos pre-construidos por propósito (0 desactiva el pool)
+            session_factory: PooledCircuit -> aiohttp.ClientSession (por defecto SOCKS)
+        """
         self.control_port = control_port
         self.socks_port = socks_port
-        self.controller = None
+        self.controller = controller
+        self.pool_size = pool_size
+        self.session_factory = session_factory
+        self._sessions: Optional[Callable] = None
+        self.circuit_pool: Optional[CircuitPool] = None
+        # Usuario SOCKS -> circuito: los streams nuevos se adjuntan a su circuito
+        self._stream_circuits: Dict[str, str] = {}
         self.circuits: Dict[str, TorCircuit] = {}
         self.onion_services: Dict[str, str] = {}  # service_id -> private_key
         self.security_level = SecurityLevel.HIGH
         self.node_cache: List[TorNode] = []
+        self.relay_index: Optional[RelayIndex] = None
         self.last_node_refresh = 0
         
         # Configuración de diversidad geográfica
@@ -138,13 +174,18 @@ class TorGateway:
         
     async def initialize(self) -> bool:
         """Inicializa la conexión con TOR"""
-        if not STEM_AVAILABLE or Controller is None:
+        if self.controller is None and (not STEM_AVAILABLE or Controller is None):
             logger.warning("TOR stem library not available, TOR functionality disabled")
             return False
+        if self.session_factory is None and not AIOHTTP_SOCKS_AVAILABLE:
+            logger.error("aiohttp-socks no disponible: TorGateway no puede enviar por SOCKS "
+                         "(pip install aiohttp-socks)")
+            return False
             
         try:
-            self.controller = Controller.from_port(port=str(self.control_port))
-            self.controller.authenticate()
+            if self.controller is None:
+                self.controller = Controller.from_port(port=str(self.control_port))
+                self.controller.authenticate()
             
             # Verificar que TOR esté funcionando
             if not self.controller.is_alive():
@@ -152,11 +193,18 @@ class TorGateway:
                 return False
             
             # Configurar eventos de circuito
-            self.controller.add_event_listener(self._circuit_event_handler, 
-                                             stem.control.EventType.CIRC)
+            self.controller.add_event_listener(self._circuit_event_handler, _event_type('CIRC'))
             
-            # Refrescar lista de nodos
-            await self._refresh_node_list()
+            # TOR deja los streams sin asignar; cada uno se adjunta al circuito
+            # pre-construido que corresponde a su usuario SOCKS
+            self.controller.set_conf('__LeaveStreamsUnattached', '1')
+            self.controller.add_event_listener(self._stream_event_handler, _event_type('STREAM'))
+            
+            # Refrescar lista de nodos y pre-construir circuitos
+            if self.pool_size > 0:
+                await self.start_circuit_pool()
+            else:
+                await self._refresh_node_list()
             
             logger.info("TOR Gateway inicializado correctamente")
             return True
@@ -165,15 +213,20 @@ class TorGateway:
             logger.error(f"Error inicializando TOR Gateway: {e}")
             return False
     
-    async def _refresh_node_list(self) -> None:
+    async def _run_controller(self, method: Callable, *args, **kwargs):
+        """Ejecuta una llamada bloqueante de stem fuera del event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(method, *args, **kwargs))
+    
+    async def _refresh_node_list(self, force: bool = False) -> None:
         """Actualiza la lista de nodos TOR disponibles"""
         try:
             current_time = time.time()
-            if current_time - self.last_node_refresh < 3600:  # Cache por 1 hora
+            if not force and current_time - self.last_node_refresh < 3600:  # Cache por 1 hora
                 return
             
-            descriptors = self.controller.get_network_statuses()
-            self.node_cache = []
+            descriptors = await self._run_controller(self.controller.get_network_statuses)
+            node_cache = []
             
             for desc in descriptors:
                 # Filtrar nodos por flags de seguridad
@@ -193,10 +246,13 @@ class TorGateway:
                     dir_port=desc.dir_port,
                     flags=desc.flags,
                     bandwidth=desc.bandwidth if hasattr(desc, 'bandwidth') else 0,
-                    country=getattr(desc, 'country', None)
+                    country=getattr(desc, 'country', None),
+                    family=getattr(desc, 'family', None)
                 )
-                self.node_cache.append(node)
+                node_cache.append(node)
             
+            self.node_cache = node_cache
+            self.relay_index = RelayIndex(node_cache, self.preferred_countries)
             self.last_node_refresh = current_time
             logger.info(f"Lista de nodos actualizada: {len(self.node_cache)} nodos disponibles")
             
@@ -204,79 +260,97 @@ class TorGateway:
             logger.error(f"Error actualizando lista de nodos: {e}")
     
     def _select_diverse_path(self, path_length: int = 3) -> List[TorNode]:
-        """Selecciona un path diverso geográficamente"""
+        """Selecciona un path diverso geográficamente, ponderado por bandwidth"""
         if len(self.node_cache) < path_length:
             raise ValueError("No hay suficientes nodos disponibles")
         
-        # Separar nodos por país
-        nodes_by_country = {}
-        for node in self.node_cache:
-            country = node.country or 'Unknown'
-            if country not in nodes_by_country:
-                nodes_by_country[country] = []
-            nodes_by_country[country].append(node)
-        
-        # Seleccionar path con diversidad geográfica
-        selected_path = []
-        used_countries = set()
+        # El índice se construye una vez por refresco; se rehace si el caché
+        # o los países preferidos se han sustituido desde fuera
+        index = self.relay_index
+        if (index is None or index.nodes is not self.node_cache
+                or index.preferred_countries != tuple(self.preferred_countries)):
+            index = self.relay_index = RelayIndex(self.node_cache, self.preferred_countries)
         
-        # Priorizar países preferidos
-        available_countries = list(nodes_by_country.keys())
-        preferred_available = [c for c in self.preferred_countries if c in available_countries]
-        
-        for i in range(path_length):
-            # Para el primer salto, usar países preferidos si están disponibles
-            if i == 0 and preferred_available:
-                candidates = []
-                for country in preferred_available:
-                    if country not in used_countries:
-                        candidates.extend(nodes_by_country[country])
-            else:
-                # Para saltos posteriores, evitar países ya usados
-                candidates = []
-                for country, nodes in nodes_by_country.items():
-                    if country not in used_countries:
-                        candidates.extend(nodes)
-            
-            if not candidates:
-                # Si no hay candidatos diversos, usar cualquier nodo disponible
-                candidates = [n for n in self.node_cache if n not in selected_path]
-            
-            if not candidates:
-                raise ValueError("No se pueden encontrar suficientes nodos diversos")
-            
-            # Selección ponderada por bandwidth
-            weights = [node.bandwidth + 1 for node in candidates]  # +1 para evitar división por 0
-            selected_node = secrets.choice(candidates)  # Usar secrets para aleatoriedad criptográfica
-            
-            selected_path.append(selected_node)
-            used_countries.add(selected_node.country or 'Unknown')
-        
-        return selected_path
+        return index.select_path(path_length)
     
-    async def create_circuit(self, purpose: str = "general") -> Optional[str]:
-        """Crea un nuevo circuito TOR con diversidad geográfica"""
+    async def _build_circuit(self, purpose: str = "general",
+                             security_level: Optional[SecurityLevel] = None) -> Optional[TorCircuit]:
+        """Construye un circuito con la lista de nodos en caché (sin refrescarla)"""
         try:
-            await self._refresh_node_list()
-            
             # Seleccionar path diverso
             path = self._select_diverse_path()
             path_fingerprints = [node.fingerprint for node in path]
             
-            # Crear circuito
-            circuit_id = self.controller.new_circuit(path_fingerprints, await_build=True)
+            # Crear circuito (stem bloquea hasta que está construido)
+            circuit_id = await self._run_controller(self.controller.new_circuit, path_fingerprints,
+                                                    await_build=True)
             
             # Almacenar información del circuito
-            circuit = TorCircuit(circuit_id, path, self.security_level)
+            circuit = TorCircuit(circuit_id, path, security_level or self.security_level)
+            circuit.state = CircuitState.BUILT
             self.circuits[circuit_id] = circuit
             
-            logger.info(f"Circuito {circuit_id} creado: {' -> '.join([n.country or 'Unknown' for n in path])}")
-            return circuit_id
+            logger.info(f"Circuito {circuit_id} ({purpose}) creado: {' -> '.join([n.country or 'Unknown' for n in path])}")
+            return circuit
             
         except Exception as e:
             logger.error(f"Error creando circuito: {e}")
             return None
     
+    async def create_circuit(self, purpose: str = "general") -> Optional[str]:
+        """Crea un nuevo circuito TOR con diversidad geográfica"""
+        await self._refresh_node_list()
+        circuit = await self._build_circuit(purpose)
+        return circuit.circuit_id if circuit else None
+    
+    async def start_circuit_pool(self, purposes: Tuple[str, ...] = ("general",)) -> bool:
+        """
+        Arranca el pool de circuitos pre-construidos.
+        
+        La lista de nodos pasa a refrescarse por temporizador y los envíos
+        sin circuito explícito toman un circuito del pool.
+        """
+        self.circuit_pool = CircuitPool(
+            build=self._build_circuit,
+            close=self._rotate_circuit,
+            session_factory=self._session_factory(),
+            target_size=self.pool_size,
+            refresh=functools.partial(self._refresh_node_list, force=True)
+        )
+        await self.circuit_pool.start((purpose, self.security_level) for purpose in purposes)
+        logger.info(f"Pool de circuitos TOR iniciado: {self.pool_size} por propósito")
+        return True
+    
+    def _session_factory(self) -> Callable[[PooledCircuit], Any]:
+        """Fábrica de sesiones que registra el usuario SOCKS de cada circuito"""
+        if self._sessions is None:
+            factory = self.session_factory or socks_session_factory("127.0.0.1", self.socks_port)
+            
+            def sessions(entry: PooledCircuit):
+                self._stream_circuits[entry.socks_username] = entry.circuit_id
+                return factory(entry)
+            self._sessions = sessions
+        return self._sessions
+    
+    def _stream_event_handler(self, event) -> None:
+        """Adjunta cada stream nuevo al circuito de su usuario SOCKS (hilo de eventos de stem)"""
+        if event.status not in ('NEW', 'NEWRESOLVE') or getattr(event, 'circ_id', None):
+            return
+        username = getattr(event, 'socks_username', None)
+        if username is None:
+            username = getattr(event, 'keyword_args', {}).get('SOCKS_USERNAME', '').strip('"')
+        # Circuito '0': streams ajenos al gateway, TOR elige el circuito
+        circuit_id = self._stream_circuits.get(username, '0')
+        try:
+            self.controller.attach_stream(event.id, circuit_id)
+        except Exception as e:
+            logger.warning(f"No se pudo adjuntar stream {event.id} al circuito {circuit_id}: {e}")
+            if circuit_id != '0':
+                try:
+                    self.controller.attach_stream(event.id, '0')
+                except Exception:
+                    pass
+    
     def _circuit_event_handler(self, event) -> None:
         """Maneja eventos de circuito TOR"""
         circuit_id = event.id
@@ -292,6 +366,9 @@ class TorGateway:
             elif event.status == 'CLOSED':
                 circuit.state = CircuitState.CLOSED
                 logger.debug(f"Circuito {circuit_id} cerrado")
+            
+            if event.status in ('FAILED', 'CLOSED') and self.circuit_pool is not None:
+                self.circuit_pool.mark_failed(circuit_id)
     
     async def create_onion_service(self, port: int, target_port: Optional[int] = None) -> Optional[str]:
         """Crea un servicio onion para recibir conexiones"""
@@ -324,65 +401,60 @@ class TorGateway:
             logger.error(f"Error creando servicio onion: {e}")
             return None
     
+    async def _post_message(self, session, target_onion: str, port: int, message: bytes) -> bool:
+        """POST del mensaje por una sesión ya configurada"""
+        url = f"http://{target_onion}:{port}/message"
+        async with session.post(url, data=message) as response:
+            if response.status == 200:
+                logger.debug(f"Mensaje enviado exitosamente a {target_onion}")
+                return True
+            logger.error(f"Error enviando mensaje: HTTP {response.status}")
+            return False
+    
     async def send_message(self, target_onion: str, port: int, message: bytes, 
-                          circuit_id: Optional[str] = None) -> bool:
+                          circuit_id: Optional[str] = None, purpose: str = "general") -> bool:
         """Envía un mensaje a través de TOR"""
         try:
-            # Seleccionar o crear circuito
+            pool = self.circuit_pool
+            if pool is not None and pool.running:
+                # Circuito explícito del pool, o el menos cargado de su propósito
+                entry = pool.get(circuit_id) if circuit_id else None
+                if entry is None or not entry.usable:
+                    entry = await pool.acquire(purpose, self.security_level)
+                else:
+                    entry.in_flight += 1
+                success = False
+                try:
+                    success = await self._post_message(entry.session, target_onion, port, message)
+                finally:
+                    pool.release(entry, success)
+                return success
+            
+            # Sin pool: circuito y sesión por mensaje
             if circuit_id and circuit_id in self.circuits:
                 circuit = self.circuits[circuit_id]
                 if circuit.should_rotate():
                     await self._rotate_circuit(circuit_id)
-                    circuit_id = await self.create_circuit()
+                    circuit_id = await self.create_circuit(purpose)
             else:
-                circuit_id = await self.create_circuit()
+                circuit_id = await self.create_circuit(purpose)
             
             if not circuit_id:
                 logger.error("No se pudo crear circuito para envío")
                 return False
             
-            # Configurar proxy SOCKS5 para usar el circuito específico
-            proxy_url = f"socks5://127.0.0.1:{self.socks_port}"
-            
-            # Crear sesión HTTP con proxy TOR
-            connector = aiohttp.TCPConnector()
-            timeout = aiohttp.ClientTimeout(total=30)
-            
-            async with aiohttp.ClientSession(
-                connector=connector,
-                timeout=timeout
-            ) as session:
-                
-                # Configurar headers para evitar fingerprinting
-                headers = {
-                    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; rv:91.0) Gecko/20100101 Firefox/91.0',
-                    'Accept': 'application/octet-stream',
-                    'Accept-Language': 'en-US,en;q=0.5',
-                    'Accept-Encoding': 'gzip, deflate',
-                    'Connection': 'keep-alive',
-                    'Upgrade-Insecure-Requests': '1'
-                }
-                
-                url = f"http://{target_onion}:{port}/message"
-                
-                async with session.post(
-                    url,
-                    data=message,
-                    headers=headers,
-                    proxy=proxy_url
-                ) as response:
-                    
-                    if response.status == 200:
-                        # Actualizar estadísticas del circuito
-                        circuit = self.circuits[circuit_id]
-                        circuit.usage_count += 1
-                        circuit.last_used = time.time()
-                        
-                        logger.debug(f"Mensaje enviado exitosamente a {target_onion}")
-                        return True
-                    else:
-                        logger.error(f"Error enviando mensaje: HTTP {response.status}")
-                        return False
+            circuit = self.circuits[circuit_id]
+            entry = PooledCircuit(circuit, (purpose, self.security_level))
+            try:
+                async with self._session_factory()(entry) as session:
+                    success = await self._post_message(session, target_onion, port, message)
+            finally:
+                self._stream_circuits.pop(entry.socks_username, None)
+            if success:
+                # Actualizar estadísticas del circuito
+                circuit.usage_count += 1
+                circuit.last_used = time.time()
+            return success
             
         except Exception as e:
             logger.error(f"Error enviando mensaje a {target_onion}: {e}")
@@ -391,9 +463,12 @@ class TorGateway:
     async def _rotate_circuit(self, circuit_id: str) -> None:
         """Rota un circuito por seguridad"""
         try:
+            for username, owner in list(self._stream_circuits.items()):
+                if owner == circuit_id:
+                    self._stream_circuits.pop(username, None)
             if circuit_id in self.circuits:
-                self.controller.close_circuit(circuit_id)
                 del self.circuits[circuit_id]
+                await self._run_controller(self.controller.close_circuit, circuit_id)
                 logger.info(f"Circuito {circuit_id} rotado por seguridad")
         except Exception as e:
             logger.error(f"Error rotando circuito {circuit_id}: {e}")
@@ -403,6 +478,9 @@ class TorGateway:
         circuits_to_remove = []
         
         for circuit_id, circuit in self.circuits.items():
+            # Los circuitos del pool rotan con sus propias reglas
+            if self.circuit_pool is not None and circuit_id in self.circuit_pool:
+                continue
             if circuit.should_rotate():
                 circuits_to_remove.append(circuit_id)
         
@@ -423,7 +501,8 @@ class TorGateway:
                 'active_circuits': len([c for c in self.circuits.values() 
                                       if c.state == CircuitState.BUILT]),
                 'total_circuits': len(self.circuits),
-                'available_nodes': len(self.node_cache)
+                'available_nodes': len(self.node_cache),
+                'circuit_pool': self.circuit_pool.status() if self.circuit_pool else None
             }
             
         except Exception as e:
@@ -433,6 +512,10 @@ class TorGateway:
     async def shutdown(self) -> None:
         """Cierra todas las conexiones y limpia recursos"""
         try:
+            # Detener el pool (cierra sus sesiones y circuitos)
+            if self.circuit_pool is not None:
+                await self.circuit_pool.stop()
+            
             # Cerrar todos los circuitos
             for circuit_id in list(self.circuits.keys()):
                 await self._rotate_circuit(circuit_id)
@@ -444,8 +527,13 @@ class TorGateway:
                 except:
                     pass
             
-            # Cerrar controlador
+            # Cerrar controlador (TOR vuelve a asignar los streams por sí mismo)
             if self.controller:
+                try:
+                    self.controller.remove_event_listener(self._stream_event_handler)
+                    self.controller.reset_conf('__LeaveStreamsUnattached')
+                except Exception as e:
+                    logger.debug(f"Error restaurando asignación de streams: {e}")
                 self.controller.close()
             
             logger.info("TOR Gateway cerrado correctamente")
@@ -0,0 +1,284 @@
+"""
+Unit tests for the alert_rules module and the alert manager built on it
+"""
+
+import unittest
+import asyncio
+import os
+import random
+import sys
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from alert_rules import (
+    FIRING, RESOLVED, CompiledRule, LevelInhibitor, NotificationRouter, RuleEngine, benchmark_alert_rules,
+    parse_condition
+)
+from alert_system import AlertLevel, AlertManager, AlertRule, AlertSystemConfig, NotificationChannel
+from rate_limiting import RateLimitPolicy
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def transitions(engine):
+    return [(event.status, event.rule.rule_id, event.labels.get("node_id")) for event in engine.drain()]
+
+
+class TestRuleEngine(unittest.TestCase):
+    """Test cases for dispatch, for-durations and hysteresis"""
+
+    def test_parse_condition(self):
+        self.assertEqual(parse_condition('cpu_usage{node_id="n1", zone="a"} >= 90'),
+                         ("cpu_usage", (("node_id", "n1"), ("zone", "a")), ">=", 90.0))
+        self.assertEqual(parse_condition("model.accuracy < .75"), ("model.accuracy", (), "<", 0.75))
+        for condition in ("test_condition", "cpu_usage == 1", 'cpu{node} > 1'):
+            with self.assertRaises(ValueError):
+                parse_condition(condition)
+
+    def test_sustained_breach_fires_once(self):
+        engine = RuleEngine()
+        engine.add_rule(CompiledRule.from_condition("high", "cpu > 90"))
+        for value in (50, 95, 96, 99, 97):
+            engine.ingest("cpu", value, {"node_id": "a"}, 1.0)
+        engine.ingest("cpu", 95, {"node_id": "b"}, 1.0)
+        engine.ingest("memory", 95, {"node_id": "a"}, 1.0)
+        self.assertEqual(transitions(engine), [(FIRING, "high", "a"), (FIRING, "high", "b")])
+        engine.ingest("cpu", 90, {"node_id": "a"}, 2.0)
+        self.assertEqual(transitions(engine), [(RESOLVED, "high", "a")])
+        self.assertEqual(engine.stats()["active_series"], 1)
+
+    def test_for_duration_and_hysteresis(self):
+        engine = RuleEngine()
+        engine.add_rule(CompiledRule.from_condition("slow", "latency > 200", for_duration=10, clear_threshold=150))
+        node = {"node_id": "a"}
+        engine.ingest("latency", 300, node, 0.0)
+        engine.ingest("latency", 100, node, 5.0)  # breach interrupted: pending restarts
+        engine.ingest("latency", 300, node, 6.0)
+        engine.ingest("latency", 300, node, 15.0)
+        self.assertEqual(transitions(engine), [])
+        engine.ingest("latency", 300, node, 16.0)
+        events = engine.drain()
+        self.assertEqual([(e.status, e.since) for e in events], [(FIRING, 6.0)])
+
+        # Back under the threshold but inside the hysteresis band keeps firing
+        engine.ingest("latency", 180, node, 17.0)
+        engine.ingest("latency", 250, node, 18.0)
+        engine.ingest("latency", 160, node, 19.0)
+        self.assertEqual(transitions(engine), [])
+        engine.ingest("latency", 150, node, 20.0)
+        self.assertEqual(transitions(engine), [(RESOLVED, "slow", "a")])
+
+    def test_label_matchers(self):
+        engine = RuleEngine()
+        engine.add_rules([CompiledRule.from_condition("n1", 'cpu{node_id="n1"} > 50'),
+                          CompiledRule.from_condition("all", "cpu > 80")])
+        engine.ingest("cpu", 60, {"node_id": "n1"}, 1.0)
+        engine.ingest("cpu", 90, {"node_id": "n2"}, 1.0)
+        engine.ingest("cpu", 90)
+        self.assertEqual(sorted(transitions(engine), key=str),
+                         [(FIRING, "all", "n2"), (FIRING, "all", None), (FIRING, "n1", "n1")])
+
+    def test_matches_brute_force(self):
+        rng = random.Random(3)
+        ops = [">", ">=", "<", "<="]
+        rules = [CompiledRule(f"r{i}", "m", rng.choice(ops), float(rng.randint(0, 20))) for i in range(40)]
+        engine = RuleEngine()
+        engine.add_rules(rules[:30])
+        firing = set()
+        for step in range(2000):
+            if step == 1000:
+                # Changing the rule set mid-stream keeps the per-series states consistent
+                engine.add_rules(rules[30:])
+                engine.remove_rule("r0")
+                firing.discard(("r0", "a"))
+            node = rng.choice("ab")
+            value = float(rng.randint(0, 20))
+            engine.ingest("m", value, {"node_id": node}, float(step))
+            for status, rule_id, series in transitions(engine):
+                (firing.add if status == FIRING else firing.discard)((rule_id, series))
+            expected = {(rule.rule_id, node) for rule in engine.rules.values() if rule.breached(value)}
+            self.assertEqual({f for f in firing if f[1] == node}, expected)
+
+    def test_remove_rule_and_expire_resolve_firing_series(self):
+        engine = RuleEngine()
+        engine.add_rules([CompiledRule.from_condition("a", "cpu > 1"), CompiledRule.from_condition("b", "cpu > 2")])
+        engine.ingest("cpu", 5, {"node_id": "x"}, 1.0)
+        engine.ingest("cpu", 5, {"node_id": "y"}, 50.0)
+        engine.drain()
+        engine.remove_rule("a", timestamp=60.0)
+        self.assertEqual(sorted(transitions(engine)), [(RESOLVED, "a", "x"), (RESOLVED, "a", "y")])
+        self.assertEqual(engine.expire(before=10.0, timestamp=60.0), 1)
+        self.assertEqual(transitions(engine), [(RESOLVED, "b", "x")])
+
+    def test_benchmark_runs(self):
+        report = benchmark_alert_rules(rules=200, samples=2000, metrics=20, series=3, legacy_samples=50)
+        self.assertGreater(report["engine_samples_per_second"], report["legacy_samples_per_second"])
+
+
+class TestNotificationRouter(unittest.TestCase):
+    """Test cases for deduplication, grouping and rate limiting"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sent = []
+        self.engine = RuleEngine(clock=self.clock)
+        self.engine.add_rules([CompiledRule.from_condition("cpu", "cpu > 90"),
+                               CompiledRule.from_condition("mem", "mem > 90")])
+
+    def router(self, **kwargs):
+        return NotificationRouter(self.sent.append, clock=self.clock, **kwargs)
+
+    def test_groups_and_repeats(self):
+        router = self.router(group_wait=5, group_interval=30, repeat_interval=300)
+        for node in ("a", "b", "c"):
+            self.engine.ingest("cpu", 95, {"node_id": node})
+        router.submit(self.engine.drain())
+        self.assertEqual(router.flush(), 0)
+        self.clock.now += 5
+        self.assertEqual(router.flush(), 1)
+        self.assertEqual(len(self.sent[0].started), 3)
+        self.assertEqual(self.sent[0].group, {"rule_id": "cpu"})
+
+        # Changes wait for the group interval; a steady group repeats
+        self.engine.ingest("cpu", 10, {"node_id": "a"})
+        router.submit(self.engine.drain())
+        self.assertEqual(router.next_due(), self.clock.now + 30)
+        self.clock.now += 30
+        router.flush()
+        self.assertEqual((len(self.sent[1].firing), len(self.sent[1].resolved)), (2, 1))
+        self.clock.now += 300
+        router.flush()
+        self.assertEqual((len(self.sent[2].firing), self.sent[2].started, self.sent[2].resolved), (2, [], []))
+
+    def test_duplicate_events_are_dropped(self):
+        router = self.router()
+        self.engine.ingest("cpu", 95, {"node_id": "a"})
+        events = self.engine.drain()
+        router.submit(events)
+        router.submit(events)
+        router.flush()
+        self.assertEqual(len(self.sent), 1)
+        self.assertEqual(router.stats["deduplicated"], 1)
+
+    def test_rate_limit_defers_groups(self):
+        router = self.router(group_by=("fingerprint",), rate_limit=RateLimitPolicy(2, 10.0))
+        for node in "abcd":
+            self.engine.ingest("cpu", 95, {"node_id": node})
+        router.submit(self.engine.drain())
+        self.assertEqual(router.flush(), 2)
+        self.assertEqual(router.next_due(), self.clock.now + 5.0)
+        self.clock.now += 10
+        self.assertEqual(router.flush(), 2)
+        self.assertEqual(len({n.firing[0].fingerprint for n in self.sent}), 4)
+
+
+class TestAlertManagerRules(unittest.TestCase):
+    """Test cases for AlertManager evaluation on sample arrival"""
+
+    def setUp(self):
+        self.config = AlertSystemConfig(grouping_wait=0, grouping_interval=0)
+        self.manager = AlertManager(self.config)
+        self.received = []
+        self.manager.notifier.register_notifier(NotificationChannel.CUSTOM, self.received.append)
+        self.manager.add_rule(AlertRule(
+            id="cpu_high", name="CPU high", description="CPU above 90%",
+            condition="cpu_usage > 90", level=AlertLevel.CRITICAL, clear_threshold=80,
+            labels={"team": "ops"}, notify_channels=[NotificationChannel.CUSTOM]
+        ))
+
+    def test_alert_lifecycle(self):
+        for value in (95, 97, 99):
+            self.manager.ingest_sample("cpu_usage", value, {"node_id": "n1"})
+        alerts = list(self.manager.get_active_alerts().values())
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0].labels, {"team": "ops", "node_id": "n1"})
+
+        self.assertEqual(self.manager.flush_notifications(), 1)
+        self.assertEqual(len(self.received), 1)
+        self.assertIn("1 firing", self.received[0].description)
+        self.assertEqual(alerts[0].notification_count, 1)
+
+        self.manager.ingest_sample("cpu_usage", 85, {"node_id": "n1"})
+        self.assertEqual(len(self.manager.get_active_alerts()), 1)
+        self.manager.ingest_sample("cpu_usage", 70, {"node_id": "n1"})
+        self.assertEqual(self.manager.get_active_alerts(), {})
+        self.manager.flush_notifications()
+        self.assertEqual(self.received[-1].status.value, "resolved")
+
+    def test_manual_rules_still_trigger(self):
+        self.manager.add_rule(AlertRule(id="manual", name="Manual", description="", condition="test_condition",
+                                        level=AlertLevel.INFO))
+        self.assertNotIn("manual", self.manager.engine.rules)
+
+        async def trigger():
+            first = self.manager.trigger_alert("manual", {"k": "v"})
+            second = self.manager.trigger_alert("manual", {"k": "v"})
+            return first, second
+
+        first, second = asyncio.run(trigger())
+        self.assertIs(first, second)
+
+    def test_notification_loop(self):
+        async def run():
+            await self.manager.start_evaluation()
+            self.manager.ingest_samples([("cpu_usage", 95, {"node_id": n}, None) for n in ("a", "b")])
+            for _ in range(50):
+                if self.received:
+                    break
+                await asyncio.sleep(0.01)
+            await self.manager.stop_evaluation()
+
+        asyncio.run(run())
+        self.assertEqual(len(self.received), 1)
+        self.assertIn("2 firing", self.received[0].description)
+
+
+class TestLevelInhibitor(unittest.TestCase):
+    """Warning and critical thresholds of one series never show both levels at once"""
+
+    def setUp(self):
+        # Same shape as the dashboard's cpu thresholds: warning 70, critical 90, hysteresis 5
+        self.engine = RuleEngine()
+        self.engine.add_rules([
+            CompiledRule("cpu.warning", "cpu_usage", ">=", 70.0, clear_threshold=65.0, payload="warning"),
+            CompiledRule("cpu.critical", "cpu_usage", ">=", 90.0, clear_threshold=85.0, payload="critical"),
+        ])
+        self.inhibitor = LevelInhibitor(critical="critical", warning="warning")
+        self.active = {}
+        self.warnings_raised = 0
+
+    def active_levels(self, value, timestamp):
+        self.engine.ingest("cpu_usage", value, {"node_id": "n1"}, timestamp)
+        for event in self.inhibitor.apply(self.engine.drain()):
+            if event.status == FIRING:
+                self.active[event.fingerprint] = event.rule.payload
+                self.warnings_raised += event.rule.payload == "warning"
+            else:
+                self.active.pop(event.fingerprint, None)
+        return sorted(self.active.values())
+
+    def test_warning_is_inhibited_while_critical(self):
+        expected = [(50, []), (75, ["warning"]), (95, ["critical"]), (87, ["critical"]),
+                    (75, ["warning"]), (50, []), (99, ["critical"]), (40, [])]
+        for timestamp, (value, levels) in enumerate(expected):
+            self.assertEqual(self.active_levels(value, float(timestamp)), levels, value)
+        self.assertEqual(self.warnings_raised, 2)  # the 50 -> 99 jump never raised a warning
+
+    def test_other_series_keep_their_warning(self):
+        self.engine.ingest("cpu_usage", 75, {"node_id": "n2"}, 0.0)
+        self.inhibitor.apply(self.engine.drain())
+        self.assertEqual(self.active_levels(95, 1.0), ["critical"])
+        self.engine.ingest("cpu_usage", 60, {"node_id": "n2"}, 2.0)
+        resolved = self.inhibitor.apply(self.engine.drain())
+        self.assertEqual([(event.status, event.labels["node_id"]) for event in resolved], [(RESOLVED, "n2")])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+"""
+Unit tests for the chunk_store module and the backup manager built on it
+"""
+
+import unittest
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from chunk_store import AESGCM_AVAILABLE, ChunkStore, ContentChunker, benchmark_backups
+from backup_system import BackupConfig, BackupManager
+
+
+def write_file(path, data, mtime=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as handle:
+        handle.write(data)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+
+
+class ChunkStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.source = os.path.join(self.tmp, "source")
+        self.chunker = ContentChunker(min_size=1024, avg_size=4096, max_size=16384)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp, ignore_errors=True)
+
+    def restored_path(self, target, name):
+        return os.path.join(target, self.source.lstrip(os.sep), name)
+
+    def open_store(self, key=None, workers=1):
+        return ChunkStore(os.path.join(self.tmp, "store"), key=key, chunker=self.chunker, workers=workers)
+
+
+class TestContentChunker(ChunkStoreTestCase):
+    """Test cases for content-defined chunking"""
+
+    def test_sizes_and_resync_after_insertion(self):
+        data = os.urandom(256 * 1024)
+        chunks = [bytes(chunk) for chunk in self.chunker.split(_Stream(data), block_size=10000)]
+        self.assertEqual(b"".join(chunks), data)
+        self.assertTrue(all(len(chunk) <= 16384 for chunk in chunks))
+        self.assertTrue(all(len(chunk) >= 1024 for chunk in chunks[:-1]))
+
+        edited = data[:100000] + b"inserted" + data[100000:]
+        edited_chunks = [bytes(chunk) for chunk in self.chunker.split(_Stream(edited))]
+        shared = set(chunks) & set(edited_chunks)
+        # Only the chunks around the insertion change
+        self.assertGreaterEqual(len(shared), len(chunks) - 3)
+
+
+class _Stream:
+    def __init__(self, data):
+        self.data, self.offset = data, 0
+
+    def read(self, size):
+        block = self.data[self.offset:self.offset + size]
+        self.offset += size
+        return block
+
+
+class TestChunkStore(ChunkStoreTestCase):
+    """Test cases for snapshots, deduplication and pruning"""
+
+    def test_second_snapshot_only_writes_changes(self):
+        for i in range(10):
+            write_file(os.path.join(self.source, f"f{i}.bin"), os.urandom(64 * 1024))
+        store = self.open_store()
+        first = store.create_snapshot([self.source], "first")["stats"]
+        self.assertEqual(first["files"], 10)
+        self.assertEqual(first["reused_chunks"], 0)
+
+        path = os.path.join(self.source, "f3.bin")
+        with open(path, "r+b") as handle:
+            handle.seek(30000)
+            handle.write(b"changed")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        second = store.create_snapshot([self.source], "second")["stats"]
+        self.assertEqual(second["files_unchanged"], 9)
+        self.assertEqual(second["bytes_read"], 64 * 1024)
+        self.assertLessEqual(second["new_chunks"], 3)
+        self.assertLess(second["bytes_written"], first["bytes_written"] / 10)
+
+        restored = os.path.join(self.tmp, "restored")
+        store.restore("first", restored)
+        with open(self.restored_path(restored, "f3.bin"), "rb") as handle:
+            self.assertNotIn(b"changed", handle.read())
+        store.restore("second", restored, paths=[path.replace(os.sep, "/")])
+        with open(self.restored_path(restored, "f3.bin"), "rb") as handle, open(path, "rb") as original:
+            self.assertEqual(handle.read(), original.read())
+
+    def test_restore_rejects_paths_escaping_target(self):
+        write_file(os.path.join(self.source, "a"), b"payload")
+        store = self.open_store()
+        store.create_snapshot([self.source], "s")
+        manifest_path = os.path.join(store.snapshot_dir, "s.json")
+        with open(manifest_path, encoding="utf-8") as handle:
+            manifest = json.load(handle)
+        entry = next(iter(manifest["files"].values()))
+        target = os.path.join(self.tmp, "restored")
+        os.makedirs(target)
+        os.symlink(self.tmp, os.path.join(target, "link"))
+        for name in ("../escaped", "/x/../../escaped", "link/escaped", "a/.."):
+            manifest["files"] = {"safe": entry, name: entry}
+            with open(manifest_path, "w", encoding="utf-8") as handle:
+                json.dump(manifest, handle)
+            with self.assertRaises(ValueError, msg=name):
+                store.restore("s", target)
+            self.assertFalse(os.path.exists(os.path.join(self.tmp, "escaped")), name)
+            self.assertFalse(os.path.exists(os.path.join(target, "safe")), name)
+
+    def test_identical_content_is_stored_once(self):
+        data = os.urandom(50000)
+        write_file(os.path.join(self.source, "a"), data)
+        write_file(os.path.join(self.source, "b"), data)
+        store = self.open_store()
+        stats = store.create_snapshot([self.source], "s")["stats"]
+        self.assertEqual(store.usage()["chunks"], stats["new_chunks"])
+        self.assertEqual(stats["new_chunks"], stats["reused_chunks"])
+
+    def test_prune_collects_unreferenced_chunks(self):
+        store = self.open_store()
+        for name in ("old", "mid", "new"):
+            write_file(os.path.join(self.source, "data"), os.urandom(40000), mtime=time.time())
+            store.create_snapshot([self.source], name)
+        chunks_before = store.usage()["chunks"]
+        removed = store.prune(time.time() + 60, keep_last=1)
+        self.assertEqual(sorted(removed), ["mid", "old"])
+        self.assertEqual([s["id"] for s in store.snapshots()], ["new"])
+        self.assertLess(store.usage()["chunks"], chunks_before)
+        store.restore("new", os.path.join(self.tmp, "restored"))
+
+    @unittest.skipIf(not AESGCM_AVAILABLE, "cryptography not available")
+    def test_encrypted_round_trip(self):
+        secret = os.urandom(100000)
+        write_file(os.path.join(self.source, "secret.bin"), secret)
+        store = self.open_store(key=b"k" * 32)
+        store.create_snapshot([self.source], "s")
+        for root, _, names in os.walk(store.chunk_dir):
+            for name in names:
+                with open(os.path.join(root, name), "rb") as handle:
+                    self.assertNotIn(secret[:64], handle.read())
+        store.close()
+
+        with self.assertRaises(ValueError):
+            self.open_store(key=b"x" * 32)
+        store = self.open_store(key=b"k" * 32)
+        store.restore("s", os.path.join(self.tmp, "restored"))
+        with open(self.restored_path(os.path.join(self.tmp, "restored"), "secret.bin"), "rb") as handle:
+            self.assertEqual(handle.read(), secret)
+
+    def test_benchmark_runs(self):
+        rows = benchmark_backups(files=20, file_size=32 * 1024, workers=1, encrypt=False)
+        self.assertEqual([row["run"] for row in rows], ["first", "second", "restore"])
+        self.assertLess(rows[1]["chunk_store_bytes"], rows[1]["full_copy_bytes"])
+
+
+class TestBackupManager(ChunkStoreTestCase):
+    """Test cases for BackupManager snapshots"""
+
+    def test_create_and_restore_backup(self):
+        write_file(os.path.join(self.source, "state.json"), b'{"a": 1}' * 1000)
+        config = BackupConfig(enable_encryption=AESGCM_AVAILABLE, source_directories=[self.source],
+                              backup_directory=os.path.join(self.tmp, "backups"), workers=1)
+        manager = BackupManager(config)
+        record = asyncio.run(manager.create_backup())
+        self.assertEqual(record["status"], "completed")
+        self.assertEqual(record["source_files"], 1)
+        self.assertTrue(os.path.exists(record["file_path"]))
+
+        again = asyncio.run(manager.create_backup())
+        self.assertEqual(again["files_unchanged"], 1)
+        self.assertEqual(again["new_chunks"], 0)
+        self.assertEqual(len(manager.list_backups()), 2)
+
+        # A new manager reuses the key generated for this backup directory
+        manager = BackupManager(config)
+        target = os.path.join(self.tmp, "restored")
+        result = asyncio.run(manager.restore_backup(record["id"], target))
+        self.assertEqual(result["files"], 1)
+        with open(self.restored_path(target, "state.json"), "rb") as handle:
+            self.assertEqual(handle.read(), b'{"a": 1}' * 1000)
+
+
+if __name__ == '__main__':
+    unittest.main()
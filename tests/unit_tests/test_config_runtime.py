@@ -0,0 +1,187 @@
+"""
+Unit tests for the config_runtime module and the config manager built on it
+"""
+
+import unittest
+import asyncio
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from config_runtime import ConfigRuntime, ConfigFileWatcher, benchmark_config_runtime, merge_layers, freeze, thaw
+from config_manager import ConfigManager, ConfigManagerConfig, ConfigSchema, ConfigValidationError
+
+
+def random_tree(rng, depth=0):
+    tree = {}
+    for key in rng.sample("abcde", rng.randint(0, 4)):
+        if depth < 3 and rng.random() < 0.5:
+            tree[key] = random_tree(rng, depth + 1)
+        else:
+            tree[key] = rng.choice([0, 1, "x", [1, 2], None])
+    return tree
+
+
+class TestConfigRuntime(unittest.TestCase):
+    """Test cases for snapshots, incremental merges, accessors and subscriptions"""
+
+    def test_incremental_merge_matches_full_merge(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            names = ["a", "b", "c"]
+            layers = {name: random_tree(rng) for name in names}
+            runtime = ConfigRuntime(names)
+            runtime.replace_layers(layers)
+            name = rng.choice(names)
+            layers[name] = random_tree(rng)
+            runtime.update_layers({name: layers[name]})
+            expected = merge_layers([freeze(layers[n]) for n in names])
+            self.assertEqual(thaw(runtime.snapshot.data), thaw(expected))
+
+    def test_snapshots_are_immutable_and_share_subtrees(self):
+        runtime = ConfigRuntime(["defaults", "file"])
+        first = runtime.replace_layers({"defaults": {"api": {"port": 1}, "tor": {"hosts": ["a"]}}, "file": {}})
+        with self.assertRaises(TypeError):
+            first.data["api"]["port"] = 2
+        self.assertEqual(first.get("tor.hosts"), ("a",))
+
+        second = runtime.update_layers({"file": {"api": {"port": 2}}})
+        self.assertEqual(second.version, first.version + 1)
+        self.assertIs(second.data["tor"], first.data["tor"])
+        self.assertEqual((first.get("api.port"), second.get("api.port")), (1, 2))
+        self.assertIsNone(runtime.update_layers({"file": {"api": {"port": 2}}}))
+
+    def test_accessors_and_subscriptions(self):
+        runtime = ConfigRuntime(["defaults", "file"])
+        runtime.replace_layers({"defaults": {"api": {"port": 1}, "tor": {"enabled": True}}})
+        port = runtime.accessor("api.port")
+        missing = runtime.accessor("api.host", "0.0.0.0")
+        calls = []
+        runtime.subscribe("api", lambda path, old, new: calls.append((path, old and old["port"], new["port"])))
+        tor = runtime.subscribe("tor", lambda path, old, new: calls.append((path, old, new)))
+
+        runtime.update_layers({"file": {"api": {"port": 2}}})
+        self.assertEqual((port(), port.value, missing()), (2, 2, "0.0.0.0"))
+        self.assertEqual(calls, [("api", 1, 2)])
+
+        runtime.unsubscribe(tor)
+        runtime.update_layers({"file": {"api": {"port": 2}, "tor": {"enabled": False}}})
+        self.assertEqual(calls, [("api", 1, 2)])
+
+    def test_failed_validation_publishes_nothing(self):
+        runtime = ConfigRuntime(["defaults", "file"])
+        runtime.replace_layers({"defaults": {"port": 1}})
+
+        def validate(data):
+            if not isinstance(data["port"], int):
+                raise ValueError("port")
+
+        with self.assertRaises(ValueError):
+            runtime.update_layers({"file": {"port": "x"}}, validate=validate)
+        self.assertEqual(runtime.snapshot.get("port"), 1)
+        self.assertEqual(runtime.snapshot.version, 1)
+
+
+class TestConfigManagerReload(unittest.TestCase):
+    """Test cases for ConfigManager reloads"""
+
+    def setUp(self):
+        self.test_dir = tempfile.mkdtemp()
+        self.config_file = os.path.join(self.test_dir, "app_config.json")
+        self.write({"api_server": {"port": 9000}})
+
+    def tearDown(self):
+        shutil.rmtree(self.test_dir, ignore_errors=True)
+
+    def write(self, data):
+        with open(self.config_file, 'w') as f:
+            f.write(data if isinstance(data, str) else json.dumps(data))
+
+    def manager(self, **kwargs):
+        return ConfigManager(ConfigManagerConfig(config_paths=[self.config_file], auto_reload=False, **kwargs))
+
+    def test_reload_files_patches_snapshot(self):
+        manager = self.manager()
+        before = manager.snapshot()
+        manager.set_value("custom.flag", True)
+        self.write({"api_server": {"port": 9001}})
+        after = manager.reload_files([self.config_file])
+        self.assertEqual(after.get("api_server.port"), 9001)
+        self.assertTrue(manager.get_value("custom.flag"))
+        self.assertIs(after.data["tor"], before.data["tor"])
+
+        # Same content, or content that fails to parse, keeps the current snapshot
+        self.assertIsNone(manager.reload_files([self.config_file]))
+        self.write("{broken")
+        self.assertIsNone(manager.reload_files([self.config_file]))
+        self.assertEqual(manager.get_value("api_server.port"), 9001)
+
+        os.remove(self.config_file)
+        self.assertEqual(manager.reload_files([self.config_file]).get("api_server.port"), 8000)
+
+    def test_invalid_reload_is_rejected(self):
+        schema = ConfigSchema(field_types={"api_server.port": int})
+        manager = self.manager(config_schema=schema)
+        self.write({"api_server": {"port": "not-a-port"}})
+        with self.assertRaises(ConfigValidationError):
+            manager.reload_files([self.config_file])
+        self.assertEqual(manager.get_value("api_server.port"), 9000)
+
+    def test_get_config_returns_a_copy(self):
+        manager = self.manager()
+        config = manager.get_config()
+        config["api_server"]["port"] = 1
+        self.assertEqual(manager.get_value("api_server.port"), 9000)
+
+    def watch(self, **kwargs):
+        async def run():
+            manager = self.manager(reload_debounce=0.01, **kwargs)
+            manager.config.auto_reload = True
+            manager._start_config_watchers()
+            port = manager.accessor("api_server.port")
+            try:
+                await asyncio.sleep(0.05)
+                self.write({"api_server": {"port": 9100}})
+                deadline = time.monotonic() + 5
+                while port.value != 9100 and time.monotonic() < deadline:
+                    await asyncio.sleep(0.01)
+                return manager.watcher.mode, port.value
+            finally:
+                await manager.shutdown()
+        return asyncio.run(run())
+
+    @unittest.skipIf(not sys.platform.startswith("linux"), "inotify is Linux only")
+    def test_inotify_reload(self):
+        self.assertEqual(self.watch(), ("inotify", 9100))
+
+    def test_polling_reload(self):
+        self.assertEqual(self.watch(use_inotify=False, reload_interval=0.05), ("polling", 9100))
+
+    def test_watcher_debounces_bursts(self):
+        async def run():
+            batches = []
+            watcher = ConfigFileWatcher([self.config_file], batches.append, debounce=0.05)
+            watcher.start()
+            for port in range(5):
+                self.write({"api_server": {"port": port}})
+                await asyncio.sleep(0.005)
+            await asyncio.sleep(0.2)
+            await watcher.close()
+            return batches
+        self.assertEqual(asyncio.run(run()), [{os.path.abspath(self.config_file)}])
+
+    def test_benchmark_runs(self):
+        report = benchmark_config_runtime(lookups=1000, reloads=1, poll_interval=0.05)
+        self.assertIn("accessor.value", report["lookup_ns"])
+        self.assertEqual(set(report["reload_latency_ms"]), {"inotify", "polling", "legacy polling"})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Unit tests for the ring-buffer backed ConsciousnessOscillator
+"""
+
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add the Metatron-ConscienceAI directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Metatron-ConscienceAI'))
+
+from nodes.consciousness_oscillator import ConsciousnessOscillator, PHI, benchmark_oscillator
+from nodes.ring_buffer import RecordRing, RingBuffer
+
+
+class TestRingBuffer(unittest.TestCase):
+    """Test cases for the preallocated ring buffers"""
+
+    def test_window_is_chronological_view(self):
+        ring = RingBuffer(4)
+        ring.extend(range(7))
+        window = ring.window()
+        np.testing.assert_array_equal(window, [3, 4, 5, 6])
+        self.assertTrue(np.shares_memory(window, ring._data))
+        np.testing.assert_array_equal(ring.window(2), [5, 6])
+        self.assertEqual(ring.last(), 6)
+        self.assertEqual(list(ring), [3, 4, 5, 6])
+        self.assertEqual(len(ring), ring.maxlen)
+
+    def test_record_columns(self):
+        ring = RecordRing(3, ('a', 'b'))
+        for i in range(5):
+            ring.append((i, 10 * i))
+        np.testing.assert_array_equal(ring.column('b'), [20, 30, 40])
+        self.assertEqual(ring.record(ring[-1]), {'a': 4.0, 'b': 40.0})
+        ring.clear()
+        self.assertEqual(len(ring.column('a')), 0)
+
+
+class TestConsciousnessOscillator(unittest.TestCase):
+    """Test cases for vectorized coupling and history views"""
+
+    def setUp(self):
+        np.random.seed(0)
+        self.nodes = {i: ConsciousnessOscillator(i, 1.0 + 0.1 * i, [0, 0, i]) for i in range(4)}
+        self.weights = {1: 0.5, 2: 0.0, 3: 0.8}
+
+    def test_coupling_matches_neighbour_loop(self):
+        node = self.nodes[0]
+        neighbours = {i: self.nodes[i] for i in (1, 2, 3)}
+        phase, amplitude = node.phase, node.amplitude
+        coupling = sum(w * np.sin(neighbours[i].phase - phase) for i, w in self.weights.items() if w > 0)
+        node.update_state(0.01, neighbours, self.weights)
+        expected_amplitude = amplitude + ((1 - amplitude ** 2) * amplitude + 0.1 * coupling) * 0.01
+        self.assertAlmostEqual(node.amplitude, expected_amplitude, places=12)
+        expected_phase = np.fmod(phase + (node.omega + coupling) * 0.01, 2 * np.pi)
+        self.assertAlmostEqual(node.phase, expected_phase, places=12)
+
+    def test_rolling_sync_matches_rescan(self):
+        node = self.nodes[0]
+        neighbours = {i: self.nodes[i] for i in (1, 2, 3)}
+        for step in range(40):
+            if step == 25:
+                # External edits (as done by MetatronEnsemble.to_consciousness)
+                node.synchronization_history.clear()
+                node.synchronization_history.extend(np.linspace(0.2, 0.9, 12))
+            before = node.dynamic_coupling_strength
+            node.update_coupling_strength(neighbours, self.weights, 0.01)
+            recent = node.synchronization_history.window(10)
+            if len(recent) < 10:
+                continue
+            weighted = np.average(recent, weights=[1 / PHI ** i for i in range(9, -1, -1)])
+            factor = 0.99 if weighted > 0.8 else 1.02 if weighted < 0.5 else 1.0
+            target = np.clip(before * factor, 1 / PHI, PHI)
+            self.assertAlmostEqual(node.dynamic_coupling_strength,
+                                   before + (target - before) * 0.01 / PHI, places=12)
+
+    def test_state_history_compatibility(self):
+        node = ConsciousnessOscillator(0, 1.0, [0, 0, 0], memory_size=5)
+        for _ in range(1005):
+            node.update_state(0.01, {}, {})
+        self.assertEqual(len(node.state_history), node.max_history)
+        last = node.state_history[-1]
+        self.assertEqual(sorted(last), ['amplitude', 'output', 'phase', 'time'])
+        self.assertEqual(last['phase'], node.phase)
+        self.assertEqual(len(node.state_history[-2:]), 2)
+        phases = node.history_window('phase', 50)
+        self.assertEqual(phases[-1], node.phase)
+        self.assertTrue(np.shares_memory(phases, node.history._data))
+        self.assertEqual(node.get_state_dict()['memory_depth'], 5)
+        node.state_history = [{'time': 0.0, 'phase': 1.0, 'amplitude': 1.0, 'output': 0.5}]
+        self.assertEqual(node.state_history[0]['output'], 0.5)
+        node.reset_state()
+        self.assertEqual(len(node.state_history), 0)
+        self.assertEqual(len(node.get_memory_trace()), 0)
+
+    def test_benchmark_runs(self):
+        result = benchmark_oscillator(ticks=5, warmup=20)
+        self.assertGreater(result['us_per_update'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,282 @@
+"""
+Unit tests for the contract_runtime module and the SmartContractEngine built on it
+"""
+
+import unittest
+import os
+import random
+import sys
+import time
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from contract_runtime import (
+    TOKEN_CONTRACT, ContractCall, ContractError, ContractRuntime, benchmark_contract_runtime, validate_contract
+)
+
+try:
+    from blockchain_integration import SmartContractEngine
+    BLOCKCHAIN_AVAILABLE = True
+except ImportError:
+    BLOCKCHAIN_AVAILABLE = False
+
+
+ATTACKS = '''
+LIMIT = 3
+
+def spin():
+    while True:
+        pass
+
+def recurse(n):
+    return recurse(n + 1)
+
+def big_string():
+    return "a" * 10 ** 9
+
+def big_power():
+    return 10 ** 10 ** 8
+
+def big_sum():
+    return sum(range(10 ** 12))
+
+def write_then_fail(key):
+    storage[key] = 1
+    assert False, "rejected"
+
+def store_list(key):
+    storage[key] = [1, 2]
+
+def loop(n):
+    total = 0
+    for i in range(n):
+        total += i
+    return total
+
+def double_string():
+    s = "ab"
+    for i in range(40):
+        s = s + s
+    return len(s)
+
+def double_list():
+    s = [1]
+    for i in range(40):
+        s += s
+    return len(s)
+
+def double_fstring():
+    s = "ab"
+    for i in range(40):
+        s = f"{s}{s}"
+    return len(s)
+
+def render_list():
+    values = list(range(20000))
+    total = 0
+    for i in range(500):
+        total += len(str(values))
+    return total
+
+def formatting(x):
+    return f"{x}-{x!r}:{len(str([x]))}", str(), str(b"ab", "ascii")
+
+def pad_format():
+    return "%0200000000d" % 1
+
+def join_separator():
+    separator = "x" * 1000
+    parts = ["a"] * 1000
+    for i in range(100):
+        joined = separator.join(parts)
+    return len(joined)
+
+def scan(n):
+    values = list(range(n))
+    text = "a" * n
+    found = 0
+    for i in range(20):
+        if -1 not in values:
+            found += values.count(0) + text.count("b") + len(text[1:])
+    return found
+
+def augmented(key):
+    storage[key] = 1
+    storage[key] += 2
+    values = [1, 2]
+    alias = values
+    values += [3]
+    values *= 2
+    return storage[key], alias, 7 % 3, ",".join("a,b".split(","))
+'''
+
+
+class TestValidation(unittest.TestCase):
+    """Test cases for the contract whitelist"""
+
+    def test_rejects_escapes(self):
+        rejected = [
+            "import os",
+            "class A:\n    pass",
+            "def f():\n    return ().__class__",
+            "def f():\n    return storage.base",
+            "def f():\n    return lambda: 1",
+            "def f():\n    try:\n        pass\n    except Exception:\n        pass",
+            "def f():\n    global x",
+            "def f():\n    def g():\n        pass",
+            "def f():\n    storage = {}",
+            "def f():\n    return __builtins__",
+            "def f():\n    return [x for x in range(3)]",
+            "def f():\n    return {1, 2}",
+            "def f(x=[]):\n    return x",
+            "CACHE = []",
+            "def f():\n    return f'{1:>1000000000}'",
+            "def f():\n    x = [1]\n    x[0:1] += [2]",
+            "def f():\n    return 1 in [1] in [[1]]",
+        ]
+        for code in rejected:
+            with self.assertRaises(ContractError, msg=code):
+                validate_contract(code)
+
+    def test_accepts_plain_contracts(self):
+        # The old substring check rejected any code containing "os" (e.g. "cost")
+        validate_contract("FEE = (1, 'fee')\n\ndef cost(amount, *, rate=2):\n    return amount * rate")
+        validate_contract(TOKEN_CONTRACT)
+
+
+class TestContractRuntime(unittest.TestCase):
+    """Test cases for metering, overlays and block execution"""
+
+    def setUp(self):
+        self.runtime = ContractRuntime()
+        self.runtime.deploy("token", TOKEN_CONTRACT)
+        self.runtime.deploy("attacks", ATTACKS)
+        self.runtime.storage["token"].update({"alice": 100, "bob": 0})
+
+    def call(self, function_name, caller="alice", gas_limit=100000, contract_id="attacks", **parameters):
+        return self.runtime.execute(ContractCall(contract_id, function_name, parameters, caller, gas_limit), 0.0)
+
+    def test_compiled_once_per_code_hash(self):
+        first = self.runtime.deploy("a", TOKEN_CONTRACT)
+        second = self.runtime.deploy("b", TOKEN_CONTRACT)
+        self.assertIs(first.compiled, second.compiled)
+        self.assertEqual(self.runtime.cache.misses, 2)
+        self.assertEqual([f["name"] for f in first.compiled.abi["functions"]], ["mint", "transfer", "balance_of"])
+
+    def test_transfer_commits(self):
+        result = self.call("transfer", contract_id="token", recipient="bob", amount=30)
+        self.assertTrue(result.success)
+        self.assertEqual(self.runtime.storage["token"], {"alice": 70, "bob": 30})
+        self.assertFalse(self.call("transfer", contract_id="token", recipient="bob", amount=500).result)
+
+    def test_runaway_code_runs_out_of_gas(self):
+        for function_name in ("spin", "big_string", "big_power", "big_sum"):
+            start = time.perf_counter()
+            result = self.call(function_name, gas_limit=50000)
+            self.assertFalse(result.success, function_name)
+            self.assertIn("Out of gas", result.error)
+            self.assertEqual(result.gas_used, 50000)
+            self.assertLess(time.perf_counter() - start, 1.0, function_name)
+        self.assertIn("Call depth", self.call("recurse", n=0).error)
+        self.assertEqual(self.runtime.stats["out_of_gas"], 4)
+
+    def test_gas_is_deterministic_and_metered(self):
+        small = [self.call("loop", n=10).gas_used for _ in range(3)]
+        self.assertEqual(len(set(small)), 1)
+        self.assertGreater(self.call("loop", n=100).gas_used, small[0])
+        self.assertEqual(self.call("loop", gas_limit=500, n=10).error, "Gas limit exceeded")
+
+    def test_growth_and_scans_are_metered(self):
+        for function_name in ("double_string", "double_list", "join_separator", "double_fstring", "render_list"):
+            start = time.perf_counter()
+            result = self.call(function_name)
+            self.assertIn("Out of gas", result.error, function_name)
+            self.assertLess(time.perf_counter() - start, 1.0, function_name)
+        self.assertIn("%-formatting", self.call("pad_format").error)
+
+        # in / count / slices pay for the size of what they scan
+        small, large = self.call("scan", n=10), self.call("scan", n=1000)
+        self.assertTrue(small.success and large.success)
+        self.assertGreater(large.gas_used - small.gas_used, 20 * 3 * 990)
+
+    def test_augmented_assignment_keeps_semantics(self):
+        result = self.call("augmented", key="k")
+        self.assertEqual(result.result, (3, [1, 2, 3, 1, 2, 3], 1, "a,b"))
+        self.assertEqual(self.runtime.storage["attacks"], {"k": 3})
+        self.assertEqual(self.call("formatting", x="a").result, ("a-'a':5", "", "ab"))
+
+    def test_failed_calls_roll_back(self):
+        result = self.call("write_then_fail", key="x")
+        self.assertFalse(result.success)
+        self.assertIn("rejected", result.error)
+        self.assertFalse(self.call("store_list", key="y").success)
+        self.assertEqual(self.runtime.storage["attacks"], {})
+        self.assertEqual(self.call("missing").error, "Function missing not found")
+
+    def test_parallel_block_matches_serial(self):
+        rng = random.Random(5)
+        accounts = [f"acct_{n}" for n in range(20)]
+        calls = [ContractCall("token", "transfer", {"recipient": rng.choice(accounts), "amount": rng.randint(1, 60)},
+                              rng.choice(accounts)) for _ in range(200)]
+        states = []
+        for workers, parallel in ((0, False), (3, True)):
+            runtime = ContractRuntime(workers=workers)
+            runtime.deploy("token", TOKEN_CONTRACT)
+            runtime.storage["token"].update({account: 100 for account in accounts})
+            results = runtime.execute_block(calls, 0.0, parallel=parallel)
+            states.append((runtime.storage["token"], [(r.success, r.result, r.gas_used) for r in results]))
+            runtime.close()
+        self.assertEqual(states[0], states[1])
+        self.assertGreater(runtime.stats["reexecuted"], 0)
+
+    def test_disjoint_calls_are_not_reexecuted(self):
+        runtime = ContractRuntime(workers=2)
+        runtime.deploy("token", TOKEN_CONTRACT)
+        runtime.storage["token"].update({f"acct_{n}": 10 for n in range(8)})
+        calls = [ContractCall("token", "transfer", {"recipient": f"acct_{n + 1}", "amount": 5}, f"acct_{n}")
+                 for n in range(0, 8, 2)]
+        results = runtime.execute_block(calls, 0.0, parallel=True)
+        runtime.close()
+        self.assertTrue(all(r.success and not r.reexecuted for r in results))
+        self.assertEqual(runtime.stats["speculated"], 4)
+
+    def test_benchmark_runs(self):
+        report = benchmark_contract_runtime(calls=400, accounts=50, block_size=50, workers=2, legacy_calls=50)
+        self.assertTrue(report["parallel_matches_serial"])
+        self.assertGreater(report["runtime_calls_per_second"], report["legacy_calls_per_second"])
+
+
+@unittest.skipIf(not BLOCKCHAIN_AVAILABLE, "blockchain_integration not available")
+class TestSmartContractEngine(unittest.TestCase):
+    """Test cases for SmartContractEngine on the compiled runtime"""
+
+    def setUp(self):
+        self.engine = SmartContractEngine(parallel_workers=2)
+        self.contract_id = self.engine.deploy_contract("creator", "Token", TOKEN_CONTRACT)
+        self.engine.execute_contract(self.contract_id, "mint", {"account": "alice", "amount": 100}, "creator")
+
+    def tearDown(self):
+        self.engine.runtime.close()
+
+    def test_execute_and_state(self):
+        result = self.engine.execute_contract(self.contract_id, "transfer", {"recipient": "bob", "amount": 40}, "alice")
+        self.assertTrue(result["success"])
+        state = self.engine.get_contract_state(self.contract_id)
+        self.assertEqual(state["storage"], {"alice": 60, "bob": 40})
+        self.assertGreater(state["gas_used"], 2 * self.engine._estimate_gas_cost("transfer", {}))
+        self.assertIsNone(self.engine.deploy_contract("creator", "Bad", "import os"))
+        self.assertEqual(self.engine.execute_contract("nope", "transfer", {}, "alice"), {"error": "Contract not found"})
+
+    def test_execute_block(self):
+        calls = [ContractCall(self.contract_id, "transfer", {"recipient": "bob", "amount": 70}, "alice"),
+                 ContractCall("nope", "transfer", {}, "alice"),
+                 ContractCall(self.contract_id, "transfer", {"recipient": "carol", "amount": 50}, "alice")]
+        results = self.engine.execute_block(calls, parallel=True)
+        self.assertEqual([r.get("result") for r in results], [True, None, False])
+        self.assertEqual(results[1], {"error": "Contract not found"})
+        self.assertEqual(self.engine.contract_storage[self.contract_id], {"alice": 30, "bob": 70})
+
+
+if __name__ == '__main__':
+    unittest.main()
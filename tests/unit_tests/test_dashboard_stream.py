@@ -0,0 +1,164 @@
+"""
+Unit tests for the dashboard_stream module
+"""
+
+import unittest
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from dashboard_stream import BINARY_FRAMES, DashboardDataPlane, benchmark_dashboard, decode_binary_frame
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class Recorder:
+    def __init__(self):
+        self.frames = []
+        self.release = None  # asyncio.Event holding sends back (a slow client)
+
+    async def __call__(self, frame):
+        if self.release is not None:
+            await self.release.wait()
+        self.frames.append(frame)
+
+    def decoded(self):
+        return [json.loads(frame) for frame in self.frames]
+
+
+class TestDashboardDataPlane(unittest.TestCase):
+    """Test cases for batching, topics and slow clients"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.plane = DashboardDataPlane(clock=self.clock, snapshot_points=3)
+
+    def run_ticks(self, *batches):
+        async def run():
+            for batch in batches:
+                for topic, value in batch:
+                    self.plane.publish(topic, self.clock.now, value, "node_1", "percent")
+                await self.plane.tick()
+                await asyncio.sleep(0)
+                self.clock.now += 1
+            await self.plane.drain()
+        asyncio.run(run())
+
+    def test_one_frame_per_tick_with_subscribed_topics(self):
+        everything, cpu_only = Recorder(), Recorder()
+        self.plane.connect("a", everything)
+        self.plane.connect("b", cpu_only, ["cpu_usage"])
+        self.run_ticks([("cpu_usage", 10), ("memory_usage", 50), ("cpu_usage", 20)],
+                       [("cpu_usage", 30)],
+                       [("memory_usage", 60)])
+
+        frames = everything.decoded()
+        self.assertEqual([f["type"] for f in frames], ["snapshot", "delta", "delta"])
+        self.assertEqual(sorted(frames[0]["topics"]), ["cpu_usage", "memory_usage"])
+        self.assertEqual([p[1] for p in frames[0]["topics"]["cpu_usage"]["points"]], [10, 20])
+        self.assertEqual(frames[0]["topics"]["cpu_usage"]["summary"]["max"], 20)
+        self.assertEqual(frames[1]["topics"]["cpu_usage"]["points"], [[1001.0, 30.0, "node_1"]])
+
+        # Ticks without changes to its topics send nothing to the CPU-only client
+        frames = cpu_only.decoded()
+        self.assertEqual(len(frames), 2)
+        self.assertTrue(all(list(f["topics"]) == ["cpu_usage"] for f in frames))
+
+    def test_fragments_are_encoded_once_per_tick(self):
+        clients = [Recorder() for _ in range(20)]
+        for i, client in enumerate(clients):
+            self.plane.connect(f"c{i}", client)
+        self.run_ticks([("cpu_usage", 1)], [("cpu_usage", 2)])
+        self.assertEqual(len({id(c.frames[1]) for c in clients}), 20)
+        self.assertEqual(len({c.frames[1] for c in clients}), 1)
+        self.assertEqual(self.plane.stats["frames"], 40)
+
+    def test_slow_client_drops_to_latest_snapshot(self):
+        slow = Recorder()
+
+        async def run():
+            gate = asyncio.Event()
+            slow.release = gate
+            self.plane.connect("slow", slow)
+            for value in range(6):
+                self.plane.publish("cpu_usage", self.clock.now, value, "node_1")
+                await self.plane.tick()
+                await asyncio.sleep(0)
+                self.clock.now += 1
+                if value == 3:
+                    gate.set()
+                    await asyncio.sleep(0)
+                    await asyncio.sleep(0)
+            await self.plane.drain()
+
+        asyncio.run(run())
+        frames = slow.decoded()
+        self.assertEqual(frames[0]["type"], "snapshot")
+        # Ticks 1-3 were skipped while the first frame was in flight
+        self.assertEqual(self.plane.stats["skipped"], 3)
+        self.assertEqual(frames[1]["type"], "snapshot")
+        self.assertEqual([p[1] for p in frames[1]["topics"]["cpu_usage"]["points"]], [2, 3, 4])
+        self.assertEqual(frames[-1]["type"], "delta")
+
+    def test_binary_frames_round_trip(self):
+        binary = Recorder()
+        self.plane.connect("bin", binary, encoding=BINARY_FRAMES)
+        self.run_ticks([("cpu_usage", 10), ("cpu_usage", 20)], [("cpu_usage", 30)])
+        first, second = [decode_binary_frame(frame) for frame in binary.frames]
+        self.assertEqual(first["type"], "snapshot")
+        self.assertEqual(first["topics"]["cpu_usage"]["points"], [[1000.0, 10.0], [1000.0, 20.0]])
+        self.assertEqual(first["topics"]["cpu_usage"]["unit"], "percent")
+        self.assertEqual(second["topics"]["cpu_usage"]["points"], [[1001.0, 30.0]])
+        self.assertEqual(second["topics"]["cpu_usage"]["summary"]["count"], 3)
+
+    def test_metrics_json_keeps_api_format(self):
+        self.run_ticks([("cpu_usage", v) for v in range(5)])
+        data = json.loads(self.plane.metrics_json())
+        self.assertEqual([m["value"] for m in data["cpu_usage"]], [2, 3, 4])
+        self.assertEqual(set(data["cpu_usage"][0]), {"timestamp", "value", "node_id", "unit"})
+
+    def test_failing_sync_sender_is_disconnected(self):
+        sent = []
+
+        def failing(frame):
+            raise ConnectionError("gone")
+
+        self.plane.connect("ok", sent.append)
+        self.plane.connect("broken", failing)
+        self.run_ticks([("cpu_usage", 1)])
+        self.run_ticks([("cpu_usage", 2)])
+        self.assertEqual(len(sent), 2)
+        self.assertEqual(list(self.plane.clients), ["ok"])
+        self.assertEqual(self.plane.stats["send_errors"], 1)
+
+    def test_background_thread(self):
+        plane = DashboardDataPlane(tick_interval=0.01)
+        received = threading.Event()
+        plane.start()
+        try:
+            plane.call_threadsafe(plane.connect, "c", lambda frame: received.set())
+            plane.publish_threadsafe("cpu_usage", time.time(), 5.0)
+            self.assertTrue(received.wait(2))
+        finally:
+            plane.stop()
+
+    def test_benchmark_runs(self):
+        rows = benchmark_dashboard(clients=10, ticks=3, metric_types=2, nodes=2, slow_clients=1)
+        self.assertEqual(rows[0]["emits"], 3 * 2 * 2 * 10)
+        self.assertLessEqual(rows[1]["emits"], 3 * 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,177 @@
+"""
+Unit tests for the host_sampler module
+"""
+
+import unittest
+import os
+import sys
+import threading
+import time
+
+import psutil
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from host_sampler import COUNTERS, GAUGES, HostSampler, ProcSource, benchmark_host_sampling
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class FakeSource:
+    name = "fake"
+
+    def __init__(self):
+        self.values = {name: 0 for name in COUNTERS + GAUGES}
+        self.values.update(memory_total=1000, memory_available=250, disk_used=30, disk_free=70)
+        self.reads = 0
+
+    def advance(self, busy, total, sent=0):
+        self.values["cpu_busy"] += busy
+        self.values["cpu_total"] += total
+        self.values["net_bytes_sent"] += sent
+
+    def read(self):
+        self.reads += 1
+        return dict(self.values)
+
+    def close(self):
+        pass
+
+
+class TestHostSampler(unittest.TestCase):
+    """Test cases for snapshots, windows, history and subscriptions"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.source = FakeSource()
+        self.sampler = HostSampler(history=4, source=self.source, clock=self.clock)
+
+    def step(self, busy, total, sent=0, seconds=1.0):
+        self.clock.now += seconds
+        self.source.advance(busy, total, sent)
+        return self.sampler.sample()
+
+    def test_derived_values(self):
+        self.source.advance(1, 4)
+        first = self.sampler.sample()
+        self.assertEqual((first.interval, first.cpu_percent), (0.0, 25.0))  # average since boot
+        second = self.step(3, 4, sent=2000, seconds=2.0)
+        self.assertEqual((second.interval, second.cpu_percent, second.net_sent_rate), (2.0, 75.0, 1000.0))
+        self.assertEqual((second.memory_percent, second.disk_percent), (75.0, 30.0))
+
+    def test_subscriptions_window_their_own_resolution(self):
+        fast = self.sampler.subscribe(interval=0.5)
+        slow = self.sampler.subscribe(interval=10.0)
+        other_slow = self.sampler.subscribe(interval=10.0)
+        self.sampler.sample()
+        fast.poll(), slow.poll(), other_slow.poll()
+        self.step(1, 1, sent=100)
+        self.assertEqual(fast.poll().cpu_percent, 100.0)
+        self.step(0, 1, sent=100)
+        self.assertEqual(fast.poll().cpu_percent, 0.0)
+        window = slow.poll()
+        self.assertEqual((window.interval, window.cpu_percent, window.net_sent_rate), (2.0, 50.0, 100.0))
+        # The same window is derived once and shared
+        self.assertIs(other_slow.poll(), window)
+        self.assertEqual(self.source.reads, 3)
+
+    def test_poll_reads_only_when_stale(self):
+        subscription = self.sampler.subscribe(interval=10.0)
+        subscription.poll()
+        self.clock.now += 4
+        subscription.poll()
+        self.assertEqual(self.source.reads, 1)
+        self.clock.now += 2
+        self.assertEqual(subscription.poll().interval, 6.0)
+        self.assertEqual(self.source.reads, 2)
+
+    def test_history_ring(self):
+        for _ in range(6):
+            self.step(1, 2)
+        self.assertEqual([snapshot.seq for snapshot in self.sampler.history()], [3, 4, 5, 6])
+        self.assertEqual([snapshot.seq for snapshot in self.sampler.history(seconds=1.0)], [5, 6])
+
+    def test_callback_subscription_runs_sampling_thread(self):
+        sampler = HostSampler(source=self.source, min_interval=0.01)
+        received = []
+        done = threading.Event()
+
+        def callback(snapshot):
+            received.append(snapshot)
+            if len(received) == 3:
+                done.set()
+
+        subscription = sampler.subscribe(callback, interval=0.01)
+        self.assertTrue(done.wait(2))
+        subscription.close()
+        self.assertFalse(sampler.running)
+        self.assertEqual([s.seq for s in received[:3]], sorted(s.seq for s in received[:3]))
+
+    @unittest.skipIf(not ProcSource.available(), "/proc not available")
+    def test_proc_source_agrees_with_psutil(self):
+        source = ProcSource()
+        try:
+            values = source.read()
+        finally:
+            source.close()
+        self.assertEqual(values["memory_total"], psutil.virtual_memory().total)
+        self.assertEqual(values["disk_total"], psutil.disk_usage("/").total)
+        self.assertLessEqual(values["net_bytes_recv"], psutil.net_io_counters().bytes_recv)
+        self.assertEqual(source.reads, 4)
+
+    def test_benchmark_runs(self):
+        rows = benchmark_host_sampling(rounds=5)
+        self.assertEqual([row["collector"] for row in rows], ["per-component psutil", "shared sampler"])
+
+
+class TestResourceMonitor(unittest.TestCase):
+    """Test cases for the resource monitor on the shared sampler"""
+
+    def test_monitor_updates_from_subscription(self):
+        from resource_manager import ResourceMonitor
+        monitor = ResourceMonitor(update_interval=0.05)
+        monitor.start_monitoring()
+        try:
+            deadline = time.monotonic() + 3
+            while monitor.get_current_utilization() is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            utilization = monitor.get_current_utilization()
+            self.assertIsNotNone(utilization)
+            self.assertGreater(utilization.memory_percent, 0)
+        finally:
+            monitor.stop_monitoring()
+        self.assertGreater(monitor.get_system_capacity().memory_total, 0)
+
+    def test_gpu_is_read_off_the_sampler_thread(self):
+        from resource_manager import ResourceMonitor
+        monitor = ResourceMonitor(update_interval=0.05)
+        readers = []
+
+        def slow_gpu_read():
+            readers.append(threading.current_thread().name)
+            time.sleep(0.2)
+            return 42.0
+
+        monitor._gpu_percent = slow_gpu_read
+        monitor.start_monitoring()
+        try:
+            deadline = time.monotonic() + 3
+            while (monitor.get_current_utilization() is None
+                   or monitor.get_current_utilization().gpu_percent != 42.0) and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(monitor.get_current_utilization().gpu_percent, 42.0)
+        finally:
+            monitor.stop_monitoring()
+        self.assertEqual(set(readers), {"gpu-monitor"})
+        self.assertIsNone(monitor._gpu_thread)
+
+
+if __name__ == '__main__':
+    unittest.main()
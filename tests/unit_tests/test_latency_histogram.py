@@ -0,0 +1,167 @@
+"""
+Unit tests for the latency_histogram module and the API server metrics
+"""
+
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from latency_histogram import (DEFAULT_LAYOUT, HistogramSnapshot, LatencyHistogram, RollingLatencyHistogram,
+                               benchmark_recording, prometheus_histogram)
+from api_server import FASTAPI_AVAILABLE, APIServer, APIServerConfig, MetricsCollector
+
+try:
+    from fastapi.testclient import TestClient
+    TESTCLIENT_AVAILABLE = True
+except ImportError:
+    TESTCLIENT_AVAILABLE = False
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestLatencyHistogram(unittest.TestCase):
+    """Test cases for log-linear histograms"""
+
+    def test_layout_indices_match_bounds(self):
+        lower, upper = DEFAULT_LAYOUT.bounds()
+        for units in [0, 1, 127, 128, 129, 1000, 123456, 2 ** 31, DEFAULT_LAYOUT.highest]:
+            index = DEFAULT_LAYOUT.index(units)
+            self.assertLessEqual(lower[index], units)
+            self.assertLess(units, upper[index])
+        # Buckets tile the range without gaps
+        np.testing.assert_array_equal(lower[1:], upper[:-1])
+        self.assertLessEqual(np.max((upper - lower)[128:] / lower[128:]), 1 / 64)
+
+    def test_quantiles_within_bucket_precision(self):
+        values = np.random.default_rng(0).lognormal(np.log(0.02), 1.0, size=50000)
+        histogram = LatencyHistogram(buffer_size=333)
+        for value in values:
+            histogram.record(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot.count, len(values))
+        self.assertAlmostEqual(snapshot.total, values.sum(), places=6)
+        self.assertEqual(snapshot.maximum, values.max())
+        for q, estimate in snapshot.quantiles((0.5, 0.9, 0.99, 0.999)).items():
+            exact = np.quantile(values, q)
+            self.assertLess(abs(estimate - exact) / exact, 0.01)
+
+    def test_snapshots_merge(self):
+        first, second, both = LatencyHistogram(), LatencyHistogram(), LatencyHistogram()
+        for i in range(1, 1001):
+            (first if i % 2 else second).record(i / 1000)
+            both.record(i / 1000)
+        merged = first.snapshot().merge(second.snapshot())
+        np.testing.assert_array_equal(merged.counts, both.snapshot().counts)
+        self.assertEqual(merged.minimum, 0.001)
+        self.assertEqual(merged.summary()["p50"], both.snapshot().summary()["p50"])
+        self.assertEqual(HistogramSnapshot().quantiles(), {0.5: 0.0, 0.9: 0.0, 0.99: 0.0, 0.999: 0.0})
+
+    def test_out_of_range_values_are_clamped(self):
+        histogram = LatencyHistogram()
+        histogram.record(-1.0)
+        histogram.record(10 ** 6)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot.counts[0], 1)
+        self.assertEqual(snapshot.counts[-1], 1)
+        self.assertEqual(snapshot.maximum, 10 ** 6)
+
+
+class TestRollingLatencyHistogram(unittest.TestCase):
+    """Test cases for slot rotation"""
+
+    def test_window_and_cumulative(self):
+        clock = FakeClock(0.0)
+        rolling = RollingLatencyHistogram(window=60, slots=6, clock=clock)
+        for second in range(120):
+            clock.now = float(second)
+            rolling.record(0.001 * (1 + second // 60))
+        window = rolling.window_snapshot()
+        self.assertEqual(window.count, 60)
+        self.assertAlmostEqual(window.quantiles((0.5,))[0.5], 0.002, places=4)
+        self.assertEqual(rolling.window_snapshot(10).count, 10)
+        self.assertEqual(rolling.snapshot().count, 120)
+        self.assertEqual(rolling.count, 120)
+
+        clock.now = 1000.0  # long silence: everything leaves the window
+        self.assertEqual(rolling.window_snapshot().count, 0)
+        self.assertEqual(rolling.snapshot().count, 120)
+
+
+class TestMetricsCollector(unittest.TestCase):
+    """Test cases for the API server metrics collector"""
+
+    def test_metrics_are_bounded_and_summarised(self):
+        collector = MetricsCollector()
+        for i in range(5000):
+            collector.record_request("GET /a", 0.01, True, 200)
+        collector.record_request("GET /a", 0.5, False, 503)
+        collector.record_request("POST /b", 0.02, False, 404)
+        metrics = collector.get_metrics()
+        self.assertEqual(metrics["request_count"], 5002)
+        self.assertEqual(metrics["error_count"], 2)
+        self.assertEqual(metrics["max_response_time"], 0.5)
+        self.assertEqual(metrics["min_response_time"], 0.01)
+        endpoint = metrics["endpoint_metrics"]["GET /a"]
+        self.assertEqual((endpoint["count"], endpoint["errors"]), (5001, 1))
+        self.assertEqual(sorted(endpoint["status_classes"]), ["2xx", "5xx"])
+        self.assertAlmostEqual(endpoint["latency"]["p50"], 0.01, places=4)
+        self.assertNotIn("response_times", endpoint)
+        self.assertEqual(len(collector.histograms), 3)
+
+    def test_prometheus_export(self):
+        collector = MetricsCollector()
+        for latency in (0.003, 0.02, 0.2):
+            collector.record_request("GET /a", latency, True, 200)
+        text = collector.export_prometheus()
+        self.assertIn("# TYPE aegis_api_request_duration_seconds histogram", text)
+        self.assertIn('aegis_api_request_duration_seconds_bucket{method="GET",path="/a",status_class="2xx",'
+                      'le="0.005"} 1', text)
+        self.assertIn('le="+Inf"} 3', text)
+        self.assertIn('aegis_api_request_duration_window_seconds{method="GET",path="/a",status_class="2xx",'
+                      'quantile="0.5"}', text)
+        self.assertIn("aegis_api_requests_total 3", text)
+        self.assertTrue(prometheus_histogram("x", "help", []).endswith("# TYPE x histogram\n"))
+
+    def test_benchmark_runs(self):
+        rows = benchmark_recording(requests=2000, endpoints=3)
+        self.assertEqual([row["collector"] for row in rows], ["unbounded lists", "histograms", "quantile error"])
+        self.assertLess(rows[2]["p50"], 0.01)
+
+
+@unittest.skipIf(not (FASTAPI_AVAILABLE and TESTCLIENT_AVAILABLE), "FastAPI test client not available")
+class TestMetricsEndpoints(unittest.TestCase):
+    """Test cases for the metrics middleware and endpoints"""
+
+    def test_routes_are_recorded_by_template(self):
+        server = APIServer(APIServerConfig(enable_cors=False, rate_limit_requests=1000))
+
+        async def item(item_id: int):
+            return {"id": item_id}
+
+        server.add_route("GET", "/items/{item_id}", item)
+        client = TestClient(server.get_app())
+        for i in range(5):
+            client.get(f"/items/{i}")
+        client.get("/missing")
+        metrics = client.get("/metrics", params={"window": 60}).json()
+        self.assertEqual(metrics["endpoint_metrics"]["GET /items/{item_id}"]["count"], 5)
+        self.assertIn("GET <unmatched>", metrics["endpoint_metrics"])
+        self.assertEqual(metrics["window_seconds"], 60)
+        response = client.get("/metrics/prometheus")
+        self.assertTrue(response.headers["content-type"].startswith("text/plain"))
+        self.assertIn('path="/items/{item_id}"', response.text)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,7 +14,10 @@ import pytest
 # Add the Open-A.G.I directory to the path so we can import the module
 sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
 
-from logging_system import start_logging_system, LogConfig, initialize_logging, get_logger
+from logging_system import (
+    start_logging_system, LogConfig, initialize_logging, get_logger, shutdown_logging,
+    LogPipeline, PipelineHandler, RotatingFileSink, SensitiveDataRedactor, StructuredFormatter
+)
 
 
 class TestLoggingSystem(unittest.TestCase):
@@ -164,6 +167,171 @@ class TestLoggingSystem(unittest.TestCase):
             # For now, we'll just check that the file exists and has content
             self.assertTrue(len(content) > 0)
 
+    def test_sensitive_data_is_masked_in_file(self):
+        """Both the pipeline and the direct loguru/logging path redact values"""
+        import time
+        for async_pipeline in (True, False):
+            config = LogConfig(
+                log_level="INFO",
+                log_file=f"redact_{async_pipeline}.log",
+                log_dir=self.test_dir,
+                enable_console=False,
+                async_pipeline=async_pipeline
+            )
+            logger_instance = initialize_logging(config)
+            logger_instance.info("User login: password=secret123, username=testuser")
+            logger_instance.flush()
+            shutdown_logging()
+            time.sleep(0.05)
+
+            with open(Path(self.test_dir) / config.log_file, 'r') as f:
+                content = f.read()
+            self.assertIn("username=testuser", content)
+            self.assertIn("password=***MASKED***", content)
+            self.assertNotIn("secret123", content)
+
+
+class TestSensitiveDataRedactor(unittest.TestCase):
+    """Test cases for the precompiled redactor"""
+
+    def setUp(self):
+        self.redactor = SensitiveDataRedactor(["password", "secret", "token", "key"])
+
+    def test_redacts_pairs_in_text_and_json(self):
+        text = 'login password=hunter2 api_key: abc123 {"auth_token": "xyz", "user": "bob"}'
+        redacted = self.redactor.redact_text(text)
+        for secret in ("hunter2", "abc123", "xyz"):
+            self.assertNotIn(secret, redacted)
+        self.assertIn('"user": "bob"', redacted)
+        self.assertEqual(self.redactor.redact_text("nothing to hide"), "nothing to hide")
+
+    def test_redacts_nested_mappings(self):
+        value = {"user": "bob", "Password": "x", "nested": {"secret_id": 1, "items": ["token=t"]}}
+        redacted = self.redactor.redact_value(value)
+        self.assertEqual(redacted["user"], "bob")
+        self.assertEqual(redacted["Password"], SensitiveDataRedactor.MASK)
+        self.assertEqual(redacted["nested"]["secret_id"], SensitiveDataRedactor.MASK)
+        self.assertEqual(redacted["nested"]["items"], ["token=***MASKED***"])
+
+
+class SlowSink:
+    """Sink that blocks until released, to fill the pipeline queue"""
+
+    def __init__(self):
+        import threading
+        self.release = threading.Event()
+        self.lines = []
+
+    def write(self, data):
+        self.release.wait(5)
+        self.lines.extend(data.splitlines())
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class TestLogPipeline(unittest.TestCase):
+    """Test cases for the batched background log pipeline"""
+
+    def _pipeline(self, policy, sink, **kwargs):
+        return LogPipeline(str, [sink], queue_size=10, batch_size=5,
+                           flush_interval=0.01, overflow_policy=policy, **kwargs)
+
+    def _fill(self, pipeline, sink, count):
+        # The first record is picked up by the writer, which then blocks in the sink
+        pipeline.submit(20, "first")
+        import time
+        deadline = time.time() + 2
+        while pipeline._queue and time.time() < deadline:
+            time.sleep(0.005)
+        return [pipeline.submit(20, f"r{i}") for i in range(count)]
+
+    def test_drop_newest_counts_drops(self):
+        sink = SlowSink()
+        pipeline = self._pipeline("drop_newest", sink)
+        accepted = self._fill(pipeline, sink, 15)
+        self.assertEqual(accepted, [True] * 10 + [False] * 5)
+        sink.release.set()
+        pipeline.close()
+        self.assertEqual(pipeline.counters["dropped"], 5)
+        self.assertEqual(sink.lines, ["first"] + [f"r{i}" for i in range(10)])
+
+    def test_drop_oldest_keeps_latest(self):
+        sink = SlowSink()
+        pipeline = self._pipeline("drop_oldest", sink)
+        self._fill(pipeline, sink, 15)
+        sink.release.set()
+        pipeline.close()
+        self.assertEqual(pipeline.counters["dropped"], 5)
+        self.assertEqual(sink.lines, ["first"] + [f"r{i}" for i in range(5, 15)])
+
+    def test_block_policy_times_out(self):
+        sink = SlowSink()
+        pipeline = self._pipeline("block", sink, block_timeout=0.05)
+        accepted = self._fill(pipeline, sink, 11)
+        self.assertFalse(accepted[-1])
+        self.assertEqual(pipeline.counters["block_timeouts"], 1)
+        sink.release.set()
+        pipeline.close()
+
+    def test_batches_are_written_in_order(self):
+        sink = SlowSink()
+        sink.release.set()
+        pipeline = LogPipeline(str, [sink], batch_size=64, flush_interval=0.01)
+        for i in range(1000):
+            pipeline.submit(20, i)
+        self.assertTrue(pipeline.flush())
+        pipeline.close()
+        self.assertEqual(sink.lines, [str(i) for i in range(1000)])
+        self.assertLess(pipeline.counters["batches"], 1000)
+
+
+    def test_handler_snapshots_records_before_enqueueing(self):
+        import logging
+        sink = SlowSink()
+        pipeline = LogPipeline(StructuredFormatter(json_format=True).format, [sink], flush_interval=0.01)
+        std_logger = logging.getLogger("pipeline_handler_test")
+        std_logger.propagate = False
+        std_logger.addHandler(PipelineHandler(pipeline))
+        state = {"step": 1}
+        std_logger.warning("state %s", state)
+        state["step"] = 2  # mutated while the record is still queued
+        try:
+            raise KeyError("boom")
+        except KeyError:
+            std_logger.exception("failed")
+        sink.release.set()
+        pipeline.close()
+        std_logger.handlers.clear()
+
+        first, second = [json.loads(line) for line in sink.lines]
+        self.assertEqual(first["message"], "state {'step': 1}")
+        self.assertEqual(second["message"], "failed")
+        self.assertIn("KeyError: 'boom'", second["exception"])
+
+
+class TestRotatingFileSink(unittest.TestCase):
+    """Rotation renames in the writer and compresses on a worker thread"""
+
+    def test_rotation_compresses_and_prunes(self):
+        test_dir = tempfile.mkdtemp()
+        path = Path(test_dir) / "rotating.log"
+        sink = RotatingFileSink(path, max_bytes=100, backup_count=2)
+        for i in range(6):
+            sink.write("x" * 120 + "\n")
+        sink.close()
+
+        backups = sorted(p.name for p in Path(test_dir).iterdir() if p.name != "rotating.log")
+        self.assertEqual(sink.rotations, 6)
+        self.assertEqual(len(backups), 2)
+        self.assertTrue(all(name.endswith(".zip") for name in backups))
+        for p in Path(test_dir).iterdir():
+            p.unlink()
+        os.rmdir(test_dir)
+
 
 @pytest.mark.asyncio
 async def test_start_logging_system():
@@ -0,0 +1,127 @@
+"""
+Unit tests for the merkle_tree module and its use in blockchain_integration
+"""
+
+import unittest
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from merkle_tree import (IncrementalMerkleTree, hash_leaf, hash_node, verify_inclusion,
+                         verify_multi_proof, benchmark_merkle)
+
+try:
+    from blockchain_integration import BlockchainCore
+    BLOCKCHAIN_AVAILABLE = True
+except ImportError:
+    BLOCKCHAIN_AVAILABLE = False
+
+
+def reference_root(leaves):
+    """Recursive RFC 6962 Merkle tree hash"""
+    if not leaves:
+        return hashlib.sha256(b"").digest()
+    if len(leaves) == 1:
+        return leaves[0]
+    k = 1
+    while k * 2 < len(leaves):
+        k *= 2
+    return hash_node(reference_root(leaves[:k]), reference_root(leaves[k:]))
+
+
+class TestIncrementalMerkleTree(unittest.TestCase):
+    """Test cases for the incremental tree and its proofs"""
+
+    def test_root_matches_reference_at_every_size(self):
+        tree = IncrementalMerkleTree()
+        leaves = []
+        for i in range(70):
+            leaves.append(hash_leaf(f"leaf{i}"))
+            tree.append(f"leaf{i}")
+            self.assertEqual(tree.root(), reference_root(leaves), len(leaves))
+
+    def test_every_inclusion_proof_verifies(self):
+        for size in (1, 2, 3, 7, 8, 13, 33):
+            tree = IncrementalMerkleTree([hash_leaf(str(i)) for i in range(size)])
+            root = tree.root_hex()
+            for index in range(size):
+                proof = tree.inclusion_proof(index)
+                self.assertTrue(verify_inclusion(hash_leaf(str(index)), index, size, proof, root))
+                self.assertFalse(verify_inclusion(hash_leaf("other"), index, size, proof, root))
+                if size > 1:
+                    other = (index + 1) % size
+                    self.assertFalse(verify_inclusion(hash_leaf(str(index)), other, size, proof, root))
+
+    def test_multi_proof_is_smaller_and_verifies(self):
+        tree = IncrementalMerkleTree([hash_leaf(str(i)) for i in range(100)])
+        indices = [3, 4, 5, 40, 99]
+        proof = tree.multi_proof(indices)
+        leaves = {i: hash_leaf(str(i)) for i in indices}
+        self.assertTrue(verify_multi_proof(leaves, 100, proof, tree.root()))
+        self.assertLess(len(proof), sum(len(tree.inclusion_proof(i)) for i in indices))
+
+        leaves[40] = hash_leaf("forged")
+        self.assertFalse(verify_multi_proof(leaves, 100, proof, tree.root()))
+        self.assertFalse(verify_multi_proof({3: hash_leaf("3")}, 100, proof, tree.root()))
+
+    def test_out_of_range_proof_raises(self):
+        tree = IncrementalMerkleTree([hash_leaf("a")])
+        with self.assertRaises(IndexError):
+            tree.inclusion_proof(1)
+
+    def test_benchmark_runs(self):
+        results = benchmark_merkle(sizes=(1000,), proofs=50, batch=8)
+        self.assertTrue(results[0]["verified"])
+        self.assertEqual(results[0]["proof_hashes"], 10)
+
+
+@unittest.skipIf(not BLOCKCHAIN_AVAILABLE, "blockchain_integration components not available")
+class TestBlockchainProofs(unittest.TestCase):
+    """Blocks carry inclusion proofs that verify against headers only"""
+
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.core = BlockchainCore("merkle_test_node")
+        self.core.crypto_manager.generate_key_pair("alice")
+        self.core.pos_validator.register_validator("merkle_test_node", 5000)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_mined_block_proofs_verify_with_headers(self):
+        for i in range(6):
+            self.assertTrue(self.core.add_transaction(self.core.create_transaction("alice", "bob", 1.0 + i)))
+        block = asyncio.run(self.core.mine_block())
+        self.assertIsNotNone(block)
+
+        headers = self.core.get_block_headers()
+        self.assertTrue(self.core.verify_header_chain(headers))
+        crypto = self.core.crypto_manager
+
+        tx = block.transactions[4]
+        proof = self.core.get_transaction_proof(tx.tx_id)
+        self.assertEqual(proof["header"], headers[1])
+        self.assertTrue(crypto.verify_transaction_inclusion(headers[1], tx, proof))
+        self.assertFalse(crypto.verify_transaction_inclusion(headers[1], block.transactions[0], proof))
+
+        ids = [block.transactions[i].tx_id for i in (0, 2, 5)]
+        multi = self.core.get_transactions_multi_proof(1, ids)
+        self.assertTrue(crypto.verify_transactions_inclusion(
+            headers[1], {i: block.transactions[i] for i in (0, 2, 5)}, multi["proof"]))
+
+        # Proofs are checked against tx_count, so it is covered by the block hash
+        self.assertFalse(self.core.verify_header_chain(headers[:1] + [dict(headers[1], tx_count=3)]))
+        headers[1]["merkle_root"] = "00" * 32
+        self.assertFalse(self.core.verify_header_chain(headers))
+
+
+if __name__ == '__main__':
+    unittest.main()
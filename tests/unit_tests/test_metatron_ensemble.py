@@ -0,0 +1,200 @@
+"""
+Unit tests for the batched Metatron ensemble simulation
+"""
+
+import unittest
+import os
+import sys
+from unittest import mock
+
+import numpy as np
+
+# Add the Metatron-ConscienceAI directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Metatron-ConscienceAI'))
+
+from orchestrator.metatron_ensemble import (MetatronEnsemble, N_PARTITIONS, STATE_LABELS, benchmark_ensemble,
+                                            fractal_dimension, shannon_information)
+
+try:
+    import nodes.memory_matrix as memory_matrix
+    from orchestrator.metatron_orchestrator import MetatronConsciousness
+    ORCHESTRATOR_AVAILABLE = True
+except ImportError:
+    ORCHESTRATOR_AVAILABLE = False
+
+
+def reference_information(states):
+    """ConsciousnessMetrics._calculate_mutual_information for one state vector"""
+    abs_states = np.abs(states)
+    total = np.sum(abs_states)
+    if total < 1e-12:
+        return 0.0
+    if np.var(abs_states) > 1e-6:
+        n_bins = min(len(states), 10)
+        hist, _ = np.histogram(abs_states, bins=n_bins, density=True)
+        probs = hist * np.diff(np.linspace(np.min(abs_states), np.max(abs_states), n_bins + 1))
+    else:
+        probs = abs_states / total
+    probs = probs[probs > 1e-12]
+    information = -np.sum(probs * np.log2(probs + 1e-12)) / (np.log2(len(states)) if len(states) > 1 else 1.0)
+    return information * (1 + 0.5 * np.tanh(information * 5))
+
+
+def reference_higuchi(signal_data):
+    """ConsciousnessMetrics.calculate_fractal_dimension for one series"""
+    n = len(signal_data)
+    k_max = min(20, n // 10)
+    logs, xs = [], []
+    for k in range(1, k_max):
+        lk = 0
+        for m in range(k):
+            n_max = (n - m) // k
+            if n_max < 2:
+                continue
+            length = sum(abs(signal_data[m + i * k] - signal_data[m + (i - 1) * k]) for i in range(1, n_max))
+            lk += length * (n - 1) / (n_max * k ** 2)
+        if lk > 0:
+            logs.append(np.log(lk / k))
+            xs.append(np.log(1.0 / k))
+    return abs(np.polyfit(xs, logs, 1)[0]) if len(logs) > 1 else 1.0
+
+
+class TestEnsembleMetrics(unittest.TestCase):
+    """Vectorized metrics match the per-system implementations"""
+
+    def test_shannon_information_matches_histogram_reference(self):
+        rng = np.random.default_rng(0)
+        states = rng.normal(size=(200, 7))
+        states[:20] = 0.5 + 1e-5 * rng.normal(size=(20, 7))  # low-variance branch
+        states[20:25] = 0.0
+        expected = [reference_information(row) for row in states]
+        np.testing.assert_allclose(shannon_information(states), expected, atol=1e-12)
+
+    def test_fractal_dimension_matches_higuchi_reference(self):
+        rng = np.random.default_rng(1)
+        windows = np.cumsum(rng.normal(size=(5, 100)), axis=1)
+        windows[0] = 1.0  # constant series: no valid k
+        expected = [reference_higuchi(row) for row in windows]
+        np.testing.assert_allclose(fractal_dimension(windows), expected, atol=1e-10)
+
+
+class TestMetatronEnsemble(unittest.TestCase):
+    """Test cases for batched stepping and per-instance state"""
+
+    def test_instance_stream_is_independent_of_ensemble_size(self):
+        small = MetatronEnsemble(1, seed=7)
+        large = MetatronEnsemble(4, seed=7, base_frequency=[40.0, 50.0, 60.0, 70.0])
+        small.run(80)
+        large.run(80)
+        np.testing.assert_allclose(large.phase[0], small.phase[0])
+        np.testing.assert_allclose(large.dimensions[0], small.dimensions[0])
+        self.assertAlmostEqual(large.metrics['phi'][0], small.metrics['phi'][0])
+
+    def test_per_instance_parameters(self):
+        ensemble = MetatronEnsemble(3, base_frequency=[40.0, 80.0, 40.0], coupling=[1.0, 1.0, 1.5],
+                                    noise=[0.1, 0.1, 0.0], seed=3)
+        np.testing.assert_allclose(ensemble.omega[1], 2 * ensemble.omega[0])
+        ensemble.run(20)
+        self.assertFalse(np.allclose(ensemble.coupling_strength[0], ensemble.coupling_strength[2]))
+        # Without sensory noise the dimensional state stays at rest
+        np.testing.assert_allclose(ensemble.dimensions[2], 0.0)
+        with self.assertRaises(ValueError):
+            MetatronEnsemble(3, coupling=[1.0, 2.0])
+
+    def test_instance_state_has_current_state_format(self):
+        ensemble = MetatronEnsemble(2, seed=1)
+        ensemble.run(40)
+        state = ensemble.instance_state(1)
+        self.assertEqual(sorted(state), ['global', 'nodes', 'system_info', 'time'])
+        self.assertEqual(len(state['nodes']), 13)
+        self.assertIn('memory_metrics', state['nodes'][3])
+        self.assertEqual(sorted(state['nodes'][5]['processor']['dimensions']),
+                         sorted(['physical', 'emotional', 'mental', 'spiritual', 'temporal']))
+        self.assertIn(state['global']['state'], STATE_LABELS)
+        self.assertAlmostEqual(state['nodes'][4]['oscillator']['phase'], ensemble.phase[1, 4])
+
+    def test_memory_ring_wraps(self):
+        ensemble = MetatronEnsemble(2, seed=4, memory_size=8)
+        ensemble.run(30)
+        counts = ensemble.sign_counts[1] + ensemble.sign_counts[-1]
+        np.testing.assert_array_equal(counts, [8, 8])
+        self.assertTrue(np.all(np.isfinite(ensemble.output)))
+
+    @unittest.skipIf(not ORCHESTRATOR_AVAILABLE, "MetatronConsciousness not available")
+    def test_instance_loads_into_consciousness(self):
+        ensemble = MetatronEnsemble(2, seed=9, base_frequency=[40.0, 45.0])
+        ensemble.run(25)
+        system = ensemble.to_consciousness(1)
+        self.assertIsInstance(system, MetatronConsciousness)
+        state = system.get_current_state()
+        for node_id in range(13):
+            self.assertAlmostEqual(state['nodes'][node_id]['oscillator']['phase'], ensemble.phase[1, node_id])
+        self.assertEqual(state['global']['phi'], ensemble.metrics['phi'][1])
+        system.update_system()
+
+    @unittest.skipIf(not ORCHESTRATOR_AVAILABLE, "MetatronConsciousness not available")
+    def test_tracks_orchestrator_under_shared_randomness(self):
+        ensemble = MetatronEnsemble(1, seed=5)
+        reference = MetatronConsciousness()
+        for node_id in range(13):
+            reference.nodes[node_id]['oscillator'].phase = float(ensemble.phase[0, node_id])
+
+        # Record the orchestrator's draws (Φ partitions, SOC noise) and replay them to the ensemble
+        permutations, soc_noise, clock = [], [], [0.0]
+        shuffle, normal = np.random.shuffle, np.random.normal
+
+        def recording_shuffle(values):
+            shuffle(values)
+            permutations.append(values.copy())
+
+        def recording_normal(loc=0.0, scale=1.0, size=None):
+            value = normal(loc, scale, size)
+            if size is None:
+                soc_noise.append((value - loc) / scale if scale else 0.0)
+            return value
+
+        def replay():
+            uniforms = np.zeros((1, N_PARTITIONS, 13))
+            for k, permutation in enumerate(permutations):
+                uniforms[0, k, permutation] = np.arange(13) / 13  # argsort gives back the permutation
+            normals = np.zeros((1, 18))
+            if soc_noise:
+                normals[0, 5:] = soc_noise
+            return normals, uniforms
+
+        ensemble._draw = replay
+        rng = np.random.default_rng(1)
+        # Memory recall decays by simulation time in the ensemble
+        with mock.patch.object(np.random, 'shuffle', recording_shuffle), \
+                mock.patch.object(np.random, 'normal', recording_normal), \
+                mock.patch.object(memory_matrix.time, 'time', lambda: clock[0]):
+            for tick in range(200):
+                sensory = rng.normal(0, 0.1, 5)
+                permutations.clear()
+                soc_noise.clear()
+                clock[0] = reference.current_time
+                expected = reference.update_system(sensory)
+                ensemble.update_system(sensory)
+                actual = ensemble.instance_state(0)
+
+                for node_id in range(13):
+                    node, other = expected['nodes'][node_id], actual['nodes'][node_id]
+                    self.assertAlmostEqual(node['oscillator']['phase'], other['oscillator']['phase'], delta=1e-12)
+                    self.assertAlmostEqual(node['output'], other['output'], delta=1e-12)
+                    for dimension, value in node['processor']['dimensions'].items():
+                        self.assertAlmostEqual(value, other['processor']['dimensions'][dimension], delta=1e-12)
+                for key in ('consciousness_level', 'phi', 'coherence', 'recursive_depth', 'gamma_power',
+                            'fractal_dimension', 'spiritual_awareness', 'present_moment'):
+                    self.assertAlmostEqual(float(expected['global'][key]), actual['global'][key], delta=1e-12,
+                                           msg=f"{key} at tick {tick}")
+                self.assertAlmostEqual(float(expected['global']['system_energy']), actual['global']['system_energy'],
+                                       delta=1e-12 * max(1.0, abs(actual['global']['system_energy'])))
+                self.assertEqual(expected['global']['state'], actual['global']['state'])
+
+    def test_benchmark_runs(self):
+        results = benchmark_ensemble(sizes=(1, 8), steps=3)
+        self.assertEqual([r['instances'] for r in results], [1, 8])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,172 @@
+"""
+Unit tests for the metrics_tsdb module and its use in metrics_collector
+"""
+
+import unittest
+import os
+import sys
+
+import numpy as np
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from metrics_tsdb import ColumnRing, TimeSeriesStore, RAW, benchmark_tsdb
+
+
+class TestColumnRing(unittest.TestCase):
+    """Test cases for the columnar ring buffer"""
+
+    def test_wraparound_range_matches_brute_force(self):
+        ring = ColumnRing(100, ("timestamp", "value"), initial=8)
+        samples = [(float(t), float(t * 2)) for t in range(250)]
+        for row in samples:
+            ring.append(*row)
+        retained = samples[-100:]
+        self.assertEqual(len(ring), 100)
+        self.assertEqual(ring.first("timestamp"), 150.0)
+
+        rows = ring.select(170.5, 230.0)
+        expected = [t for t, _ in retained if 170.5 <= t <= 230.0]
+        self.assertEqual(rows["timestamp"].tolist(), expected)
+        self.assertEqual(rows["value"].tolist(), [t * 2 for t in expected])
+
+    def test_out_of_order_appends_fall_back_to_masking(self):
+        ring = ColumnRing(10, ("timestamp", "value"))
+        for t in [1.0, 2.0, 5.0, 3.0, 4.0]:
+            ring.append(t, t)
+        self.assertFalse(ring.ordered)
+        self.assertEqual(sorted(ring.select(2.5, 4.5)["timestamp"].tolist()), [3.0, 4.0])
+
+
+class TestTimeSeriesStore(unittest.TestCase):
+    """Test cases for label interning, rollups and vectorized queries"""
+
+    def test_label_sets_are_interned(self):
+        store = TimeSeriesStore()
+        a = store.intern_labels({"node": "n1", "region": "eu"})
+        b = store.intern_labels({"region": "eu", "node": "n1"})
+        c = store.intern_labels({"node": "n2"})
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+        self.assertEqual(store.intern_labels(None), 0)
+
+        store.append("cpu", 1.0, 10.0, {"node": "n1", "region": "eu"})
+        store.append("cpu", 2.0, 11.0, {"node": "n2"})
+        self.assertEqual(store.series_ids("cpu", {"node": "n1"}), [a])
+        self.assertEqual(len(store.series_ids("cpu")), 2)
+
+    def test_rollups_match_brute_force_buckets(self):
+        store = TimeSeriesStore(raw_capacity=50)
+        rng = np.random.default_rng(1)
+        timestamps = np.sort(rng.uniform(0, 3600, 2000)) + 1_000_000.0
+        values = rng.normal(50, 10, 2000)
+        for t, v in zip(timestamps, values):
+            store.append("latency", v, t)
+
+        for resolution in (10.0, 60.0):
+            result = store.query("latency", resolution=resolution)
+            buckets = timestamps - timestamps % resolution
+            starts = np.unique(buckets)
+            self.assertEqual(result["timestamp"].tolist(), starts.tolist())
+            for i in (0, len(starts) // 2, len(starts) - 1):
+                in_bucket = values[buckets == starts[i]]
+                self.assertAlmostEqual(result["min"][i], in_bucket.min())
+                self.assertAlmostEqual(result["max"][i], in_bucket.max())
+                self.assertAlmostEqual(result["avg"][i], in_bucket.mean())
+                self.assertEqual(result["count"][i], len(in_bucket))
+
+    def test_queries_beyond_raw_retention_use_rollups(self):
+        store = TimeSeriesStore(raw_capacity=100)
+        base = 1_000_000.0
+        for i in range(5000):
+            store.append("gauge", float(i % 10), base + i)
+
+        recent = store.query("gauge", start=base + 4950)
+        self.assertEqual(recent["resolution"], RAW)
+        self.assertEqual(len(recent["value"]), 50)
+
+        older = store.query("gauge", start=base + 1000)
+        self.assertEqual(older["resolution"], 10.0)
+
+        stats = store.stats("gauge", start=base)
+        self.assertEqual(stats["count"], 5000)
+        self.assertEqual(stats["min"], 0.0)
+        self.assertEqual(stats["max"], 9.0)
+        self.assertAlmostEqual(stats["avg"], 4.5)
+        self.assertEqual(stats["latest"], 9.0)
+
+    def test_series_are_merged_per_bucket(self):
+        store = TimeSeriesStore()
+        store.append("req", 1.0, 100.0, {"node": "a"})
+        store.append("req", 5.0, 101.0, {"node": "b"})
+        store.append("req", 3.0, 115.0, {"node": "a"})
+        result = store.query("req", resolution=10.0)
+        self.assertEqual(result["timestamp"].tolist(), [100.0, 110.0])
+        self.assertEqual(result["count"].tolist(), [2.0, 1.0])
+        self.assertEqual(result["max"].tolist(), [5.0, 3.0])
+
+        raw = store.query("req", resolution=RAW)
+        self.assertEqual(raw["value"].tolist(), [1.0, 5.0, 3.0])
+
+    def test_late_sample_updates_closed_bucket(self):
+        store = TimeSeriesStore()
+        store.append("x", 1.0, 100.0)
+        store.append("x", 2.0, 125.0)
+        store.append("x", 10.0, 105.0)  # late, belongs to the closed 100-110 bucket
+        result = store.query("x", resolution=10.0)
+        self.assertEqual(result["max"].tolist(), [10.0, 2.0])
+        self.assertEqual(result["count"].tolist(), [2.0, 1.0])
+
+    def test_raw_samples_cost_16_bytes(self):
+        store = TimeSeriesStore(raw_capacity=1000, rollups=())
+        for i in range(1000):
+            store.append("m", float(i), float(i))
+        self.assertEqual(store.memory_bytes(), 1000 * 16)
+
+    def test_benchmark_runs(self):
+        results = benchmark_tsdb(samples=2000, history_size=400, queries=5)
+        self.assertEqual(results["columnar_store"]["retained_samples"],
+                         results["deque_of_dicts"]["retained_samples"])
+        self.assertLess(results["columnar_store"]["raw_bytes_per_sample"],
+                        results["deque_of_dicts"]["bytes_per_sample"])
+
+
+class TestMetricIntegration(unittest.TestCase):
+    """Metric keeps its history/stats interface on top of the store"""
+
+    def setUp(self):
+        try:
+            from metrics_collector import MetricsCollector, MetricsCollectorConfig, MetricConfig, MetricType, MetricCategory
+        except ImportError:
+            self.skipTest("Metrics collector components not available")
+        self.collector = MetricsCollector(MetricsCollectorConfig(
+            enable_prometheus=False, enable_system_metrics=False,
+            enable_network_metrics=False, history_size=5
+        ))
+        self.metric = self.collector.register_metric(MetricConfig(
+            name="tsdb_test_metric", type=MetricType.GAUGE, category=MetricCategory.CUSTOM
+        ))
+
+    def test_history_and_stats(self):
+        for i in range(8):
+            self.collector.set_metric_value("tsdb_test_metric", i, {"node": "a" if i % 2 else "b"})
+        self.collector.set_metric_value("tsdb_test_metric", "not-a-number")
+
+        history = self.collector.get_metrics_history("tsdb_test_metric", limit=3)
+        self.assertEqual([entry["value"] for entry in history], [5.0, 6.0, 7.0])
+        self.assertEqual(history[-1]["labels"], {"node": "a"})
+        self.assertEqual(self.metric.get_value(), "not-a-number")
+
+        stats = self.metric.get_stats()
+        self.assertEqual(stats["count"], 8)
+        self.assertEqual(stats["min"], 0.0)
+        self.assertEqual(stats["latest"], 7.0)
+        self.assertEqual(self.metric.get_stats(labels={"node": "a"})["count"], 4)
+
+        buckets = self.collector.query_metric("tsdb_test_metric", resolution=60.0)
+        self.assertEqual(int(buckets["count"].sum()), 8)
+
+
+if __name__ == '__main__':
+    unittest.main()
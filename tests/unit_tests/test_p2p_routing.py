@@ -0,0 +1,282 @@
+"""
+Unit tests for the p2p_routing module
+"""
+
+import unittest
+import asyncio
+import os
+import json
+import random
+import sys
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from p2p_routing import LinkTable, RoutingTable, path_cost, yen_k_shortest_paths
+
+
+def random_weighted_graph(n, edges, seed):
+    rng = random.Random(seed)
+    adjacency = {str(i): {} for i in range(n)}
+    for _ in range(edges):
+        a, b = str(rng.randrange(n)), str(rng.randrange(n))
+        if a != b:
+            weight = rng.uniform(1, 50)
+            adjacency[a][b] = weight
+            adjacency[b][a] = weight
+    return adjacency
+
+
+def all_simple_path_costs(adjacency, source, target):
+    costs = []
+    stack = [(source, [source])]
+    while stack:
+        node, path = stack.pop()
+        if node == target:
+            costs.append(path_cost(adjacency, path))
+            continue
+        for neighbor in adjacency[node]:
+            if neighbor not in path:
+                stack.append((neighbor, path + [neighbor]))
+    return sorted(costs)
+
+
+class TestYenKShortestPaths(unittest.TestCase):
+    """Test cases for Yen's k-shortest loopless paths"""
+
+    def test_matches_exhaustive_enumeration(self):
+        for seed in range(20):
+            adjacency = random_weighted_graph(8, 14, seed)
+            expected = all_simple_path_costs(adjacency, "0", "7")[:4]
+            paths = yen_k_shortest_paths(adjacency, "0", "7", k=4)
+            self.assertEqual(len(paths), len(expected))
+            for (cost, path), expected_cost in zip(paths, expected):
+                self.assertAlmostEqual(cost, expected_cost)
+                self.assertEqual(len(path), len(set(path)))  # loopless
+                self.assertAlmostEqual(path_cost(adjacency, path), cost)
+
+    def test_unreachable_destination(self):
+        adjacency = {"a": {"b": 1.0}, "b": {"a": 1.0}, "c": {}}
+        self.assertEqual(yen_k_shortest_paths(adjacency, "a", "c", k=3), [])
+
+
+class TestRoutingTable(unittest.TestCase):
+    """Test cases for the cached, incrementally invalidated routing table"""
+
+    def setUp(self):
+        self.links = LinkTable(change_threshold=0.0)
+        for a, b, rtt in [("me", "a", 10), ("me", "b", 20), ("a", "dest", 10),
+                          ("b", "dest", 10), ("a", "b", 5), ("b", "other", 10)]:
+            self.links.add_link(a, b, rtt_ms=rtt)
+        self.table = RoutingTable("me", self.links, k=3)
+
+    def test_best_route_prefers_low_latency(self):
+        route = self.table.best_route("dest")
+        self.assertEqual(route.path, ["me", "a", "dest"])
+        self.assertEqual(route.next_hop, "a")
+        self.assertEqual(len(self.table.get_routes("dest")), 3)
+
+    def test_lookups_are_cached(self):
+        self.table.best_route("dest")
+        for _ in range(100):
+            self.table.best_route("dest")
+        self.assertEqual(self.table.stats["computations"], 1)
+
+    def test_degraded_link_invalidates_only_affected_destinations(self):
+        table = RoutingTable("me", self.links, k=2)
+        table.best_route("dest")
+        table.best_route("other")
+        computations = table.stats["computations"]
+
+        # The two best routes to "other" (via b, via a-b) never use a-dest
+        for _ in range(20):
+            self.links.record_loss("a", "dest")
+        self.assertNotIn("dest", table.routes)
+        self.assertIn("other", table.routes)
+        self.assertEqual(table.best_route("dest").path, ["me", "a", "b", "dest"])
+        self.assertEqual(table.stats["computations"], computations + 1)
+
+    def test_new_shortcut_invalidates_routes(self):
+        self.table.best_route("dest")
+        self.links.add_link("me", "dest", rtt_ms=1)
+        self.assertEqual(self.table.best_route("dest").path, ["me", "dest"])
+
+    def test_removed_link_reroutes(self):
+        self.table.best_route("dest")
+        self.links.remove_link("me", "a")
+        self.assertEqual(self.table.best_route("dest").path, ["me", "b", "dest"])
+
+    def test_exclude_relays(self):
+        route = self.table.best_route("dest", exclude=["a"])
+        self.assertNotIn("a", route.path)
+
+    def test_rtt_samples_update_costs(self):
+        links = LinkTable(change_threshold=0.1)
+        links.record_rtt("me", "a", 40.0)
+        first = links.cost("me", "a")
+        links.record_rtt("me", "a", 41.0)
+        self.assertEqual(links.cost("me", "a"), first)  # jitter below threshold not published
+        for _ in range(30):
+            links.record_rtt("me", "a", 200.0)
+        self.assertGreater(links.cost("me", "a"), first * 2)
+
+
+class FakeTransport:
+    def __init__(self, buffered=0, high_water=1000):
+        self.buffered = buffered
+        self.high_water = high_water
+
+    def get_write_buffer_size(self):
+        return self.buffered
+
+    def get_write_buffer_limits(self):
+        return 0, self.high_water
+
+
+class FakeWriter:
+    def __init__(self, transport=None):
+        self.transport = transport or FakeTransport()
+        self.lines = []
+
+    def write(self, data):
+        self.lines.append(json.loads(data))
+
+    async def drain(self):
+        pass
+
+
+class TestNetworkIntegration(unittest.TestCase):
+    """Routing integration with the P2P network manager"""
+
+    def setUp(self):
+        try:
+            import p2p_network
+            self.p2p_network = p2p_network
+        except ImportError:
+            self.skipTest("P2P network components not available")
+
+    def test_topology_manager_k_routes(self):
+        manager = self.p2p_network.NetworkTopologyManager("me")
+        manager.update_peer_connections({"me": ["a", "b"], "a": ["dest", "b"], "b": ["dest"]})
+        routes = manager.get_optimal_routes("me", "dest")
+        self.assertEqual(len(routes), 3)
+        self.assertTrue(all(len(r) == len(set(r)) for r in routes))
+        self.assertEqual(len(routes[0]), 3)
+
+    def test_send_via_relay_uses_next_hop(self):
+        network = self.p2p_network.P2PNetworkManager("me", port=0)
+        sent = []
+
+        async def fake_send(peer_id, message):
+            sent.append((peer_id, message))
+            return True
+
+        network.connection_manager.send_message = fake_send
+        network.link_table.add_link("me", "relay", rtt_ms=5)
+        network.update_remote_links("relay", ["dest"])
+
+        result = asyncio.run(network.send_message("dest", self.p2p_network.MessageType.DATA, {"x": 1}))
+        self.assertTrue(result)
+        self.assertEqual(sent[0][0], "relay")
+        self.assertEqual(sent[0][1]["route"], ["me", "relay", "dest"])
+
+    def connect(self, network, peer_id, transport=None):
+        writer = FakeWriter(transport)
+        network.connection_manager.active_connections[peer_id] = {
+            "writer": writer, "bytes_sent": 0, "bytes_received": 0, "last_activity": 0
+        }
+        network.link_table.add_link(network.node_id, peer_id)
+        return writer
+
+    def test_heartbeat_neighbors_enable_relay(self):
+        network = self.p2p_network.P2PNetworkManager("me", port=0)
+        manager = network.connection_manager
+        writer = self.connect(network, "relay")
+
+        async def run():
+            await manager.send_heartbeats()
+            heartbeat = writer.lines[-1]
+            self.assertEqual(heartbeat["neighbors"], ["relay"])
+            await manager._process_peer_message("relay", {
+                "type": "heartbeat_response", "echo_timestamp": heartbeat["timestamp"], "neighbors": ["me", "dest"]
+            })
+            self.assertTrue(await network.send_message("dest", self.p2p_network.MessageType.DATA, {"x": 1}))
+            self.assertEqual(writer.lines[-1]["route"], ["me", "relay", "dest"])
+
+            # The peer stops announcing dest: the relay route disappears
+            await manager._process_peer_message("relay", {"type": "heartbeat", "timestamp": 1.0, "neighbors": ["me"]})
+            self.assertFalse(await network.send_message("dest", self.p2p_network.MessageType.DATA, {"x": 2}))
+
+        asyncio.run(run())
+        self.assertEqual(manager.pending_heartbeats, {})
+
+    def test_missed_heartbeats_and_load_update_link_costs(self):
+        network = self.p2p_network.P2PNetworkManager("me", port=0)
+        transport = FakeTransport(buffered=0)
+        self.connect(network, "a", transport)
+        self.connect(network, "b")
+
+        async def run():
+            await network.connection_manager.send_heartbeats()
+            await network.connection_manager.send_heartbeats()  # the first one was never answered
+            transport.buffered = 800
+            await network.connection_manager.send_message("a", {"type": "data"})
+
+        asyncio.run(run())
+        metrics = network.link_table.links[("a", "me")]
+        self.assertGreater(metrics.loss_rate, 0)
+        self.assertAlmostEqual(metrics.load, 0.8)
+        self.assertGreater(network.link_table.cost("me", "a"), network.link_table.cost("me", "b"))
+
+    def test_relay_final_hop_dispatches_inner_message(self):
+        network = self.p2p_network.P2PNetworkManager("dest", port=0)
+        received = []
+
+        async def handle_data(peer_id, message):
+            received.append((peer_id, message))
+
+        network.connection_manager._handle_data_message = handle_data
+        inner = {"type": "data", "node_id": "origin", "payload": {"x": 1}}
+        asyncio.run(network.connection_manager._process_peer_message("relay", {
+            "type": "relay", "node_id": "spoofed", "route": ["origin", "relay", "dest"], "ttl": 2, "message": inner
+        }))
+        self.assertEqual(received, [("origin", inner)])
+
+    def test_relay_rejects_loops_spoofed_hops_and_control_messages(self):
+        network = self.p2p_network.P2PNetworkManager("me", port=0)
+        manager = network.connection_manager
+        writer = self.connect(network, "b")
+        links = dict(network.link_table.links)
+        delivered = []
+
+        async def handle_data(peer_id, message):
+            delivered.append(peer_id)
+
+        manager._handle_data_message = handle_data
+        data = {"type": "data", "payload": {}}
+        heartbeat = {"type": "heartbeat", "timestamp": 1.0, "neighbors": ["me", "victim"]}
+        rejected = [
+            ("x", ["x", "me", "b", "me"], 3, data),     # repeats a node: would bounce forever
+            ("x", ["y", "me", "b"], 2, data),           # previous hop is not the sender
+            ("x", ["x", "me", "b"], 0, data),           # TTL exhausted
+            ("x", ["x", "me", "b"], None, data),
+            ("x", ["x", "me"], 1, heartbeat),           # control message inside a relay
+            ("x", ["x", "me"], 1, {"type": "relay", "route": ["x", "me"], "ttl": 1, "message": data}),
+        ]
+
+        async def run():
+            for peer_id, route, ttl, inner in rejected:
+                await manager._process_peer_message(peer_id, {
+                    "type": "relay", "node_id": "x", "route": route, "ttl": ttl, "message": inner})
+            await manager._process_peer_message("x", {
+                "type": "relay", "node_id": "x", "route": ["x", "me", "b"], "ttl": 2, "message": data})
+
+        asyncio.run(run())
+        self.assertEqual(delivered, [])
+        self.assertEqual(dict(network.link_table.links), links)
+        self.assertEqual(len(writer.lines), 1)
+        self.assertEqual(writer.lines[0]["ttl"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,175 @@
+"""
+Unit tests for the probe_engine module and its use in fault_tolerance
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+import time
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from probe_engine import PhiAccrualFailureDetector, ProbeEngine
+
+try:
+    from aiohttp import web
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+
+async def start_delayed_server(delay):
+    """Local HTTP server answering every request after ``delay`` seconds"""
+    async def handler(request):
+        await asyncio.sleep(delay)
+        return web.json_response({"ok": True})
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "0.0.0.0", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, port
+
+
+class TestPhiAccrualFailureDetector(unittest.TestCase):
+    """Test cases for the phi-accrual failure detector"""
+
+    def test_regular_heartbeats_keep_phi_low(self):
+        detector = PhiAccrualFailureDetector(threshold=8.0, first_heartbeat_estimate=1.0)
+        now = 1000.0
+        for _ in range(50):
+            detector.heartbeat("n1", now)
+            now += 1.0
+        self.assertLess(detector.phi("n1", now - 0.5), 1.0)
+        self.assertTrue(detector.is_available("n1", now))
+
+    def test_missing_heartbeats_raise_phi(self):
+        detector = PhiAccrualFailureDetector(threshold=8.0, first_heartbeat_estimate=1.0)
+        now = 1000.0
+        for _ in range(50):
+            detector.heartbeat("n1", now)
+            now += 1.0
+        self.assertGreater(detector.phi("n1", now + 5.0), 8.0)
+        self.assertFalse(detector.is_available("n1", now + 5.0))
+
+    def test_jittery_nodes_tolerate_longer_gaps(self):
+        """A node with irregular arrivals is suspected later than a regular one"""
+        regular = PhiAccrualFailureDetector(first_heartbeat_estimate=1.0)
+        jittery = PhiAccrualFailureDetector(first_heartbeat_estimate=1.0)
+        t_regular = t_jittery = 0.0
+        for i in range(100):
+            regular.heartbeat("n", t_regular)
+            jittery.heartbeat("n", t_jittery)
+            t_regular += 1.0
+            t_jittery += 0.2 if i % 2 else 1.8
+        gap = 2.5
+        self.assertGreater(regular.phi("n", t_regular - 1.0 + gap), jittery.phi("n", t_jittery - 1.0 + gap))
+
+
+@unittest.skipIf(not AIOHTTP_AVAILABLE, "aiohttp not available")
+class TestProbeEngine(unittest.TestCase):
+    """Test cases for pooled, concurrent probing"""
+
+    def test_sessions_are_reused(self):
+        async def run():
+            runner, port = await start_delayed_server(0)
+            engine = ProbeEngine()
+            try:
+                results = [await engine.get("127.0.0.1", port, "/ping") for _ in range(10)]
+            finally:
+                await engine.close()
+                await runner.cleanup()
+            return engine, results
+
+        engine, results = asyncio.run(run())
+        self.assertTrue(all(r.ok for r in results))
+        self.assertEqual(engine.stats["sessions_created"], 1)
+
+    def test_check_tcp_closed_port(self):
+        async def run():
+            engine = ProbeEngine()
+            return await engine.check_tcp("127.0.0.1", 1, timeout=1)
+
+        result = asyncio.run(run())
+        self.assertFalse(result.ok)
+        self.assertIsNotNone(result.error)
+
+    def test_heartbeat_round_time_is_flat(self):
+        """A round over 100 slow nodes takes about one probe latency, not 100"""
+        try:
+            from fault_tolerance import HeartbeatManager, NodeInfo, NodeStatus
+        except ImportError:
+            self.skipTest("fault_tolerance components not available")
+
+        delay = 0.1
+
+        async def run():
+            runner, port = await start_delayed_server(delay)
+            manager = HeartbeatManager("self", heartbeat_interval=5.0)
+            for i in range(100):
+                node_id = f"node_{i}"
+                manager.nodes[node_id] = NodeInfo(
+                    node_id=node_id, address=f"127.0.0.{i + 2}", port=port,
+                    status=NodeStatus.HEALTHY, last_heartbeat=0.0,
+                    capabilities={}, load_metrics={}
+                )
+            heartbeat = {"node_id": "self", "timestamp": time.time()}
+            try:
+                start = time.perf_counter()
+                await asyncio.gather(*(manager._send_heartbeat_to_node(n, heartbeat)
+                                       for n in manager.nodes.values()))
+                elapsed = time.perf_counter() - start
+            finally:
+                await manager.stop_heartbeat_service()
+                await runner.cleanup()
+            return manager, elapsed
+
+        manager, elapsed = asyncio.run(run())
+        self.assertLess(elapsed, delay * 10)
+        self.assertTrue(all(n.failure_count == 0 for n in manager.nodes.values()))
+        self.assertTrue(all(manager.phi_detector.has_history(n) for n in manager.nodes))
+
+    def test_piggybacked_traffic_skips_explicit_heartbeat(self):
+        try:
+            from fault_tolerance import HeartbeatManager
+        except ImportError:
+            self.skipTest("fault_tolerance components not available")
+
+        try:
+            from fault_tolerance import DataReplicationManager, NodeInfo, NodeStatus
+        except ImportError:
+            self.skipTest("fault_tolerance components not available")
+
+        async def run():
+            runner, port = await start_delayed_server(0)
+            manager = HeartbeatManager("self", heartbeat_interval=5.0)
+            replication = DataReplicationManager("self")
+            replication.heartbeat_manager = manager
+            for node_id, node_port in (("node_1", port), ("node_2", 1)):  # node_2: nothing listens
+                manager.nodes[node_id] = NodeInfo(
+                    node_id=node_id, address="127.0.0.1", port=node_port, status=NodeStatus.HEALTHY,
+                    last_heartbeat=0.0, capabilities={}, load_metrics={}
+                )
+            try:
+                results = [await replication._replicate_to_node(node_id, "k", {"value": 1})
+                           for node_id in ("node_1", "node_2")]
+            finally:
+                await manager.stop_heartbeat_service()
+                await runner.cleanup()
+            return manager, results
+
+        manager, results = asyncio.run(run())
+        self.assertEqual(results, [True, False])
+        self.assertEqual(manager.piggyback_heartbeat("node_1", {})["heartbeat"]["node_id"], "self")
+        # Only delivered traffic stands in for the explicit heartbeat
+        self.assertTrue(manager.probe_engine.recently_sent("node_1", 5.0))
+        self.assertFalse(manager.probe_engine.recently_sent("node_2", 5.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
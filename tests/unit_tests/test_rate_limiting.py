@@ -0,0 +1,165 @@
+"""
+Unit tests for the rate_limiting module and the API server rate limiter
+"""
+
+import unittest
+import os
+import sys
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from rate_limiting import (SLIDING_WINDOW, PolicyLimiter, RateLimiterSet, RateLimitPolicy,
+                           benchmark_rate_limiter)
+from api_server import FASTAPI_AVAILABLE, APIServer, APIServerConfig, AuthLevel, RateLimiter
+
+try:
+    from fastapi.testclient import TestClient
+    TESTCLIENT_AVAILABLE = True
+except ImportError:
+    TESTCLIENT_AVAILABLE = False
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class TestGCRA(unittest.TestCase):
+    """Test cases for the GCRA limiter"""
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.limiter = PolicyLimiter(RateLimitPolicy(10, 60), clock=self.clock)
+
+    def test_burst_then_exact_retry_after(self):
+        decisions = [self.limiter.check("a") for _ in range(11)]
+        self.assertTrue(all(d.allowed for d in decisions[:10]))
+        self.assertEqual([d.remaining for d in decisions[:3]], [9, 8, 7])
+        self.assertFalse(decisions[10].allowed)
+        self.assertAlmostEqual(decisions[10].retry_after, 6.0)
+        self.assertAlmostEqual(self.limiter.peek_retry_after("a"), 6.0)
+        self.assertEqual(decisions[10].headers()["Retry-After"], "6")
+
+        self.clock.now += 5.999
+        self.assertFalse(self.limiter.check("a").allowed)
+        self.clock.now += 0.002
+        self.assertTrue(self.limiter.check("a").allowed)
+        self.assertFalse(self.limiter.check("a").allowed)
+
+    def test_denied_requests_do_not_consume_budget(self):
+        for _ in range(10):
+            self.limiter.check("a")
+        for _ in range(100):
+            self.limiter.check("a")
+        self.clock.now += 6.0
+        self.assertTrue(self.limiter.check("a").allowed)
+
+    def test_keys_are_independent(self):
+        for _ in range(10):
+            self.limiter.check("a")
+        self.assertTrue(self.limiter.check("b").allowed)
+
+    def test_idle_keys_expire(self):
+        for i in range(1000):
+            self.limiter.check(f"client{i}")
+        self.assertEqual(len(self.limiter), 1000)
+        self.clock.now += 61
+        self.limiter.check("late")
+        self.assertLess(len(self.limiter), 1000)
+        self.limiter.sweep()
+        self.assertEqual(len(self.limiter), 1)
+
+    def test_burst_override(self):
+        limiter = PolicyLimiter(RateLimitPolicy(10, 60, burst=2), clock=self.clock)
+        self.assertEqual([limiter.check("a").allowed for _ in range(3)], [True, True, False])
+
+
+class TestSlidingWindow(unittest.TestCase):
+    """Test cases for the sliding-window-counter mode"""
+
+    def test_previous_window_decays(self):
+        clock = FakeClock(600.0)  # start of a window
+        limiter = PolicyLimiter(RateLimitPolicy(10, 60, mode=SLIDING_WINDOW), clock=clock)
+        self.assertTrue(all(limiter.check("a").allowed for _ in range(10)))
+        decision = limiter.check("a")
+        self.assertFalse(decision.allowed)
+        # The full count carries into the next window and must decay by 1/10
+        self.assertAlmostEqual(decision.retry_after, 66.0)
+        clock.now += 66.01
+        self.assertTrue(limiter.check("a").allowed)
+        self.assertFalse(limiter.check("a").allowed)
+
+    def test_retry_after_is_exact(self):
+        clock = FakeClock(600.0)
+        limiter = PolicyLimiter(RateLimitPolicy(10, 60, mode=SLIDING_WINDOW), clock=clock)
+        for _ in range(10):
+            limiter.check("a")
+        clock.now = 690.0  # half way through the next window: estimate 5
+        for _ in range(5):
+            self.assertTrue(limiter.check("a").allowed)
+        decision = limiter.check("a")
+        self.assertFalse(decision.allowed)
+        clock.now += decision.retry_after + 1e-6
+        self.assertTrue(limiter.check("a").allowed)
+
+
+class TestPolicies(unittest.TestCase):
+    """Test cases for per-route and per-auth-level policies"""
+
+    def test_resolution_order(self):
+        limiters = RateLimiterSet(
+            RateLimitPolicy(100, 60),
+            routes={"POST /login": RateLimitPolicy(1, 60), "/admin/*": RateLimitPolicy(2, 60)},
+            auth_levels={AuthLevel.AUTHENTICATED: RateLimitPolicy(1000, 60)},
+            clock=FakeClock())
+        self.assertEqual(limiters.resolve("POST /login", AuthLevel.AUTHENTICATED).policy.requests, 1)
+        self.assertEqual(limiters.resolve("GET /admin/users").policy.requests, 2)
+        self.assertEqual(limiters.resolve("GET /x", AuthLevel.AUTHENTICATED).policy.requests, 1000)
+        self.assertEqual(limiters.resolve("GET /x", AuthLevel.PUBLIC).policy.requests, 100)
+        self.assertTrue(limiters.check("a", "POST /login").allowed)
+        self.assertFalse(limiters.check("a", "POST /login").allowed)
+        self.assertTrue(limiters.check("a", "GET /x").allowed)
+        self.assertEqual(limiters.stats()["tracked_keys"], 2)
+
+    def test_legacy_interface(self):
+        limiter = RateLimiter(2, 60)
+        self.assertEqual(limiter.get_retry_after("a"), 0)
+        self.assertTrue(limiter.is_allowed("a"))
+        self.assertTrue(limiter.is_allowed("a"))
+        self.assertFalse(limiter.is_allowed("a"))
+        self.assertEqual(limiter.get_retry_after("a"), 30)
+
+    def test_benchmark_runs(self):
+        rows = benchmark_rate_limiter(clients=1000, hot_requests=100)
+        self.assertEqual([row["limiter"] for row in rows], ["timestamp-list", "gcra", "sliding-window"])
+        self.assertLess(rows[1]["retained_after_idle_mb"], rows[1]["retained_mb"])
+
+
+@unittest.skipIf(not (FASTAPI_AVAILABLE and TESTCLIENT_AVAILABLE), "FastAPI test client not available")
+class TestAPIServerRateLimiting(unittest.TestCase):
+    """Test cases for the rate limit middleware"""
+
+    def test_route_and_auth_policies(self):
+        config = APIServerConfig(enable_cors=False, auth_secret="token", rate_limit_requests=3,
+                                 rate_limit_routes={"GET /health": {"requests": 1, "window": 60}},
+                                 rate_limit_auth_levels={AuthLevel.AUTHENTICATED: {"requests": 50, "window": 60}})
+        client = TestClient(APIServer(config).get_app())
+
+        self.assertEqual(client.get("/health").status_code, 200)
+        limited = client.get("/health")
+        self.assertEqual(limited.status_code, 429)
+        self.assertEqual(limited.headers["Retry-After"], "60")
+
+        statuses = [client.get("/").status_code for _ in range(4)]
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        authorized = client.get("/", headers={"Authorization": "Bearer token"})
+        self.assertEqual(authorized.status_code, 200)
+        self.assertEqual(authorized.headers["X-RateLimit-Limit"], "50")
+
+
+if __name__ == '__main__':
+    unittest.main()
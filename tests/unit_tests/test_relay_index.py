@@ -0,0 +1,91 @@
+"""
+Unit tests for the relay_index module and its use in TorGateway
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from relay_index import RelayIndex, bandwidth_share_check, benchmark_path_selection, relay_weight
+from tor_circuit_pool import FakeTorController
+from tor_integration import TorGateway, TorNode
+
+
+def make_node(i, country, flags=('Guard', 'Exit'), bandwidth=100, address=None, family=None):
+    return TorNode(fingerprint=f"{i:040X}", nickname=f"relay{i}", address=address or f"{i}.{i}.0.1",
+                   or_port=9001, dir_port=9030, flags=['Fast', 'Stable', 'Running', *flags],
+                   bandwidth=bandwidth, country=country, family=family)
+
+
+def refreshed_gateway(relays=300, seed=0):
+    gateway = TorGateway(controller=FakeTorController(relays=relays, seed=seed), pool_size=0)
+    asyncio.run(gateway._refresh_node_list(force=True))
+    return gateway
+
+
+class TestRelayIndex(unittest.TestCase):
+    """Test cases for indexed weighted path selection"""
+
+    def test_selection_matches_bandwidth_share(self):
+        index = RelayIndex(refreshed_gateway().node_cache)
+        check = bandwidth_share_check(index, samples=20000)
+        self.assertLess(abs(check['z']), 4)
+
+    def test_path_roles_and_diversity(self):
+        gateway = refreshed_gateway()
+        index = gateway.relay_index
+        totals = {key: partition.total() for key, partition in index.partitions.items()}
+        for n in range(200):
+            path = index.select_path(3, seed=b"path%d" % n)
+            self.assertIn('Guard', path[0].flags)
+            self.assertIn(path[0].country, gateway.preferred_countries)
+            self.assertIn('Exit', path[-1].flags)
+            self.assertEqual(len({node.country for node in path}), 3)
+            self.assertEqual(len({tuple(node.address.split('.')[:2]) for node in path}), 3)
+        # Exclusions are undone after every draw
+        self.assertEqual(totals, {key: partition.total() for key, partition in index.partitions.items()})
+
+    def test_families_are_not_reused(self):
+        nodes = [make_node(i, country, family='same' if i < 2 else None)
+                 for i, country in enumerate(['US', 'DE', 'NL', 'SE'])]
+        nodes[0].bandwidth = nodes[1].bandwidth = 10 ** 9
+        index = RelayIndex(nodes, ['US', 'DE'])
+        for n in range(50):
+            path = index.select_path(3, seed=b"family%d" % n)
+            self.assertLessEqual(sum(node.family == 'same' for node in path), 1)
+
+    def test_falls_back_when_diversity_is_impossible(self):
+        nodes = [make_node(i, 'US', flags=(), address='10.0.0.%d' % i) for i in range(3)]
+        path = RelayIndex(nodes, ['DE']).select_path(3, seed=b"fallback")
+        self.assertEqual(len({node.fingerprint for node in path}), 3)
+        with self.assertRaises(ValueError):
+            RelayIndex(nodes[:2]).select_path(3)
+
+    def test_zero_bandwidth_relays_stay_eligible(self):
+        nodes = [make_node(i, country, bandwidth=0) for i, country in enumerate(['US', 'DE', 'NL'])]
+        self.assertEqual(relay_weight(nodes[0]), 1)
+        self.assertEqual(len(RelayIndex(nodes).select_path(3)), 3)
+
+    def test_seeded_selection_is_deterministic(self):
+        index = RelayIndex(refreshed_gateway().node_cache)
+        first = [node.fingerprint for node in index.select_path(3, seed=b"x")]
+        self.assertEqual(first, [node.fingerprint for node in index.select_path(3, seed=b"x")])
+
+    def test_gateway_rebuilds_index_for_replaced_cache(self):
+        gateway = TorGateway(controller=FakeTorController(), pool_size=0)
+        gateway.node_cache = [make_node(i, country) for i, country in enumerate(['US', 'DE', 'NL', 'SE'])]
+        path = gateway._select_diverse_path()
+        self.assertIs(gateway.relay_index.nodes, gateway.node_cache)
+        self.assertTrue({node.fingerprint for node in path} <= {node.fingerprint for node in gateway.node_cache})
+
+    def test_benchmark_runs(self):
+        result = benchmark_path_selection(relays=300, paths=50)
+        self.assertGreater(result['index_paths_per_second'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
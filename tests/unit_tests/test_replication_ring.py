@@ -0,0 +1,251 @@
+"""
+Unit tests for the replication_ring module and its use in fault_tolerance
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from replication_ring import ConsistentHashRing, HintedHandoffStore, MerkleRangeTree, simulate_churn
+
+try:
+    import aiohttp
+    from aiohttp import web
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+try:
+    from fault_tolerance import FaultToleranceOrchestrator, NodeInfo, NodeStatus
+    FAULT_TOLERANCE_AVAILABLE = True
+except ImportError:
+    FAULT_TOLERANCE_AVAILABLE = False
+
+
+def make_node(node_id, port=0, status=None):
+    return NodeInfo(node_id=node_id, address="127.0.0.1", port=port,
+                    status=status or NodeStatus.HEALTHY, last_heartbeat=0.0,
+                    capabilities={}, load_metrics={})
+
+
+class TestConsistentHashRing(unittest.TestCase):
+    """Test cases for the consistent-hash ring"""
+
+    def test_adding_a_node_moves_about_one_nth_of_keys(self):
+        ring = ConsistentHashRing(vnodes=128)
+        ring.set_nodes(f"node_{i}" for i in range(10))
+        keys = [f"key_{i}" for i in range(5000)]
+        before = {key: ring.primary(key) for key in keys}
+        ring.add_node("node_new")
+        after = {key: ring.primary(key) for key in keys}
+
+        moved = [key for key in keys if before[key] != after[key]]
+        self.assertTrue(all(after[key] == "node_new" for key in moved))
+        self.assertLess(abs(len(moved) / len(keys) - 1 / 11), 0.03)
+
+    def test_preference_list_is_distinct_and_filterable(self):
+        ring = ConsistentHashRing(vnodes=32)
+        ring.set_nodes(["a", "b", "c", "d"])
+        replicas = ring.get_nodes("some-key", 3)
+        self.assertEqual(len(set(replicas)), 3)
+        self.assertEqual(replicas, ring.get_nodes("some-key", 3))
+        self.assertEqual(len(ring.get_nodes("some-key", 10)), 4)
+        self.assertNotIn(replicas[0], ring.get_nodes("some-key", 3, accept=lambda n: n != replicas[0]))
+
+    def test_hints_keep_latest_entry_and_respect_capacity(self):
+        store = HintedHandoffStore(max_hints_per_node=2)
+        self.assertTrue(store.add("n1", "k1", {"v": 1}))
+        self.assertTrue(store.add("n1", "k1", {"v": 2}))
+        self.assertTrue(store.add("n1", "k2", {"v": 1}))
+        self.assertFalse(store.add("n1", "k3", {"v": 1}))
+        self.assertEqual(store.pending("n1")["k1"], {"v": 2})
+        store.discard("n1", "k1")
+        store.discard("n1", "k2")
+        self.assertEqual(store.count(), 0)
+
+
+class TestMerkleRangeTree(unittest.TestCase):
+    """Test cases for the range Merkle tree"""
+
+    def test_identical_trees_exchange_only_the_root(self):
+        a, b = MerkleRangeTree(depth=8), MerkleRangeTree(depth=8)
+        for i in range(1000):
+            a.update(f"k{i}", str(i))
+            b.update(f"k{i}", str(i))
+        self.assertEqual(a.diff(b), ([], 1))
+
+    def test_diff_finds_exactly_the_changed_ranges(self):
+        a, b = MerkleRangeTree(depth=8), MerkleRangeTree(depth=8)
+        for i in range(1000):
+            a.update(f"k{i}", str(i))
+            b.update(f"k{i}", str(i))
+        b.update("k10", "changed")
+        b.remove("k20")
+        b.update("extra", "new")
+
+        leaves, exchanged = a.diff(b)
+        expected = {a.bucket_of(k) for k in ("k10", "k20", "extra")}
+        self.assertEqual(set(leaves), expected)
+        self.assertLess(exchanged, 2 * len(expected) * (a.depth + 1))
+
+
+@unittest.skipIf(not FAULT_TOLERANCE_AVAILABLE, "fault_tolerance components not available")
+class TestDataReplicationManager(unittest.TestCase):
+    """Ring placement, hinted handoff and read repair in DataReplicationManager"""
+
+    def setUp(self):
+        self.system = FaultToleranceOrchestrator("self")
+        self.replication = self.system.replication_manager
+        for i in range(5):
+            self.system.heartbeat_manager.nodes[f"node_{i}"] = make_node(f"node_{i}")
+        self.sent = []
+
+        async def fake_replicate(node_id, key, data_entry):
+            self.sent.append((node_id, key))
+            return True
+
+        self.replication._replicate_to_node = fake_replicate
+
+    def test_write_to_failed_replica_is_hinted_and_delivered_on_recovery(self):
+        replicas = asyncio.run(self.replication._select_replica_nodes("config", False))
+        down = next(n for n in replicas if n != "self")
+        self.system.heartbeat_manager.nodes[down].status = NodeStatus.FAILED
+
+        async def run():
+            self.assertTrue(await self.replication.store_data("config", {"x": 1}))
+            self.assertEqual(self.replication.hints.count(down), 1)
+            self.assertNotIn((down, "config"), self.sent)
+
+            self.system.heartbeat_manager.record_arrival(down)
+            await asyncio.sleep(0.05)
+
+        asyncio.run(run())
+        self.assertIn((down, "config"), self.sent)
+        self.assertEqual(self.replication.hints.count(), 0)
+        self.assertEqual(self.replication.stats["hints_delivered"], 1)
+
+    def test_read_repairs_stale_replicas(self):
+        entries = {}
+
+        async def fake_fetch(node_id, key):
+            return entries.get(node_id)
+
+        self.replication._fetch_from_node = fake_fetch
+        replicas = asyncio.run(self.replication._select_replica_nodes("k", False))
+        remote = [n for n in replicas if n != "self"]
+        old = {"data": "old", "timestamp": 1.0, "version": "a", "checksum": "c-old"}
+        new = {"data": "new", "timestamp": 2.0, "version": "b", "checksum": "c-new"}
+        entries[remote[0]] = new
+        for node_id in remote[1:]:
+            entries[node_id] = old
+
+        async def run():
+            value = await self.replication.read_data("k")
+            await asyncio.sleep(0.05)
+            return value
+
+        self.assertEqual(asyncio.run(run()), "new")
+        repaired = {node_id for node_id, key in self.sent}
+        self.assertEqual(repaired, set(remote[1:]))
+
+
+@unittest.skipIf(not (AIOHTTP_AVAILABLE and FAULT_TOLERANCE_AVAILABLE),
+                 "aiohttp or fault_tolerance not available")
+class TestMerkleAntiEntropy(unittest.TestCase):
+    """Anti-entropy between two replication managers over HTTP"""
+
+    def test_anti_entropy_syncs_only_differing_keys(self):
+        async def run():
+            a = FaultToleranceOrchestrator("node_a")
+            b = FaultToleranceOrchestrator("node_b")
+            rep_a, rep_b = a.replication_manager, b.replication_manager
+            rep_a.replication_factor = rep_b.replication_factor = 2
+
+            app = web.Application()
+            rep_b.add_routes(app)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+
+            a.heartbeat_manager.nodes["node_b"] = make_node("node_b", port)
+            b.heartbeat_manager.nodes["node_a"] = make_node("node_a")
+            rep_b._sync_ring()
+
+            try:
+                # Both nodes hold the same 500 keys, then diverge on a few
+                for i in range(500):
+                    entry = {"data": i, "timestamp": 1.0, "version": "v1",
+                             "checksum": rep_a._calculate_checksum(i)}
+                    rep_a.apply_replica(f"k{i}", dict(entry))
+                    rep_b.apply_replica(f"k{i}", dict(entry))
+                rep_a.apply_replica("k1", {"data": "a", "timestamp": 2.0, "version": "v2",
+                                           "checksum": rep_a._calculate_checksum("a")})
+                rep_b.apply_replica("k2", {"data": "b", "timestamp": 2.0, "version": "v2",
+                                           "checksum": rep_b._calculate_checksum("b")})
+                rep_b.apply_replica("only_b", {"data": "x", "timestamp": 2.0, "version": "v2",
+                                               "checksum": rep_b._calculate_checksum("x")})
+
+                result = await rep_a.run_anti_entropy("node_b")
+                second = await rep_a.run_anti_entropy("node_b")
+            finally:
+                await a.heartbeat_manager.stop_heartbeat_service()
+                await runner.cleanup()
+            return rep_a, rep_b, result, second
+
+        rep_a, rep_b, result, second = asyncio.run(run())
+        self.assertEqual(result["keys_pushed"], 1)
+        self.assertEqual(result["keys_pulled"], 2)
+        self.assertLessEqual(result["ranges"], 3)
+        self.assertEqual(rep_b.data_store["k1"]["data"], "a")
+        self.assertEqual(rep_a.data_store["k2"]["data"], "b")
+        self.assertEqual(rep_a.data_store["only_b"]["data"], "x")
+        self.assertEqual(second["ranges"], 0)
+
+    def test_handlers_reject_malformed_requests(self):
+        async def run():
+            b = FaultToleranceOrchestrator("node_b")
+            app = web.Application()
+            b.replication_manager.add_routes(app)
+            runner = web.AppRunner(app)
+            await runner.setup()
+            site = web.TCPSite(runner, "127.0.0.1", 0)
+            await site.start()
+            port = site._server.sockets[0].getsockname()[1]
+            statuses = []
+            try:
+                async with aiohttp.ClientSession() as session:
+                    for path, body in (("/replicate", {"key": "k", "data_entry": {"data": 1}}),
+                                       ("/replicate", ["not", "an", "object"]),
+                                       ("/merkle", {"peer": "node_a", "level": 0, "indices": [-1]}),
+                                       ("/merkle", {"peer": "node_a", "level": 99, "indices": [0]}),
+                                       ("/merkle/range", {"peer": "node_a"}),
+                                       ("/replicate/get", {"key": "missing"})):
+                        async with session.post(f"http://127.0.0.1:{port}{path}", json=body) as response:
+                            statuses.append(response.status)
+            finally:
+                await runner.cleanup()
+            return statuses
+
+        self.assertEqual(asyncio.run(run()), [400, 400, 400, 400, 400, 200])
+
+
+class TestChurnSimulation(unittest.TestCase):
+    """The churn simulation reports placement stability and repair savings"""
+
+    def test_simulation(self):
+        result = simulate_churn(num_nodes=12, num_keys=3000, churn_events=4,
+                                writes_during_outage=20, vnodes=64, seed=3)
+        self.assertLess(result["ring_moved_fraction"], 2 * result["ideal_moved_fraction"])
+        self.assertGreater(result["modulo_moved_fraction"], 0.5)
+        self.assertEqual(result["keys_transferred"], result["missed_writes"])
+        self.assertLess(result["repair_bytes_merkle"], result["repair_bytes_full_sync"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Unit tests for the server_startup module used by the Metatron web server
+"""
+
+import unittest
+import os
+import sys
+import threading
+
+# Add the Metatron-ConscienceAI directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Metatron-ConscienceAI'))
+
+from scripts.server_startup import LazyModule, ModelLoader
+
+
+class TestLazyModule(unittest.TestCase):
+    """Test cases for deferred module proxies"""
+
+    def test_imports_on_first_attribute_access(self):
+        proxy = LazyModule("colorsys")
+        self.assertTrue(proxy.available)
+        self.assertFalse(proxy.loaded)
+        self.assertEqual(proxy.rgb_to_hsv(1.0, 0.0, 0.0), (0.0, 1.0, 1.0))
+        self.assertTrue(proxy.loaded)
+
+    def test_missing_module(self):
+        proxy = LazyModule("metatron_missing_module")
+        self.assertFalse(proxy.available)
+        with self.assertRaises(ImportError):
+            proxy.anything
+
+
+class TestModelLoader(unittest.TestCase):
+    """Test cases for background model loading"""
+
+    def setUp(self):
+        self.release = threading.Event()
+
+    def fake_load(self, model_name, report):
+        report("weights", 0.5)
+        self.release.wait(5)
+        if model_name == "broken":
+            raise OSError("no such model")
+        return "model-" + model_name, "tokenizer", "cpu"
+
+    def test_background_load_reports_progress(self):
+        loader = ModelLoader(load_fn=self.fake_load, requirements=())
+        self.assertTrue(loader.start("tiny"))
+        self.assertFalse(loader.start("tiny"))  # already loading
+        status = loader.status()
+        self.assertEqual(status["state"], "loading")
+        self.assertEqual(status["loading_model"], "tiny")
+        self.assertIsNone(loader.components())
+        self.release.set()
+        self.assertTrue(loader.wait(5))
+        self.assertEqual(loader.components(), ("model-tiny", "tokenizer", "cpu"))
+        status = loader.status()
+        self.assertEqual((status["state"], status["model"], status["progress"]), ("ready", "tiny", 1.0))
+        self.assertFalse(loader.start("tiny"))  # already loaded
+
+    def test_repeated_start_during_slow_load_queues_once(self):
+        loads = []
+
+        def counting_load(model_name, report):
+            loads.append(model_name)
+            return self.fake_load(model_name, report)
+
+        loader = ModelLoader(load_fn=counting_load, requirements=())
+        self.assertTrue(loader.start("a"))
+        self.assertTrue(loader.start("b"))
+        for _ in range(5):
+            self.assertFalse(loader.start("a"))
+            self.assertFalse(loader.start("b"))
+        self.assertEqual(loader.status()["queued_models"], ["b"])
+        self.release.set()
+        self.assertTrue(loader.wait(5))
+        self.assertEqual(loads, ["a", "b"])
+        self.assertTrue(loader.has_model("b"))
+        self.assertEqual(loader.status()["queued_models"], [])
+
+    def test_failed_switch_keeps_previous_model(self):
+        self.release.set()
+        loader = ModelLoader(load_fn=self.fake_load, requirements=())
+        self.assertTrue(loader.load("tiny"))
+        loader.start("broken")
+        self.assertFalse(loader.wait(5))
+        self.assertEqual(loader.state, "failed")
+        self.assertIn("no such model", loader.status()["error"])
+        self.assertTrue(loader.has_model("tiny"))
+
+    def test_unavailable_requirements(self):
+        loader = ModelLoader(load_fn=self.fake_load, requirements=(LazyModule("metatron_missing_module"),))
+        self.assertFalse(loader.available())
+        self.assertEqual(loader.status()["state"], "unavailable")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Unit tests for the stake_sampling module and its use in blockchain_integration
+"""
+
+import unittest
+import os
+import random
+import sys
+from collections import Counter
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from stake_sampling import FenwickTree, StakeSampler, derive_seed, benchmark_sampling
+
+try:
+    from blockchain_integration import ProofOfStakeValidator, StakeStatus
+    BLOCKCHAIN_AVAILABLE = True
+except ImportError:
+    BLOCKCHAIN_AVAILABLE = False
+
+
+class TestFenwickTree(unittest.TestCase):
+    """Test cases for the Fenwick tree"""
+
+    def test_find_matches_linear_scan(self):
+        rng = random.Random(1)
+        tree = FenwickTree(4)
+        tree.grow(37)
+        weights = [rng.randrange(0, 5) for _ in range(37)]
+        for i, w in enumerate(weights):
+            tree.set(i, w)
+        self.assertEqual(tree.total(), sum(weights))
+        for target in range(sum(weights)):
+            expected, acc = None, 0
+            for i, w in enumerate(weights):
+                acc += w
+                if acc > target:
+                    expected = i
+                    break
+            self.assertEqual(tree.find(target), expected)
+
+
+class TestStakeSampler(unittest.TestCase):
+    """Test cases for stake-weighted sampling"""
+
+    def test_selection_frequency_matches_stake_share(self):
+        sampler = StakeSampler()
+        stakes = {f"v{i}": 1000.0 * (i + 1) for i in range(20)}
+        for validator_id, stake in stakes.items():
+            sampler.set_stake(validator_id, stake)
+
+        draws = 40000
+        counts = Counter(sampler.select(derive_seed("ab" * 32, height)) for height in range(draws))
+        total = sum(stakes.values())
+        chi_square = sum(
+            (counts[v] - draws * s / total) ** 2 / (draws * s / total) for v, s in stakes.items()
+        )
+        # Critical value for 19 degrees of freedom at p = 0.001
+        self.assertLess(chi_square, 43.82)
+
+    def test_selection_is_deterministic_for_a_seed(self):
+        a, b = StakeSampler(), StakeSampler()
+        for i in range(50):
+            a.set_stake(f"v{i}", 1000 + i)
+            b.set_stake(f"v{i}", 1000 + i)
+        for height in range(100):
+            seed = derive_seed("prev_hash", height)
+            self.assertEqual(a.select(seed), b.select(seed))
+
+    def test_removed_and_zero_stake_are_never_selected(self):
+        sampler = StakeSampler(initial_capacity=2)
+        for i in range(10):
+            sampler.set_stake(f"v{i}", 1000.0)
+        sampler.remove("v3")
+        sampler.set_stake("v5", 0)
+        picks = {sampler.select(derive_seed("x", h)) for h in range(2000)}
+        self.assertNotIn("v3", picks)
+        self.assertNotIn("v5", picks)
+        self.assertEqual(len(picks), 8)
+        self.assertAlmostEqual(sampler.total_stake(), 8000.0)
+
+    def test_committee_is_distinct_and_restores_weights(self):
+        sampler = StakeSampler()
+        for i in range(30):
+            sampler.set_stake(f"v{i}", 1000.0 + i)
+        total = sampler.total_stake()
+        committee = sampler.committee(derive_seed("h", 1, "committee"), 10)
+        self.assertEqual(len(set(committee)), 10)
+        self.assertEqual(sampler.total_stake(), total)
+        self.assertEqual(len(sampler.committee(b"seed", 100)), 30)
+
+    def test_benchmark_runs(self):
+        result = benchmark_sampling(validators=2000, selections=200, updates=200,
+                                    committee_size=8, legacy_selections=5)
+        self.assertGreater(result["selections_per_second"], result["legacy_selections_per_second"])
+
+
+@unittest.skipIf(not BLOCKCHAIN_AVAILABLE, "blockchain_integration components not available")
+class TestProofOfStakeSelection(unittest.TestCase):
+    """ProofOfStakeValidator keeps the sampler in sync with stake changes"""
+
+    def setUp(self):
+        self.pos = ProofOfStakeValidator("node")
+        for i in range(5):
+            self.pos.register_validator(f"v{i}", 2000.0)
+
+    def test_nodes_agree_on_validator_for_previous_hash(self):
+        other = ProofOfStakeValidator("other")
+        for i in range(5):
+            other.register_validator(f"v{i}", 2000.0)
+        for height in range(20):
+            chosen = self.pos.select_validator(height, "f" * 64)
+            self.assertEqual(chosen, other.select_validator(height, "f" * 64))
+            self.assertTrue(other.verify_validator_selection(chosen, height, "f" * 64))
+
+    def test_slashed_and_unstaked_validators_are_excluded(self):
+        self.pos.slash_validator("v0", 1500.0)
+        self.assertEqual(self.pos.validators["v0"].status, StakeStatus.SLASHED)
+        self.assertTrue(self.pos.unstake_validator("v1"))
+        self.assertTrue(self.pos.add_stake("v2", 10000.0))
+        self.assertAlmostEqual(self.pos.total_stake, 500.0 + 12000.0 + 2000.0 * 2)
+
+        picks = Counter(self.pos.select_validator(h, "a" * 64) for h in range(2000))
+        self.assertNotIn("v0", picks)
+        self.assertNotIn("v1", picks)
+        self.assertGreater(picks["v2"], picks["v3"] * 3)
+
+        committee = self.pos.select_committee(10, "a" * 64, 5)
+        self.assertEqual(sorted(committee), ["v2", "v3", "v4"])
+
+    def test_status_changed_outside_api_is_resynced(self):
+        for i in range(4):
+            self.pos.validators[f"v{i}"].status = StakeStatus.LOCKED
+        self.assertEqual(self.pos.select_validator(1, "b" * 64), "v4")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+Unit tests for the state_stream module used by the Metatron /ws feed
+"""
+
+import unittest
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+# Add the Metatron-ConscienceAI directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Metatron-ConscienceAI'))
+
+from scripts.state_stream import (FIELD_NAMES, StateStreamDecoder, StateStreamEncoder, StreamOptions,
+                                  SyntheticStateSource, benchmark_stream, build_json_payload, flatten_state)
+
+
+def decode_all(encoder, decoder, messages):
+    result = None
+    for message in messages:
+        if isinstance(message, bytes):
+            result = decoder.decode(message)
+        else:
+            decoder.handle_text(message)
+    return result
+
+
+class TestStateStream(unittest.TestCase):
+    """Test cases for keyframe/delta encoding"""
+
+    def test_decoded_state_tracks_source_within_quantum(self):
+        source = SyntheticStateSource(seed=3)
+        encoder = StateStreamEncoder(keyframe_interval=25)
+        decoder = StateStreamDecoder(json.loads(json.dumps(encoder.schema())))
+        for _ in range(200):
+            state = source.update_system()
+            sim_time, values = decode_all(encoder, decoder, encoder.encode(state))
+            expected = flatten_state(state)
+            self.assertAlmostEqual(sim_time, state["time"])
+            for name in FIELD_NAMES:
+                diff = values[name] - expected[name]
+                if name == "phase":
+                    diff = (diff + math.pi) % (2 * math.pi) - math.pi
+                # float32 keyframe rounding plus half a quantum
+                self.assertLess(np.abs(diff).max(), 1e-3, name)
+        self.assertEqual(decoder.state_label, state["global"]["state_classification"])
+        self.assertGreater(encoder.stats["deltas"], encoder.stats["keyframes"] * 10)
+
+    def test_deltas_are_smaller_than_json(self):
+        source = SyntheticStateSource(seed=1)
+        encoder = StateStreamEncoder()
+        encoder.encode(source.update_system())
+        state = source.update_system()
+        delta = [m for m in encoder.encode(state) if isinstance(m, bytes)][0]
+        self.assertLess(len(delta) * 5, len(json.dumps(build_json_payload(state))))
+
+    def test_large_jump_falls_back_to_keyframe(self):
+        source = SyntheticStateSource()
+        encoder = StateStreamEncoder(fields=("amplitude",))
+        encoder.encode(source.update_system())
+        source.amplitude += 10.0
+        frame = encoder.encode(source.update_system())[-1]
+        self.assertEqual(frame[0], 1)
+        self.assertEqual(len(frame), 16 + 4 * 13)
+
+    def test_options_from_query(self):
+        options = StreamOptions.from_query({"format": "binary", "fields": "phase,bogus,amplitude", "rate": "10"})
+        self.assertTrue(options.binary)
+        self.assertEqual(options.fields, ("phase", "amplitude"))
+        self.assertEqual(options.decimation, 4)
+        self.assertFalse(StreamOptions.from_query({}).binary)
+
+    def test_benchmark_runs(self):
+        results = benchmark_stream(frames=200)
+        self.assertLess(results["binary_all"]["bytes_per_second"], results["json"]["bytes_per_second"])
+
+
+if __name__ == '__main__':
+    unittest.main()
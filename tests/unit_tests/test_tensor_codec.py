@@ -0,0 +1,194 @@
+"""
+Unit tests for the tensor_codec module and its use in distributed_learning
+"""
+
+import unittest
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+
+import numpy as np
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from tensor_codec import (UpdateCodec, encode_tensor, pack_tensors, unpack_tensors, unpack_update,
+                          apply_delta, benchmark_codec, INT8, FP16)
+
+
+def rewrite_header(payload, change):
+    """Re-encode a container's JSON header, keeping its buffer region untouched"""
+    magic, version, length = struct.unpack_from("<4sBI", payload)
+    header = json.loads(payload[9:9 + length])
+    change(header["tensors"][0])
+    encoded = json.dumps(header).encode()
+    return (struct.pack("<4sBI", magic, version, len(encoded)) + encoded
+            + bytes(-(9 + len(encoded)) % 64) + payload[9 + length + (-(9 + length) % 64):])
+
+
+try:
+    from distributed_learning import (DistributedLearningCoordinator, ModelUpdate, TrainingRound,
+                                      LearningPhase, AggregationMethod, encode_model_update,
+                                      decode_model_update)
+    DISTRIBUTED_LEARNING_AVAILABLE = True
+except ImportError:
+    DISTRIBUTED_LEARNING_AVAILABLE = False
+
+
+class TestTensorContainer(unittest.TestCase):
+    """Test cases for the binary tensor container"""
+
+    def test_round_trip_is_exact_and_zero_copy(self):
+        rng = np.random.default_rng(0)
+        tensors = {
+            "dense": rng.normal(size=(7, 3)).astype(np.float32),
+            "vector": np.arange(5, dtype=np.float64),
+            "scalar": np.array(2.5, dtype=np.float32),
+        }
+        payload = pack_tensors(tensors, {"round": 3})
+        meta, decoded = unpack_tensors(payload)
+        self.assertEqual(meta, {"round": 3})
+        for name, tensor in tensors.items():
+            restored = decoded[name].to_dense()
+            self.assertEqual(restored.dtype, tensor.dtype)
+            np.testing.assert_array_equal(restored, tensor)
+        self.assertFalse(decoded["dense"].values.flags.owndata)
+        self.assertEqual(decoded["dense"].values.ctypes.data % 64,
+                         np.frombuffer(payload, np.uint8).ctypes.data % 64)
+
+    def test_rejects_foreign_payload(self):
+        with self.assertRaises(ValueError):
+            unpack_tensors(b"PKL\x00" + b"\x00" * 16)
+
+    def test_rejects_truncated_payload(self):
+        payload = pack_tensors({"t": np.arange(4, dtype=np.float32)})
+        for truncated in (b"", payload[:5], payload[:12]):
+            with self.assertRaises(ValueError):
+                unpack_tensors(truncated)
+
+    def test_rejects_inconsistent_headers(self):
+        tensor = np.arange(40, dtype=np.float32).reshape(8, 5)
+        dense = pack_tensors({"t": tensor})
+        sparse = pack_tensors({"t": encode_tensor(tensor, top_k_ratio=0.25)})
+        self.assertEqual(len(unpack_tensors(rewrite_header(sparse, lambda entry: None))[1]["t"].indices), 10)
+
+        def set_key(key, value):
+            return lambda entry: entry.__setitem__(key, value)
+
+        def set_buffer(kind, key, value):
+            return lambda entry: entry["buffers"][kind].__setitem__(key, value)
+
+        tampered = [
+            (dense, set_key("shape", [9, 5])),                    # dense count does not match the shape
+            (dense, set_key("dtype", "|O")),
+            (dense, set_key("encoding", "pickle")),
+            (dense, set_buffer("values", "dtype", "<f8")),
+            (dense, set_buffer("values", "offset", 10 ** 9)),
+            (sparse, set_key("shape", [2, 5])),                   # indices beyond prod(shape)
+            (sparse, set_buffer("indices", "count", 9)),          # fewer indices than values
+            (sparse, set_buffer("indices", "dtype", "<i8")),
+            (sparse, lambda entry: entry.pop("scale")),
+        ]
+        for payload, change in tampered:
+            with self.assertRaises(ValueError):
+                unpack_tensors(rewrite_header(payload, change))
+
+    def test_quantized_and_sparse_tensors(self):
+        rng = np.random.default_rng(1)
+        tensor = rng.normal(size=(50, 20)).astype(np.float32)
+        for quantization, tolerance in ((INT8, np.abs(tensor).max() / 127), (FP16, 1e-2)):
+            item = unpack_tensors(pack_tensors({"t": encode_tensor(tensor, quantization)}))[1]["t"]
+            self.assertLessEqual(np.abs(item.to_dense() - tensor).max(), tolerance)
+
+        sparse = encode_tensor(tensor, top_k_ratio=0.05)
+        self.assertEqual(len(sparse.indices), 50)
+        kept = np.sort(np.abs(tensor).ravel())[-50:]
+        np.testing.assert_array_equal(np.sort(np.abs(sparse.values)), kept)
+
+        out = np.ones_like(tensor)
+        sparse.accumulate_into(out, 0.5)
+        np.testing.assert_allclose(out, 1 + 0.5 * sparse.to_dense())
+
+
+class TestUpdateCodec(unittest.TestCase):
+    """Error feedback keeps every coordinate, only delayed"""
+
+    def test_residuals_carry_untransmitted_mass(self):
+        rng = np.random.default_rng(2)
+        codec = UpdateCodec(quantization=INT8, top_k_ratio=0.1)
+        gradient = rng.normal(size=200).astype(np.float32)
+        sent = np.zeros_like(gradient)
+        for _ in range(5):
+            sent += codec.encode({"g": gradient})["g"].to_dense()
+        # What was sent plus what is still pending equals what was produced
+        np.testing.assert_allclose(sent + codec.residuals["g"], 5 * gradient, atol=1e-4)
+
+    def test_weights_travel_as_delta_from_global_model(self):
+        rng = np.random.default_rng(3)
+        global_weights = {"w": rng.normal(size=(4, 4)).astype(np.float32)}
+        weights = {"w": global_weights["w"] + 0.01}
+        payload = UpdateCodec(quantization=FP16).encode_update(
+            {"w": np.zeros((4, 4), np.float32)}, {"n": 1}, weights, global_weights)
+        meta, gradients, deltas = unpack_update(payload)
+        self.assertEqual(meta, {"n": 1})
+        np.testing.assert_allclose(apply_delta(global_weights, deltas)["w"], weights["w"], atol=1e-4)
+
+    def test_benchmark_runs(self):
+        results = benchmark_codec(rounds=5, clients=2, features=16, outputs=4, samples=32)
+        self.assertLess(results["int8"]["bytes_per_round"], results["float32"]["bytes_per_round"])
+        self.assertLess(results["float32"]["bytes_per_round"], results["legacy_pickle"]["bytes_per_round"])
+
+
+@unittest.skipIf(not DISTRIBUTED_LEARNING_AVAILABLE, "distributed_learning components not available")
+class TestCoordinatorIntegration(unittest.TestCase):
+    """Aggregation consumes the compressed form directly"""
+
+    def make_update(self, node_id, gradient, data_size):
+        return ModelUpdate(node_id=node_id, model_id="m", update_id=f"u_{node_id}",
+                           gradients={"layer": gradient}, weights={}, metadata={"k": 1},
+                           timestamp=time.time(), local_epochs=1, data_size=data_size,
+                           loss=0.5, accuracy=0.8)
+
+    def test_federated_averaging_over_encoded_updates(self):
+        coordinator = DistributedLearningCoordinator("coord", {})
+        rng = np.random.default_rng(4)
+        dense_updates = [self.make_update(f"n{i}", rng.normal(size=(8, 8)).astype(np.float32), 100 * (i + 1))
+                         for i in range(3)]
+        expected = coordinator._federated_averaging(dense_updates)["layer"]
+
+        codec = UpdateCodec(quantization=INT8, top_k_ratio=0.5)
+        encoded_updates = [decode_model_update(encode_model_update(u, codec)) for u in dense_updates]
+        self.assertEqual(encoded_updates[0].gradients, {})
+        self.assertEqual(encoded_updates[0].metadata, {"k": 1})
+        result = coordinator._federated_averaging(encoded_updates)["layer"]
+
+        reference = sum(
+            (u.data_size / 600) * e.encoded_gradients["layer"].to_dense()
+            for u, e in zip(dense_updates, encoded_updates)
+        )
+        np.testing.assert_allclose(result, reference, rtol=1e-5, atol=1e-6)
+        self.assertLess(np.linalg.norm(result - expected), np.linalg.norm(expected))
+
+    def test_receive_encoded_update(self):
+        coordinator = DistributedLearningCoordinator("coord", {})
+        coordinator.current_round = TrainingRound(
+            round_id="r1", global_model_version="v1", participating_nodes={"n0", "n1"},
+            start_time=time.time(), end_time=None, phase=LearningPhase.LOCAL_TRAINING,
+            aggregation_method=AggregationMethod.FEDERATED_AVERAGING, updates_received={},
+            aggregated_model=None, performance_metrics={})
+        payload = encode_model_update(self.make_update("n0", np.ones((4, 4), np.float32), 10),
+                                      UpdateCodec(quantization=FP16))
+        self.assertTrue(asyncio.run(coordinator.receive_encoded_update(payload)))
+        self.assertIn("n0", coordinator.current_round.updates_received)
+        self.assertFalse(asyncio.run(coordinator.receive_encoded_update(b"garbage" * 4)))
+
+        model = {"layer": np.arange(6, dtype=np.float32).reshape(2, 3)}
+        restored = coordinator._deserialize_model(coordinator._serialize_model(model))
+        np.testing.assert_array_equal(restored["layer"], model["layer"])
+
+
+if __name__ == '__main__':
+    unittest.main()
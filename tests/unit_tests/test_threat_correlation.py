@@ -0,0 +1,126 @@
+"""
+Unit tests for the threat_correlation module and its use in security_protocols
+"""
+
+import unittest
+import os
+import sys
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from threat_correlation import (AhoCorasick, CompiledIndicators, ThreatCorrelator, BoundedEventStore,
+                                DEFAULT_THREAT_PATTERNS, replay_benchmark)
+
+try:
+    from security_protocols import IntrusionDetectionSystem
+    SECURITY_PROTOCOLS_AVAILABLE = True
+except ImportError:
+    SECURITY_PROTOCOLS_AVAILABLE = False
+
+
+def legacy_match(event_type, additional_data, config):
+    """Matching rule of the original IntrusionDetectionSystem._event_matches_pattern"""
+    indicators = config.get("indicators", [])
+    return any(i in event_type for i in indicators) or any(i in additional_data for i in indicators)
+
+
+class TestCompiledIndicators(unittest.TestCase):
+    """Test cases for the compiled indicator matcher"""
+
+    def test_aho_corasick_finds_overlapping_patterns(self):
+        automaton = AhoCorasick(["he", "she", "his", "hers"])
+        self.assertEqual(automaton.find_all("ushers"), {"he", "she", "hers"})
+        self.assertEqual(automaton.find_all("nothing"), set())
+
+    def test_matches_agree_with_legacy_rule(self):
+        indicators = CompiledIndicators(DEFAULT_THREAT_PATTERNS)
+        cases = [
+            ("multiple_failed_logins", {}),
+            ("x_high_request_rate_y", {}),
+            ("login", {"rapid_requests": 1, "large_data_transfer": 1}),
+            ("unauthorized_access_permission_changes", {}),
+            ("heartbeat_ok", {"bytes": 1}),
+            ("rapid", {"rapid": 1}),
+        ]
+        for event_type, data in cases:
+            expected = {name for name, config in DEFAULT_THREAT_PATTERNS.items()
+                        if legacy_match(event_type, data, config)}
+            self.assertEqual(indicators.match(event_type, data), expected, event_type)
+
+
+class TestThreatCorrelator(unittest.TestCase):
+    """Test cases for the sliding-window correlator"""
+
+    def test_fires_when_threshold_is_crossed_inside_window(self):
+        correlator = ThreatCorrelator(DEFAULT_THREAT_PATTERNS)
+        for i in range(4):
+            self.assertEqual(correlator.observe("n1", "multiple_failed_logins", {}, 100.0 + i, f"e{i}"), [])
+        detections = correlator.observe("n1", "multiple_failed_logins", {}, 104.0, "e4")
+        self.assertEqual(len(detections), 1)
+        self.assertEqual(detections[0].pattern_name, "brute_force")
+        self.assertEqual(detections[0].event_ids, ["e0", "e1", "e2", "e3", "e4"])
+        # The window is reset after firing
+        self.assertEqual(correlator.observe("n1", "multiple_failed_logins", {}, 105.0, "e5"), [])
+
+    def test_events_outside_window_do_not_count(self):
+        correlator = ThreatCorrelator(DEFAULT_THREAT_PATTERNS)
+        for i in range(4):
+            correlator.observe("n1", "rapid_requests", {}, float(i), f"old{i}")
+        self.assertEqual(correlator.observe("n1", "rapid_requests", {}, 1000.0, "late"), [])
+        self.assertEqual(correlator.window_count("brute_force", "n1", 1000.0), 1)
+
+    def test_counters_are_per_node(self):
+        correlator = ThreatCorrelator(DEFAULT_THREAT_PATTERNS)
+        for i in range(4):
+            correlator.observe("n1", "multiple_failed_logins", {}, float(i))
+            correlator.observe("n2", "multiple_failed_logins", {}, float(i))
+        detections = correlator.observe("n2", "multiple_failed_logins", {}, 5.0)
+        self.assertEqual([d.node_id for d in detections], ["n2"])
+        self.assertEqual(correlator.window_count("brute_force", "n1", 5.0), 4)
+
+    def test_expired_windows_are_evicted(self):
+        correlator = ThreatCorrelator(DEFAULT_THREAT_PATTERNS)
+        correlator.observe("n1", "high_request_rate", {}, 0.0)
+        correlator.observe("n2", "large_data_transfer", {}, 0.0)
+        correlator.evict_expired(120.0)
+        self.assertEqual(list(correlator.windows), [("data_exfiltration", "n2")])
+
+    def test_replay_benchmark_runs(self):
+        result = replay_benchmark(events=20000, nodes=100, legacy_sample=2000)
+        self.assertGreater(result["detections"], 0)
+        self.assertGreater(result["events_per_second"], 0)
+
+
+class TestBoundedEventStore(unittest.TestCase):
+    """Test cases for the bounded event store"""
+
+    def test_retention_and_capacity(self):
+        class Event:
+            def __init__(self, timestamp):
+                self.timestamp = timestamp
+
+        store = BoundedEventStore(retention=10.0, max_events=5)
+        for t in range(8):
+            store.append(Event(float(t)))
+        self.assertEqual([e.timestamp for e in store], [3.0, 4.0, 5.0, 6.0, 7.0])
+        store.append(Event(15.0))
+        self.assertEqual([e.timestamp for e in store], [5.0, 6.0, 7.0, 15.0])
+
+
+@unittest.skipIf(not SECURITY_PROTOCOLS_AVAILABLE, "security_protocols components not available")
+class TestIntrusionDetectionSystem(unittest.TestCase):
+    """The IDS raises pattern events as soon as a threshold is crossed"""
+
+    def test_pattern_detected_without_running_loop(self):
+        ids = IntrusionDetectionSystem()
+        for _ in range(5):
+            ids.record_security_event("node_x", "multiple_failed_logins", "failed login")
+        patterns = [e for e in ids.security_events if e.event_type == "pattern_detected_brute_force"]
+        self.assertEqual(len(patterns), 1)
+        self.assertEqual(patterns[0].additional_data["source_node"], "node_x")
+        self.assertEqual(patterns[0].additional_data["event_count"], 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
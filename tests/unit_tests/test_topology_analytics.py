@@ -0,0 +1,152 @@
+"""
+Unit tests for the topology_analytics module
+"""
+
+import unittest
+import asyncio
+import os
+import random
+import sys
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from topology_analytics import (
+    TopologyAnalytics, UnionFind, bfs_distances, estimate_path_metrics,
+    find_articulation_points_and_bridges
+)
+
+
+def random_graph(n, edges, seed):
+    rng = random.Random(seed)
+    graph = {str(i): set() for i in range(n)}
+    for _ in range(edges):
+        a, b = str(rng.randrange(n)), str(rng.randrange(n))
+        if a != b:
+            graph[a].add(b)
+            graph[b].add(a)
+    return graph
+
+
+def count_components(graph):
+    seen, count = set(), 0
+    for node in graph:
+        if node in seen:
+            continue
+        count += 1
+        seen.update(bfs_distances(graph, node))
+    return count
+
+
+def brute_force_articulation_points(graph):
+    base = count_components(graph)
+    points = set()
+    for node in graph:
+        reduced = {n: nbrs - {node} for n, nbrs in graph.items() if n != node}
+        if count_components(reduced) > base:
+            points.add(node)
+    return points
+
+
+def brute_force_bridges(graph):
+    base = count_components(graph)
+    bridges = set()
+    for a in graph:
+        for b in graph[a]:
+            if a < b:
+                reduced = {n: set(nbrs) for n, nbrs in graph.items()}
+                reduced[a].discard(b)
+                reduced[b].discard(a)
+                if count_components(reduced) > base:
+                    bridges.add((a, b))
+    return bridges
+
+
+class TestTopologyAnalytics(unittest.TestCase):
+    """Test cases for articulation points, union-find and sampled path metrics"""
+
+    def test_articulation_points_match_brute_force(self):
+        """Tarjan results match node/edge removal on random graphs"""
+        for seed in range(30):
+            graph = random_graph(25, 30, seed)
+            points, bridges = find_articulation_points_and_bridges(graph)
+            self.assertEqual(points, brute_force_articulation_points(graph))
+            self.assertEqual({tuple(sorted(e)) for e in bridges}, brute_force_bridges(graph))
+
+    def test_long_chain_has_no_recursion_limit(self):
+        """A 5000-node chain is analysed without hitting the recursion limit"""
+        n = 5000
+        graph = {str(i): set() for i in range(n)}
+        for i in range(n - 1):
+            graph[str(i)].add(str(i + 1))
+            graph[str(i + 1)].add(str(i))
+        points, bridges = find_articulation_points_and_bridges(graph)
+        self.assertEqual(len(points), n - 2)
+        self.assertEqual(len(bridges), n - 1)
+
+    def test_union_find_tracks_components_incrementally(self):
+        """Edge additions merge components; removals trigger a lazy rebuild"""
+        analytics = TopologyAnalytics()
+        for i in range(10):
+            analytics.add_node(str(i))
+        self.assertEqual(analytics.component_count(), 10)
+        analytics.add_edges([("0", "1"), ("1", "2"), ("3", "4")])
+        self.assertEqual(analytics.component_count(), 7)
+        self.assertTrue(analytics.connected("0", "2"))
+        analytics.remove_edge("1", "2")
+        self.assertEqual(analytics.component_count(), 8)
+        self.assertFalse(analytics.connected("0", "2"))
+        analytics.remove_node("4")
+        self.assertEqual(analytics.component_count(), 8)
+
+    def test_union_find_sizes(self):
+        uf = UnionFind()
+        for a, b in [("a", "b"), ("b", "c"), ("d", "e")]:
+            uf.union(a, b)
+        self.assertEqual(uf.components, 2)
+        self.assertEqual(uf.component_size("c"), 3)
+        self.assertFalse(uf.union("a", "c"))
+
+    def test_small_graph_path_metrics_are_exact(self):
+        graph = {"a": {"b"}, "b": {"a", "c"}, "c": {"b", "d"}, "d": {"c"}}
+        estimate = estimate_path_metrics(graph, sample_size=64)
+        self.assertTrue(estimate.exact)
+        self.assertEqual(estimate.diameter, 3)
+        self.assertAlmostEqual(estimate.average_path_length, 10 / 6)
+        self.assertEqual(estimate.average_path_length_error, 0.0)
+
+    def test_sampled_path_metrics_bound_true_values(self):
+        """Sampled estimates on a 1200-peer mesh bracket the exact values"""
+        graph = random_graph(1200, 3600, seed=7)
+        exact = estimate_path_metrics(graph, sample_size=len(graph))
+        estimate = estimate_path_metrics(graph, sample_size=64, seed=1)
+        self.assertFalse(estimate.exact)
+        self.assertLessEqual(estimate.diameter_lower_bound, exact.diameter)
+        self.assertGreaterEqual(estimate.diameter_upper_bound, exact.diameter)
+        self.assertLess(abs(estimate.average_path_length - exact.average_path_length),
+                        max(3 * estimate.average_path_length_error, 0.05))
+
+    def test_topology_manager_uses_analytics(self):
+        """NetworkTopologyManager reports articulation points on a large mesh"""
+        try:
+            from p2p_network import NetworkTopologyManager
+        except ImportError:
+            self.skipTest("P2P network components not available")
+
+        manager = NetworkTopologyManager("node_0")
+        connections = {f"ring_{i}": [f"ring_{(i + 1) % 2000}"] for i in range(2000)}
+        connections["ring_0"].append("leaf")
+        manager.update_peer_connections(connections)
+
+        topology = asyncio.run(manager.analyze_topology())
+        self.assertEqual(topology.total_nodes, 2001)
+        self.assertIn("ring_0", topology.critical_nodes)
+        self.assertEqual(topology.connected_components, 1)
+        self.assertLessEqual(topology.network_diameter, topology.diameter_upper_bound)
+
+        manager.remove_peer_connection("ring_0", "leaf")
+        self.assertEqual(manager.analytics.component_count(), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,242 @@
+"""
+Unit tests for the tor_circuit_pool module and its use in TorGateway
+"""
+
+import unittest
+import asyncio
+import os
+import struct
+import sys
+
+# Add the Open-A.G.I directory to the path so we can import the module
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'Open-A.G.I'))
+
+from tor_circuit_pool import (AIOHTTP_SOCKS_AVAILABLE, CircuitPool, FakeTorController, benchmark_circuit_pool,
+                              direct_session_factory, socks_session_factory)
+from tor_integration import SecurityLevel, TorGateway
+
+try:
+    from aiohttp import web
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+
+async def start_receiver():
+    """Local HTTP server standing in for the onion service"""
+    received = []
+
+    async def receive(request):
+        received.append(await request.read())
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_post('/message', receive)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    return runner, site._server.sockets[0].getsockname()[1], received
+
+
+async def start_socks_standin(usernames, controller=None):
+    """Minimal SOCKS5 server (username/password auth, CONNECT) that records usernames
+
+    Like Tor, it announces every new stream to the controller's STREAM listeners.
+    """
+
+    async def pipe(reader, writer):
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                writer.write(data)
+                await writer.drain()
+        finally:
+            writer.close()
+
+    async def handle(reader, writer):
+        _, n_methods = await reader.readexactly(2)
+        await reader.readexactly(n_methods)
+        writer.write(b"\x05\x02")
+        _, user_len = await reader.readexactly(2)
+        usernames.append((await reader.readexactly(user_len)).decode())
+        if controller is not None:
+            controller.emit_stream(str(len(usernames)), usernames[-1])
+        pass_len = (await reader.readexactly(1))[0]
+        await reader.readexactly(pass_len)
+        writer.write(b"\x01\x00")
+        _, _, _, address_type = await reader.readexactly(4)
+        if address_type == 3:
+            host = (await reader.readexactly((await reader.readexactly(1))[0])).decode()
+        else:
+            host = '.'.join(str(b) for b in await reader.readexactly(4))
+        port = struct.unpack('>H', await reader.readexactly(2))[0]
+        upstream_reader, upstream_writer = await asyncio.open_connection(host, port)
+        writer.write(b"\x05\x00\x00\x01" + bytes(4) + b"\x00\x00")
+        await writer.drain()
+        await asyncio.gather(pipe(reader, upstream_writer), pipe(upstream_reader, writer))
+
+    server = await asyncio.start_server(handle, '127.0.0.1', 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+@unittest.skipIf(not AIOHTTP_AVAILABLE, "aiohttp not available")
+class TestCircuitPool(unittest.TestCase):
+    """Test cases for pooled circuits against a fake controller"""
+
+    def run_async(self, coroutine):
+        return asyncio.run(coroutine)
+
+    def test_prewarmed_pool_serves_messages_without_per_message_builds(self):
+        async def scenario():
+            runner, port, received = await start_receiver()
+            controller = FakeTorController(build_latency=0.01)
+            gateway = TorGateway(controller=controller, pool_size=3, session_factory=direct_session_factory())
+            try:
+                self.assertTrue(await gateway.initialize())
+                self.assertTrue(await gateway.circuit_pool.wait_ready("general", gateway.security_level, timeout=5))
+                results = await asyncio.gather(*(gateway.send_message('127.0.0.1', port, b"m%d" % i)
+                                                 for i in range(30)))
+                status = await gateway.get_network_status()
+                return results, received, controller, status
+            finally:
+                await gateway.shutdown()
+                await runner.cleanup()
+
+        results, received, controller, status = self.run_async(scenario())
+        self.assertTrue(all(results))
+        self.assertEqual(len(received), 30)
+        self.assertEqual(len(controller.built), 3)
+        self.assertEqual(controller.status_walks, 1)
+        self.assertEqual(status['circuit_pool']['keys']['general/HIGH']['usable'], 3)
+        self.assertEqual(sorted(controller.closed), sorted(controller.built))
+
+    def test_usage_rotation_does_not_fail_senders(self):
+        async def scenario():
+            runner, port, _ = await start_receiver()
+            controller = FakeTorController()
+            gateway = TorGateway(controller=controller, pool_size=2, session_factory=direct_session_factory())
+            gateway.security_level = SecurityLevel.PARANOID  # 10 messages per circuit
+            try:
+                await gateway.initialize()
+                results = []
+                for i in range(45):
+                    results.append(await gateway.send_message('127.0.0.1', port, b"x"))
+                return results, controller, dict(gateway.circuit_pool.stats)
+            finally:
+                await gateway.shutdown()
+                await runner.cleanup()
+
+        results, controller, stats = self.run_async(scenario())
+        self.assertTrue(all(results))
+        self.assertGreaterEqual(stats['retired'], 3)
+        self.assertGreaterEqual(len(controller.built), 5)
+
+    def test_failed_circuit_is_replaced(self):
+        async def scenario():
+            controller = FakeTorController()
+            gateway = TorGateway(controller=controller, pool_size=1, session_factory=direct_session_factory())
+            try:
+                await gateway.initialize()
+                pool = gateway.circuit_pool
+                first = await pool.acquire("general", gateway.security_level)
+                pool.release(first)
+                pool.mark_failed(first.circuit_id)
+                second = await pool.acquire("general", gateway.security_level, timeout=5)
+                pool.release(second)
+                return first.circuit_id, second.circuit_id, pool
+            finally:
+                await gateway.shutdown()
+
+        first, second, pool = self.run_async(scenario())
+        self.assertNotEqual(first, second)
+        self.assertGreaterEqual(pool.stats['waits'], 1)
+
+    def test_node_list_refreshes_on_timer(self):
+        async def scenario():
+            refreshes = []
+
+            async def refresh():
+                refreshes.append(1)
+
+            async def build(purpose, level):
+                return None
+
+            async def close(circuit_id):
+                pass
+
+            pool = CircuitPool(build, close, direct_session_factory(), target_size=0, refresh=refresh,
+                               refresh_interval=0.01, maintenance_interval=0.01)
+            await pool.start([("general", SecurityLevel.HIGH)])
+            await asyncio.sleep(0.1)
+            await pool.stop()
+            return len(refreshes)
+
+        self.assertGreaterEqual(self.run_async(scenario()), 3)
+
+    @unittest.skipIf(not AIOHTTP_SOCKS_AVAILABLE, "aiohttp-socks not available")
+    def test_socks_sessions_use_isolated_credentials(self):
+        async def scenario():
+            runner, port, received = await start_receiver()
+            usernames = []
+            controller = FakeTorController()
+            socks_server, socks_port = await start_socks_standin(usernames, controller)
+            gateway = TorGateway(controller=controller, socks_port=socks_port, pool_size=2)
+            try:
+                await gateway.initialize()
+                await gateway.circuit_pool.wait_ready("general", gateway.security_level, timeout=5)
+                self.assertEqual(controller.conf, {'__LeaveStreamsUnattached': '1'})
+                circuits = {entry.socks_username: entry.circuit_id
+                            for entries in gateway.circuit_pool._entries.values() for entry in entries}
+                results = await asyncio.gather(*(gateway.send_message('127.0.0.1', port, b"x")
+                                                 for _ in range(10)))
+                return results, usernames, controller, circuits
+            finally:
+                await gateway.shutdown()
+                socks_server.close()
+                await runner.cleanup()
+
+        results, usernames, controller, circuits = self.run_async(scenario())
+        self.assertTrue(all(results))
+        # Keep-alive: far fewer SOCKS handshakes than messages, one identity per circuit
+        self.assertLessEqual(len(usernames), 10)
+        self.assertEqual(len(set(usernames)), 2)
+        # Every stream rides the pre-built circuit owned by its SOCKS identity
+        self.assertEqual(controller.attached, [(str(n + 1), circuits[username])
+                                               for n, username in enumerate(usernames)])
+        self.assertEqual(controller.conf, {})
+
+    def test_foreign_streams_are_left_to_tor(self):
+        async def scenario():
+            controller = FakeTorController()
+            gateway = TorGateway(controller=controller, pool_size=1, session_factory=direct_session_factory())
+            try:
+                self.assertTrue(await gateway.initialize())
+                controller.emit_stream('7', 'someone-else')
+                controller.emit_stream('8', None)
+                controller.emit_stream('9', 'someone-else', status='SUCCEEDED')
+                return controller.attached
+            finally:
+                await gateway.shutdown()
+
+        self.assertEqual(self.run_async(scenario()), [('7', '0'), ('8', '0')])
+
+    @unittest.skipIf(AIOHTTP_SOCKS_AVAILABLE, "aiohttp-socks installed")
+    def test_pool_disabled_without_socks_support(self):
+        with self.assertRaises(RuntimeError):
+            socks_session_factory()
+        gateway = TorGateway(controller=FakeTorController(), pool_size=2)
+        with self.assertLogs(level='ERROR'):
+            self.assertFalse(self.run_async(gateway.initialize()))
+        self.assertIsNone(gateway.circuit_pool)
+
+    def test_benchmark_runs(self):
+        results = benchmark_circuit_pool(messages=20, concurrencies=(4,), build_latency=0.0, pool_size=2)
+        self.assertEqual([r['mode'] for r in results], ['per-message', 'pool'])
+        self.assertEqual(results[1]['circuits_built'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
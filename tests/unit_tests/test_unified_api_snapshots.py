@@ -0,0 +1,192 @@
+"""
+Unit tests for the unified_api snapshot service
+"""
+
+import unittest
+import asyncio
+import os
+import sys
+
+# Add the project root to the path so we can import the unified_api package
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from unified_api.client import UnifiedAPIClient
+from unified_api.models import ConsciousnessState, AGIState
+from unified_api.snapshots import SnapshotService, UpstreamSnapshot
+
+
+def make_consciousness(level=0.5):
+    return ConsciousnessState(
+        node_id="metatron_system", timestamp=1.0, consciousness_level=level,
+        phi=0.1, coherence=0.2, recursive_depth=1, gamma_power=0.3,
+        fractal_dimension=1.2, spiritual_awareness=0.4,
+        state_classification="aware", is_conscious=True, dimensions={}
+    )
+
+
+class FakeClient(UnifiedAPIClient):
+    """UnifiedAPIClient whose upstream calls are counted instead of sent"""
+
+    def __init__(self, delay=0.01):
+        super().__init__()
+        self.delay = delay
+        self.consciousness_calls = 0
+        self.agi_calls = 0
+        self.fail = False
+
+    async def get_consciousness_state(self):
+        self.consciousness_calls += 1
+        await asyncio.sleep(self.delay)
+        return None if self.fail else make_consciousness(self.consciousness_calls / 10)
+
+    async def get_agi_state(self):
+        self.agi_calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("AGI down")
+        return AGIState(node_id="agi_system", timestamp=1.0, consensus_status="healthy",
+                        network_health={}, performance_metrics={}, active_connections=3,
+                        byzantine_threshold=1, quorum_size=3)
+
+
+class TestSnapshotService(unittest.TestCase):
+    """Test cases for cached, coalesced state snapshots"""
+
+    def test_concurrent_misses_are_coalesced(self):
+        """Concurrent cache misses share a single upstream call"""
+        async def run():
+            client = FakeClient()
+            service = SnapshotService(client, ttl=60.0)
+            results = await asyncio.gather(*[service.get_unified() for _ in range(50)])
+            return client, service, results
+
+        client, service, results = asyncio.run(run())
+        self.assertEqual(client.consciousness_calls, 1)
+        self.assertEqual(client.agi_calls, 1)
+        self.assertEqual(service.consciousness.stats.coalesced_waits, 49)
+        self.assertTrue(all(r["consciousness"]["consciousness_level"] == 0.1 for r in results))
+        self.assertEqual(results[0]["system_status"], "running")
+
+    def test_fresh_value_served_from_cache(self):
+        """Reads within the TTL never reach the upstream"""
+        async def run():
+            client = FakeClient(delay=0)
+            snapshot = UpstreamSnapshot("consciousness", client.get_consciousness_state, ttl=60.0)
+            for _ in range(100):
+                await snapshot.get()
+            return client, snapshot
+
+        client, snapshot = asyncio.run(run())
+        self.assertEqual(client.consciousness_calls, 1)
+        self.assertEqual(snapshot.stats.cache_hits, 99)
+
+    def test_stale_value_served_on_upstream_error(self):
+        """The last good value is kept when the upstream starts failing"""
+        async def run():
+            client = FakeClient(delay=0)
+            service = SnapshotService(client, ttl=0.05, max_stale=60.0)
+            first = await service.get_unified()
+            client.fail = True
+            await asyncio.sleep(0.06)
+            await service.get_unified()  # Served stale; the refresh runs in the background
+            await asyncio.sleep(0.01)
+            second = await service.get_unified()
+            await service.stop()
+            return service, first, second
+
+        service, first, second = asyncio.run(run())
+        self.assertEqual(second["consciousness"], first["consciousness"])
+        self.assertEqual(second["agi"]["consensus_status"], "healthy")
+        self.assertTrue(second["snapshot"]["consciousness_stale"])
+        self.assertEqual(service.agi.last_error, "AGI down")
+        self.assertEqual(service.agi.stats.upstream_errors, 1)
+
+    def test_stale_read_does_not_wait_for_upstream(self):
+        """An expired value is returned at once while a slow refresh runs"""
+        async def run():
+            client = FakeClient(delay=0)
+            snapshot = UpstreamSnapshot("consciousness", client.get_consciousness_state,
+                                        ttl=0.05, max_stale=60.0)
+            first = await snapshot.get()
+            client.delay = 2.0
+            await asyncio.sleep(0.06)
+            start = asyncio.get_running_loop().time()
+            reads = [await snapshot.get() for _ in range(10)]
+            elapsed = asyncio.get_running_loop().time() - start
+            await asyncio.sleep(0)
+            refreshing = snapshot._inflight is not None
+            await snapshot.stop()
+            return client, snapshot, first, reads, elapsed, refreshing
+
+        client, snapshot, first, reads, elapsed, refreshing = asyncio.run(run())
+        self.assertLess(elapsed, 0.5)
+        self.assertTrue(all(read is first for read in reads))
+        self.assertTrue(refreshing)
+        self.assertEqual(client.consciousness_calls, 2)
+        self.assertEqual(snapshot.stats.stale_served, 10)
+
+    def test_stale_value_expires(self):
+        """Values older than max_stale are no longer served"""
+        async def run():
+            client = FakeClient(delay=0)
+            snapshot = UpstreamSnapshot("consciousness", client.get_consciousness_state,
+                                        ttl=0.0, max_stale=0.0)
+            await snapshot.get()
+            client.fail = True
+            return await snapshot.get()
+
+        self.assertIsNone(asyncio.run(run()))
+
+    def test_failing_upstream_not_retried_within_ttl(self):
+        """A down upstream is polled at most once per TTL regardless of callers"""
+        async def run():
+            client = FakeClient(delay=0)
+            client.fail = True
+            service = SnapshotService(client, ttl=60.0)
+            for _ in range(100):
+                state = await service.get_unified()
+            return client, state
+
+        client, state = asyncio.run(run())
+        self.assertEqual(client.consciousness_calls, 1)
+        self.assertEqual(client.agi_calls, 1)
+        self.assertEqual(state["system_status"], "error")
+
+    def test_publish_fans_out_one_frame(self):
+        """All subscribers receive the same serialized frame; slow ones keep only the newest"""
+        async def run():
+            client = FakeClient(delay=0)
+            service = SnapshotService(client, ttl=60.0)
+            await service.get_unified()
+            queues = [service.subscribe() for _ in range(20)]
+            service.publish()
+            latest = service.publish()
+            frames = [q.get_nowait() for q in queues]
+            return client, latest, frames, queues
+
+        client, latest, frames, queues = asyncio.run(run())
+        self.assertTrue(all(frame is latest for frame in frames))
+        self.assertTrue(all(q.empty() for q in queues))
+        self.assertEqual(client.consciousness_calls, 1)
+
+    def test_background_refresh_rate_independent_of_readers(self):
+        """Upstream call rate follows the TTL, not the number of readers"""
+        async def run():
+            client = FakeClient(delay=0)
+            service = SnapshotService(client, ttl=0.05, push_interval=0.05)
+            service.start()
+            try:
+                end = asyncio.get_running_loop().time() + 0.3
+                while asyncio.get_running_loop().time() < end:
+                    await asyncio.gather(*[service.get_unified() for _ in range(20)])
+                    await asyncio.sleep(0.005)
+            finally:
+                await service.stop()
+            return client
+
+        client = asyncio.run(run())
+        self.assertLessEqual(client.consciousness_calls, 15)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -149,6 +149,11 @@ class UnifiedAPIClient:
         if isinstance(agi_state, Exception):
             logger.error(f"AGI state error: {agi_state}")
         
+        return self.build_unified_state(valid_consciousness_state, valid_agi_state)
+    
+    def build_unified_state(self, valid_consciousness_state: Optional[ConsciousnessState],
+                            valid_agi_state: Optional[AGIState]) -> UnifiedSystemState:
+        """Combine already-fetched consciousness and AGI states into a unified state"""
         # Calculate integration metrics
         consciousness_level = 0.0
         if valid_consciousness_state is not None and hasattr(valid_consciousness_state, 'consciousness_level'):
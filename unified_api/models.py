@@ -74,5 +74,7 @@ class UnifiedAPISettings:
     agi_api_url: str = "http://localhost:5000"       # Open-A.G.I monitoring runs on port 5000
     websocket_url: str = "ws://localhost:457/ws"
     update_interval: float = 1.0  # seconds
+    snapshot_ttl: float = 1.0  # seconds between upstream refreshes
+    snapshot_max_stale: float = 30.0  # serve last good state this long on upstream errors
     enable_tls: bool = False
     api_key: Optional[str] = None
\ No newline at end of file
@@ -20,6 +20,7 @@ logger = logging.getLogger(__name__)
 
 # Global variables
 api_client = None
+snapshot_service = None
 active_connections = []
 server_thread = None
 server_should_stop = False
@@ -27,6 +28,7 @@ server_should_stop = False
 # Import these only when needed to avoid circular dependencies
 UnifiedAPIClient = None
 UnifiedAPISettings = None
+SnapshotService = None
 
 # Create FastAPI app without lifespan events that might conflict with threading
 app = FastAPI(
@@ -92,14 +94,15 @@ async def root():
 
 
 async def initialize_client():
-    """Initialize the unified API client"""
-    global api_client, UnifiedAPIClient, UnifiedAPISettings
+    """Initialize the unified API client and its snapshot service"""
+    global api_client, snapshot_service, UnifiedAPIClient, UnifiedAPISettings, SnapshotService
     
     # Import here to avoid circular dependencies
-    if UnifiedAPIClient is None or UnifiedAPISettings is None:
+    if UnifiedAPIClient is None or UnifiedAPISettings is None or SnapshotService is None:
         try:
             from unified_api.client import UnifiedAPIClient
             from unified_api.models import UnifiedAPISettings
+            from unified_api.snapshots import SnapshotService
         except ImportError as e:
             logger.error(f"Failed to import unified API modules: {e}")
             return
@@ -110,23 +113,54 @@ async def initialize_client():
             api_client = UnifiedAPIClient(settings)
             await api_client.initialize()
             logger.info("Unified API Client initialized successfully")
+        if snapshot_service is None:
+            settings = api_client.settings
+            snapshot_service = SnapshotService(
+                api_client,
+                ttl=settings.snapshot_ttl,
+                max_stale=settings.snapshot_max_stale,
+                push_interval=settings.update_interval
+            )
+            snapshot_service.start()
     except Exception as e:
         logger.error(f"Failed to initialize Unified API Client: {e}")
 
 
 async def cleanup_client():
-    """Clean up the unified API client"""
-    global api_client
+    """Clean up the snapshot service and the unified API client"""
+    global api_client, snapshot_service
     try:
+        if snapshot_service:
+            await snapshot_service.stop()
         if api_client:
             await api_client.close()
             logger.info("Unified API Client closed")
     except Exception as e:
         logger.error(f"Error closing Unified API Client: {e}")
     finally:
+        snapshot_service = None
         api_client = None
 
 
+def _basic_state(error: Optional[str] = None) -> Dict[str, Any]:
+    """Placeholder state returned when no upstream data is available"""
+    state = {
+        "timestamp": asyncio.get_event_loop().time(),
+        "system_status": "running",
+        "consciousness": None,
+        "agi": None,
+        "integration_metrics": {
+            "systems_operational": (False, False),
+            "consciousness_level": 0.0,
+            "consensus_status": "unknown",
+            "timestamp": asyncio.get_event_loop().time()
+        }
+    }
+    if error is not None:
+        state["error"] = error
+    return state
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -139,7 +173,8 @@ async def health_check():
         return {
             "status": "healthy",
             "timestamp": asyncio.get_event_loop().time(),
-            "api_client_initialized": api_client is not None
+            "api_client_initialized": api_client is not None,
+            "snapshots": snapshot_service.get_status() if snapshot_service else None
         }
     except Exception as e:
         raise HTTPException(status_code=503, detail=f"Health check failed: {str(e)}")
@@ -147,131 +182,35 @@ async def health_check():
 
 @app.get("/state")
 async def get_unified_state():
-    """Get the unified state of both systems"""
+    """Get the unified state of both systems (served from the snapshot cache)"""
     # Initialize client if not already done
     if api_client is None:
         await initialize_client()
         
-    if not api_client:
+    if not snapshot_service:
         # Return a basic state if client is not available
-        return {
-            "timestamp": asyncio.get_event_loop().time(),
-            "system_status": "running",
-            "consciousness": None,
-            "agi": None,
-            "integration_metrics": {
-                "systems_operational": (False, False),
-                "consciousness_level": 0.0,
-                "consensus_status": "unknown",
-                "timestamp": asyncio.get_event_loop().time()
-            }
-        }
+        return _basic_state()
     
     try:
-        state = await api_client.get_unified_state()
-        if state:
-            # Convert to dict for JSON serialization
-            state_dict = {
-                "timestamp": state.timestamp,
-                "system_status": state.system_status.value if hasattr(state.system_status, 'value') else str(state.system_status),
-                "consciousness": None,
-                "agi": None,
-                "integration_metrics": state.integration_metrics
-            }
-            
-            # Add consciousness state if available
-            if state.consciousness:
-                state_dict["consciousness"] = {
-                    "node_id": state.consciousness.node_id,
-                    "timestamp": state.consciousness.timestamp,
-                    "consciousness_level": state.consciousness.consciousness_level,
-                    "phi": state.consciousness.phi,
-                    "coherence": state.consciousness.coherence,
-                    "recursive_depth": state.consciousness.recursive_depth,
-                    "gamma_power": state.consciousness.gamma_power,
-                    "fractal_dimension": state.consciousness.fractal_dimension,
-                    "spiritual_awareness": state.consciousness.spiritual_awareness,
-                    "state_classification": state.consciousness.state_classification,
-                    "is_conscious": state.consciousness.is_conscious,
-                    "dimensions": state.consciousness.dimensions
-                }
-            
-            # Add AGI state if available
-            if state.agi:
-                state_dict["agi"] = {
-                    "node_id": state.agi.node_id,
-                    "timestamp": state.agi.timestamp,
-                    "consensus_status": state.agi.consensus_status,
-                    "network_health": state.agi.network_health,
-                    "performance_metrics": state.agi.performance_metrics,
-                    "active_connections": state.agi.active_connections,
-                    "byzantine_threshold": state.agi.byzantine_threshold,
-                    "quorum_size": state.agi.quorum_size
-                }
-            
-            return state_dict
-        else:
-            # Return a basic state if unable to get unified state
-            return {
-                "timestamp": asyncio.get_event_loop().time(),
-                "system_status": "running",
-                "consciousness": None,
-                "agi": None,
-                "integration_metrics": {
-                    "systems_operational": (False, False),
-                    "consciousness_level": 0.0,
-                    "consensus_status": "unknown",
-                    "timestamp": asyncio.get_event_loop().time()
-                }
-            }
+        return await snapshot_service.get_unified()
     except Exception as e:
         logger.error(f"Error retrieving state: {e}")
         # Return a basic state if there's an error
-        return {
-            "timestamp": asyncio.get_event_loop().time(),
-            "system_status": "running",
-            "consciousness": None,
-            "agi": None,
-            "integration_metrics": {
-                "systems_operational": (False, False),
-                "consciousness_level": 0.0,
-                "consensus_status": "unknown",
-                "timestamp": asyncio.get_event_loop().time()
-            },
-            "error": str(e)
-        }
+        return _basic_state(str(e))
 
 
 @app.get("/consciousness")
 async def get_consciousness_state():
-    """Get consciousness state only"""
+    """Get consciousness state only (served from the snapshot cache)"""
     # Initialize client if not already done
     if api_client is None:
         await initialize_client()
         
-    if not api_client:
+    if not snapshot_service:
         raise HTTPException(status_code=503, detail="API client not initialized")
     
     try:
-        state = await api_client.get_consciousness_state()
-        if state:
-            # Convert to dict for JSON serialization
-            return {
-                "node_id": state.node_id,
-                "timestamp": state.timestamp,
-                "consciousness_level": state.consciousness_level,
-                "phi": state.phi,
-                "coherence": state.coherence,
-                "recursive_depth": state.recursive_depth,
-                "gamma_power": state.gamma_power,
-                "fractal_dimension": state.fractal_dimension,
-                "spiritual_awareness": state.spiritual_awareness,
-                "state_classification": state.state_classification,
-                "is_conscious": state.is_conscious,
-                "dimensions": state.dimensions
-            }
-        else:
-            return None
+        return await snapshot_service.get_consciousness()
     except Exception as e:
         logger.error(f"Error retrieving consciousness state: {e}")
         raise HTTPException(status_code=500, detail=f"Error retrieving consciousness state: {str(e)}")
@@ -279,30 +218,16 @@ async def get_consciousness_state():
 
 @app.get("/agi")
 async def get_agi_state():
-    """Get AGI state only"""
+    """Get AGI state only (served from the snapshot cache)"""
     # Initialize client if not already done
     if api_client is None:
         await initialize_client()
         
-    if not api_client:
+    if not snapshot_service:
         raise HTTPException(status_code=503, detail="API client not initialized")
     
     try:
-        state = await api_client.get_agi_state()
-        if state:
-            # Convert to dict for JSON serialization
-            return {
-                "node_id": state.node_id,
-                "timestamp": state.timestamp,
-                "consensus_status": state.consensus_status,
-                "network_health": state.network_health,
-                "performance_metrics": state.performance_metrics,
-                "active_connections": state.active_connections,
-                "byzantine_threshold": state.byzantine_threshold,
-                "quorum_size": state.quorum_size
-            }
-        else:
-            return None
+        return await snapshot_service.get_agi()
     except Exception as e:
         logger.error(f"Error retrieving AGI state: {e}")
         raise HTTPException(status_code=500, detail=f"Error retrieving AGI state: {str(e)}")
@@ -352,7 +277,11 @@ async def send_chat_message(message_data: Dict[str, Any]):
 
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket endpoint for real-time state streaming"""
+    """WebSocket endpoint for real-time state streaming
+    
+    Every subscriber receives the same pre-serialized snapshot frame pushed by
+    the snapshot service, so upstream load does not grow with client count.
+    """
     # Initialize client if not already done
     if api_client is None:
         await initialize_client()
@@ -360,33 +289,36 @@ async def websocket_endpoint(websocket: WebSocket):
     await websocket.accept()
     active_connections.append(websocket)
     
+    queue = None
     try:
-        # Send initial state
-        try:
-            state = await get_unified_state()
-            if state:
-                await websocket.send_text(json.dumps(state, default=str))
-        except Exception as e:
-            logger.error(f"Error sending initial state: {e}")
+        if not snapshot_service:
+            await websocket.send_text(json.dumps(_basic_state("API client not initialized"), default=str))
+            return
         
-        # Stream updates at regular intervals
-        while True:
+        # Send initial state without waiting for the next push tick
+        if snapshot_service.frame is None:
             try:
-                state = await get_unified_state()
-                if state:
-                    await websocket.send_text(json.dumps(state, default=str))
+                await websocket.send_text(json.dumps(await snapshot_service.get_unified(), default=str))
             except Exception as e:
-                logger.error(f"Error getting/sending state: {e}")
-            
-            # Wait before next update
-            await asyncio.sleep(1.0)
+                logger.error(f"Error sending initial state: {e}")
+        
+        # Stream pushed snapshots
+        queue = snapshot_service.subscribe()
+        while True:
+            frame = await queue.get()
+            await websocket.send_text(frame)
             
     except Exception as e:
         logger.error(f"WebSocket error: {e}")
     finally:
+        if queue is not None and snapshot_service:
+            snapshot_service.unsubscribe(queue)
         if websocket in active_connections:
             active_connections.remove(websocket)
-        await websocket.close()
+        try:
+            await websocket.close()
+        except Exception:
+            pass
 
 
 def _run_server_in_thread(host: str, port: int):
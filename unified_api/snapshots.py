@@ -0,0 +1,304 @@
+"""
+Snapshot service for the Unified API
+
+Caches upstream state from the Metatron and Open-A.G.I backends so that the
+number of HTTP requests sent upstream depends only on the refresh interval,
+not on how many REST callers or WebSocket dashboards are connected.
+
+- One background refresher per upstream, re-fetching every ``ttl`` seconds
+- Single-flight coalescing: concurrent cache misses share one upstream call
+- Stale-while-revalidate: an expired value is served (flagged as stale) while
+  the refresh runs in the background, and on upstream errors the last good
+  value is kept, both for up to ``max_stale`` seconds; only cold reads wait
+- One pre-serialized JSON frame per tick fanned out to all WebSocket subscribers
+"""
+
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+
+def consciousness_to_dict(state) -> Optional[Dict[str, Any]]:
+    """Convert a ConsciousnessState into its JSON-ready dict"""
+    if state is None:
+        return None
+    return asdict(state)
+
+
+def agi_to_dict(state) -> Optional[Dict[str, Any]]:
+    """Convert an AGIState into its JSON-ready dict"""
+    if state is None:
+        return None
+    return asdict(state)
+
+
+def unified_to_dict(state) -> Dict[str, Any]:
+    """Convert a UnifiedSystemState into its JSON-ready dict"""
+    return {
+        "timestamp": state.timestamp,
+        "system_status": state.system_status.value if hasattr(state.system_status, 'value') else str(state.system_status),
+        "consciousness": consciousness_to_dict(state.consciousness),
+        "agi": agi_to_dict(state.agi),
+        "integration_metrics": state.integration_metrics
+    }
+
+
+@dataclass
+class SnapshotStats:
+    """Counters describing cache behaviour for one upstream"""
+    upstream_calls: int = 0
+    upstream_errors: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    coalesced_waits: int = 0
+    stale_served: int = 0
+
+
+class UpstreamSnapshot:
+    """Cached value of one upstream, refreshed in the background"""
+
+    def __init__(self, name: str, fetch: Callable[[], Awaitable[Any]],
+                 ttl: float = 1.0, max_stale: float = 30.0):
+        self.name = name
+        self.fetch = fetch
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.value: Any = None
+        self.fetched_at: float = 0.0  # monotonic time of last successful fetch
+        self.attempted_at: float = 0.0  # monotonic time of last fetch attempt
+        self.last_error: Optional[str] = None
+        self.stats = SnapshotStats()
+        self._inflight: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self._revalidation: Optional[asyncio.Task] = None
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last successful fetch"""
+        if not self.fetched_at:
+            return float("inf")
+        return time.monotonic() - self.fetched_at
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.age < self.ttl
+
+    @property
+    def is_stale(self) -> bool:
+        """True when the served value is older than the TTL but still usable"""
+        return self.fetched_at > 0 and not self.is_fresh and self.age < self.max_stale
+
+    def current(self) -> Any:
+        """Return the cached value without touching the upstream"""
+        if self.fetched_at and self.age < self.max_stale:
+            return self.value
+        return None
+
+    async def get(self) -> Any:
+        """Return the cached value; only a cold cache waits for the upstream"""
+        if self.is_fresh:
+            self.stats.cache_hits += 1
+            return self.value
+        if self.current() is not None:
+            # Expired but within max_stale: serve it and refresh behind the caller
+            self.stats.stale_served += 1
+            self._revalidate()
+            return self.value
+        if self.attempted_at and time.monotonic() - self.attempted_at < self.ttl:
+            # Upstream failed recently; don't retry more often than the TTL
+            return None
+        self.stats.cache_misses += 1
+        await self.refresh()
+        return self.current()
+
+    def _revalidate(self):
+        """Schedule a background refresh unless one is already running or due"""
+        if self._inflight is not None:
+            return
+        if self._task is not None and not self._task.done():
+            return  # The refresher loop picks it up on its next tick
+        if self._revalidation is not None and not self._revalidation.done():
+            return
+        if self.attempted_at and time.monotonic() - self.attempted_at < self.ttl:
+            return
+        self._revalidation = asyncio.ensure_future(self.refresh())
+
+    async def refresh(self) -> Any:
+        """Fetch from the upstream, coalescing with any refresh already in flight"""
+        if self._inflight is not None:
+            self.stats.coalesced_waits += 1
+            return await asyncio.shield(self._inflight)
+
+        loop = asyncio.get_running_loop()
+        self._inflight = loop.create_future()
+        try:
+            self.stats.upstream_calls += 1
+            try:
+                value = await self.fetch()
+            except Exception as e:
+                value = None
+                self.last_error = str(e)
+                logger.warning(f"Upstream '{self.name}' refresh failed: {e}")
+
+            self.attempted_at = time.monotonic()
+            if value is not None:
+                self.value = value
+                self.fetched_at = time.monotonic()
+                self.last_error = None
+            else:
+                # Keep serving the previous value (stale-while-revalidate)
+                self.stats.upstream_errors += 1
+                if self.last_error is None:
+                    self.last_error = "upstream unavailable"
+
+            result = self.current()
+            self._inflight.set_result(result)
+            return result
+        except BaseException:
+            # Cancelled mid-fetch: let coalesced waiters fall back to the cached value
+            self._inflight.set_result(self.current())
+            raise
+        finally:
+            self._inflight = None
+
+    async def _refresh_loop(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error in '{self.name}' refresher: {e}")
+            await asyncio.sleep(self.ttl)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.ensure_future(self._refresh_loop())
+
+    async def stop(self):
+        for task in (self._task, self._revalidation):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = None
+        self._revalidation = None
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "age": None if not self.fetched_at else round(self.age, 3),
+            "fresh": self.is_fresh,
+            "stale": self.is_stale,
+            "last_error": self.last_error,
+            "stats": asdict(self.stats)
+        }
+
+
+class SnapshotService:
+    """Shared, cached view of both upstreams for REST and WebSocket callers"""
+
+    def __init__(self, client, ttl: float = 1.0, max_stale: float = 30.0,
+                 push_interval: Optional[float] = None):
+        self.client = client
+        self.consciousness = UpstreamSnapshot("consciousness", client.get_consciousness_state,
+                                              ttl=ttl, max_stale=max_stale)
+        self.agi = UpstreamSnapshot("agi", client.get_agi_state, ttl=ttl, max_stale=max_stale)
+        self.push_interval = push_interval if push_interval is not None else ttl
+        self.frame: Optional[str] = None  # Latest pre-serialized unified state
+        self.frames_published = 0
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._push_task: Optional[asyncio.Task] = None
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def _compose(self, consciousness, agi) -> Dict[str, Any]:
+        state = self.client.build_unified_state(consciousness, agi)
+        state_dict = unified_to_dict(state)
+        state_dict["snapshot"] = {
+            "consciousness_stale": self.consciousness.is_stale,
+            "agi_stale": self.agi.is_stale
+        }
+        return state_dict
+
+    async def get_consciousness(self) -> Optional[Dict[str, Any]]:
+        return consciousness_to_dict(await self.consciousness.get())
+
+    async def get_agi(self) -> Optional[Dict[str, Any]]:
+        return agi_to_dict(await self.agi.get())
+
+    async def get_unified(self) -> Dict[str, Any]:
+        consciousness, agi = await asyncio.gather(self.consciousness.get(), self.agi.get())
+        return self._compose(consciousness, agi)
+
+    def publish(self) -> str:
+        """Serialize the cached state once and hand it to every subscriber"""
+        state_dict = self._compose(self.consciousness.current(), self.agi.current())
+        frame = json.dumps(state_dict, default=str)
+        self.frame = frame
+        self.frames_published += 1
+        for queue in self._subscribers:
+            # Slow subscribers only ever see the newest frame
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(frame)
+        return frame
+
+    def subscribe(self) -> asyncio.Queue:
+        """Register a subscriber; it immediately receives the latest frame if any"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+        if self.frame is not None:
+            queue.put_nowait(self.frame)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    async def _push_loop(self):
+        while True:
+            try:
+                self.publish()
+            except Exception as e:
+                logger.error(f"Error publishing snapshot: {e}")
+            await asyncio.sleep(self.push_interval)
+
+    def start(self):
+        """Start the upstream refreshers and the subscriber push loop"""
+        self.consciousness.start()
+        self.agi.start()
+        if self._push_task is None or self._push_task.done():
+            self._push_task = asyncio.ensure_future(self._push_loop())
+        logger.info("Snapshot service started")
+
+    async def stop(self):
+        if self._push_task is not None:
+            self._push_task.cancel()
+            try:
+                await self._push_task
+            except asyncio.CancelledError:
+                pass
+            self._push_task = None
+        await self.consciousness.stop()
+        await self.agi.stop()
+        self._subscribers.clear()
+        logger.info("Snapshot service stopped")
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            "subscribers": self.subscriber_count,
+            "frames_published": self.frames_published,
+            "consciousness": self.consciousness.get_status(),
+            "agi": self.agi.get_status()
+        }